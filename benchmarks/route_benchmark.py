@@ -0,0 +1,463 @@
+"""
+ルート最適化ベンチマーク
+合成インスタンス（一様・クラスタ・都道府県分布）で RouteOptimizer の各手法を計測し、
+実行時間・ピークメモリ・既知最良解とのギャップを JSON に記録する
+
+実行方法:
+	python benchmarks/route_benchmark.py
+	python benchmarks/route_benchmark.py --sizes 10 100 1000 --methods greedy 2opt
+	python benchmarks/route_benchmark.py --save-baseline benchmarks/results/baseline.json
+	python benchmarks/route_benchmark.py --baseline benchmarks/results/baseline.json
+
+インスタンスは TSPLIB 形式（EDGE_WEIGHT_TYPE: GEO）で書き出し・読み込みできる:
+	python benchmarks/route_benchmark.py --export-dir benchmarks/instances
+	python benchmarks/route_benchmark.py --instances benchmarks/instances/*.tsp
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python benchmarks/route_benchmark.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.logger import get_logger
+from src.route_optimizer import RouteOptimizer
+
+
+# 手法ごとの最大地点数（これを超えるインスタンスでは計測しない）
+METHOD_LIMITS = {
+	'exhaustive': 9,
+	'held_karp': 16,
+	'greedy': None,
+	'2opt': None,
+	'multistart': None,
+}
+
+DEFAULT_SIZES = [10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# 都道府県庁所在地（緯度, 経度）と人口（万人、おおよその値）
+# 観光地の分布は人口にほぼ比例するため、重み付きで地点を生成する
+PREFECTURES = [
+	(43.064, 141.347, 514), (40.824, 140.740, 120), (39.704, 141.153, 118),
+	(38.269, 140.872, 228), (39.719, 140.102, 93), (38.240, 140.363, 104),
+	(37.750, 140.468, 179), (36.342, 140.447, 284), (36.566, 139.884, 191),
+	(36.391, 139.060, 191), (35.857, 139.649, 734), (35.605, 140.123, 628),
+	(35.690, 139.692, 1404), (35.448, 139.643, 923), (37.902, 139.023, 215),
+	(36.695, 137.211, 102), (36.594, 136.626, 111), (36.065, 136.222, 75),
+	(35.664, 138.568, 80), (36.651, 138.181, 202), (35.391, 136.722, 195),
+	(34.977, 138.383, 355), (35.180, 136.907, 749), (34.730, 136.509, 174),
+	(35.004, 135.869, 141), (35.021, 135.756, 255), (34.686, 135.520, 878),
+	(34.691, 135.183, 537), (34.685, 135.833, 131), (34.226, 135.168, 91),
+	(35.504, 134.238, 54), (35.472, 133.051, 66), (34.662, 133.935, 186),
+	(34.396, 132.459, 276), (34.186, 131.471, 131), (34.066, 134.559, 70),
+	(34.340, 134.043, 94), (33.842, 132.766, 131), (33.560, 133.531, 68),
+	(33.607, 130.418, 510), (33.249, 130.299, 80), (32.745, 129.874, 128),
+	(32.790, 130.742, 172), (33.238, 131.613, 111), (31.911, 131.424, 106),
+	(31.560, 130.558, 156), (26.212, 127.681, 147),
+]
+
+
+def uniform_instance(n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+	"""関東周辺に一様分布する地点"""
+	return rng.uniform(34.8, 36.8, n), rng.uniform(138.8, 140.8, n)
+
+
+def clustered_instance(n: int, rng: np.random.Generator, clusters: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+	"""いくつかの観光地周辺に集中した地点（ウィッシュリストに近い分布）"""
+	centers_lat = rng.uniform(31.5, 43.0, clusters)
+	centers_lon = rng.uniform(130.5, 144.0, clusters)
+	labels = rng.integers(0, clusters, n)
+	return (
+		centers_lat[labels] + rng.normal(0, 0.08, n),
+		centers_lon[labels] + rng.normal(0, 0.08, n)
+	)
+
+
+def japan_instance(n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+	"""都道府県庁所在地の周辺に人口比で分布する地点（全国旅行の分布）"""
+	table = np.array(PREFECTURES, dtype=np.float64)
+	weights = table[:, 2] / table[:, 2].sum()
+	labels = rng.choice(len(table), size=n, p=weights)
+	# 県の広さを考慮して半径 20〜30km 程度にばらつかせる
+	return (
+		table[labels, 0] + rng.normal(0, 0.2, n),
+		table[labels, 1] + rng.normal(0, 0.25, n)
+	)
+
+
+GENERATORS = {
+	'uniform': uniform_instance,
+	'clustered': clustered_instance,
+	'japan': japan_instance,
+}
+
+
+def to_locations(lats: np.ndarray, lons: np.ndarray) -> List[Dict[str, Any]]:
+	"""座標配列を RouteOptimizer に渡す地点リストに変換"""
+	return [
+		{'id': i, 'latitude': float(lat), 'longitude': float(lon)}
+		for i, (lat, lon) in enumerate(zip(lats, lons))
+	]
+
+
+def _to_geo(value: float) -> float:
+	"""10進度を TSPLIB GEO 形式（DDD.MM）に変換"""
+	degrees = math.trunc(value)
+	minutes = (value - degrees) * 60.0
+	return degrees + minutes / 100.0
+
+
+def _from_geo(value: float) -> float:
+	"""TSPLIB GEO 形式（DDD.MM）を10進度に変換"""
+	degrees = math.trunc(value)
+	minutes = (value - degrees) * 100.0
+	return degrees + minutes / 60.0
+
+
+def write_tsplib(path: Path, name: str, locations: List[Dict[str, Any]], comment: str = ""):
+	"""
+	地点リストを TSPLIB 形式で書き出す
+
+	Args:
+		path: 出力ファイルのパス
+		name: インスタンス名
+		locations: 地点のリスト
+		comment: COMMENT 行に書き込む説明
+	"""
+	lines = [
+		f"NAME : {name}",
+		f"COMMENT : {comment or 'JourneyMap synthetic instance'}",
+		"TYPE : TSP",
+		f"DIMENSION : {len(locations)}",
+		"EDGE_WEIGHT_TYPE : GEO",
+		"NODE_COORD_SECTION",
+	]
+	for i, location in enumerate(locations, 1):
+		lines.append(f"{i} {_to_geo(location['latitude']):.6f} {_to_geo(location['longitude']):.6f}")
+	lines.append("EOF")
+	path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def read_tsplib(path: Path) -> Tuple[str, List[Dict[str, Any]]]:
+	"""
+	TSPLIB 形式のファイルを読み込む（NODE_COORD_SECTION を持つ GEO / 緯度経度のみ対応）
+
+	Args:
+		path: .tsp ファイルのパス
+
+	Returns:
+		(インスタンス名, 地点のリスト)
+	"""
+	name = path.stem
+	weight_type = "GEO"
+	locations = []
+	in_coords = False
+
+	for raw in path.read_text(encoding='utf-8').splitlines():
+		line = raw.strip()
+		if not line:
+			continue
+		if line == "EOF":
+			break
+		if in_coords:
+			_, x, y = line.split()[:3]
+			x, y = float(x), float(y)
+			if weight_type == "GEO":
+				x, y = _from_geo(x), _from_geo(y)
+			locations.append({'id': len(locations), 'latitude': x, 'longitude': y})
+			continue
+		if line.startswith("NODE_COORD_SECTION"):
+			in_coords = True
+			continue
+		if ":" in line:
+			key, value = (part.strip() for part in line.split(":", 1))
+			if key == "NAME":
+				name = value
+			elif key == "EDGE_WEIGHT_TYPE":
+				weight_type = value
+
+	if weight_type not in ("GEO", "LATLON"):
+		raise ValueError(f"未対応の EDGE_WEIGHT_TYPE です: {weight_type}")
+
+	return name, locations
+
+
+def measure(
+	optimizer: RouteOptimizer,
+	locations: List[Dict[str, Any]],
+	method: str,
+	return_to_start: bool
+) -> Dict[str, float]:
+	"""
+	1手法を1回計測（距離行列の構築も含める）
+
+	tracemalloc の追跡分だけ実行時間は実運用より長くなるが、ベースラインとの比較は同条件で行う
+
+	Returns:
+		{'km', 'seconds', 'peak_mb'}
+	"""
+	# 前の計測でキャッシュされた距離行列を使わないようにする
+	RouteOptimizer.clear_matrix_cache()
+
+	tracemalloc.start()
+	started = time.perf_counter()
+	_, total_km = optimizer.optimize_route(locations, method=method, return_to_start=return_to_start)
+	seconds = time.perf_counter() - started
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return {
+		'km': float(total_km),
+		'seconds': seconds,
+		'peak_mb': peak / (1024 * 1024)
+	}
+
+
+def build_instances(
+	distributions: List[str],
+	sizes: List[int],
+	seed: int,
+	files: List[str]
+) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+	"""
+	計測対象のインスタンスを用意
+
+	Returns:
+		[(インスタンス名, 分布名, 地点リスト), ...]
+	"""
+	instances = []
+	for distribution in distributions:
+		for n in sizes:
+			# インスタンスごとにシードを固定し、サイズや分布の指定が変わっても同じ地点になるようにする
+			rng = np.random.default_rng([seed, n, sorted(GENERATORS).index(distribution)])
+			lats, lons = GENERATORS[distribution](n, rng)
+			instances.append((f"{distribution}-{n}", distribution, to_locations(lats, lons)))
+
+	for file in files:
+		name, locations = read_tsplib(Path(file))
+		instances.append((name, 'tsplib', locations))
+
+	return instances
+
+
+def run_benchmark(
+	instances: List[Tuple[str, str, List[Dict[str, Any]]]],
+	methods: List[str],
+	return_to_start: bool,
+	best_known: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+	"""
+	全インスタンス × 全手法を計測
+
+	Args:
+		instances: build_instances の戻り値
+		methods: 計測する手法
+		return_to_start: 周回ルートとして計測するか
+		best_known: インスタンス名 → 既知最良距離（ベースラインから引き継ぐ）
+
+	Returns:
+		計測結果のリスト（gap は既知最良解に対する超過率 %）
+	"""
+	optimizer = RouteOptimizer()
+	best_known = dict(best_known or {})
+	results = []
+
+	for name, distribution, locations in instances:
+		n = len(locations)
+		rows = []
+		for method in methods:
+			limit = METHOD_LIMITS.get(method)
+			if limit is not None and n > limit:
+				continue
+			row = {'instance': name, 'distribution': distribution, 'n': n, 'method': method}
+			row.update(measure(optimizer, locations, method, return_to_start))
+			rows.append(row)
+			print(
+				f"  {name:<18}{method:<12}{row['km']:>12.1f} km"
+				f"{row['seconds']:>10.3f} s{row['peak_mb']:>9.1f} MB"
+			)
+
+		if not rows:
+			continue
+
+		best = min(row['km'] for row in rows)
+		if name in best_known:
+			best = min(best, best_known[name])
+		best_known[name] = best
+
+		for row in rows:
+			row['best_known_km'] = best
+			row['gap'] = (row['km'] - best) / best * 100 if best > 0 else 0.0
+		results.extend(rows)
+
+	return results
+
+
+def compare_with_baseline(
+	results: List[Dict[str, Any]],
+	baseline: Dict[str, Any],
+	time_tolerance: float,
+	gap_tolerance: float
+) -> List[str]:
+	"""
+	ベースラインと比較して差分を表示
+
+	Args:
+		results: 今回の計測結果
+		baseline: 保存済みのベンチマーク結果
+		time_tolerance: 実行時間の許容倍率（例: 1.5 = 1.5倍まで）
+		gap_tolerance: 距離悪化の許容率（%）
+
+	Returns:
+		劣化と判定された項目の説明
+	"""
+	previous = {(row['instance'], row['method']): row for row in baseline.get('results', [])}
+	regressions = []
+
+	print("=" * 86)
+	print(f"{'インスタンス':<16}{'手法':<12}{'距離(km)':>12}{'前回比':>10}{'時間(s)':>10}{'前回比':>10}")
+	print("=" * 86)
+
+	for row in results:
+		before = previous.get((row['instance'], row['method']))
+		if before is None:
+			continue
+
+		km_change = (row['km'] - before['km']) / before['km'] * 100 if before['km'] > 0 else 0.0
+		time_ratio = row['seconds'] / before['seconds'] if before['seconds'] > 0 else 1.0
+		print(
+			f"{row['instance']:<18}{row['method']:<12}{row['km']:>12.1f}{km_change:>+9.2f}%"
+			f"{row['seconds']:>10.3f}{time_ratio:>9.2f}x"
+		)
+
+		if km_change > gap_tolerance:
+			regressions.append(f"{row['instance']} / {row['method']}: 距離が {km_change:+.2f}% 悪化")
+		# 極端に短い計測は揺らぎが大きいため時間の判定から外す
+		if time_ratio > time_tolerance and row['seconds'] > 0.05:
+			regressions.append(f"{row['instance']} / {row['method']}: 実行時間が {time_ratio:.2f} 倍")
+
+	print("=" * 86)
+	return regressions
+
+
+def print_summary(results: List[Dict[str, Any]]):
+	"""手法ごとのギャップ・時間の一覧を表示"""
+	print("=" * 86)
+	print(f"{'インスタンス':<16}{'手法':<12}{'距離(km)':>12}{'ギャップ':>10}{'時間(s)':>10}{'メモリ(MB)':>12}")
+	print("=" * 86)
+	for row in results:
+		print(
+			f"{row['instance']:<18}{row['method']:<12}{row['km']:>12.1f}{row['gap']:>9.2f}%"
+			f"{row['seconds']:>10.3f}{row['peak_mb']:>12.1f}"
+		)
+	print("=" * 86)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="RouteOptimizer の品質・速度ベンチマーク")
+	parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+	parser.add_argument(
+		"--distributions", nargs="+", choices=sorted(GENERATORS), default=['uniform', 'clustered', 'japan']
+	)
+	parser.add_argument("--methods", nargs="+", choices=sorted(METHOD_LIMITS), default=list(METHOD_LIMITS))
+	parser.add_argument("--instances", nargs="*", default=[], help="追加で計測する TSPLIB 形式のファイル")
+	parser.add_argument("--return-to-start", action="store_true", help="周回ルートとして計測")
+	parser.add_argument("--seed", type=int, default=42)
+	parser.add_argument("--output", help="結果 JSON の出力先（省略時は benchmarks/results/ に日時付きで保存）")
+	parser.add_argument("--baseline", help="比較するベースライン JSON")
+	parser.add_argument("--save-baseline", help="今回の結果をベースラインとして保存するパス")
+	parser.add_argument("--time-tolerance", type=float, default=1.5, help="実行時間の許容倍率")
+	parser.add_argument("--gap-tolerance", type=float, default=1.0, help="距離悪化の許容率（%%）")
+	parser.add_argument("--export-dir", help="生成したインスタンスを TSPLIB 形式で書き出すディレクトリ")
+	args = parser.parse_args()
+
+	# 計算ごとの INFO ログは表示しない
+	get_logger().logger.setLevel(logging.WARNING)
+
+	instances = build_instances(args.distributions, args.sizes, args.seed, args.instances)
+
+	if args.export_dir:
+		export_dir = Path(args.export_dir)
+		export_dir.mkdir(parents=True, exist_ok=True)
+		for name, distribution, locations in instances:
+			write_tsplib(export_dir / f"{name}.tsp", name, locations, comment=f"{distribution}, seed={args.seed}")
+		print(f"📝 {len(instances)}件のインスタンスを書き出しました: {export_dir}")
+		return
+
+	baseline = None
+	if args.baseline:
+		with open(args.baseline, 'r', encoding='utf-8') as f:
+			baseline = json.load(f)
+
+	print(f"🚀 {len(instances)}インスタンス × {len(args.methods)}手法を計測します")
+	results = run_benchmark(
+		instances,
+		args.methods,
+		args.return_to_start,
+		best_known=baseline.get('best_known') if baseline else None
+	)
+	print_summary(results)
+
+	best_known = {}
+	for row in results:
+		best_known[row['instance']] = row['best_known_km']
+
+	report = {
+		'created_at': datetime.now().isoformat(timespec='seconds'),
+		'environment': {
+			'python': platform.python_version(),
+			'numpy': np.__version__,
+			'platform': platform.platform(),
+			'cpu_count': os.cpu_count(),
+		},
+		'settings': {
+			'seed': args.seed,
+			'return_to_start': args.return_to_start,
+			'method_limits': METHOD_LIMITS,
+		},
+		'best_known': best_known,
+		'results': results,
+	}
+
+	output = Path(args.output) if args.output else (
+		_project_root / "benchmarks" / "results" / f"route_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+	)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with open(output, 'w', encoding='utf-8') as f:
+		json.dump(report, f, ensure_ascii=False, indent=2)
+	print(f"💾 結果を保存しました: {output}")
+
+	if args.save_baseline:
+		baseline_path = Path(args.save_baseline)
+		baseline_path.parent.mkdir(parents=True, exist_ok=True)
+		with open(baseline_path, 'w', encoding='utf-8') as f:
+			json.dump(report, f, ensure_ascii=False, indent=2)
+		print(f"📌 ベースラインを保存しました: {baseline_path}")
+
+	if baseline is not None:
+		regressions = compare_with_baseline(results, baseline, args.time_tolerance, args.gap_tolerance)
+		if regressions:
+			print("⚠️ ベースラインからの劣化:")
+			for message in regressions:
+				print(f"  - {message}")
+			sys.exit(1)
+		print("✅ ベースラインからの劣化はありません")
+
+
+if __name__ == "__main__":
+	main()
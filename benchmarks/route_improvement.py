@@ -0,0 +1,119 @@
+"""
+ルート改善ベンチマーク
+貪欲法・2-opt / Or-opt 改善・多始点探索の総距離・実行時間を比較する
+（多始点探索は 2-opt に対する短縮率と、ワーカープロセスの最大メモリも表示）
+
+実行方法:
+	python benchmarks/route_improvement.py
+	python benchmarks/route_improvement.py --sizes 50 200 1000 --time-limit 3
+	python benchmarks/route_improvement.py --sizes 500 1000 2000 --multistart-time 10 --starts 16
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python benchmarks/route_improvement.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import argparse
+import logging
+import resource
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.route_benchmark import clustered_instance, to_locations, uniform_instance
+from src.logger import get_logger
+from src.route_optimizer import RouteOptimizer
+
+
+def run_case(
+	optimizer: RouteOptimizer,
+	locations: List[Dict[str, Any]],
+	time_limit: float,
+	multistart_time: float = 0.0,
+	workers: int = None,
+	seed: int = None,
+	starts: int = None
+) -> Dict[str, float]:
+	"""1インスタンスで貪欲法・2-opt・多始点探索（multistart_time > 0 の場合）を比較"""
+	started = time.perf_counter()
+	_, greedy_km = optimizer.optimize_route_greedy(locations)
+	greedy_sec = time.perf_counter() - started
+
+	started = time.perf_counter()
+	_, improved_km = optimizer.optimize_route_2opt(locations, time_limit=time_limit)
+	improved_sec = time.perf_counter() - started
+
+	result = {
+		'greedy_km': greedy_km,
+		'greedy_sec': greedy_sec,
+		'2opt_km': improved_km,
+		'2opt_sec': improved_sec,
+		'improvement': (greedy_km - improved_km) / greedy_km * 100 if greedy_km else 0.0
+	}
+
+	if multistart_time > 0:
+		started = time.perf_counter()
+		_, multistart_km = optimizer.optimize_route_multistart(
+			locations, starts=starts, time_limit=multistart_time, seed=seed, max_workers=workers
+		)
+		result['multistart_km'] = multistart_km
+		result['multistart_sec'] = time.perf_counter() - started
+		result['multistart_gain'] = (improved_km - multistart_km) / improved_km * 100 if improved_km else 0.0
+	return result
+
+
+def main():
+	parser = argparse.ArgumentParser(description="貪欲法と 2-opt / Or-opt の比較")
+	parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200, 500, 1000])
+	parser.add_argument("--repeat", type=int, default=3, help="サイズごとのインスタンス数")
+	parser.add_argument("--time-limit", type=float, default=2.0, help="局所探索の制限時間（秒）")
+	parser.add_argument("--multistart-time", type=float, default=0.0,
+		help="多始点探索の制限時間（秒、0 で計測しない）")
+	parser.add_argument("--workers", type=int, default=None, help="多始点探索の並列プロセス数")
+	parser.add_argument("--starts", type=int, default=None, help="多始点探索の試行回数（省略時は CPU 数の2倍）")
+	parser.add_argument("--seed", type=int, default=42)
+	args = parser.parse_args()
+
+	# 計算ごとの INFO ログは表示しない
+	get_logger().logger.setLevel(logging.WARNING)
+
+	rng = np.random.default_rng(args.seed)
+	optimizer = RouteOptimizer()
+
+	print("=" * 86)
+	print(f"{'分布':<10}{'地点数':>6}{'貪欲法(km)':>14}{'時間(s)':>9}{'2-opt(km)':>14}{'時間(s)':>9}{'短縮率':>9}")
+	print("=" * 86)
+
+	for name, generator in (('uniform', uniform_instance), ('clustered', clustered_instance)):
+		for n in args.sizes:
+			results = [
+				run_case(optimizer, to_locations(*generator(n, rng)), args.time_limit, args.multistart_time, args.workers, args.seed, args.starts)
+				for _ in range(args.repeat)
+			]
+			mean = {key: float(np.mean([r[key] for r in results])) for key in results[0]}
+			print(
+				f"{name:<10}{n:>6}"
+				f"{mean['greedy_km']:>14.1f}{mean['greedy_sec']:>9.3f}"
+				f"{mean['2opt_km']:>14.1f}{mean['2opt_sec']:>9.3f}"
+				f"{mean['improvement']:>8.1f}%"
+			)
+			if args.multistart_time > 0:
+				print(
+					f"{'':<16}多始点探索 {mean['multistart_km']:>14.1f}{mean['multistart_sec']:>9.3f}"
+					f"（2-opt から {mean['multistart_gain']:+.2f}%）"
+				)
+
+	print("=" * 86)
+	if args.multistart_time > 0:
+		# Linux は KB、macOS はバイト単位
+		peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+		peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+		print(f"多始点探索ワーカーの最大メモリ: {peak_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+	main()
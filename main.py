@@ -371,6 +371,42 @@ def main():
 		)
 		st.session_state.show_performance = show_perf
 		
+		# 大規模ライブラリ向け: 写真マーカーの遅延読み込み
+		if 'lazy_markers' not in st.session_state:
+			st.session_state.lazy_markers = False
+		
+		lazy_markers = st.checkbox(
+			"写真マーカーを表示範囲ごとに読み込む",
+			value=st.session_state.lazy_markers,
+			help="ローカルのデータサーバから表示範囲内の写真だけを取得します（写真が多い場合に高速）"
+		)
+		st.session_state.lazy_markers = lazy_markers
+		
+		# 写真の表示方法（複数年分のライブラリでは密度表示が見やすい）
+		photo_layer_labels = {
+			'markers': '📍 マーカー',
+			'heatmap': '🔥 ヒートマップ',
+			'hexbin': '⬢ 六角形ビン（件数）',
+			'grid': '▦ グリッド（件数）',
+			'tiles': '🧱 事前レンダリングタイル（ドット・ルート）'
+		}
+		st.session_state.photo_layer = st.selectbox(
+			"写真の表示方法",
+			list(photo_layer_labels.keys()),
+			index=list(photo_layer_labels.keys()).index(st.session_state.get('photo_layer', 'markers')),
+			format_func=lambda k: photo_layer_labels[k],
+			help="密度表示では写真をセルに集約して描画します（ズームに応じてセルの大きさが変わります）。"
+			"事前レンダリングタイルは全写真のドットとルートを画像タイルにして配信します（期間フィルタは反映されません）"
+		)
+		
+		# 移動ルートの描き方（撮影時刻の間隔と速度で 徒歩/車・電車/飛行機 に区間分け）
+		st.session_state.route_segmented = st.checkbox(
+			"移動ルートを移動手段ごとに区間分け",
+			value=st.session_state.get('route_segmented', True),
+			help="撮影時刻の間隔と移動速度から 徒歩・車/電車・飛行機 を判定し、区間ごとに線を分けて描画します。"
+			"GPSの外れ値は除外し、長い空白期間ではルートを途切れさせます"
+		)
+		
 		st.markdown("---")
 		
 		# 逆ジオコーディング
@@ -384,16 +420,44 @@ def main():
 		- インターネット接続が必要です
 		""")
 		
+		from src.offline_geocoder import find_gazetteer_file
+		gazetteer_file = find_gazetteer_file()
+		use_offline_geocoder = st.checkbox(
+			"オフラインの地名辞書を使う（高速・ネット接続不要）",
+			value=gazetteer_file is not None,
+			disabled=gazetteer_file is None,
+			help="data/gazetteer/ に GeoNames の cities1000.txt などを置くと使えます" if gazetteer_file is None
+				else f"地名辞書: {gazetteer_file.name}"
+		)
+		
 		if st.button("場所名を取得", use_container_width=True):
 			with st.spinner("🌍 設定されていない写真の場所名を取得中..."):
 				try:
-					from src.geocoding import ReverseGeocoder
+					if use_offline_geocoder:
+						from src.offline_geocoder import get_offline_geocoder
+						geocoder = get_offline_geocoder(gazetteer_file)
+					else:
+						from src.geocoding import ReverseGeocoder
+						from src.geocoding_worker import AsyncGeocodingWorker
+						# 作業キューに保存しながら処理するため、中断しても次回は続きから再開する
+						geocoder = AsyncGeocodingWorker(ReverseGeocoder())
 					
-					geocoder = ReverseGeocoder()
+					progress_bar = st.progress(0.0, text="場所を集計中...")
+					
+					def report_progress(done, total, updated_count):
+						progress_bar.progress(
+							done / total,
+							text=f"{done}/{total} 地点を解決（{updated_count} 件更新）"
+						)
 					
 					db = Database()
 					db.initialize()
-					updated = db.update_location_names(geocoder)
+					updated = db.update_location_names(
+						geocoder,
+						progress_callback=report_progress,
+						# オンラインは1地点ごとに待機があるため、こまめに保存・進捗表示する
+						batch_size=1000 if use_offline_geocoder else 20
+					)
 					
 					if updated > 0:
 						st.success(f"✅ {updated} 件の場所名を取得しました")
@@ -426,28 +490,77 @@ def main():
 						st.error("フォルダIDを入力してください")
 					else:
 						from src.drive_sync import DriveSync
-						from src.scanner import MediaScanner
 						
 						sync = DriveSync(st.session_state.drive_folder_id)
-						res = sync.sync_new_photos(modified_after_iso=last_synced)
+						db = Database()
+						db.initialize()
+						progress_bar = st.progress(0.0, text="Drive から取り込み中...")
+						try:
+							# ダウンロードできたファイルから順に EXIF を読み、まとめて DB に登録する
+							res = sync.import_changes(
+								db,
+								progress_callback=lambda done, total, f: progress_bar.progress(
+									done / total, text=f"取り込み中: {done}/{total} {f.get('name', '')}"
+								)
+							)
+						finally:
+							db.close()
+						progress_bar.empty()
+						if res["failed"]:
+							st.warning(f"⚠️ {res['failed']} 件のダウンロードに失敗しました（次回の同期で再取得します）")
+						else:
+							from datetime import datetime
+							st.session_state.drive_last_synced = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+						if res["skipped"]:
+							st.caption(f"保存済みの内容と同じ {res['skipped']} 件はダウンロードを省略しました")
+						if res["no_gps"]:
+							st.caption(f"GPS情報のない {res['no_gps']} 件は地図に登録していません")
+						if res["remote_only"]:
+							st.caption(f"うち {res['remote_only']} 件は先頭だけを確認し、ダウンロードを省略しました")
 						
 						if res["downloaded"] > 0:
-							with st.spinner("新規ファイルをスキャン・登録中..."):
-								scan_result = MediaScanner.scan_folder(sync.download_dir, recursive=False)
-								db = Database()
-								db.initialize()
-								from src.exif_extractor import ExifExtractor
-								from src.video_metadata import VideoMetadataExtractor
-								db.bulk_insert_from_scanner(scan_result, ExifExtractor, VideoMetadataExtractor)
-								db.close()
 							st.success(f"✅ {res['downloaded']} 件のファイルを取り込みました")
-							st.session_state.drive_last_synced = res.get("latest") or st.session_state.get("drive_last_synced")
 							st.cache_data.clear()
 							st.rerun()
 						else:
 							st.info("新しいファイルはありませんでした")
 				except Exception as e:
 					st.error(f"❌ 同期エラー: {e}")
+			
+			# GPS情報がないためダウンロードを省略したファイルは、開くときに1件だけ取得する
+			if st.session_state.get("drive_folder_id"):
+				from src.drive_sync import DriveSyncState
+				
+				_drive_state = DriveSyncState()
+				try:
+					remote_files = _drive_state.remote_only(st.session_state.drive_folder_id)
+				finally:
+					_drive_state.close()
+				
+				if remote_files:
+					selected_remote = st.selectbox(
+						f"GPS情報のない写真（{len(remote_files)} 件、開くときにダウンロード）",
+						remote_files,
+						format_func=lambda row: row["name"],
+						key="drive_remote_only_file"
+					)
+					if st.button("👁️ 開く", use_container_width=True):
+						try:
+							from src.drive_sync import DriveSync
+							
+							sync = DriveSync(st.session_state.drive_folder_id)
+							with st.spinner(f"{selected_remote['name']} をダウンロード中..."):
+								local_path = sync.ensure_local(selected_remote["id"])
+							if ExifExtractor.is_supported(local_path):
+								st.image(
+									load_resized_image_bytes(str(local_path), 1024, 90, local_path.stat().st_mtime),
+									use_container_width=True
+								)
+							elif VideoMetadataExtractor.is_supported(local_path):
+								st.video(str(local_path))
+							st.caption(f"📁 {local_path}")
+						except Exception as e:
+							st.error(f"❌ ダウンロードエラー: {e}")
 		
 		# 観光地データ管理
 		st.markdown("### 🗾 観光地データ")
@@ -682,6 +795,46 @@ def main():
 							st.cache_data.clear()
 							st.rerun()
 					
+					# 営業時間・滞在時間（旅程スケジュールで使用、空欄は制限なし・標準の滞在時間）
+					hc1, hc2, hc3 = st.columns(3)
+					with hc1:
+						new_open = st.text_input("開館 (HH:MM)", value=item.get('open_time') or "", key=f"open_{item['id']}")
+					with hc2:
+						new_close = st.text_input("閉館 (HH:MM)", value=item.get('close_time') or "", key=f"close_{item['id']}")
+					with hc3:
+						new_dwell = st.number_input(
+							"滞在時間（分）",
+							min_value=0,
+							max_value=720,
+							value=int(item.get('dwell_minutes') or 0),
+							step=10,
+							key=f"dwell_{item['id']}",
+							help="0 の場合はスケジュール作成時の標準の滞在時間を使います"
+						)
+					
+					hours_changed = (
+						(new_open or None) != item.get('open_time')
+						or (new_close or None) != item.get('close_time')
+						or (new_dwell or None) != item.get('dwell_minutes')
+					)
+					if hours_changed and st.button("💾 営業時間を保存", key=f"save_hours_{item['id']}"):
+						from src.itinerary_scheduler import parse_hhmm
+						try:
+							for value in (new_open, new_close):
+								parse_hhmm(value.strip() or None)
+						except ValueError:
+							st.error("❌ 時刻は HH:MM 形式で入力してください")
+						else:
+							db.update_attraction_hours(
+								item['attraction_id'],
+								open_time=new_open.strip() or None,
+								close_time=new_close.strip() or None,
+								dwell_minutes=new_dwell or None
+							)
+							st.success("✅ 営業時間を保存しました")
+							st.cache_data.clear()
+							st.rerun()
+					
 					# 削除ボタン
 					if st.button("🗑️ 削除", key=f"delete_{item['id']}", use_container_width=True):
 						db.remove_from_wishlist(item['id'])
@@ -951,7 +1104,7 @@ def main():
 							else:
 								# マップを生成（キャッシュ版）
 								photos_hash = MapGenerator._calculate_photos_hash(valid_photos)
-								map_html = MapGenerator.generate_map_cached(valid_photos, _photos_hash=photos_hash)
+								map_html = MapGenerator.generate_map_cached(valid_photos, _photos_hash=photos_hash, segmented=st.session_state.get('route_segmented', True))
 								
 								# マップ統計を計算
 								generator = MapGenerator()
@@ -980,7 +1133,7 @@ def main():
 						else:
 							# マップを生成（キャッシュ版）
 							photos_hash = MapGenerator._calculate_photos_hash(valid_photos)
-							map_html = MapGenerator.generate_map_cached(valid_photos, _photos_hash=photos_hash)
+							map_html = MapGenerator.generate_map_cached(valid_photos, _photos_hash=photos_hash, segmented=st.session_state.get('route_segmented', True))
 							
 							# マップ統計を計算
 							generator = MapGenerator()
@@ -1065,9 +1218,53 @@ def main():
 							st.warning("⚠️ GPS情報を含む写真がありません")
 							st.stop()
 						
-						# マップを生成（キャッシュ版）
-						photos_hash = MapGenerator._calculate_photos_hash(valid_photos)
-						map_html = MapGenerator.generate_map_cached(valid_photos, _photos_hash=photos_hash)
+						# ビューポート遅延読み込み（写真マーカーを表示範囲ごとにローカルサーバから取得）
+						_lazy_endpoint = None
+						_lazy_range = None
+						if st.session_state.get('lazy_markers', False):
+							from src.map_server import get_map_data_server
+							_lazy_endpoint = get_map_data_server().url
+							if st.session_state.filtered and st.session_state.filter_start and st.session_state.filter_end:
+								_lazy_range = (
+									st.session_state.filter_start.isoformat(),
+									f"{st.session_state.filter_end.isoformat()}T23:59:59"
+								)
+						
+						# 写真の表示方法（マーカー / 密度表示 / 事前レンダリングタイル）
+						_photo_layer = st.session_state.get('photo_layer', 'markers')
+						_route_segmented = st.session_state.get('route_segmented', True)
+						
+						# 事前レンダリングタイル: 前回以降に追加された写真のタイルだけ描き直して配信
+						_overlay_tiles = None
+						if _photo_layer == 'tiles':
+							from src.map_server import get_map_data_server
+							from src.tile_renderer import TileRenderer
+							_tile_server = get_map_data_server()
+							# 写真データが前回の描画から変わっていなければ差分の確認も省く（マップキャッシュと同じハッシュ）
+							_tiles_hash = MapGenerator._calculate_photos_hash(all_photos)
+							if st.session_state.get('tiles_photos_hash') != _tiles_hash or not _tile_server.mbtiles_path.exists():
+								with st.spinner("🧱 写真オーバーレイのタイルを更新中..."):
+									_tile_result = TileRenderer().render_incremental(all_photos, _tile_server.mbtiles_path)
+								st.session_state.tiles_photos_hash = _tiles_hash
+								if _tile_result['tiles']:
+									st.caption(f"🧱 タイルを {_tile_result['tiles']} 枚描画しました")
+							_overlay_tiles = _tile_server.tiles_url
+						
+						if _lazy_endpoint or _photo_layer != 'markers':
+							_centerL = MapGenerator().calculate_center_from_photos(valid_photos)
+							_genL = MapGenerator(compact=True, lazy_endpoint=_lazy_endpoint, lazy_date_range=_lazy_range, photo_layer=_photo_layer, overlay_tiles=_overlay_tiles)
+							_genL.create_base_map(
+								center_lat=_centerL[0],
+								center_lon=_centerL[1],
+								zoom_start=_genL.calculate_zoom_level(valid_photos)
+							)
+							_genL.add_markers(valid_photos)
+							_genL.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8, segmented=_route_segmented)
+							map_html = _genL.get_map_html()
+						else:
+							# マップを生成（キャッシュ版）
+							photos_hash = MapGenerator._calculate_photos_hash(valid_photos)
+							map_html = MapGenerator.generate_map_cached(valid_photos, _photos_hash=photos_hash, segmented=_route_segmented)
 						
 						# 観光地マーカーを追加（キャッシュを使わない、リアルタイム生成）
 						if 'show_attractions' in st.session_state and st.session_state.show_attractions:
@@ -1094,7 +1291,7 @@ def main():
 								_zoom = _tmp.calculate_zoom_level(valid_photos)
 								
 								# 新しいMapGeneratorインスタンスでリアルタイム生成
-								gen2 = MapGenerator()
+								gen2 = MapGenerator(compact=True, lazy_endpoint=_lazy_endpoint, lazy_date_range=_lazy_range, photo_layer=_photo_layer, overlay_tiles=_overlay_tiles)
 								gen2.create_base_map(
 									center_lat=_center[0],
 									center_lon=_center[1],
@@ -1103,7 +1300,7 @@ def main():
 								# 写真マーカー
 								gen2.add_markers(valid_photos)
 								# ルート
-								gen2.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8)
+								gen2.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8, segmented=_route_segmented)
 								# 観光地マーカー
 								gen2.add_attraction_markers(
 									filtered_attractions,
@@ -1111,7 +1308,7 @@ def main():
 									show_unvisited=st.session_state.get('show_unvisited', True)
 								)
 								# HTML差し替え
-								map_html = gen2.map._repr_html_()
+								map_html = gen2.get_map_html()
 							
 							db2.close()
 						
@@ -1131,17 +1328,17 @@ def main():
 									_center2 = _tmp2.calculate_center_from_photos(valid_photos)
 									_zoom2 = _tmp2.calculate_zoom_level(valid_photos)
 									
-									genW = MapGenerator()
+									genW = MapGenerator(compact=True, lazy_endpoint=_lazy_endpoint, lazy_date_range=_lazy_range, photo_layer=_photo_layer, overlay_tiles=_overlay_tiles)
 									genW.create_base_map(
 										center_lat=_center2[0],
 										center_lon=_center2[1],
 										zoom_start=_zoom2
 									)
 									genW.add_markers(valid_photos)
-									genW.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8)
+									genW.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8, segmented=_route_segmented)
 								
 								genW.add_wishlist_markers(wishlist_items)
-								map_html = genW.map._repr_html_()
+								map_html = genW.get_map_html()
 							
 							db3.close()
 						
@@ -1157,25 +1354,25 @@ def main():
 								_tmp3 = MapGenerator()
 								_center3 = _tmp3.calculate_center_from_photos(valid_photos)
 								_zoom3 = _tmp3.calculate_zoom_level(valid_photos)
-								_gen_for_route = MapGenerator()
+								_gen_for_route = MapGenerator(compact=True, lazy_endpoint=_lazy_endpoint, lazy_date_range=_lazy_range, photo_layer=_photo_layer, overlay_tiles=_overlay_tiles)
 								_gen_for_route.create_base_map(center_lat=_center3[0], center_lon=_center3[1], zoom_start=_zoom3)
 								_gen_for_route.add_markers(valid_photos)
-								_gen_for_route.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8)
+								_gen_for_route.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8, segmented=_route_segmented)
 							_gen_for_route.add_route_preview_markers(
 								st.session_state.optimized_route,
 								color='#FF6B35',
 								show_numbers=True
 							)
-							map_html = _gen_for_route.map._repr_html_()
+							map_html = _gen_for_route.get_map_html()
 						elif 'daily_routes' in st.session_state and st.session_state.daily_routes:
 							if _gen_for_route is None:
 								_tmp4 = MapGenerator()
 								_center4 = _tmp4.calculate_center_from_photos(valid_photos)
 								_zoom4 = _tmp4.calculate_zoom_level(valid_photos)
-								_gen_for_route = MapGenerator()
+								_gen_for_route = MapGenerator(compact=True, lazy_endpoint=_lazy_endpoint, lazy_date_range=_lazy_range, photo_layer=_photo_layer, overlay_tiles=_overlay_tiles)
 								_gen_for_route.create_base_map(center_lat=_center4[0], center_lon=_center4[1], zoom_start=_zoom4)
 								_gen_for_route.add_markers(valid_photos)
-								_gen_for_route.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8)
+								_gen_for_route.add_route(valid_photos, color='#FF6B35', weight=4, opacity=0.8, segmented=_route_segmented)
 							colors = ['#FF6B35', '#4ECDC4', '#95E1D3', '#FFD93D', '#6BCF7F']
 							for day_num, (day_route, _) in enumerate(st.session_state.daily_routes):
 								_color = colors[day_num % len(colors)]
@@ -1184,7 +1381,7 @@ def main():
 									color=_color,
 									show_numbers=True
 								)
-							map_html = _gen_for_route.map._repr_html_()
+							map_html = _gen_for_route.get_map_html()
 						
 						# マップ統計を計算
 						generator = MapGenerator()
@@ -1455,19 +1652,60 @@ def main():
 					help="移動時間の推定に使用します"
 				)
 			
+			# 1日の移動距離の上限（複数日の旅程のみ、0 で制限なし）
+			max_km_per_day = st.number_input(
+				"1日の最大移動距離 (km)",
+				min_value=0,
+				max_value=2000,
+				value=0,
+				step=10,
+				help="複数日の旅程で1日に移動する距離の上限です。収まらない場合は日数を増やします（0 で制限なし）"
+			)
+			
+			return_to_start = st.checkbox(
+				"🔁 開始地点に戻る（周回ルート）",
+				value=False,
+				help="1日の旅程で、最後に開始地点へ戻るルートを計算します"
+			)
+			
+			route_methods = {
+				"自動": 'auto',
+				"多始点探索（200地点以上向け・最大10秒）": 'multistart'
+			}
+			route_method = route_methods[st.selectbox(
+				"計算方法",
+				list(route_methods.keys()),
+				help="多始点探索は複数の初期ルートを並列に改善し、最も短いものを選びます"
+			)]
+			
+			# ローカルの道路データがあれば道路距離で計算できる（data/roads/）
+			from src.road_network import find_road_file, get_road_network
+			road_file = find_road_file()
+			use_roads = False
+			if road_file is not None:
+				use_roads = st.checkbox(
+					"🛣️ 道路距離で計算",
+					value=True,
+					help=f"{road_file.name} の道路ネットワークで距離・移動時間を計算します"
+				)
+			
 			# ルート生成ボタン
 			if st.button("🗺️ ルートを生成", use_container_width=True, type="primary"):
 				with st.spinner("🧭 最適ルートを計算中..."):
 					try:
 						from src.route_optimizer import RouteOptimizer
 						
-						optimizer = RouteOptimizer()
+						optimizer = RouteOptimizer(
+							distance_backend=get_road_network(road_file) if use_roads else None
+						)
 						
 						if days == 1:
 							# 1日の旅程
 							optimized_route, total_distance = optimizer.optimize_route(
 								wishlist,
-								start_index=start_index
+								start_index=start_index,
+								method=route_method,
+								return_to_start=return_to_start
 							)
 							
 							# 推定移動時間
@@ -1510,20 +1748,50 @@ def main():
 											next_location['latitude'], next_location['longitude']
 										)
 										st.caption(f"↓ {distance:.1f} km")
+									elif return_to_start and len(optimized_route) > 1:
+										distance = RouteOptimizer.calculate_distance(
+											location['latitude'], location['longitude'],
+											optimized_route[0]['latitude'], optimized_route[0]['longitude']
+										)
+										st.caption(f"↩ 開始地点へ {distance:.1f} km")
 							
 							# セッションステートに保存（マップ表示用）
 							st.session_state.optimized_route = optimized_route
 							st.session_state.route_total_distance = total_distance
+							st.session_state.route_return_to_start = return_to_start
 							
 						else:
 							# 複数日の旅程
 							daily_routes = optimizer.split_route_by_days(
 								wishlist,
 								days=days,
-								start_index=start_index
+								start_index=start_index,
+								max_km_per_day=max_km_per_day or None,
+								allow_extra_days=True
 							)
 							
-							st.success(f"✅ {days}日間の旅程を生成しました")
+							if len(daily_routes) > days:
+								st.warning(
+									f"⚠️ 1日の最大移動距離 {max_km_per_day} km に収めるため、"
+									f"旅程を {days}日 → {len(daily_routes)}日 に延ばしました"
+								)
+							st.success(f"✅ {len(daily_routes)}日間の旅程を生成しました")
+							
+							# 従来のリスト順分割との比較
+							sliced_routes = optimizer.split_route_by_days(
+								wishlist,
+								days=days,
+								start_index=start_index,
+								strategy='slice'
+							)
+							sweep_total = sum(d for _, d in daily_routes)
+							slice_total = sum(d for _, d in sliced_routes)
+							if slice_total > 0:
+								st.caption(
+									f"📏 合計移動距離 {sweep_total:.1f} km"
+									f"（リスト順に分割した場合 {slice_total:.1f} km、"
+									f"{(sweep_total - slice_total) / slice_total * 100:+.1f}%）"
+								)
 							
 							# 各日の旅程を表示
 							for day_num, (day_route, day_distance) in enumerate(daily_routes, 1):
@@ -1562,7 +1830,7 @@ def main():
 							
 							# セッションステートに保存
 							st.session_state.daily_routes = daily_routes
-							st.session_state.route_days = days
+							st.session_state.route_days = len(daily_routes)
 					
 					except Exception as e:
 						st.error(f"❌ ルート生成エラー: {e}")
@@ -1570,6 +1838,60 @@ def main():
 						logger = get_logger()
 						logger.error("ルート生成エラー")
 			
+			# ルートの編集（全体を再計算せず、追加・削除した周辺だけ組み直す）
+			if 'optimized_route' in st.session_state:
+				with st.expander("✏️ ルートを編集", expanded=False):
+					from src.route_optimizer import RouteOptimizer
+					
+					current_route = st.session_state.optimized_route
+					round_trip = st.session_state.get('route_return_to_start', False)
+					editor = RouteOptimizer(
+						distance_backend=get_road_network(road_file) if use_roads else None
+					)
+					
+					st.caption(
+						f"現在のルート: {len(current_route)}箇所, "
+						f"{st.session_state.get('route_total_distance', 0.0):.1f} km"
+					)
+					
+					ed1, ed2 = st.columns(2)
+					with ed1:
+						remove_index = st.selectbox(
+							"外す地点",
+							list(range(len(current_route))),
+							format_func=lambda i: f"{i + 1}. {current_route[i]['name']}",
+							key="route_remove_index"
+						)
+						if st.button("➖ ルートから外す", use_container_width=True, disabled=len(current_route) <= 1):
+							new_route, new_distance = editor.remove_stop(
+								current_route, remove_index, return_to_start=round_trip
+							)
+							st.session_state.optimized_route = new_route
+							st.session_state.route_total_distance = new_distance
+							st.rerun()
+					
+					with ed2:
+						route_ids = {location.get('id') for location in current_route}
+						addable = [item for item in wishlist if item.get('id') not in route_ids]
+						if addable:
+							add_index = st.selectbox(
+								"追加する地点",
+								list(range(len(addable))),
+								format_func=lambda i: addable[i]['name'],
+								key="route_add_index"
+							)
+							if st.button("➕ ルートに追加", use_container_width=True):
+								new_route, new_distance = editor.insert_stop(
+									current_route, addable[add_index], return_to_start=round_trip
+								)
+								st.session_state.optimized_route = new_route
+								st.session_state.route_total_distance = new_distance
+								st.rerun()
+						else:
+							st.caption("ウィッシュリストの地点はすべてルートに含まれています")
+					
+					st.caption(" → ".join(location['name'] for location in current_route))
+			
 			# ルートクリア
 			if 'optimized_route' in st.session_state or 'daily_routes' in st.session_state:
 				if st.button("🗑️ ルート表示をクリア", use_container_width=True):
@@ -1577,6 +1899,8 @@ def main():
 						del st.session_state.optimized_route
 					if 'route_total_distance' in st.session_state:
 						del st.session_state.route_total_distance
+					if 'route_return_to_start' in st.session_state:
+						del st.session_state.route_return_to_start
 					if 'daily_routes' in st.session_state:
 						del st.session_state.daily_routes
 					if 'route_days' in st.session_state:
@@ -1584,6 +1908,81 @@ def main():
 					
 					st.success("✅ ルート表示をクリアしました")
 					st.rerun()
+			
+			# 時間を考慮したスケジュール
+			with st.expander("⏰ 滞在時間・営業時間を考慮したスケジュール", expanded=False):
+				from datetime import datetime, time as dt_time
+				
+				st.caption(
+					"営業時間・滞在時間はウィッシュリストの各地点で設定した値"
+					"（CSV の open_time / close_time / dwell_minutes 列からも取り込めます）を使用します。"
+					"未設定の地点は行動時間内ならいつでも訪問でき、滞在時間は標準の値になります"
+				)
+				
+				tc1, tc2, tc3 = st.columns(3)
+				with tc1:
+					day_start_time = st.time_input("行動開始", value=dt_time(9, 0))
+				with tc2:
+					day_end_time = st.time_input("行動終了", value=dt_time(18, 0))
+				with tc3:
+					default_dwell = st.number_input("標準の滞在時間（分）", min_value=10, max_value=480, value=60, step=10)
+				
+				if st.button("⏰ スケジュールを作成", use_container_width=True):
+					try:
+						from src.itinerary_scheduler import ItineraryScheduler
+						from src.route_optimizer import RouteOptimizer
+						
+						scheduler = ItineraryScheduler(
+							optimizer=RouteOptimizer(
+								distance_backend=get_road_network(road_file) if use_roads else None
+							),
+							speed_kmh=speed,
+							day_start=day_start_time.strftime("%H:%M"),
+							day_end=day_end_time.strftime("%H:%M"),
+							default_dwell_minutes=default_dwell
+						)
+						st.session_state.itinerary_schedule = scheduler.schedule(
+							wishlist,
+							days=days,
+							start_index=start_index
+						)
+					except Exception as e:
+						st.error(f"❌ スケジュール作成エラー: {e}")
+						from src.logger import get_logger
+						get_logger().error("スケジュール作成エラー")
+				
+				schedule = st.session_state.get('itinerary_schedule')
+				if schedule:
+					for day_num, items in enumerate(schedule['days'], 1):
+						st.markdown(f"**📅 {day_num}日目**")
+						for item in items:
+							wait_note = f"（待ち {item['wait_minutes']}分）" if item['wait_minutes'] > 0 else ""
+							st.write(
+								f"{item['start']}〜{item['departure']}　{item['location']['name']}"
+								f"　🚗 {item['travel_minutes']}分{wait_note}"
+							)
+					
+					if schedule['unscheduled']:
+						st.warning(
+							"⚠️ 時間内に入らなかった地点: "
+							+ "、".join(location['name'] for location in schedule['unscheduled'])
+						)
+					
+					itinerary_name = st.text_input("旅程名", value=f"旅程 {datetime.now().strftime('%Y-%m-%d')}")
+					if st.button("💾 旅程を保存", use_container_width=True):
+						db = Database()
+						try:
+							db.initialize()
+							itinerary_id = db.save_itinerary(
+								itinerary_name,
+								schedule['days'],
+								total_distance=schedule['total_distance']
+							)
+							st.success(f"✅ 旅程を保存しました（ID: {itinerary_id}）")
+						except Exception as e:
+							st.error(f"❌ 旅程保存エラー: {e}")
+						finally:
+							db.close()
 		
 		# 次のステップ案内
 		st.markdown("""
@@ -51,7 +51,11 @@ class AttractionImporter:
 							'rating': float(row['rating']) if row.get('rating') else None,
 							'prefecture': row.get('prefecture'),
 							'city': row.get('city'),
-							'source': 'csv_import'
+							'source': 'csv_import',
+							# 営業時間（HH:MM）と滞在時間（分）は任意の列
+							'open_time': row.get('open_time') or None,
+							'close_time': row.get('close_time') or None,
+							'dwell_minutes': int(row['dwell_minutes']) if row.get('dwell_minutes') else None
 						}
 						
 						db.insert_attraction(attraction)
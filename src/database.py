@@ -9,6 +9,7 @@ SQLite を使用して写真・動画のメタデータを管理
 import sqlite3
 import os
 from pathlib import Path
+from src.geo import haversine_km
 from src.logger import get_logger
 import streamlit as st
 from functools import lru_cache
@@ -102,6 +103,7 @@ class Database:
 			self.migrate_add_location_name()
 			# 観光地テーブルを作成（冪等）
 			self.create_attractions_table()
+			self.migrate_add_attraction_hours()
 			# ウィッシュリストテーブルを作成（冪等）
 			self.create_wishlist_table()
 			# 旅程テーブルを作成（冪等）
@@ -131,7 +133,10 @@ class Database:
 					visited BOOLEAN DEFAULT 0,
 					visit_date TEXT,
 					source TEXT,
-					created_at TEXT DEFAULT CURRENT_TIMESTAMP
+					created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+					open_time TEXT,
+					close_time TEXT,
+					dwell_minutes INTEGER
 				)
 			""")
 			
@@ -258,6 +263,30 @@ class Database:
 			self.logger.error("マイグレーションエラー")
 			raise
 	
+	def migrate_add_attraction_hours(self):
+		"""観光地に営業時間（open_time / close_time）と滞在時間（dwell_minutes）のカラムを追加するマイグレーション"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			cursor.execute("PRAGMA table_info(attractions)")
+			columns = [row[1] for row in cursor.fetchall()]
+			
+			added = []
+			for column, column_type in (('open_time', 'TEXT'), ('close_time', 'TEXT'), ('dwell_minutes', 'INTEGER')):
+				if column not in columns:
+					cursor.execute(f"ALTER TABLE attractions ADD COLUMN {column} {column_type}")
+					added.append(column)
+			
+			if added:
+				self.conn.commit()
+				self.logger.info(f"観光地テーブルにカラムを追加しました: {', '.join(added)}")
+			
+			self.close()
+		except Exception as e:
+			self.logger.error("マイグレーションエラー")
+			raise
+	
 	@staticmethod
 	def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 		"""
@@ -270,27 +299,7 @@ class Database:
 		Returns:
 			距離（km）
 		"""
-		from math import radians, sin, cos, sqrt, atan2
-		
-		# 地球の半径（km）
-		R = 6371.0
-		
-		# ラジアンに変換
-		lat1_rad = radians(lat1)
-		lon1_rad = radians(lon1)
-		lat2_rad = radians(lat2)
-		lon2_rad = radians(lon2)
-		
-		# 差分
-		dlat = lat2_rad - lat1_rad
-		dlon = lon2_rad - lon1_rad
-		
-		# ハバーサイン公式
-		a = sin(dlat / 2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2)**2
-		c = 2 * atan2(sqrt(a), sqrt(1 - a))
-		
-		distance = R * c
-		return distance
+		return float(haversine_km(lat1, lon1, lat2, lon2))
 	
 	def auto_mark_visited_attractions(self, threshold_km: float = 0.5) -> int:
 		"""
@@ -387,8 +396,8 @@ class Database:
 			cursor.execute("""
 				INSERT INTO attractions 
 				(name, name_en, category, latitude, longitude, description, 
-				 rating, prefecture, city, source)
-				VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+				 rating, prefecture, city, source, open_time, close_time, dwell_minutes)
+				VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 			""", (
 				attraction['name'],
 				attraction.get('name_en'),
@@ -399,7 +408,10 @@ class Database:
 				attraction.get('rating'),
 				attraction.get('prefecture'),
 				attraction.get('city'),
-				attraction.get('source', 'manual')
+				attraction.get('source', 'manual'),
+				attraction.get('open_time'),
+				attraction.get('close_time'),
+				attraction.get('dwell_minutes')
 			))
 			
 			attraction_id = cursor.lastrowid
@@ -461,7 +473,10 @@ class Database:
 					'visited': bool(row['visited']),
 					'visit_date': row['visit_date'],
 					'source': row['source'],
-					'created_at': row['created_at']
+					'created_at': row['created_at'],
+					'open_time': row['open_time'],
+					'close_time': row['close_time'],
+					'dwell_minutes': row['dwell_minutes']
 				})
 			
 			return attractions
@@ -502,6 +517,41 @@ class Database:
 			self.logger.error(f"訪問済み設定エラー: ID={attraction_id}")
 			raise
 	
+	def update_attraction_hours(
+		self,
+		attraction_id: int,
+		open_time: str = None,
+		close_time: str = None,
+		dwell_minutes: int = None
+	):
+		"""
+		観光地の営業時間・滞在時間を設定（None の項目は未設定に戻す）
+		
+		Args:
+			attraction_id: 観光地ID
+			open_time: 開館時刻（'HH:MM'）
+			close_time: 閉館時刻（'HH:MM'）
+			dwell_minutes: 滞在時間（分）
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			cursor.execute("""
+				UPDATE attractions
+				SET open_time = ?, close_time = ?, dwell_minutes = ?
+				WHERE id = ?
+			""", (open_time, close_time, dwell_minutes, attraction_id))
+			
+			self.conn.commit()
+			self.close()
+			
+			self.logger.info(f"観光地の営業時間を更新: ID={attraction_id}")
+			
+		except Exception as e:
+			self.logger.error(f"営業時間更新エラー: ID={attraction_id}")
+			raise
+	
 	@st.cache_data(ttl=300)
 	def get_attractions_cached(_self, category: str = None, visited: bool = None) -> List[Dict[str, Any]]:
 		"""観光地を取得（キャッシュ版）"""
@@ -663,7 +713,10 @@ class Database:
 					a.description,
 					a.rating,
 					a.prefecture,
-					a.city
+					a.city,
+					a.open_time,
+					a.close_time,
+					a.dwell_minutes
 				FROM wishlist w
 				JOIN attractions a ON w.attraction_id = a.id
 				ORDER BY {order_clause}
@@ -690,7 +743,10 @@ class Database:
 					'description': row['description'],
 					'rating': row['rating'],
 					'prefecture': row['prefecture'],
-					'city': row['city']
+					'city': row['city'],
+					'open_time': row['open_time'],
+					'close_time': row['close_time'],
+					'dwell_minutes': row['dwell_minutes']
 				})
 			
 			return wishlist
@@ -730,6 +786,68 @@ class Database:
 	def get_wishlist_cached(_self, order_by: str = 'priority') -> List[Dict[str, Any]]:
 		"""ウィッシュリストを取得（キャッシュ版）"""
 		return _self.get_wishlist(order_by=order_by)
+	
+	def save_itinerary(
+		self,
+		name: str,
+		days: List[List[Dict[str, Any]]],
+		description: str = None,
+		total_distance: float = None
+	) -> int:
+		"""
+		旅程を保存（旅程と全アイテムを1トランザクションで書き込む）
+		
+		Args:
+			name: 旅程名
+			days: 日ごとのアイテムのリスト（ItineraryScheduler.schedule() の 'days'）
+			description: 説明
+			total_distance: 総移動距離（km）
+			
+		Returns:
+			旅程ID
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			cursor.execute("""
+				INSERT INTO itineraries (name, description, days, total_distance)
+				VALUES (?, ?, ?, ?)
+			""", (name, description, len(days), total_distance))
+			itinerary_id = cursor.lastrowid
+			
+			rows = []
+			for day_number, items in enumerate(days, 1):
+				for sequence_number, item in enumerate(items, 1):
+					location = item['location']
+					rows.append((
+						itinerary_id,
+						day_number,
+						sequence_number,
+						location.get('attraction_id'),
+						# ウィッシュリストの地点は id がウィッシュリストID
+						location.get('id') if location.get('attraction_id') is not None else None,
+						f"{item['start']}-{item['departure']}"
+					))
+			
+			cursor.executemany("""
+				INSERT INTO itinerary_items
+					(itinerary_id, day_number, sequence_number, attraction_id, wishlist_id, notes)
+				VALUES (?, ?, ?, ?, ?, ?)
+			""", rows)
+			
+			self.conn.commit()
+			self.close()
+			
+			self.logger.info(f"旅程を保存: {name}（{len(days)}日, {len(rows)}地点）")
+			return itinerary_id
+			
+		except Exception as e:
+			if self.conn:
+				self.conn.rollback()
+				self.close()
+			self.logger.error(f"旅程保存エラー: {name}")
+			raise
 	@staticmethod
 	def _calculate_db_hash(db_path: str) -> str:
 		"""
@@ -891,6 +1009,48 @@ class Database:
 		finally:
 			cursor.close()
 	
+	def upsert_photos(self, rows):
+		"""
+		写真データをまとめて登録（登録済みのパスは座標・撮影日時を更新）
+		
+		座標が変わった写真は場所名（location_name）を消し、逆ジオコーディングをやり直す対象にする。
+		
+		Args:
+			rows (list): (file_path, file_type, latitude, longitude, timestamp) のリスト
+		
+		Returns:
+			int: 登録・更新した件数
+		"""
+		rows = [(str(file_path), file_type, lat, lon, ts) for file_path, file_type, lat, lon, ts in rows]
+		if not rows:
+			return 0
+		
+		self.connect()
+		try:
+			self.conn.executemany("""
+				INSERT INTO photos (file_path, file_type, latitude, longitude, timestamp)
+				VALUES (?, ?, ?, ?, ?)
+				ON CONFLICT(file_path) DO UPDATE SET
+					file_type = excluded.file_type,
+					location_name = CASE
+						WHEN photos.latitude IS excluded.latitude AND photos.longitude IS excluded.longitude
+						THEN photos.location_name
+						ELSE NULL
+					END,
+					latitude = excluded.latitude,
+					longitude = excluded.longitude,
+					timestamp = excluded.timestamp
+			""", rows)
+			self.conn.commit()
+			self.logger.debug(f"レコード一括登録: {len(rows)}件")
+			return len(rows)
+		except Exception:
+			self.logger.error("レコード一括登録エラー")
+			self.conn.rollback()
+			raise
+		finally:
+			self.close()
+	
 	def bulk_insert_from_scanner(self, scan_result, extractor_image, extractor_video):
 		"""
 		スキャン結果を一括登録
@@ -1029,16 +1189,252 @@ class Database:
 			self.logger.error("全データ取得エラー")
 			return []
 	
-	def update_location_names(self, geocoder) -> int:
+	@staticmethod
+	def _bounds_clause(
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		start: str = None,
+		end: str = None
+	):
+		"""表示範囲（と期間）の WHERE 句とパラメータを生成"""
+		clause = "latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+		params = [south, north, west, east]
+		
+		if start:
+			clause += " AND timestamp >= ?"
+			params.append(start)
+		if end:
+			clause += " AND timestamp <= ?"
+			params.append(end)
+		
+		return clause, params
+	
+	def count_photos_in_bounds(
+		self,
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		start: str = None,
+		end: str = None
+	) -> int:
+		"""
+		表示範囲内の写真の件数を取得（idx_location を使用）
+		
+		Args:
+			south, west, north, east: 表示範囲（緯度経度）
+			start, end: 期間フィルタ（ISO 8601、省略可）
+			
+		Returns:
+			件数
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			clause, params = self._bounds_clause(south, west, north, east, start, end)
+			cursor.execute(f"SELECT COUNT(*) FROM photos WHERE {clause}", params)
+			count = cursor.fetchone()[0]
+			self.close()
+			
+			return count
+			
+		except Exception as e:
+			self.logger.error("範囲内件数取得エラー")
+			raise
+	
+	def get_photos_in_bounds(
+		self,
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		start: str = None,
+		end: str = None,
+		limit: int = None
+	) -> List[Dict[str, Any]]:
+		"""
+		表示範囲内の写真を取得（idx_location を使用）
+		
+		Args:
+			south, west, north, east: 表示範囲（緯度経度）
+			start, end: 期間フィルタ（ISO 8601、省略可）
+			limit: 最大件数
+			
+		Returns:
+			写真データのリスト（時系列順）
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			clause, params = self._bounds_clause(south, west, north, east, start, end)
+			query = f"""
+				SELECT id, file_path, file_type, latitude, longitude, timestamp
+				FROM photos
+				WHERE {clause}
+				ORDER BY timestamp ASC
+			"""
+			if limit:
+				query += " LIMIT ?"
+				params.append(limit)
+			
+			cursor.execute(query, params)
+			rows = cursor.fetchall()
+			self.close()
+			
+			return [
+				{
+					'id': row['id'],
+					'file_path': row['file_path'],
+					'file_type': row['file_type'],
+					'latitude': row['latitude'],
+					'longitude': row['longitude'],
+					'timestamp': row['timestamp']
+				}
+				for row in rows
+			]
+			
+		except Exception as e:
+			self.logger.error("範囲内写真取得エラー")
+			raise
+	
+	def get_photo_grid_in_bounds(
+		self,
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		cell_size: float,
+		start: str = None,
+		end: str = None
+	) -> List[Dict[str, Any]]:
+		"""
+		表示範囲内の写真をグリッドで集約（低ズーム時のクラスタ表示用）
+		
+		Args:
+			south, west, north, east: 表示範囲（緯度経度）
+			cell_size: グリッドのセルサイズ（度）
+			start, end: 期間フィルタ（ISO 8601、省略可）
+			
+		Returns:
+			セルごとの {'latitude', 'longitude', 'count'} のリスト（重心座標）
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			clause, params = self._bounds_clause(south, west, north, east, start, end)
+			cursor.execute(f"""
+				SELECT
+					CAST((latitude - ?) / ? AS INTEGER) AS gy,
+					CAST((longitude - ?) / ? AS INTEGER) AS gx,
+					COUNT(*) AS cnt,
+					AVG(latitude) AS lat,
+					AVG(longitude) AS lon
+				FROM photos
+				WHERE {clause}
+				GROUP BY gy, gx
+			""", [south, cell_size, west, cell_size] + params)
+			rows = cursor.fetchall()
+			self.close()
+			
+			return [
+				{'latitude': row['lat'], 'longitude': row['lon'], 'count': row['cnt']}
+				for row in rows
+			]
+			
+		except Exception as e:
+			self.logger.error("範囲内グリッド集約エラー")
+			raise
+	
+	def get_photos_signature(self, start: str = None, end: str = None):
+		"""
+		写真データの内容を表すシグネチャを取得（配信キャッシュの無効化判定用）
+		
+		MAX(id) だけでは削除と追加が同時に起きた場合を見逃すため、件数と id の合計も含める。
+		
+		Args:
+			start, end: 期間フィルタ（ISO 8601、省略可）
+			
+		Returns:
+			(件数, 最大id, idの合計) のタプル
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			clause, params = self._bounds_clause(-90.0, -180.0, 90.0, 180.0, start, end)
+			cursor.execute(
+				f"SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(id), 0) FROM photos WHERE {clause}",
+				params
+			)
+			signature = tuple(cursor.fetchone())
+			self.close()
+			
+			return signature
+			
+		except Exception as e:
+			self.logger.error("シグネチャ取得エラー")
+			raise
+	
+	def get_route_points(self, start: str = None, end: str = None) -> List[tuple]:
+		"""
+		撮影日時のあるGPS付き写真の座標を時系列順に取得（ルート配信用）
+		
+		Args:
+			start, end: 期間フィルタ（ISO 8601、省略可）
+			
+		Returns:
+			(緯度, 経度, 撮影日時) のリスト（時系列順）
+		"""
+		try:
+			self.connect()
+			cursor = self.conn.cursor()
+			
+			clause, params = self._bounds_clause(-90.0, -180.0, 90.0, 180.0, start, end)
+			cursor.execute(f"""
+				SELECT latitude, longitude, timestamp
+				FROM photos
+				WHERE {clause} AND timestamp IS NOT NULL
+				ORDER BY timestamp ASC, id ASC
+			""", params)
+			rows = cursor.fetchall()
+			self.close()
+			
+			return [(row[0], row[1], row[2]) for row in rows]
+			
+		except Exception as e:
+			self.logger.error("ルート座標取得エラー")
+			raise
+	
+	def update_location_names(
+		self,
+		geocoder,
+		progress_callback=None,
+		batch_size: int = 200,
+		cell_precision: int = 7
+	) -> int:
 		"""
 		location_name が空の写真に対して逆ジオコーディングを実行
 		
+		同じ場所（ジオハッシュのセル）の写真はまとめて1回だけ解決し、
+		batch_size セルごとに executemany で更新・コミットする（途中で止めても結果は残る）。
+		
 		Args:
-			geocoder: ReverseGeocoderインスタンス
+			geocoder: ReverseGeocoder または OfflineGeocoder インスタンス
+			progress_callback: 進捗通知 callback(解決済みセル数, 全セル数, 更新件数)
+			batch_size: まとめて解決・更新するセル数
+			cell_precision: 同じ場所とみなすセルの細かさ（ジオハッシュの文字数、7 で約150m）
 			
 		Returns:
 			更新した件数
 		"""
+		import numpy as np
+		from src import geohash
+		
 		try:
 			self.connect()
 			cursor = self.conn.cursor()
@@ -1047,7 +1443,8 @@ class Database:
 			cursor.execute("""
 				SELECT id, latitude, longitude
 				FROM photos
-				WHERE location_name IS NULL OR location_name = ''
+				WHERE (location_name IS NULL OR location_name = '')
+					AND latitude IS NOT NULL AND longitude IS NOT NULL
 			""")
 			
 			rows = cursor.fetchall()
@@ -1057,32 +1454,60 @@ class Database:
 				self.close()
 				return 0
 			
+			# セルごとに写真をまとめる（代表座標はセル内の最初の写真）
+			lats = np.fromiter((row['latitude'] for row in rows), dtype=np.float64, count=len(rows))
+			lons = np.fromiter((row['longitude'] for row in rows), dtype=np.float64, count=len(rows))
+			cells: Dict[str, List[int]] = {}
+			for position, cell in enumerate(geohash.encode_many(lats, lons, cell_precision)):
+				cells.setdefault(cell, []).append(position)
+			groups = list(cells.values())
+			
+			self.logger.info(f"逆ジオコーディング開始: {len(rows)}件（{len(groups)}地点）")
+			
 			updated = 0
 			
-			for row in rows:
-				photo_id = row['id']
-				lat = row['latitude']
-				lon = row['longitude']
+			for start in range(0, len(groups), batch_size):
+				batch = groups[start:start + batch_size]
+				representatives = [members[0] for members in batch]
 				
-				# 逆ジオコーディング実行
-				location_info = geocoder.reverse_geocode(lat, lon)
+				# オフラインのジオコーダーはバッチ全体を1回の問い合わせで解決できる
+				if hasattr(geocoder, 'reverse_geocode_many'):
+					resolved = geocoder.reverse_geocode_many(lats[representatives], lons[representatives])
+				else:
+					resolved = [
+						geocoder.reverse_geocode(float(lats[i]), float(lons[i]))
+						for i in representatives
+					]
 				
-				if location_info:
+				updates = []
+				for members, location_info in zip(batch, resolved):
+					if not location_info:
+						continue
 					city = location_info.get('city') or ''
 					country = location_info.get('country') or ''
 					location_name = (f"{city}, {country}").strip(", ").strip()
-					
-					cursor.execute("""
+					if not location_name:
+						continue
+					updates.extend((location_name, rows[i]['id']) for i in members)
+				
+				if updates:
+					cursor.executemany("""
 						UPDATE photos
 						SET location_name = ?
 						WHERE id = ?
-					""", (location_name, photo_id))
-					
-					updated += 1
+					""", updates)
+					self.conn.commit()
+					updated += len(updates)
+				
+				if progress_callback is not None:
+					progress_callback(min(start + batch_size, len(groups)), len(groups), updated)
 			
-			self.conn.commit()
 			self.close()
 			
+			# ジオコーディング結果のキャッシュを書き込む
+			if hasattr(geocoder, 'flush_cache'):
+				geocoder.flush_cache()
+			
 			# キャッシュ無効化
 			try:
 				st.cache_data.clear()
@@ -1093,9 +1518,13 @@ class Database:
 			return updated
 			
 		except Exception as e:
+			if self.conn is not None:
+				self.conn.rollback()
+				self.close()
 			self.logger.error("逆ジオコーディング実行エラー")
 			raise
 
+
 def main():
 	"""テスト実行用メイン関数"""
 	print("=" * 50)
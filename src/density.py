@@ -0,0 +1,206 @@
+"""
+密度集約モジュール
+写真の座標をグリッド・六角形セルに集約する（NumPy によるベクトル化処理）
+"""
+
+import math
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+
+# Web メルカトルのタイル1枚あたりのピクセル数
+TILE_SIZE = 256
+
+
+def extract_coordinates(photos: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+	写真データから緯度・経度の配列を取り出す（GPS情報なしは除外）
+
+	Args:
+		photos: 写真データのリスト
+
+	Returns:
+		(緯度配列, 経度配列)
+	"""
+	coords = np.array(
+		[
+			(p['latitude'], p['longitude'])
+			for p in photos
+			if p.get('latitude') is not None and p.get('longitude') is not None
+		],
+		dtype=np.float64
+	).reshape(-1, 2)
+	return coords[:, 0], coords[:, 1]
+
+
+def cell_size_for_zoom(zoom: int, cell_pixels: int = 40) -> float:
+	"""
+	ズームレベルに応じたセルサイズ（経度方向の度数）を計算
+
+	Args:
+		zoom: ズームレベル
+		cell_pixels: 画面上のセルの大きさ（ピクセル）
+
+	Returns:
+		セルサイズ（度）
+	"""
+	return 360.0 / (TILE_SIZE * (2 ** zoom)) * cell_pixels
+
+
+def square_bins(lats: np.ndarray, lons: np.ndarray, cell_deg: float) -> Dict[str, np.ndarray]:
+	"""
+	正方形グリッドに集約
+
+	緯度方向のセルは cos(緯度) で補正し、地図上でほぼ正方形になるようにする。
+
+	Args:
+		lats: 緯度配列
+		lons: 経度配列
+		cell_deg: セルサイズ（経度方向の度数）
+
+	Returns:
+		{'lat': セル中心緯度, 'lon': セル中心経度, 'count': 件数,
+		 'half_lat': セル半幅（緯度）, 'half_lon': セル半幅（経度）}
+	"""
+	if lats.size == 0:
+		empty = np.empty(0)
+		return {'lat': empty, 'lon': empty, 'count': empty.astype(np.int64), 'half_lat': 0.0, 'half_lon': 0.0}
+
+	lat_cell = cell_deg * math.cos(math.radians(float(np.mean(lats))))
+	iy = np.floor(lats / lat_cell).astype(np.int64)
+	ix = np.floor(lons / cell_deg).astype(np.int64)
+
+	cells, counts = np.unique(np.stack([iy, ix], axis=1), axis=0, return_counts=True)
+	return {
+		'lat': (cells[:, 0] + 0.5) * lat_cell,
+		'lon': (cells[:, 1] + 0.5) * cell_deg,
+		'count': counts,
+		'half_lat': lat_cell / 2,
+		'half_lon': cell_deg / 2
+	}
+
+
+def hex_bins(lats: np.ndarray, lons: np.ndarray, cell_deg: float) -> Dict[str, np.ndarray]:
+	"""
+	六角形（pointy-top）セルに集約
+
+	経度をそのまま x、緯度を cos(平均緯度) で割ったものを y とする局所平面上で
+	アキシャル座標に変換し、キューブ座標の丸めで所属セルを決定する。
+
+	Args:
+		lats: 緯度配列
+		lons: 経度配列
+		cell_deg: 六角形の外接円半径（経度方向の度数）
+
+	Returns:
+		{'lat': セル中心緯度, 'lon': セル中心経度, 'count': 件数,
+		 'size': 六角形の半径（経度方向）, 'lat_scale': 緯度方向の縮尺}
+	"""
+	if lats.size == 0:
+		empty = np.empty(0)
+		return {'lat': empty, 'lon': empty, 'count': empty.astype(np.int64), 'size': cell_deg, 'lat_scale': 1.0}
+
+	lat_scale = math.cos(math.radians(float(np.mean(lats))))
+	x = lons
+	y = lats / lat_scale
+	size = cell_deg
+
+	# ピクセル座標 → アキシャル座標（分数）
+	q = (math.sqrt(3) / 3 * x - y / 3) / size
+	r = (2 / 3 * y) / size
+
+	# キューブ座標で丸める
+	cx, cz = q, r
+	cy = -cx - cz
+	rx, ry, rz = np.round(cx), np.round(cy), np.round(cz)
+	dx, dy, dz = np.abs(rx - cx), np.abs(ry - cy), np.abs(rz - cz)
+	fix_x = (dx > dy) & (dx > dz)
+	fix_y = ~fix_x & (dy > dz)
+	fix_z = ~fix_x & ~fix_y
+	rx = np.where(fix_x, -ry - rz, rx)
+	rz = np.where(fix_z, -rx - ry, rz)
+
+	cells, counts = np.unique(
+		np.stack([rx.astype(np.int64), rz.astype(np.int64)], axis=1),
+		axis=0,
+		return_counts=True
+	)
+	cq = cells[:, 0].astype(np.float64)
+	cr = cells[:, 1].astype(np.float64)
+
+	# アキシャル座標 → 中心座標
+	center_x = size * (math.sqrt(3) * cq + math.sqrt(3) / 2 * cr)
+	center_y = size * (1.5 * cr)
+
+	return {
+		'lat': center_y * lat_scale,
+		'lon': center_x,
+		'count': counts,
+		'size': size,
+		'lat_scale': lat_scale
+	}
+
+
+def hex_polygons(
+	lats: np.ndarray,
+	lons: np.ndarray,
+	size: float,
+	lat_scale: float
+) -> np.ndarray:
+	"""
+	六角形セルの頂点をまとめて計算（GeoJSON の [lon, lat] 順、閉じたリング）
+
+	Args:
+		lats, lons: セル中心の配列
+		size: 六角形の半径（経度方向）
+		lat_scale: 緯度方向の縮尺（cos(平均緯度)）
+
+	Returns:
+		(セル数, 7, 2) の頂点配列
+	"""
+	angles = np.radians(60 * (np.arange(7) % 6) - 30)
+	ring_lon = lons[:, None] + size * np.cos(angles)[None, :]
+	ring_lat = lats[:, None] + size * lat_scale * np.sin(angles)[None, :]
+	return np.stack([ring_lon, ring_lat], axis=2)
+
+
+def square_polygons(
+	lats: np.ndarray,
+	lons: np.ndarray,
+	half_lat: float,
+	half_lon: float
+) -> np.ndarray:
+	"""
+	正方形セルの頂点をまとめて計算（GeoJSON の [lon, lat] 順、閉じたリング）
+
+	Args:
+		lats, lons: セル中心の配列
+		half_lat, half_lon: セルの半幅
+
+	Returns:
+		(セル数, 5, 2) の頂点配列
+	"""
+	dx = np.array([-1, 1, 1, -1, -1]) * half_lon
+	dy = np.array([-1, -1, 1, 1, -1]) * half_lat
+	return np.stack([lons[:, None] + dx[None, :], lats[:, None] + dy[None, :]], axis=2)
+
+
+def count_classes(counts: np.ndarray, n_classes: int = 6) -> np.ndarray:
+	"""
+	件数を対数スケールで階級分け（配色用）
+
+	Args:
+		counts: 件数配列
+		n_classes: 階級数
+
+	Returns:
+		0〜n_classes-1 の階級配列
+	"""
+	if counts.size == 0:
+		return counts.astype(np.int64)
+	log_counts = np.log1p(counts.astype(np.float64))
+	top = log_counts.max()
+	if top <= 0:
+		return np.zeros(counts.shape, dtype=np.int64)
+	return np.minimum((log_counts / top * n_classes).astype(np.int64), n_classes - 1)
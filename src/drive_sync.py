@@ -1,47 +1,298 @@
 """
 Google Drive 同期モジュール
+初回はフォルダを一覧し、以降は Changes API のページトークンから差分だけを取得する
 """
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-import io
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain, islice
 from datetime import datetime, timezone
 
 import streamlit as st
 
+from src.exif_extractor import ExifExtractor
+from src.logger import get_logger
+from src.video_metadata import VideoMetadataExtractor
+
 try:
 	from google.oauth2 import service_account
 	from googleapiclient.discovery import build
-	from googleapiclient.http import MediaIoBaseDownload
+	from googleapiclient.errors import HttpError
 except Exception:
 	# Streamlit Cloud 上でまだ依存が入っていない場合に備える
 	service_account = None
 	build = None
-	MediaIoBaseDownload = None
+	HttpError = None
 
 
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
+# 1回の Range リクエストで取得するバイト数
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# EXIF を読むために最初に取得する先頭のバイト数（JPEG の APP1 セグメントが収まる大きさ）
+HEAD_SIZE = 64 * 1024
+
+# 先頭だけで GPS の有無を判定できる形式（EXIF がファイル先頭にある）
+PROBE_MIME_TYPES = ("image/jpeg",)
+
+# ダウンロード途中のファイルと、その進捗情報の拡張子
+PARTIAL_SUFFIX = ".part"
+PARTIAL_STATE_SUFFIX = ".part.json"
+
+# 一覧・変更の取得で要求するファイルの項目（一覧はゴミ箱を q で除くため trashed は不要）
+LIST_FIELDS = "id, name, mimeType, modifiedTime, size, md5Checksum, parents"
+FILE_FIELDS = LIST_FIELDS + ", trashed"
+
+# 同期する MIME タイプ
+MEDIA_MIME_PREFIXES = ("image/", "video/")
+FOLDER_MIME = "application/vnd.google-apps.folder"
+
+
+class DriveSyncState:
+	"""
+	Drive 同期の状態（SQLite）
+	
+	フォルダごとの Changes API のページトークンと、
+	取得済みファイルの Drive ID・md5Checksum・保存先パスを保存する。
+	"""
+	
+	def __init__(self, db_path: str = "data/drive_sync.db"):
+		"""
+		Args:
+			db_path: SQLite ファイルのパス（プロジェクトルートからの相対パス）
+		"""
+		path = Path(db_path)
+		if not path.is_absolute():
+			path = Path(__file__).parent.parent / path
+		path.parent.mkdir(parents=True, exist_ok=True)
+		self.db_path = path
+		self._lock = threading.Lock()
+		
+		self.conn = sqlite3.connect(str(path), check_same_thread=False)
+		self.conn.row_factory = sqlite3.Row
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute("""
+			CREATE TABLE IF NOT EXISTS drive_page_tokens (
+				folder_id TEXT PRIMARY KEY,
+				page_token TEXT NOT NULL,
+				updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+			)
+		""")
+		self.conn.execute("""
+			CREATE TABLE IF NOT EXISTS drive_files (
+				id TEXT PRIMARY KEY,
+				folder_id TEXT NOT NULL,
+				name TEXT,
+				md5 TEXT,
+				modified_time TEXT,
+				local_path TEXT NOT NULL,
+				downloaded INTEGER NOT NULL DEFAULT 1,
+				updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+			)
+		""")
+		# downloaded 列がない古い状態ファイルに列を追加
+		columns = [row[1] for row in self.conn.execute("PRAGMA table_info(drive_files)")]
+		if "downloaded" not in columns:
+			self.conn.execute("ALTER TABLE drive_files ADD COLUMN downloaded INTEGER NOT NULL DEFAULT 1")
+		self.conn.execute("""
+			CREATE TABLE IF NOT EXISTS drive_folders (
+				id TEXT NOT NULL,
+				root_id TEXT NOT NULL,
+				parent_id TEXT,
+				PRIMARY KEY (root_id, id)
+			)
+		""")
+		self.conn.execute("CREATE INDEX IF NOT EXISTS idx_drive_files_md5 ON drive_files(md5)")
+		self.conn.execute("CREATE INDEX IF NOT EXISTS idx_drive_files_local_path ON drive_files(local_path)")
+		self.conn.commit()
+	
+	def get_page_token(self, folder_id: str) -> Optional[str]:
+		"""保存済みのページトークン（未同期なら None）"""
+		with self._lock:
+			row = self.conn.execute(
+				"SELECT page_token FROM drive_page_tokens WHERE folder_id = ?", (folder_id,)
+			).fetchone()
+		return row[0] if row else None
+	
+	def set_page_token(self, folder_id: str, page_token: str):
+		"""次回の同期を始めるページトークンを保存"""
+		with self._lock:
+			self.conn.execute("""
+				INSERT INTO drive_page_tokens (folder_id, page_token) VALUES (?, ?)
+				ON CONFLICT(folder_id) DO UPDATE SET page_token = excluded.page_token, updated_at = CURRENT_TIMESTAMP
+			""", (folder_id, page_token))
+			self.conn.commit()
+	
+	def get_folders(self, root_id: str) -> Dict[str, Optional[str]]:
+		"""同期対象フォルダ配下のサブフォルダ {フォルダID: 親フォルダID}"""
+		with self._lock:
+			rows = self.conn.execute(
+				"SELECT id, parent_id FROM drive_folders WHERE root_id = ?", (root_id,)
+			).fetchall()
+		return {row[0]: row[1] for row in rows}
+	
+	def save_sync_point(self, root_id: str, page_token: str, folders: Dict[str, Optional[str]]):
+		"""ページトークンとその時点のサブフォルダ構成を1トランザクションで保存"""
+		with self._lock:
+			self.conn.execute("DELETE FROM drive_folders WHERE root_id = ?", (root_id,))
+			self.conn.executemany(
+				"INSERT INTO drive_folders (id, root_id, parent_id) VALUES (?, ?, ?)",
+				((folder_id, root_id, parent_id) for folder_id, parent_id in folders.items())
+			)
+			self.conn.execute("""
+				INSERT INTO drive_page_tokens (folder_id, page_token) VALUES (?, ?)
+				ON CONFLICT(folder_id) DO UPDATE SET page_token = excluded.page_token, updated_at = CURRENT_TIMESTAMP
+			""", (root_id, page_token))
+			self.conn.commit()
+	
+	def _select_in(self, column: str, values: Iterable[str]) -> List[sqlite3.Row]:
+		values = list(dict.fromkeys(v for v in values if v))
+		rows: List[sqlite3.Row] = []
+		with self._lock:
+			for start in range(0, len(values), 500):
+				chunk = values[start:start + 500]
+				placeholders = ",".join("?" * len(chunk))
+				rows.extend(self.conn.execute(
+					f"SELECT * FROM drive_files WHERE {column} IN ({placeholders})", chunk
+				).fetchall())
+		return rows
+	
+	def get_files(self, file_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+		"""Drive ID から取得済みファイルの記録を引く"""
+		return {row['id']: dict(row) for row in self._select_in('id', file_ids)}
+	
+	def find_by_md5(self, checksums: Iterable[str]) -> Dict[str, List[str]]:
+		"""md5Checksum から保存済みのパスを引く"""
+		found: Dict[str, List[str]] = {}
+		for row in self._select_in('md5', checksums):
+			found.setdefault(row['md5'], []).append(row['local_path'])
+		return found
+	
+	def find_by_path(self, local_paths: Iterable[str]) -> Dict[str, str]:
+		"""保存先パスから、そのパスを使っている Drive ID を引く"""
+		return {row['local_path']: row['id'] for row in self._select_in('local_path', local_paths)}
+	
+	def record_many(self, records: Iterable[Tuple[str, str, str, Optional[str], Optional[str], str, bool]]):
+		"""
+		取得済み（または先頭だけ確認した）ファイルを記録
+		
+		Args:
+			records: (Drive ID, フォルダID, 名前, md5Checksum, 更新日時, 保存先パス, ダウンロード済みか) のリスト
+		"""
+		with self._lock:
+			self.conn.executemany("""
+				INSERT INTO drive_files (id, folder_id, name, md5, modified_time, local_path, downloaded)
+				VALUES (?, ?, ?, ?, ?, ?, ?)
+				ON CONFLICT(id) DO UPDATE SET
+					folder_id = excluded.folder_id,
+					name = excluded.name,
+					md5 = excluded.md5,
+					modified_time = excluded.modified_time,
+					local_path = excluded.local_path,
+					downloaded = excluded.downloaded,
+					updated_at = CURRENT_TIMESTAMP
+			""", records)
+			self.conn.commit()
+	
+	def remote_only(self, folder_id: str) -> List[Dict[str, Any]]:
+		"""GPS がないためダウンロードしていないファイルの記録"""
+		with self._lock:
+			rows = self.conn.execute(
+				"SELECT * FROM drive_files WHERE folder_id = ? AND downloaded = 0 ORDER BY modified_time", (folder_id,)
+			).fetchall()
+		return [dict(row) for row in rows]
+	
+	def remove_many(self, file_ids: Iterable[str]) -> int:
+		"""記録を削除（保存済みのファイル自体は残す）し、削除した件数を返す"""
+		file_ids = list(file_ids)
+		removed = 0
+		with self._lock:
+			for start in range(0, len(file_ids), 500):
+				chunk = file_ids[start:start + 500]
+				placeholders = ",".join("?" * len(chunk))
+				removed += self.conn.execute(
+					f"DELETE FROM drive_files WHERE id IN ({placeholders})", chunk
+				).rowcount
+			self.conn.commit()
+		return removed
+	
+	def close(self):
+		with self._lock:
+			if self.conn is not None:
+				self.conn.close()
+				self.conn = None
+
 
 class DriveSync:
 	"""Google Drive から写真を同期するクラス"""
 	
-	def __init__(self, folder_id: str, download_dir: Path = Path("data/drive_import")):
+	def __init__(
+		self,
+		folder_id: str,
+		download_dir: Path = Path("data/drive_import"),
+		service_factory: Optional[Callable[[], object]] = None,
+		max_workers: int = 4,
+		chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+		state: Optional[DriveSyncState] = None,
+		list_workers: int = 4
+	):
+		"""
+		Args:
+			folder_id: 同期する Drive フォルダID
+			download_dir: 保存先ディレクトリ
+			service_factory: Drive v3 サービスを作る関数（省略時は st.secrets のサービスアカウント）。
+				ワーカースレッドごとに1回だけ呼ばれる
+			max_workers: 同時にダウンロードするファイル数
+			chunk_size: 1回の Range リクエストで取得するバイト数
+			state: 同期状態の保存先（省略時は data/drive_sync.db）
+			list_workers: 同時に一覧を取得するフォルダ数
+		"""
 		self.folder_id = folder_id
 		self.download_dir = Path(download_dir)
 		self.download_dir.mkdir(parents=True, exist_ok=True)
+		self.max_workers = max(1, max_workers)
+		self.list_workers = max(1, list_workers)
+		self.chunk_size = chunk_size
+		self.logger = get_logger()
+		self.state = state or DriveSyncState()
+		
+		self._service_factory = service_factory or self._build_service
+		self._credentials = None
+		self._credentials_lock = threading.Lock()
+		# httplib2 はスレッドセーフではないため、サービスはスレッドごとに1つ作って使い回す
+		self._local = threading.local()
 	
-	def _get_service(self):
+	def _build_service(self):
+		"""st.secrets のサービスアカウントで Drive v3 サービスを作成（認証情報は共有）"""
 		if service_account is None or build is None:
 			raise RuntimeError("Google Drive クライアントが利用できません。requirements に google-api-python-client, google-auth を追加してください。")
 		
-		if "gcp_service_account" not in st.secrets:
-			raise RuntimeError("st.secrets['gcp_service_account'] が設定されていません（サービスアカウントJSONを保存してください）。")
+		with self._credentials_lock:
+			if self._credentials is None:
+				if "gcp_service_account" not in st.secrets:
+					raise RuntimeError("st.secrets['gcp_service_account'] が設定されていません（サービスアカウントJSONを保存してください）。")
+				
+				info = st.secrets["gcp_service_account"]
+				self._credentials = service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
 		
-		info = st.secrets["gcp_service_account"]
-		creds = service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
-		return build("drive", "v3", credentials=creds, cache_discovery=False)
+		return build("drive", "v3", credentials=self._credentials, cache_discovery=False)
+	
+	def _get_service(self):
+		"""現在のスレッド用の Drive サービス（初回のみ作成）"""
+		service = getattr(self._local, "service", None)
+		if service is None:
+			service = self._service_factory()
+			self._local.service = service
+		return service
 	
 	def list_files(self, mime_prefix: str = "image/", modified_after: Optional[str] = None, page_size: int = 1000) -> List[Dict]:
 		"""
@@ -60,7 +311,7 @@ class DriveSync:
 			resp = service.files().list(
 				q=q,
 				spaces="drive",
-				fields="nextPageToken, files(id, name, mimeType, modifiedTime)",
+				fields=f"nextPageToken, files({FILE_FIELDS})",
 				pageSize=page_size,
 				orderBy="modifiedTime desc",
 				pageToken=page_token,
@@ -71,43 +322,752 @@ class DriveSync:
 				break
 		return files
 	
-	def download_file(self, file_id: str, filename: str) -> Path:
-		"""ファイルを download_dir に保存"""
+	def iter_files(
+		self,
+		mime_prefixes: Tuple[str, ...] = MEDIA_MIME_PREFIXES,
+		modified_after: Optional[str] = None,
+		folder_id: Optional[str] = None,
+		recursive: bool = True,
+		include_folders: bool = False,
+		page_size: int = 1000
+	) -> Iterator[Dict]:
+		"""
+		フォルダ配下のファイルを、一覧のページが届いたものから順に返す
+		
+		サブフォルダは見つかった時点で一覧の取得を始め、最大 list_workers フォルダを並行して取得する。
+		
+		Args:
+			mime_prefixes: 対象の MIME タイプ（前方一致）
+			modified_after: RFC3339 形式（これ以降に更新されたファイルのみ。フォルダには適用しない）
+			folder_id: 起点のフォルダ（省略時は同期対象のフォルダ）
+			recursive: サブフォルダもたどるか
+			include_folders: サブフォルダ自体も返すか（mimeType が FOLDER_MIME のもの）
+			page_size: 1ページの件数
+			
+		Yields:
+			ファイル情報（LIST_FIELDS の項目）
+		"""
+		media = " or ".join(f"mimeType contains '{prefix}'" for prefix in mime_prefixes)
+		if modified_after:
+			media = f"({media}) and modifiedTime > '{modified_after}'"
+		kinds = f"mimeType = '{FOLDER_MIME}' or ({media})" if recursive else media
+		fields = f"nextPageToken, files({LIST_FIELDS})"
+		
+		def list_page(parent: str, page_token: Optional[str]) -> Tuple[str, Dict]:
+			resp = self._get_service().files().list(
+				q=f"'{parent}' in parents and trashed = false and ({kinds})",
+				spaces="drive",
+				fields=fields,
+				pageSize=page_size,
+				pageToken=page_token,
+			).execute()
+			return parent, resp
+		
+		with ThreadPoolExecutor(max_workers=self.list_workers, thread_name_prefix="DriveList") as executor:
+			pending = {executor.submit(list_page, folder_id or self.folder_id, None)}
+			while pending:
+				done, pending = wait(pending, return_when=FIRST_COMPLETED)
+				for future in done:
+					parent, resp = future.result()
+					if resp.get("nextPageToken"):
+						pending.add(executor.submit(list_page, parent, resp["nextPageToken"]))
+					for f in resp.get("files", []):
+						if f.get("mimeType") != FOLDER_MIME:
+							yield f
+							continue
+						if recursive:
+							pending.add(executor.submit(list_page, f["id"], None))
+						if include_folders:
+							yield f
+	
+	def list_changes(
+		self,
+		page_token: str,
+		mime_prefixes: Tuple[str, ...] = MEDIA_MIME_PREFIXES,
+		folders: Optional[Dict[str, Optional[str]]] = None,
+		page_size: int = 1000
+	) -> Tuple[List[Dict], List[str], str, List[str]]:
+		"""
+		ページトークン以降の変更を取得（Changes API）
+		
+		Args:
+			page_token: 前回の同期で保存したページトークン
+			mime_prefixes: 対象の MIME タイプ（前方一致）
+			folders: 同期対象のサブフォルダ {フォルダID: 親フォルダID}。
+				フォルダの追加・移動・削除に合わせてこの辞書を更新する
+			page_size: 1ページの件数
+			
+		Returns:
+			(対象フォルダ内で追加・更新されたファイル, 削除・ゴミ箱・対象外へ移動したファイルID,
+			 次回のページトークン, 新たに対象になったサブフォルダ（中身は一覧で取得する必要がある）)
+		"""
 		service = self._get_service()
-		request = service.files().get_media(fileId=file_id)
-		fh = io.BytesIO()
-		downloader = MediaIoBaseDownload(fh, request)
-		done = False
-		while not done:
-			_, done = downloader.next_chunk()
-		
-		fh.seek(0)
+		folders = folders if folders is not None else {}
+		added_folders: Dict[str, None] = {}
+		
+		# 同じファイルの変更が複数あれば最新のものだけを残す
+		changed: Dict[str, Dict] = {}
+		removed: Dict[str, None] = {}
+		while True:
+			resp = service.changes().list(
+				pageToken=page_token,
+				spaces="drive",
+				includeRemoved=True,
+				fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))",
+				pageSize=page_size,
+			).execute()
+			
+			for change in resp.get("changes", []):
+				file_id = change.get("fileId")
+				f = change.get("file")
+				changed.pop(file_id, None)
+				removed.pop(file_id, None)
+				parent = next(
+					(p for p in (f or {}).get("parents", []) if p == self.folder_id or p in folders), None
+				)
+				inside = not change.get("removed") and f is not None and not f.get("trashed") and parent is not None
+				
+				if (f is not None and f.get("mimeType") == FOLDER_MIME) or file_id in folders:
+					# サブフォルダの追加・移動・削除（配下のサブフォルダも合わせて外す）
+					if inside and file_id not in folders:
+						added_folders[file_id] = None
+					if inside:
+						folders[file_id] = parent
+					else:
+						self._drop_folder(folders, file_id)
+						added_folders.pop(file_id, None)
+				elif not inside:
+					removed[file_id] = None
+				elif f.get("mimeType", "").startswith(mime_prefixes):
+					changed[file_id] = f
+			
+			if "newStartPageToken" in resp:
+				return list(changed.values()), list(removed), resp["newStartPageToken"], list(added_folders)
+			page_token = resp["nextPageToken"]
+	
+	@staticmethod
+	def _drop_folder(folders: Dict[str, Optional[str]], folder_id: str):
+		"""フォルダと、その配下のサブフォルダを対象から外す"""
+		stack = [folder_id]
+		while stack:
+			current = stack.pop()
+			folders.pop(current, None)
+			stack.extend(child for child, parent in folders.items() if parent == current)
+	
+	@staticmethod
+	def _file_md5(path: Path) -> str:
+		digest = hashlib.md5()
+		with open(path, "rb") as f:
+			for block in iter(lambda: f.read(1024 * 1024), b""):
+				digest.update(block)
+		return digest.hexdigest()
+	
+	def _plan_downloads(
+		self,
+		files: List[Dict],
+		claimed: Optional[Dict[str, str]] = None,
+		downloading: Optional[Dict[str, Dict]] = None
+	) -> Tuple[List[Dict], List[Tuple[Dict, str]], List[Tuple[Dict, str]]]:
+		"""
+		取得が必要なファイルと、既存のファイルで済むものに分ける
+		
+		一覧を少しずつ渡す場合は、claimed（使用予定の保存名）と downloading（取得予定の md5Checksum）に
+		同じ辞書を渡して、前の分との重複も判定する。
+		
+		Returns:
+			(保存先の名前 local_name を付けたダウンロード対象,
+			 [(既に保存済みのファイル, パス), ...],
+			 [(同じ内容を今回ダウンロードするファイル, md5Checksum), ...])
+		"""
+		known = self.state.get_files(f["id"] for f in files)
+		by_md5 = self.state.find_by_md5(f.get("md5Checksum") for f in files)
+		names = {f["id"]: Path(f["name"]).name for f in files}
+		owners = self.state.find_by_path(str(self.download_dir / name) for name in names.values())
+		
+		downloads: List[Dict] = []
+		existing: List[Tuple[Dict, str]] = []
+		duplicates: List[Tuple[Dict, str]] = []
+		claimed = claimed if claimed is not None else {}
+		downloading = downloading if downloading is not None else {}
+		for f in files:
+			md5 = f.get("md5Checksum")
+			row = known.get(f["id"])
+			
+			# 同じファイルで内容が変わっていない（名前の変更・移動だけ）なら取得しない
+			# （GPS がなく先頭だけ確認したファイルも、内容が変わるまでは確認し直さない）
+			if row and (Path(row["local_path"]).exists() or not row["downloaded"]) and (
+				(md5 and row["md5"] == md5) or (not md5 and row["modified_time"] == f.get("modifiedTime"))
+			):
+				existing.append((f, row["local_path"]))
+				continue
+			
+			# 同じ内容のファイルが保存済み・ダウンロード予定なら再利用する
+			if md5:
+				path = next((p for p in by_md5.get(md5, []) if Path(p).exists()), None)
+				if path is not None:
+					existing.append((f, path))
+					continue
+				if md5 in downloading:
+					duplicates.append((f, md5))
+					continue
+			
+			if row:
+				# 内容が更新されたファイルは同じパスに上書きする
+				local_name = Path(row["local_path"]).name
+			else:
+				local_name = names[f["id"]]
+				path = self.download_dir / local_name
+				owner = claimed.get(local_name) or owners.get(str(path))
+				if owner is None and local_name not in claimed and path.exists():
+					# 記録のない既存ファイル（以前の同期で名前のまま保存したもの）は内容が同じなら引き継ぐ
+					if md5 and self._file_md5(path) == md5:
+						existing.append((f, str(path)))
+						claimed[local_name] = f["id"]
+						continue
+					owner = ""
+				if owner not in (None, f["id"]):
+					# 同名の別ファイルは Drive ID を付けて別名で保存する
+					local_name = f"{path.stem}_{f['id'][:8]}{path.suffix}"
+			
+			claimed[local_name] = f["id"]
+			if md5:
+				downloading[md5] = f
+			downloads.append(dict(f, local_name=local_name))
+		
+		return downloads, existing, duplicates
+	
+	def _record(self, entries: List[Tuple[Dict, str]]):
+		# 保存先にファイルがなければ未ダウンロード（先頭だけ確認したもの）として記録する
+		self.state.record_many(
+			(
+				f["id"], self.folder_id, f.get("name"), f.get("md5Checksum"), f.get("modifiedTime"),
+				str(path), Path(path).exists()
+			)
+			for f, path in entries
+		)
+	
+	def _fetch_range(self, file_id: str, start: int, end: int) -> Tuple[bytes, Optional[int], bool]:
+		"""
+		ファイルの一部を Range リクエストで取得
+		
+		Args:
+			file_id: Drive ファイルID
+			start: 先頭バイト位置
+			end: 末尾バイト位置（この位置を含む）
+			
+		Returns:
+			(取得したバイト列, ファイル全体のサイズ（不明なら None）, 部分取得できたか)
+			部分取得できなかった場合（サーバが Range を無視した場合）はファイル全体が返る
+		"""
+		request = self._get_service().files().get_media(fileId=file_id)
+		response, content = request.http.request(
+			request.uri,
+			method="GET",
+			headers={"range": f"bytes={start}-{end}"}
+		)
+		status = int(response.status)
+		
+		if status == 416:
+			# 範囲がファイル末尾を超えている（取得済み）
+			return b"", start, True
+		if status >= 400:
+			if HttpError is not None:
+				raise HttpError(response, content, uri=request.uri)
+			raise RuntimeError(f"Drive からの取得に失敗しました（HTTP {status}）")
+		
+		if status == 206:
+			match = re.search(r"/(\d+)$", response.get("content-range", ""))
+			return content, int(match.group(1)) if match else None, True
+		return content, len(content), False
+	
+	def _partial_paths(self, target: Path) -> Tuple[Path, Path]:
+		return (
+			target.with_name(target.name + PARTIAL_SUFFIX),
+			target.with_name(target.name + PARTIAL_STATE_SUFFIX)
+		)
+	
+	def download_file(
+		self,
+		file_id: str,
+		filename: str,
+		size: Optional[int] = None,
+		modified_time: Optional[str] = None,
+		on_head: Optional[Callable[[bytes], None]] = None,
+		head: Optional[bytes] = None
+	) -> Path:
+		"""
+		ファイルを download_dir に保存
+		
+		チャンクごとに一時ファイル（.part）へ書き込み、完了後に置き換える。
+		前回の同期が途中で止まっていた場合は、同じファイル（ID・更新日時が一致）なら続きから取得する。
+		
+		Args:
+			file_id: Drive ファイルID
+			filename: 保存するファイル名
+			size: ファイルサイズ（一覧で取得済みなら指定）
+			modified_time: 更新日時（途中ファイルが同じ版か確認するために使う）
+			on_head: 先頭 HEAD_SIZE バイトが届いた時点で呼ぶ関数（残りの取得より先に EXIF を読める）
+			head: 取得済みの先頭部分（probe_exif の結果。同じ範囲を取得し直さない）
+			
+		Returns:
+			保存先のパス
+		"""
 		target = self.download_dir / filename
-		with open(target, "wb") as f:
-			f.write(fh.read())
+		partial, state_path = self._partial_paths(target)
+		state = {"id": file_id, "modifiedTime": modified_time, "size": size}
+		
+		# 途中まで取得済みのファイルがあれば続きから
+		offset = 0
+		if partial.exists() and state_path.exists():
+			try:
+				previous = json.loads(state_path.read_text(encoding="utf-8"))
+			except Exception:
+				previous = {}
+			if previous.get("id") == file_id and previous.get("modifiedTime") == modified_time:
+				offset = partial.stat().st_size
+			if offset:
+				self.logger.info(f"Drive ダウンロード再開: {filename}（{offset}バイトから）")
+		if offset == 0:
+			partial.unlink(missing_ok=True)
+		state_path.write_text(json.dumps(state), encoding="utf-8")
+		if head and offset == 0:
+			partial.write_bytes(head)
+			offset = len(head)
+		
+		if on_head is not None and offset:
+			# 再開時は取得済みの先頭部分を渡す
+			with open(partial, "rb") as f:
+				on_head(f.read(HEAD_SIZE))
+			on_head = None
+		
+		with open(partial, "ab" if offset else "wb") as f:
+			while size is None or offset < size:
+				# 先頭は EXIF を読める分だけ先に取得する
+				length = HEAD_SIZE if on_head is not None else self.chunk_size
+				content, total, ranged = self._fetch_range(file_id, offset, offset + length - 1)
+				if not ranged:
+					# Range 非対応の応答は全体が返るため、先頭から書き直す
+					f.seek(0)
+					f.truncate()
+					f.write(content)
+					offset = len(content)
+					if on_head is not None:
+						on_head(content[:HEAD_SIZE])
+					break
+				
+				f.write(content)
+				# チャンクごとにディスクへ反映し、中断しても取得済みの分は残す
+				f.flush()
+				offset += len(content)
+				if total is not None:
+					size = total
+				if on_head is not None:
+					on_head(content)
+					on_head = None
+				if len(content) < length:
+					break
+		
+		if size is not None and offset < size:
+			raise IOError(f"ダウンロードが途中で終了しました: {filename}（{offset}/{size}バイト）")
+		
+		os.replace(partial, target)
+		state_path.unlink(missing_ok=True)
 		return target
 	
-	def sync_new_photos(self, modified_after_iso: Optional[str] = None) -> Dict[str, any]:
+	@staticmethod
+	def extract_metadata(path: Path) -> Optional[Dict[str, Any]]:
+		"""保存したファイル全体から座標・撮影日時を抽出（非対応の形式は None）"""
+		if ExifExtractor.is_supported(path):
+			return ExifExtractor.extract_exif(path)
+		if VideoMetadataExtractor.is_supported(path):
+			return VideoMetadataExtractor.extract_metadata(path)
+		return None
+	
+	def probe_exif(self, file_id: str) -> Tuple[Dict[str, Any], bytes, Optional[int]]:
+		"""
+		ファイルの先頭 HEAD_SIZE バイトだけを Range リクエストで取得して EXIF を読む
+		
+		Args:
+			file_id: Drive ファイルID
+			
+		Returns:
+			(extract_exif と同じ形式のメタデータ, 取得した先頭部分, ファイル全体のサイズ)
+		"""
+		head, total, ranged = self._fetch_range(file_id, 0, HEAD_SIZE - 1)
+		if not ranged:
+			# Range 非対応の応答はファイル全体
+			total = len(head)
+		return ExifExtractor.extract_exif_from_bytes(head), head, total
+	
+	def _download(
+		self,
+		f: Dict,
+		extract_metadata: bool = False,
+		probe_gps: bool = False
+	) -> Tuple[Optional[Path], Optional[Dict[str, Any]]]:
+		"""
+		1件をダウンロードし、必要ならメタデータも抽出
+		
+		画像は先頭 HEAD_SIZE バイトが届いた時点で EXIF を読み、
+		そこで座標が取れなかった場合（HEIC など）だけ保存後のファイル全体から読む。
+		probe_gps が True なら、JPEG は先に先頭だけを取得し、GPS がなければダウンロードしない（パスは None）。
+		"""
+		local_name = f.get("local_name") or Path(f["name"]).name
+		size = int(f["size"]) if f.get("size") else None
+		
+		if probe_gps and f.get("mimeType") in PROBE_MIME_TYPES:
+			metadata, head, total = self.probe_exif(f["id"])
+			if not metadata["has_gps"]:
+				return None, metadata
+			path = self.download_file(f["id"], local_name, size or total, f.get("modifiedTime"), head=head)
+			return path, metadata if extract_metadata else None
+		
+		head_metadata: Dict[str, Any] = {}
+		on_head = None
+		if extract_metadata and f.get("mimeType", "").startswith("image/"):
+			on_head = lambda head: head_metadata.update(ExifExtractor.extract_exif_from_bytes(head))
+		
+		path = self.download_file(
+			f["id"],
+			local_name,
+			size,
+			f.get("modifiedTime"),
+			on_head=on_head
+		)
+		if not extract_metadata:
+			return path, None
+		if head_metadata.get("has_gps"):
+			return path, head_metadata
+		return path, self.extract_metadata(path)
+	
+	def iter_downloads(
+		self,
+		files: Iterable[Dict],
+		extract_metadata: bool = False,
+		probe_gps: bool = False
+	) -> Iterator[Tuple[Dict, Optional[Path], Optional[Dict[str, Any]], Optional[str]]]:
+		"""
+		複数のファイルを並行してダウンロードし、終わったものから順に返す
+		
+		files はジェネレータでもよく、一覧の取得と並行してダウンロードを始める
+		（取り出すのは実行中の件数が max_workers の2倍に満たないときだけ）。
+		
+		Args:
+			files: list_files の戻り値の形式のファイル情報（local_name があればその名前で保存）
+			extract_metadata: ダウンロードと同じワーカーで座標・撮影日時も抽出するか
+			probe_gps: JPEG は先頭だけを取得し、GPS があるものだけダウンロードするか
+			
+		Yields:
+			(ファイル情報, 保存先のパス, メタデータ, エラー内容)。
+			失敗した場合はパスが None、GPS がなくダウンロードしなかった場合はパスとエラー内容が None
+		"""
+		source = iter(files)
+		exhausted = False
+		with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="DriveSync") as executor:
+			futures: Dict[Any, Dict] = {}
+			while True:
+				while not exhausted and len(futures) < self.max_workers * 2:
+					f = next(source, None)
+					if f is None:
+						exhausted = True
+					else:
+						futures[executor.submit(self._download, f, extract_metadata, probe_gps)] = f
+				if not futures:
+					return
+				
+				done, _ = wait(futures, return_when=FIRST_COMPLETED)
+				for future in done:
+					f = futures.pop(future)
+					try:
+						path, metadata = future.result()
+					except Exception as e:
+						self.logger.warning(f"Drive ダウンロード失敗: {f.get('name')} ({e})")
+						yield f, None, None, str(e)
+						continue
+					yield f, path, metadata, None
+	
+	def download_files(
+		self,
+		files: List[Dict],
+		progress_callback: Optional[Callable[[int, int, Dict], None]] = None
+	) -> Tuple[List[Path], List[Tuple[Dict, str]]]:
+		"""
+		複数のファイルを並行してダウンロード
+		
+		Args:
+			files: list_files の戻り値の形式のファイル情報（local_name があればその名前で保存）
+			progress_callback: 1件終わるごとに callback(完了数, 全件数, ファイル情報)
+			
+		Returns:
+			(保存したパスのリスト（files の順）, [(失敗したファイル情報, エラー内容), ...])
+		"""
+		positions = {id(f): position for position, f in enumerate(files)}
+		paths: Dict[int, Path] = {}
+		failed: List[Tuple[Dict, str]] = []
+		for done, (f, path, _, error) in enumerate(self.iter_downloads(files), 1):
+			if path is None:
+				failed.append((f, error))
+			else:
+				paths[positions[id(f)]] = path
+			if progress_callback is not None:
+				progress_callback(done, len(files), f)
+		
+		return [paths[position] for position in sorted(paths)], failed
+	
+	def _sync_files(
+		self,
+		files: Iterable[Dict],
+		progress_callback: Optional[Callable[[int, int, Dict], None]] = None,
+		on_saved: Optional[Callable[[Dict, Path, Optional[Dict[str, Any]]], None]] = None,
+		batch_size: int = 200,
+		probe_gps: bool = False
+	) -> Dict[str, Any]:
+		"""
+		取得済みの内容を除いてダウンロードし、結果を記録する
+		
+		files はジェネレータでもよく、batch_size 件ずつ取得の要否を判定してダウンロードに回す。
+		on_saved を指定すると、保存したファイルごとに（すべての完了を待たずに）
+		呼び出し元のスレッドで on_saved(ファイル情報, パス, メタデータ) を呼ぶ。
+		progress_callback の全件数は、一覧の取得が終わるまで増えていく。
+		probe_gps が True なら、GPS のない JPEG はダウンロードせず未取得として記録する（ensure_local で取得できる）。
 		"""
-		新しい写真をダウンロード
+		existing: List[Tuple[Dict, str]] = []
+		duplicates: List[Tuple[Dict, str]] = []
+		claimed: Dict[str, str] = {}
+		downloading: Dict[str, Dict] = {}
+		seen: set = set()
+		planned: List[Dict] = []
+		
+		def plan() -> Iterator[Dict]:
+			source = iter(files)
+			while True:
+				chunk = list(islice(source, batch_size))
+				if not chunk:
+					return
+				# 同じファイルが複数回届いても（変更の一覧と新しいフォルダの一覧など）1回だけ扱う
+				batch = []
+				for f in chunk:
+					if f["id"] not in seen:
+						seen.add(f["id"])
+						batch.append(f)
+				downloads, batch_existing, batch_duplicates = self._plan_downloads(batch, claimed, downloading)
+				existing.extend(batch_existing)
+				duplicates.extend(batch_duplicates)
+				for f in downloads:
+					planned.append(f)
+					yield f
+		
+		saved: List[Tuple[Dict, Path]] = []
+		remote_only: List[Tuple[Dict, Path]] = []
+		failed: List[Tuple[Dict, str]] = []
+		try:
+			for done, (f, path, metadata, error) in enumerate(
+				self.iter_downloads(plan(), extract_metadata=on_saved is not None, probe_gps=probe_gps), 1
+			):
+				if path is None and error is None:
+					remote_only.append((f, self.download_dir / f["local_name"]))
+				elif path is None:
+					failed.append((f, error))
+				else:
+					saved.append((f, path))
+					if on_saved is not None:
+						on_saved(f, path, metadata)
+				if progress_callback is not None:
+					progress_callback(done, len(planned), f)
+		finally:
+			# 途中で例外になっても、保存できたファイルは記録しておく
+			entries = saved + remote_only + existing
+			saved_by_md5 = {f.get("md5Checksum"): path for f, path in saved}
+			for f, md5 in duplicates:
+				if md5 in saved_by_md5:
+					entries.append((f, saved_by_md5[md5]))
+				else:
+					failed.append((f, "同じ内容のファイルのダウンロードに失敗しました"))
+			self._record(entries)
+		
+		if existing or duplicates:
+			self.logger.info(f"Drive 同期: 保存済みの内容のため {len(existing) + len(duplicates)}件の取得を省略")
+		positions = {id(f): position for position, f in enumerate(planned)}
+		paths = [path for f, path in sorted(saved, key=lambda item: positions[id(item[0])])]
+		return {
+			"paths": paths,
+			"skipped": len(existing) + len(duplicates),
+			"remote_only": len(remote_only),
+			"failed": failed
+		}
+	
+	def sync_changes(
+		self,
+		progress_callback: Optional[Callable[[int, int, Dict], None]] = None,
+		on_saved: Optional[Callable[[Dict, Path, Optional[Dict[str, Any]]], None]] = None,
+		probe_gps: bool = False
+	) -> Dict[str, Any]:
+		"""
+		前回の同期以降の変更だけを取得
+		
+		初回はサブフォルダを含めてフォルダ全体を一覧し、同時に Changes API のページトークンを保存する。
+		2回目以降は変更の件数に比例した処理量で済む。画像・動画が対象。
+		ダウンロードに失敗したファイルがある場合はトークンを進めない（次回同じ変更から再試行する）。
+		
+		Args:
+			progress_callback: 1件終わるごとに callback(完了数, 全件数, ファイル情報)
+			on_saved: 保存したファイルごとに callback(ファイル情報, パス, メタデータ)（指定時はメタデータも抽出する）
+			probe_gps: JPEG は先頭だけを取得し、GPS があるものだけダウンロードするか
+			
+		Returns:
+			{ 'downloaded': int, 'paths': List[Path], 'skipped': int, 'remote_only': int,
+			  'removed': int, 'failed': int, 'full_scan': bool }
+		"""
+		page_token = self.state.get_page_token(self.folder_id)
+		full_scan = page_token is None
+		folders = self.state.get_folders(self.folder_id)
+		removed_ids: List[str] = []
+		if full_scan:
+			# 一覧の取得中に起きた変更を取りこぼさないよう、先にトークンを取得しておく
+			new_token = self._get_service().changes().getStartPageToken().execute()["startPageToken"]
+			folders = {}
+			files = self._track_folders(self.iter_files(include_folders=True), folders)
+		else:
+			changed, removed_ids, new_token, added_folders = self.list_changes(page_token, folders=folders)
+			# 移動してきたフォルダの中身は変更として届かないため、一覧で取得する（入れ子は最上位だけたどる）
+			tops = [folder_id for folder_id in added_folders if folders.get(folder_id) not in added_folders]
+			files = chain(changed, *(
+				self._track_folders(self.iter_files(folder_id=folder_id, include_folders=True), folders)
+				for folder_id in tops
+			))
+		
+		result = self._sync_files(files, progress_callback, on_saved, probe_gps=probe_gps)
+		removed = self.state.remove_many(removed_ids) if removed_ids else 0
+		if not result["failed"]:
+			self.state.save_sync_point(self.folder_id, new_token, folders)
+		
+		return {
+			"downloaded": len(result["paths"]),
+			"paths": result["paths"],
+			"skipped": result["skipped"],
+			"remote_only": result["remote_only"],
+			"removed": removed,
+			"failed": len(result["failed"]),
+			"full_scan": full_scan
+		}
+	
+	@staticmethod
+	def _track_folders(entries: Iterable[Dict], folders: Dict[str, Optional[str]]) -> Iterator[Dict]:
+		"""一覧からサブフォルダを folders に記録し、ファイルだけを返す"""
+		for f in entries:
+			if f.get("mimeType") == FOLDER_MIME:
+				parents = f.get("parents") or [None]
+				folders[f["id"]] = parents[0]
+			else:
+				yield f
+	
+	def import_changes(
+		self,
+		database,
+		progress_callback: Optional[Callable[[int, int, Dict], None]] = None,
+		batch_size: int = 100,
+		probe_gps: bool = True
+	) -> Dict[str, Any]:
+		"""
+		変更を取得しながら、届いたファイルから順に写真DBへ登録（フォルダの再スキャンは不要）
+		
+		ダウンロード・メタデータ抽出はワーカースレッドで並行して行い、
+		DB への登録は呼び出し元のスレッドで batch_size 件ずつまとめて行う。
+		GPS のない写真は DB に登録しないため、JPEG は先頭だけを確認して GPS があるものだけダウンロードする。
+		
+		Args:
+			database: 登録先の Database
+			progress_callback: 1件終わるごとに callback(完了数, 全件数, ファイル情報)
+			batch_size: まとめて登録する件数
+			probe_gps: GPS のない JPEG のダウンロードを省略するか
+			
+		Returns:
+			sync_changes の戻り値に 'registered'（登録件数）, 'no_gps'（座標なし、未ダウンロード分を含む）を加えたもの
+		"""
+		rows: List[Tuple] = []
+		counts = {"registered": 0, "no_gps": 0}
+		
+		def on_saved(f: Dict, path: Path, metadata: Optional[Dict[str, Any]]):
+			if not metadata or not metadata.get("has_gps"):
+				counts["no_gps"] += 1
+				return
+			file_type = "video" if f.get("mimeType", "").startswith("video/") else "image"
+			rows.append((path, file_type, metadata["latitude"], metadata["longitude"], metadata["timestamp"]))
+			if len(rows) >= batch_size:
+				counts["registered"] += database.upsert_photos(rows)
+				rows.clear()
+		
+		try:
+			result = self.sync_changes(progress_callback, on_saved=on_saved, probe_gps=probe_gps)
+		finally:
+			if rows:
+				counts["registered"] += database.upsert_photos(rows)
+		
+		counts["no_gps"] += result["remote_only"]
+		result.update(counts)
+		return result
+	
+	def ensure_local(self, file_id: str) -> Path:
+		"""
+		ファイルがダウンロード済みでなければ取得してパスを返す（GPS がなく未取得のファイルを開くとき用）
+		
+		Args:
+			file_id: Drive ファイルID
+			
+		Returns:
+			保存先のパス
+		"""
+		row = self.state.get_files([file_id]).get(file_id)
+		if row is not None and Path(row["local_path"]).exists():
+			return Path(row["local_path"])
+		
+		f = self._get_service().files().get(fileId=file_id, fields=LIST_FIELDS).execute()
+		if row is not None:
+			local_name = Path(row["local_path"]).name
+		else:
+			downloads, existing, duplicates = self._plan_downloads([f])
+			if existing:
+				self._record(existing)
+				return Path(existing[0][1])
+			local_name = downloads[0]["local_name"]
+		
+		path = self.download_file(
+			f["id"], local_name, int(f["size"]) if f.get("size") else None, f.get("modifiedTime")
+		)
+		self._record([(f, path)])
+		return path
+	
+	def sync_new_photos(
+		self,
+		modified_after_iso: Optional[str] = None,
+		progress_callback: Optional[Callable[[int, int, Dict], None]] = None
+	) -> Dict[str, any]:
+		"""
+		更新日時で絞り込んで新しい写真をダウンロード（ページトークンを使わない方式）
 		
 		Args:
 			modified_after_iso: ISO8601 文字列（これ以降の更新のみ取得）
+			progress_callback: 1件終わるごとに callback(完了数, 全件数, ファイル情報)
 		Returns:
-			{ 'downloaded': int, 'paths': List[Path], 'latest': str }
+			{ 'downloaded': int, 'paths': List[Path], 'latest': str, 'skipped': int, 'failed': int }
 		"""
 		files = self.list_files(mime_prefix="image/", modified_after=modified_after_iso)
-		paths: List[Path] = []
-		for f in reversed(files):  # 古い順に保存
-			try:
-				p = self.download_file(f["id"], f["name"])
-				paths.append(p)
-			except Exception:
-				continue
+		# 古い順に保存
+		result = self._sync_files(list(reversed(files)), progress_callback=progress_callback)
+		failed = result["failed"]
 		
 		latest = None
 		if files:
 			latest = files[0].get("modifiedTime")
-		return {"downloaded": len(paths), "paths": paths, "latest": latest}
-
-
+		if failed:
+			# 失敗したファイルが次回の一覧に含まれるよう、それより前までしか進めない
+			first_failed = min(f.get("modifiedTime") or "" for f, _ in failed)
+			succeeded = [f.get("modifiedTime") for f in files if (f.get("modifiedTime") or "") < first_failed]
+			latest = max(succeeded) if succeeded else modified_after_iso
+		return {
+			"downloaded": len(result["paths"]),
+			"paths": result["paths"],
+			"latest": latest,
+			"skipped": result["skipped"],
+			"failed": len(failed)
+		}
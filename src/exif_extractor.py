@@ -6,7 +6,9 @@ JPG, PNG, HEIC からGPS座標と撮影日時を抽出
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
 import exifread
+from contextlib import nullcontext
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 from typing import Optional, Dict, Any
 from src.logger import get_logger
@@ -93,6 +95,33 @@ class ExifExtractor:
         
         return result
 
+    @staticmethod
+    def extract_exif_from_bytes(data: bytes) -> Dict[str, Any]:
+        """
+        ファイル先頭のバイト列からEXIF情報を抽出
+        
+        JPEG の EXIF は先頭の APP1 セグメントにあるため、
+        ダウンロード途中（先頭の数十KB）でも座標と撮影日時を取得できることが多い。
+        
+        Args:
+            data (bytes): 画像ファイルの先頭部分（または全体）
+            
+        Returns:
+            dict: extract_exif と同じ形式（取得できなければ has_gps は False）
+        """
+        result = {
+            'latitude': None,
+            'longitude': None,
+            'timestamp': None,
+            'has_gps': False
+        }
+        
+        result = ExifExtractor._extract_with_pillow(BytesIO(data), result)
+        if not result['has_gps']:
+            result = ExifExtractor._extract_with_exifread(BytesIO(data), result)
+        
+        return result
+
     @staticmethod
     def _extract_with_pillow(file_path, result):
         """Pillowを使用してEXIF抽出"""
@@ -125,9 +154,9 @@ class ExifExtractor:
 
     @staticmethod
     def _extract_with_exifread(file_path, result):
-        """exifreadを使用してEXIF抽出（フォールバック）"""
+        """exifreadを使用してEXIF抽出（フォールバック、file_path はファイルオブジェクトでも可）"""
         try:
-            with open(file_path, 'rb') as f:
+            with (nullcontext(file_path) if hasattr(file_path, 'read') else open(file_path, 'rb')) as f:
                 tags = exifread.process_file(f)
                 
                 # GPS情報
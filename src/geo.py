@@ -0,0 +1,62 @@
+"""
+球面距離モジュール
+ハバーサイン距離と単位球ベクトルによる大圏距離の計算をまとめる
+（ルート最適化・道路ネットワーク・逆ジオコーディング・移動軌跡で共通に使う）
+"""
+
+import numpy as np
+
+
+# 地球の半径（km）
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+	"""
+	2地点間の大圏距離（ハバーサイン公式）
+
+	NumPy 配列でもスカラーでも可（配列はブロードキャストされる）。
+
+	Args:
+		lat1, lon1: 地点1の緯度経度
+		lat2, lon2: 地点2の緯度経度
+
+	Returns:
+		距離（km）
+	"""
+	lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+	a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+	return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(lats, lons) -> np.ndarray:
+	"""緯度経度 → 単位球面上の3次元ベクトル（弦の長さが大圏距離と単調に対応する）"""
+	lat = np.radians(np.asarray(lats, dtype=np.float64))
+	lon = np.radians(np.asarray(lons, dtype=np.float64))
+	cos_lat = np.cos(lat)
+	return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chords) -> np.ndarray:
+	"""単位球上の弦の長さ → 大圏距離（km）"""
+	return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chords) / 2, 0.0, 1.0))
+
+
+def dots_to_km(dots: np.ndarray) -> np.ndarray:
+	"""
+	単位ベクトルの内積 → 大圏距離（km）
+
+	大きな行列の一時領域を増やさないよう dots を上書きして計算する。
+	"""
+	# |p_i - p_j|^2 = 2 - 2 p_i・p_j
+	chord = dots
+	np.multiply(chord, -2.0, out=chord)
+	np.add(chord, 2.0, out=chord)
+	np.clip(chord, 0.0, 4.0, out=chord)
+	np.sqrt(chord, out=chord)
+
+	# 弦の長さ c → 中心角 2·asin(c/2)
+	np.multiply(chord, 0.5, out=chord)
+	np.arcsin(chord, out=chord)
+	np.multiply(chord, 2 * EARTH_RADIUS_KM, out=chord)
+	return chord
@@ -0,0 +1,423 @@
+"""
+逆ジオコーディング結果のキャッシュモジュール
+SQLite のキー・バリュー表に保存し、プロセス内の LRU を前段に置く
+座標で引く場合はジオハッシュのセルを細かい順にたどり、隣接セル・親セルの結果も再利用する
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from src import geohash
+from src.geo import haversine_km
+from src.logger import get_logger
+
+
+# 行政レベルごとのセルの細かさ（ジオハッシュの文字数、細かい順）
+# street: 約150m, city: 約4.9km, prefecture: 約39km×20km, country: 約156km
+LEVEL_PRECISION = OrderedDict([
+	('street', 7),
+	('city', 5),
+	('prefecture', 4),
+	('country', 3),
+])
+
+# 各レベルの結果に残す項目（粗いセルでは細かい項目を捨てて保存する）
+LEVEL_FIELDS = {
+	'street': None,
+	'city': ('city', 'prefecture', 'country'),
+	'prefecture': ('prefecture', 'country'),
+	'country': ('country',),
+}
+
+
+# 終了時に未書き込みの結果を書き込むため、開いているキャッシュを弱参照で保持
+_open_caches: "weakref.WeakSet[GeocodeCache]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_caches():
+	for cache in list(_open_caches):
+		try:
+			cache.close()
+		except Exception:
+			pass
+
+
+class GeocodeCache:
+	"""
+	逆ジオコーディング結果のキャッシュ（辞書と同じように使える）
+
+	起動時に全件を読み込まず、参照のたびに主キーで SQLite を引く。
+	書き込みはまとめて行い（batch_size 件ごと、または flush() 時）、
+	1件ごとにファイル全体を書き直すことはない。
+	"""
+
+	DEFAULT_LRU_SIZE = 4096
+	DEFAULT_BATCH_SIZE = 50
+
+	def __init__(
+		self,
+		db_path: str = "data/geocoding_cache.db",
+		lru_size: int = DEFAULT_LRU_SIZE,
+		batch_size: int = DEFAULT_BATCH_SIZE,
+		legacy_json: Optional[str] = "data/geocoding_cache.json"
+	):
+		"""
+		キャッシュを初期化
+
+		Args:
+			db_path: SQLite ファイルのパス（プロジェクトルートからの相対パス）
+			lru_size: メモリ上に保持する件数（0 で無効）
+			batch_size: まとめて書き込む件数
+			legacy_json: 旧形式の JSON キャッシュ（存在すれば初回に取り込む）
+		"""
+		self.db_path = self._resolve(db_path)
+		self.lru_size = lru_size
+		self.batch_size = max(1, batch_size)
+		self.logger = get_logger()
+
+		self._lru: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+		self._pending: Dict[str, Dict[str, Any]] = {}
+		self._lock = threading.RLock()
+
+		self.db_path.parent.mkdir(parents=True, exist_ok=True)
+		# Streamlit の再実行は別スレッドになるため、ロックで保護して接続を共有する
+		self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute("PRAGMA synchronous=NORMAL")
+		self.conn.execute("""
+			CREATE TABLE IF NOT EXISTS geocode_cache (
+				key TEXT PRIMARY KEY,
+				value TEXT NOT NULL
+			) WITHOUT ROWID
+		""")
+		self.conn.commit()
+
+		if legacy_json:
+			self._migrate_json(self._resolve(legacy_json))
+
+		_open_caches.add(self)
+
+	@staticmethod
+	def _resolve(path) -> Path:
+		path = Path(path)
+		if not path.is_absolute():
+			path = Path(__file__).parent.parent / path
+		return path
+
+	def _migrate_json(self, json_path: Path):
+		"""旧形式の JSON キャッシュを取り込み、取り込み済みのファイルは名前を変える"""
+		if not json_path.exists():
+			return
+
+		try:
+			with open(json_path, 'r', encoding='utf-8') as f:
+				entries = json.load(f)
+		except Exception:
+			self.logger.warning(f"旧ジオコーディングキャッシュを読み込めません: {json_path.name}")
+			return
+
+		with self._lock:
+			self.conn.executemany(
+				"INSERT OR IGNORE INTO geocode_cache (key, value) VALUES (?, ?)",
+				(
+					(key, json.dumps(value, ensure_ascii=False))
+					for key, value in entries.items()
+				)
+			)
+			self.conn.commit()
+
+		json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+		self.logger.info(f"ジオコーディングキャッシュを移行: {len(entries)}件 → {self.db_path.name}")
+
+	def _remember(self, key: str, value: Dict[str, Any]):
+		"""LRU に追加（上限を超えたら最も古いものを捨てる）"""
+		if self.lru_size <= 0:
+			return
+		self._lru[key] = value
+		self._lru.move_to_end(key)
+		while len(self._lru) > self.lru_size:
+			self._lru.popitem(last=False)
+
+	def get(self, key: str, default=None) -> Optional[Dict[str, Any]]:
+		"""
+		キャッシュから取得
+
+		Args:
+			key: キャッシュキー
+			default: キャッシュにない場合の値
+
+		Returns:
+			場所情報の辞書
+		"""
+		with self._lock:
+			if key in self._lru:
+				self._lru.move_to_end(key)
+				return self._lru[key]
+			if key in self._pending:
+				return self._pending[key]
+
+			row = self.conn.execute(
+				"SELECT value FROM geocode_cache WHERE key = ?", (key,)
+			).fetchone()
+			if row is None:
+				return default
+
+			value = json.loads(row[0])
+			self._remember(key, value)
+			return value
+
+	def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+		"""
+		複数のキーをまとめて取得（SQLite への問い合わせは 500 件ごとに1回）
+
+		Args:
+			keys: キャッシュキー
+
+		Returns:
+			見つかったキーと場所情報の辞書
+		"""
+		found: Dict[str, Dict[str, Any]] = {}
+		missing = []
+		with self._lock:
+			for key in dict.fromkeys(keys):
+				if key in self._lru:
+					found[key] = self._lru[key]
+				elif key in self._pending:
+					found[key] = self._pending[key]
+				else:
+					missing.append(key)
+
+			for start in range(0, len(missing), 500):
+				chunk = missing[start:start + 500]
+				placeholders = ",".join("?" * len(chunk))
+				rows = self.conn.execute(
+					f"SELECT key, value FROM geocode_cache WHERE key IN ({placeholders})", chunk
+				).fetchall()
+				for key, raw in rows:
+					value = json.loads(raw)
+					self._remember(key, value)
+					found[key] = value
+		return found
+
+	def set(self, key: str, value: Dict[str, Any]):
+		"""
+		キャッシュに保存（batch_size 件たまったらまとめて書き込む）
+
+		Args:
+			key: キャッシュキー
+			value: 場所情報の辞書
+		"""
+		with self._lock:
+			self._pending[key] = value
+			self._remember(key, value)
+			if len(self._pending) >= self.batch_size:
+				self.flush()
+
+	def set_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+		"""複数件を保存してすぐに書き込む"""
+		with self._lock:
+			for key, value in items:
+				self._pending[key] = value
+				self._remember(key, value)
+			self.flush()
+
+	def flush(self):
+		"""未書き込みの結果を1トランザクションで SQLite に書き込む"""
+		with self._lock:
+			if not self._pending:
+				return
+			try:
+				self.conn.executemany(
+					"INSERT OR REPLACE INTO geocode_cache (key, value) VALUES (?, ?)",
+					(
+						(key, json.dumps(value, ensure_ascii=False))
+						for key, value in self._pending.items()
+					)
+				)
+				self.conn.commit()
+				self._pending.clear()
+			except Exception:
+				self.conn.rollback()
+				self.logger.error("ジオコーディングキャッシュ保存エラー")
+				raise
+
+	# ジオハッシュによる空間キャッシュ
+	# 結果は有効な行政レベルのセルと、それより粗いセルに項目を絞って保存する。
+	# 参照時は最も細かいセルから親セルへとたどり、市区町村以上のレベルでは隣接8セルも調べる
+	# （セルの境界をまたいだすぐ隣の地点の市区町村名も再利用できる）。
+	# 隣接セルの結果は境界からセルの半分以内の地点にだけ使い、
+	# 番地レベルでは隣接セルを使わない（150m 先は別の番地・通りのことが多い）
+
+	@staticmethod
+	def _spatial_key(cell: str) -> str:
+		return f"gh:{cell}"
+
+	@staticmethod
+	def _project(result: Dict[str, Any], level: str) -> Dict[str, Any]:
+		"""結果をレベルに応じた項目だけに絞る"""
+		fields = LEVEL_FIELDS[level]
+		if fields is None:
+			return dict(result)
+		projected = {field: result.get(field) or '' for field in fields}
+		name = ", ".join(projected[field] for field in fields if projected[field])
+		projected['display_name'] = name
+		projected['address'] = name
+		projected['level'] = level
+		return projected
+
+	@staticmethod
+	def _distance_to_cell_km(latitude: float, longitude: float, cell: str) -> float:
+		"""地点からセル（の最も近い点）までの距離（経度 ±180° をまたぐ隣接セルにも対応）"""
+		south, west, north, east = geohash.bounds(cell)
+		center = (west + east) / 2
+		# セルの中心に近い側に経度を合わせてから範囲に収める
+		longitude = longitude + 360.0 * round((center - longitude) / 360.0)
+		nearest_lat = min(max(latitude, south), north)
+		nearest_lon = min(max(longitude, west), east)
+		return float(haversine_km(latitude, longitude, nearest_lat, nearest_lon))
+
+	def lookup(self, latitude: float, longitude: float, level: str = 'city') -> Optional[Dict[str, Any]]:
+		"""
+		座標に最も近いセルの結果を取得
+
+		Args:
+			latitude: 緯度
+			longitude: 経度
+			level: 受け付ける最も粗い行政レベル（'city' なら市区町村名を含む結果のみ）
+
+		Returns:
+			場所情報の辞書（見つからない場合は None）
+		"""
+		return self.lookup_many([latitude], [longitude], level=level)[0]
+
+	def lookup_many(self, lats, lons, level: str = 'city') -> list:
+		"""
+		複数の座標をまとめて空間キャッシュから取得
+
+		Args:
+			lats: 緯度配列
+			lons: 経度配列
+			level: 受け付ける最も粗い行政レベル
+
+		Returns:
+			地点ごとの場所情報（見つからない地点は None）
+		"""
+		levels = list(LEVEL_PRECISION)
+		precisions = [LEVEL_PRECISION[name] for name in levels[:levels.index(level) + 1]]
+		lats = np.asarray(lats, dtype=np.float64)
+		lons = np.asarray(lons, dtype=np.float64)
+		cells = geohash.encode_many(lats, lons, precisions[0])
+
+		# 各レベルのセルとその隣接8セル（境界をまたいだすぐ隣の結果も再利用する、番地レベルを除く）
+		street = LEVEL_PRECISION['street']
+		prefixes = dict.fromkeys(cell[:precision] for cell in cells for precision in precisions)
+		around = {
+			prefix: [] if len(prefix) == street else geohash.neighbors(prefix)
+			for prefix in prefixes
+		}
+
+		# すべての候補セルを1回でまとめて引く
+		found = self.get_many(
+			self._spatial_key(candidate)
+			for prefix, cells_around in around.items()
+			for candidate in [prefix] + cells_around
+		)
+
+		results = []
+		for latitude, longitude, cell in zip(lats, lons, cells):
+			result = None
+			for precision in precisions:
+				prefix = cell[:precision]
+				result = found.get(self._spatial_key(prefix))
+				if result is not None:
+					break
+				# 自分のセルになければ、境界からセルの半分以内にある隣接セルのうち中心が最も近いものを使う
+				candidates = [c for c in around[prefix] if self._spatial_key(c) in found]
+				if not candidates:
+					continue
+				south, west, north, east = geohash.bounds(prefix)
+				limit_km = 0.5 * min(
+					haversine_km(south, longitude, north, longitude),
+					haversine_km(latitude, west, latitude, east)
+				)
+				hits = [
+					(haversine_km(latitude, longitude, *geohash.decode(candidate)), candidate)
+					for candidate in candidates
+					if self._distance_to_cell_km(latitude, longitude, candidate) <= limit_km
+				]
+				if hits:
+					result = found[self._spatial_key(min(hits)[1])]
+					break
+			results.append(result)
+		return results
+
+	def store(self, latitude: float, longitude: float, result: Dict[str, Any], level: str = 'street'):
+		"""
+		結果を空間キャッシュに保存
+
+		Args:
+			latitude: 緯度
+			longitude: 経度
+			result: 場所情報の辞書
+			level: 結果が正しい最も細かい行政レベル（その粗いレベルにも項目を絞って保存する）
+		"""
+		cell = geohash.encode(latitude, longitude, LEVEL_PRECISION['street'])
+		levels = list(LEVEL_PRECISION)
+		with self._lock:
+			for name in levels[levels.index(level):]:
+				fields = LEVEL_FIELDS[name]
+				# 市区町村名のない結果を市区町村レベルのセルには保存しない
+				if fields is not None and not result.get(fields[0]):
+					continue
+				key = self._spatial_key(cell[:LEVEL_PRECISION[name]])
+				self.set(key, dict(result) if fields is None else self._project(result, name))
+
+	def close(self):
+		"""未書き込みの結果を書き込んで接続を閉じる"""
+		with self._lock:
+			if self.conn is None:
+				return
+			self.flush()
+			self.conn.close()
+			self.conn = None
+
+	def __del__(self):
+		try:
+			self.close()
+		except Exception:
+			pass
+
+	# 辞書と同じ操作（ReverseGeocoder.cache を使っていた既存コード向け）
+
+	def __contains__(self, key: str) -> bool:
+		return self.get(key) is not None
+
+	def __getitem__(self, key: str) -> Dict[str, Any]:
+		value = self.get(key)
+		if value is None:
+			raise KeyError(key)
+		return value
+
+	def __setitem__(self, key: str, value: Dict[str, Any]):
+		self.set(key, value)
+
+	def __len__(self) -> int:
+		self.flush()
+		with self._lock:
+			return self.conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+
+	def __iter__(self) -> Iterator[str]:
+		self.flush()
+		with self._lock:
+			keys = [row[0] for row in self.conn.execute("SELECT key FROM geocode_cache")]
+		return iter(keys)
+
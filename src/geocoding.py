@@ -3,72 +3,125 @@
 GPS座標から場所名を取得
 """
 
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/geocoding.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import time
 from typing import Optional, Dict
 from pathlib import Path
-import json
+
+from src.geocode_cache import GeocodeCache
 
 
 class ReverseGeocoder:
 	"""逆ジオコーディングクラス"""
 	
-	def __init__(self, user_agent: str = "JourneyMap/1.0", cache_file: Path = None):
+	def __init__(
+		self,
+		user_agent: str = "JourneyMap/1.0",
+		cache_file: Path = None,
+		lru_size: int = GeocodeCache.DEFAULT_LRU_SIZE,
+		domain: str = "nominatim.openstreetmap.org",
+		scheme: str = "https",
+		min_interval: float = 1.0
+	):
 		"""
 		逆ジオコーダーを初期化
 		
 		Args:
 			user_agent: User-Agent文字列
-			cache_file: キャッシュファイルのパス
+			cache_file: キャッシュファイル（SQLite）のパス。
+				旧形式の .json を指定した場合は同名の .db に移行する
+			lru_size: メモリ上に保持するキャッシュ件数
+			domain: Nominatim のホスト（自前のサーバやテスト用スタブを使う場合に変更）
+			scheme: 'https' または 'http'
+			min_interval: APIリクエストの最小間隔（秒、公開サーバの利用規約は1秒）
 		"""
-		self.geocoder = Nominatim(user_agent=user_agent)
+		self.geocoder = Nominatim(user_agent=user_agent, domain=domain, scheme=scheme)
+		self.min_interval = min_interval
+		self._last_request = 0.0
 		
 		# キャッシュファイル
 		if cache_file is None:
-			cache_file = Path("data/geocoding_cache.json")
+			cache_file = Path("data/geocoding_cache.db")
+		cache_file = Path(cache_file)
 		
-		self.cache_file = cache_file
-		self.cache = self._load_cache()
+		self.cache_file = cache_file.with_suffix('.db')
+		self.cache = GeocodeCache(
+			db_path=self.cache_file,
+			lru_size=lru_size,
+			legacy_json=cache_file.with_suffix('.json')
+		)
 	
-	def _load_cache(self) -> Dict[str, Dict[str, str]]:
-		"""キャッシュを読み込み"""
-		if self.cache_file.exists():
-			try:
-				with open(self.cache_file, 'r', encoding='utf-8') as f:
-					return json.load(f)
-			except Exception:
-				return {}
-		return {}
-	
-	def _save_cache(self):
-		"""キャッシュを保存"""
-		try:
-			self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-			with open(self.cache_file, 'w', encoding='utf-8') as f:
-				json.dump(self.cache, f, ensure_ascii=False, indent=2)
-		except Exception as e:
-			print(f"キャッシュ保存エラー: {e}")
+	def flush_cache(self):
+		"""未書き込みのキャッシュを保存"""
+		self.cache.flush()
 	
 	def _make_cache_key(self, latitude: float, longitude: float) -> str:
 		"""キャッシュキーを生成（小数点2桁で丸める）"""
 		return f"{latitude:.2f},{longitude:.2f}"
 	
+	@staticmethod
+	def _result_level(address: Dict[str, str]) -> str:
+		"""Nominatim の住所要素から、結果が正しい最も細かい行政レベルを判定"""
+		if any(address.get(key) for key in ('road', 'house_number', 'neighbourhood', 'quarter', 'suburb')):
+			return 'street'
+		if any(address.get(key) for key in ('city', 'town', 'village')):
+			return 'city'
+		if address.get('state') or address.get('province'):
+			return 'prefecture'
+		return 'country'
+	
+	def lookup_cache(
+		self,
+		latitude: float,
+		longitude: float,
+		level: str = 'city'
+	) -> Optional[Dict[str, str]]:
+		"""
+		キャッシュだけを参照（API は呼ばない）
+		
+		ジオハッシュのセルを細かい順にたどり、見つからなければ旧形式のキー（小数点2桁）を参照する。
+		
+		Args:
+			latitude: 緯度
+			longitude: 経度
+			level: 受け付ける最も粗い行政レベル
+			
+		Returns:
+			場所情報の辞書（キャッシュにない場合はNone）
+		"""
+		cached = self.cache.lookup(latitude, longitude, level=level)
+		if cached is None:
+			cached = self.cache.get(self._make_cache_key(latitude, longitude))
+		return cached
+	
 	def reverse_geocode(
 		self,
 		latitude: float,
 		longitude: float,
 		language: str = 'ja',
-		timeout: int = 5
+		timeout: int = 5,
+		level: str = 'city'
 	) -> Optional[Dict[str, str]]:
 		"""
 		GPS座標から場所名を取得
 		
+		近くの地点の結果がキャッシュにあれば、level で指定した行政レベルまでは再利用する
+		（その場合 display_name・address はそのレベルの名前になる）。
+		
 		Args:
 			latitude: 緯度
 			longitude: 経度
 			language: 言語（'ja', 'en'など）
 			timeout: タイムアウト（秒）
+			level: 再利用を許す最も粗い行政レベル（'street', 'city', 'prefecture', 'country'）
 			
 		Returns:
 			場所情報の辞書（取得失敗時はNone）
@@ -80,38 +133,19 @@ class ReverseGeocoder:
 			}
 		"""
 		# キャッシュを確認
-		cache_key = self._make_cache_key(latitude, longitude)
-		if cache_key in self.cache:
-			return self.cache[cache_key]
+		cached = self.lookup_cache(latitude, longitude, level=level)
+		if cached is not None:
+			return cached
 		
 		# APIリクエスト
 		try:
-			# API制限を守るため、1秒待機
-			time.sleep(1)
+			# API制限を守るため、前回のリクエストから min_interval 秒あける
+			wait = self._last_request + self.min_interval - time.monotonic()
+			if wait > 0:
+				time.sleep(wait)
+			self._last_request = time.monotonic()
 			
-			location = self.geocoder.reverse(
-                f"{latitude}, {longitude}",
-                language=language,
-                timeout=timeout
-            )
-			
-			if location:
-				address = location.raw.get('address', {})
-				
-				result = {
-					'display_name': location.address,
-					'city': address.get('city') or address.get('town') or address.get('village') or '',
-					'country': address.get('country', ''),
-					'address': location.address
-				}
-				
-				# キャッシュに保存
-				self.cache[cache_key] = result
-				self._save_cache()
-				
-				return result
-			
-			return None
+			return self.fetch(latitude, longitude, language=language, timeout=timeout)
 			
 		except GeocoderTimedOut:
 			print(f"タイムアウト: ({latitude}, {longitude})")
@@ -123,6 +157,46 @@ class ReverseGeocoder:
 			print(f"逆ジオコーディングエラー: {e}")
 			return None
 	
+	def fetch(
+		self,
+		latitude: float,
+		longitude: float,
+		language: str = 'ja',
+		timeout: int = 5
+	) -> Optional[Dict[str, str]]:
+		"""
+		Nominatim に1回問い合わせて結果をキャッシュに保存
+		
+		キャッシュの確認・待機・例外処理は行わない（呼び出し側で制御する）。
+		
+		Raises:
+			GeocoderTimedOut: タイムアウト
+			GeocoderServiceError: サービスエラー（レート制限・一時的な障害を含む）
+		"""
+		location = self.geocoder.reverse(
+			f"{latitude}, {longitude}",
+			language=language,
+			timeout=timeout
+		)
+		
+		if not location:
+			return None
+		
+		address = location.raw.get('address', {})
+		
+		result = {
+			'display_name': location.address,
+			'city': address.get('city') or address.get('town') or address.get('village') or '',
+			'prefecture': address.get('state') or address.get('province') or '',
+			'country': address.get('country', ''),
+			'address': location.address
+		}
+		
+		# 結果が正しい行政レベルのセルに保存（まとめて書き込まれる）
+		self.cache.store(latitude, longitude, result, level=self._result_level(address))
+		
+		return result
+	
 	def batch_reverse_geocode(
 		self,
 		coordinates: list,
@@ -143,19 +217,30 @@ class ReverseGeocoder:
 		results = {}
 		request_count = 0
 		
-		for lat, lon in coordinates:
-			# API制限チェック
-			if request_count >= max_requests:
-				print(f"APIリクエスト制限に到達（{max_requests}件）")
-				break
-			
+		# キャッシュ済みの座標はまとめて引く
+		cached = self.cache.lookup_many(
+			[lat for lat, _ in coordinates],
+			[lon for _, lon in coordinates]
+		) if coordinates else []
+		
+		for index, ((lat, lon), hit) in enumerate(zip(coordinates, cached)):
 			cache_key = self._make_cache_key(lat, lon)
 			
 			# キャッシュにある場合はスキップ
-			if cache_key in self.cache:
-				results[cache_key] = self.cache[cache_key]
+			if hit is None:
+				# 同じバッチ内で先に取得した近くの地点の結果も使う
+				hit = self.lookup_cache(lat, lon)
+			if hit is not None:
+				results[cache_key] = hit
 				continue
 			
+			# API制限チェック
+			if request_count >= max_requests:
+				remaining = len(coordinates) - index
+				print(f"APIリクエスト制限に到達（{max_requests}件）: 未処理 {remaining} 件")
+				print("   すべて処理するには geocoding_worker.AsyncGeocodingWorker を使用してください")
+				break
+			
 			# 逆ジオコーディング実行
 			location_info = self.reverse_geocode(lat, lon, language=language)
 			
@@ -164,6 +249,7 @@ class ReverseGeocoder:
 			
 			request_count += 1
 		
+		self.cache.flush()
 		return results
 
 
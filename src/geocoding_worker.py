@@ -0,0 +1,520 @@
+"""
+非同期逆ジオコーディングワーカー
+トークンバケットでリクエスト間隔を守りながら、未解決の地点を並行して問い合わせる。
+作業キューは SQLite に保存するため、途中で止めても次回は残りから再開できる。
+
+実行方法:
+	python src/geocoding_worker.py --stub            # ローカルのスタブサーバで動作確認
+	python src/geocoding_worker.py --domain nominatim.example.com
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/geocoding_worker.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from geopy.exc import GeocoderRateLimited, GeocoderServiceError, GeocoderTimedOut
+
+from src import geohash
+from src.logger import get_logger
+
+
+class TokenBucket:
+	"""
+	トークンバケット方式のレート制限（asyncio 用）
+
+	rate 件/秒でトークンが補充され、最大 capacity 件まで連続して取得できる。
+	"""
+
+	def __init__(self, rate: float = 1.0, capacity: int = 1):
+		"""
+		Args:
+			rate: 1秒あたりのリクエスト数
+			capacity: 連続して送れる最大数（バースト）
+		"""
+		self.rate = rate
+		self.capacity = capacity
+		self._tokens = float(capacity)
+		self._updated = time.monotonic()
+		self._paused_until = 0.0
+		self._lock: Optional[asyncio.Lock] = None
+
+	def pause(self, seconds: float):
+		"""サーバから待機を指示された場合（429 Retry-After など）、補充を止める"""
+		self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+		self._tokens = 0.0
+
+	async def acquire(self):
+		"""トークンを1つ取得（なければ補充されるまで待つ）"""
+		if self._lock is None:
+			self._lock = asyncio.Lock()
+
+		async with self._lock:
+			while True:
+				now = time.monotonic()
+				if now < self._paused_until:
+					await asyncio.sleep(self._paused_until - now)
+					self._updated = time.monotonic()
+					continue
+
+				self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+				self._updated = now
+				if self._tokens >= 1.0:
+					self._tokens -= 1.0
+					return
+				await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class GeocodeQueue:
+	"""
+	逆ジオコーディングの作業キュー（SQLite）
+
+	地点はジオハッシュのセル単位で登録し、状態（pending / done / failed）と
+	試行回数・結果を保存する。
+	"""
+
+	def __init__(self, db_path: str = "data/geocoding_queue.db"):
+		"""
+		Args:
+			db_path: SQLite ファイルのパス（プロジェクトルートからの相対パス）
+		"""
+		path = Path(db_path)
+		if not path.is_absolute():
+			path = _project_root / path
+		path.parent.mkdir(parents=True, exist_ok=True)
+		self.db_path = path
+		self.logger = get_logger()
+		self._lock = threading.Lock()
+
+		self.conn = sqlite3.connect(str(path), check_same_thread=False)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute("""
+			CREATE TABLE IF NOT EXISTS geocode_jobs (
+				cell TEXT PRIMARY KEY,
+				latitude REAL NOT NULL,
+				longitude REAL NOT NULL,
+				status TEXT NOT NULL DEFAULT 'pending',
+				attempts INTEGER NOT NULL DEFAULT 0,
+				result TEXT,
+				error TEXT,
+				updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+			)
+		""")
+		self.conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_jobs_status ON geocode_jobs(status)")
+		self.conn.commit()
+
+	def enqueue_many(self, jobs: Iterable[Tuple[str, float, float]]):
+		"""
+		地点を登録（登録済みのセルはそのまま、失敗済みのセルは再試行の対象に戻す）
+
+		Args:
+			jobs: (セル, 緯度, 経度) のリスト
+		"""
+		with self._lock:
+			self.conn.executemany("""
+				INSERT INTO geocode_jobs (cell, latitude, longitude)
+				VALUES (?, ?, ?)
+				ON CONFLICT(cell) DO UPDATE SET status = 'pending', attempts = 0, error = NULL
+				WHERE geocode_jobs.status = 'failed'
+			""", jobs)
+			self.conn.commit()
+
+	def pending(self, cells: Optional[Iterable[str]] = None) -> List[Tuple[str, float, float, int]]:
+		"""
+		未解決の地点 [(セル, 緯度, 経度, 試行回数), ...]
+
+		Args:
+			cells: 対象のセル（省略時はキュー全体）
+		"""
+		with self._lock:
+			if cells is None:
+				return self.conn.execute("""
+					SELECT cell, latitude, longitude, attempts
+					FROM geocode_jobs
+					WHERE status = 'pending'
+					ORDER BY rowid
+				""").fetchall()
+
+			cells = list(dict.fromkeys(cells))
+			rows = []
+			for start in range(0, len(cells), 500):
+				chunk = cells[start:start + 500]
+				rows.extend(self.conn.execute(f"""
+					SELECT rowid, cell, latitude, longitude, attempts
+					FROM geocode_jobs
+					WHERE status = 'pending' AND cell IN ({",".join("?" * len(chunk))})
+				""", chunk).fetchall())
+			return [row[1:] for row in sorted(rows)]
+
+	def complete_many(self, results: Iterable[Tuple[str, Optional[Dict[str, Any]]]]):
+		"""解決した地点を保存（結果なし = 該当する地名がない場合は None）"""
+		with self._lock:
+			self.conn.executemany("""
+				UPDATE geocode_jobs
+				SET status = 'done', result = ?, error = NULL, updated_at = CURRENT_TIMESTAMP
+				WHERE cell = ?
+			""", [
+				(json.dumps(result, ensure_ascii=False) if result is not None else None, cell)
+				for cell, result in results
+			])
+			self.conn.commit()
+
+	def record_failure(self, cell: str, attempts: int, error: str, final: bool):
+		"""失敗を記録（final=True なら再試行しない）"""
+		with self._lock:
+			self.conn.execute("""
+				UPDATE geocode_jobs
+				SET status = ?, attempts = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+				WHERE cell = ?
+			""", ('failed' if final else 'pending', attempts, error, cell))
+			self.conn.commit()
+
+	def results(self, cells: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+		"""解決済みのセルの結果（未解決・失敗のセルは含まない）"""
+		cells = list(dict.fromkeys(cells))
+		found: Dict[str, Optional[Dict[str, Any]]] = {}
+		with self._lock:
+			for start in range(0, len(cells), 500):
+				chunk = cells[start:start + 500]
+				rows = self.conn.execute(f"""
+					SELECT cell, result FROM geocode_jobs
+					WHERE status = 'done' AND cell IN ({",".join("?" * len(chunk))})
+				""", chunk).fetchall()
+				for cell, raw in rows:
+					found[cell] = json.loads(raw) if raw else None
+		return found
+
+	def counts(self) -> Dict[str, int]:
+		"""状態ごとの件数"""
+		with self._lock:
+			rows = self.conn.execute("SELECT status, COUNT(*) FROM geocode_jobs GROUP BY status").fetchall()
+		return dict(rows)
+
+	def close(self):
+		with self._lock:
+			if self.conn is not None:
+				self.conn.close()
+				self.conn = None
+
+
+class AsyncGeocodingWorker:
+	"""
+	非同期逆ジオコーディングワーカー
+
+	キャッシュで解決できる地点は待たずに処理し、APIへの問い合わせだけを
+	トークンバケットで制限する。タイムアウト・サービスエラーは指数バックオフで再試行する。
+	reverse_geocode_many を持つため、Database.update_location_names にそのまま渡せる。
+	"""
+
+	def __init__(
+		self,
+		geocoder=None,
+		queue: GeocodeQueue = None,
+		rate: float = 1.0,
+		burst: int = 1,
+		concurrency: int = 2,
+		max_retries: int = 5,
+		base_delay: float = 1.0,
+		max_delay: float = 60.0,
+		language: str = 'ja',
+		timeout: int = 5,
+		cell_precision: int = 7
+	):
+		"""
+		ワーカーを初期化
+
+		Args:
+			geocoder: ReverseGeocoder インスタンス（省略時は既定の設定で作成）
+			queue: 作業キュー（省略時は data/geocoding_queue.db）
+			rate: 1秒あたりの最大リクエスト数
+			burst: 連続して送れる最大リクエスト数
+			concurrency: 同時に待ち合わせるリクエスト数（応答待ちの間に次を送る）
+			max_retries: 1地点あたりの最大再試行回数
+			base_delay: 再試行の初回待機時間（秒、試行ごとに2倍）
+			max_delay: 再試行の最大待機時間（秒）
+			language: 結果の言語
+			timeout: 1リクエストのタイムアウト（秒）
+			cell_precision: 同じ地点とみなすセルの細かさ（ジオハッシュの文字数）
+		"""
+		if geocoder is None:
+			from src.geocoding import ReverseGeocoder
+			geocoder = ReverseGeocoder()
+
+		self.geocoder = geocoder
+		self.queue = queue or GeocodeQueue()
+		self.rate = rate
+		self.burst = burst
+		self.concurrency = max(1, concurrency)
+		self.max_retries = max_retries
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+		self.language = language
+		self.timeout = timeout
+		self.cell_precision = cell_precision
+		self.logger = get_logger()
+
+	def enqueue(self, lats, lons) -> List[str]:
+		"""
+		地点を作業キューに登録
+
+		Returns:
+			地点ごとのセル
+		"""
+		cells = geohash.encode_many(lats, lons, self.cell_precision)
+		self.queue.enqueue_many(
+			(cell, float(lat), float(lon)) for cell, lat, lon in zip(cells, lats, lons)
+		)
+		return cells
+
+	def _backoff(self, attempts: int) -> float:
+		"""指数バックオフの待機時間（同時に再試行が集中しないよう揺らぎを入れる）"""
+		delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+		return delay * random.uniform(0.5, 1.0)
+
+	async def run(
+		self,
+		progress_callback: Callable[[int, int], None] = None,
+		cells: Optional[Iterable[str]] = None,
+		language: Optional[str] = None
+	) -> Dict[str, int]:
+		"""
+		作業キューの未解決の地点を処理
+
+		Args:
+			progress_callback: 進捗通知 callback(処理済み件数, 全件数)
+			cells: 処理するセル（省略時はキューに残っている地点をすべて処理）
+			language: 結果の言語（省略時はワーカーの設定）
+
+		Returns:
+			{'done': 解決数, 'failed': 失敗数, 'cached': キャッシュで解決した数, 'requests': APIリクエスト数}
+		"""
+		language = language or self.language
+		jobs = self.queue.pending(cells)
+		stats = {'done': 0, 'failed': 0, 'cached': 0, 'requests': 0}
+		if not jobs:
+			return stats
+
+		total = len(jobs)
+		processed = 0
+
+		def advance():
+			nonlocal processed
+			processed += 1
+			if progress_callback is not None:
+				progress_callback(processed, total)
+
+		# キャッシュで解決できる地点はまとめて処理（待機なし）
+		remaining = []
+		hits = []
+		for job in jobs:
+			cached = self.geocoder.lookup_cache(job[1], job[2])
+			if cached is not None:
+				hits.append((job[0], cached))
+			else:
+				remaining.append(job)
+		if hits:
+			self.queue.complete_many(hits)
+			stats['cached'] += len(hits)
+			stats['done'] += len(hits)
+			processed += len(hits)
+			if progress_callback is not None:
+				progress_callback(processed, total)
+
+		bucket = TokenBucket(self.rate, self.burst)
+		work: "asyncio.Queue[Tuple[str, float, float, int]]" = asyncio.Queue()
+		for job in remaining:
+			work.put_nowait(job)
+
+		async def consume():
+			while True:
+				try:
+					cell, lat, lon, attempts = work.get_nowait()
+				except asyncio.QueueEmpty:
+					return
+				await self._process(cell, lat, lon, attempts, bucket, stats, language)
+				advance()
+
+		await asyncio.gather(*(consume() for _ in range(self.concurrency)))
+		self.geocoder.flush_cache()
+
+		self.logger.info(
+			f"非同期逆ジオコーディング完了: 解決{stats['done']}件（キャッシュ{stats['cached']}件）, "
+			f"失敗{stats['failed']}件, リクエスト{stats['requests']}回"
+		)
+		return stats
+
+	async def _process(
+		self,
+		cell: str,
+		lat: float,
+		lon: float,
+		attempts: int,
+		bucket: TokenBucket,
+		stats: Dict[str, int],
+		language: str
+	):
+		"""1地点を解決（成功するか再試行回数を使い切るまで）"""
+		while True:
+			# 同じ実行の中で近くの地点が先に解決されていればそれを使う
+			cached = self.geocoder.lookup_cache(lat, lon)
+			if cached is not None:
+				self.queue.complete_many([(cell, cached)])
+				stats['cached'] += 1
+				stats['done'] += 1
+				return
+
+			await bucket.acquire()
+			stats['requests'] += 1
+			try:
+				result = await asyncio.to_thread(
+					self.geocoder.fetch, lat, lon, language=language, timeout=self.timeout
+				)
+			except (GeocoderTimedOut, GeocoderServiceError) as e:
+				attempts += 1
+				final = attempts > self.max_retries
+				self.queue.record_failure(cell, attempts, f"{type(e).__name__}: {e}", final)
+				if final:
+					self.logger.warning(f"逆ジオコーディング失敗（再試行上限）: ({lat}, {lon}) {e}")
+					stats['failed'] += 1
+					return
+
+				delay = self._backoff(attempts)
+				if isinstance(e, GeocoderRateLimited) and e.retry_after:
+					delay = max(delay, float(e.retry_after))
+					bucket.pause(float(e.retry_after))
+				self.logger.debug(f"逆ジオコーディング再試行 {attempts}/{self.max_retries}: {delay:.1f}秒後")
+				await asyncio.sleep(delay)
+				continue
+			except Exception as e:
+				# 再試行しても解決しない種類のエラー
+				self.queue.record_failure(cell, attempts + 1, f"{type(e).__name__}: {e}", True)
+				self.logger.error(f"逆ジオコーディングエラー: ({lat}, {lon})")
+				stats['failed'] += 1
+				return
+
+			self.queue.complete_many([(cell, result)])
+			stats['done'] += 1
+			return
+
+	def run_sync(
+		self,
+		progress_callback: Callable[[int, int], None] = None,
+		cells: Optional[Iterable[str]] = None,
+		language: Optional[str] = None
+	) -> Dict[str, int]:
+		"""
+		run() を同期的に実行（Streamlit・スクリプトから呼ぶ場合）
+
+		イベントループの中から呼ばれた場合は、別スレッドの新しいイベントループで実行する。
+		"""
+		def execute():
+			return asyncio.run(self.run(progress_callback, cells=cells, language=language))
+
+		try:
+			asyncio.get_running_loop()
+		except RuntimeError:
+			return execute()
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			return executor.submit(execute).result()
+
+	def drain(self, progress_callback: Callable[[int, int], None] = None) -> Dict[str, int]:
+		"""作業キューに残っている地点（前回中断したものを含む）をすべて処理"""
+		return self.run_sync(progress_callback)
+
+	def reverse_geocode_many(self, lats, lons, language: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+		"""
+		複数の座標をまとめて逆ジオコーディング（キューに登録して処理）
+
+		処理するのは今回登録した地点だけ。前回中断した地点は drain() で処理する。
+
+		Args:
+			lats: 緯度配列
+			lons: 経度配列
+			language: 結果の言語（省略時はワーカーの設定）
+
+		Returns:
+			地点ごとの場所情報（該当なし・失敗は None）
+		"""
+		if len(lats) == 0:
+			return []
+		cells = self.enqueue(lats, lons)
+		self.run_sync(cells=cells, language=language)
+		results = self.queue.results(cells)
+		return [results.get(cell) for cell in cells]
+
+	def reverse_geocode(
+		self,
+		latitude: float,
+		longitude: float,
+		language: Optional[str] = None,
+		**kwargs
+	) -> Optional[Dict[str, Any]]:
+		"""1地点を逆ジオコーディング（ReverseGeocoder と同じ呼び出し方）"""
+		return self.reverse_geocode_many([latitude], [longitude], language=language)[0]
+
+	def flush_cache(self):
+		"""未書き込みのキャッシュを保存"""
+		self.geocoder.flush_cache()
+
+
+def main():
+	"""データベースの場所名のない写真を非同期ワーカーで逆ジオコーディング"""
+	import argparse
+
+	from src.database import Database
+	from src.geocoding import ReverseGeocoder
+
+	parser = argparse.ArgumentParser(description="非同期逆ジオコーディング")
+	parser.add_argument("--domain", default="nominatim.openstreetmap.org")
+	parser.add_argument("--scheme", default="https")
+	parser.add_argument("--rate", type=float, default=1.0, help="1秒あたりの最大リクエスト数")
+	parser.add_argument("--concurrency", type=int, default=2)
+	parser.add_argument("--stub", action="store_true", help="ローカルの Nominatim スタブに接続")
+	args = parser.parse_args()
+
+	stub = None
+	domain, scheme = args.domain, args.scheme
+	if args.stub:
+		from src.stub_servers import StubNominatimServer
+		stub = StubNominatimServer(fail_every=4)
+		domain, scheme = stub.start(), "http"
+		print(f"🧪 Nominatim スタブ: http://{domain}")
+
+	geocoder = ReverseGeocoder(domain=domain, scheme=scheme)
+	worker = AsyncGeocodingWorker(geocoder, rate=args.rate, concurrency=args.concurrency, base_delay=0.2)
+
+	def report(done, total):
+		print(f"\r🌍 {done}/{total}", end="", flush=True)
+
+	try:
+		# 前回中断した地点を先に処理
+		resumed = worker.drain(progress_callback=report)
+		if resumed['done'] or resumed['failed']:
+			print(f"\n↩️ 前回の残り: 解決 {resumed['done']} 件, 失敗 {resumed['failed']} 件")
+
+		db = Database()
+		updated = db.update_location_names(
+			worker,
+			progress_callback=lambda done, total, count: report(done, total)
+		)
+		print(f"\n✅ {updated} 件の場所名を更新しました")
+		print(f"   作業キュー: {worker.queue.counts()}")
+	finally:
+		if stub is not None:
+			stub.stop()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,182 @@
+"""
+ジオハッシュモジュール
+緯度経度を階層的なセル文字列に変換する（前方一致で親セルになる）
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: value for value, char in enumerate(_BASE32)}
+
+# 5ビット × 12文字 = 60ビットまで（int64 に収まる範囲）
+MAX_PRECISION = 12
+
+
+def _bit_counts(precision: int):
+	"""
+	経度・緯度に割り当てるビット数（経度から交互に割り当てる）
+
+	Raises:
+		ValueError: precision が 1〜MAX_PRECISION の範囲外の場合
+	"""
+	if not 1 <= precision <= MAX_PRECISION:
+		raise ValueError(f"ジオハッシュの文字数は 1〜{MAX_PRECISION} で指定してください: {precision}")
+	total = 5 * precision
+	return (total + 1) // 2, total // 2
+
+
+def encode(latitude: float, longitude: float, precision: int = 7) -> str:
+	"""
+	緯度経度をジオハッシュに変換
+
+	Args:
+		latitude: 緯度
+		longitude: 経度
+		precision: 文字数（5: 約4.9km, 7: 約150m 四方）
+
+	Returns:
+		ジオハッシュ文字列
+	"""
+	return encode_many(np.array([latitude]), np.array([longitude]), precision)[0]
+
+
+def encode_many(lats: np.ndarray, lons: np.ndarray, precision: int = 7) -> List[str]:
+	"""
+	複数の地点をまとめてジオハッシュに変換（NumPy によるベクトル化処理）
+
+	Args:
+		lats: 緯度配列
+		lons: 経度配列
+		precision: 文字数（1〜MAX_PRECISION）
+
+	Returns:
+		ジオハッシュ文字列のリスト
+
+	Raises:
+		ValueError: precision が範囲外の場合
+	"""
+	lon_bits, lat_bits = _bit_counts(precision)
+	lats = np.asarray(lats, dtype=np.float64)
+	lons = np.asarray(lons, dtype=np.float64)
+
+	# 範囲を 2^bits 個に等分したときの番号（上端は最後のセルに含める）
+	lat_q = np.clip(((lats + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+	lon_q = np.clip(((lons + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+	return _interleave(lon_q, lat_q, precision)
+
+
+def _interleave(lon_q: np.ndarray, lat_q: np.ndarray, precision: int) -> List[str]:
+	"""経度・緯度のセル番号からジオハッシュ文字列を作る"""
+	lon_bits, lat_bits = _bit_counts(precision)
+
+	# 経度・緯度のビットを上位から交互に並べる
+	code = np.zeros(len(lon_q), dtype=np.int64)
+	lon_pos, lat_pos = lon_bits, lat_bits
+	for bit in range(5 * precision):
+		if bit % 2 == 0:
+			lon_pos -= 1
+			code = (code << 1) | ((lon_q >> lon_pos) & 1)
+		else:
+			lat_pos -= 1
+			code = (code << 1) | ((lat_q >> lat_pos) & 1)
+
+	# 5ビットごとに Base32 の文字へ
+	chars = np.empty((len(lon_q), precision), dtype='<U1')
+	alphabet = np.array(list(_BASE32))
+	for i in range(precision):
+		shift = 5 * (precision - 1 - i)
+		chars[:, i] = alphabet[(code >> shift) & 31]
+	return ["".join(row) for row in chars]
+
+
+def ancestors(geohash: str, min_precision: int = 1) -> List[str]:
+	"""
+	セル自身と親セルのリスト（細かい順）
+
+	Args:
+		geohash: ジオハッシュ文字列
+		min_precision: 最も粗い親セルの文字数
+
+	Returns:
+		[geohash, geohash[:-1], ..., geohash[:min_precision]]
+	"""
+	return [geohash[:length] for length in range(len(geohash), min_precision - 1, -1)]
+
+
+def _cell_numbers(geohash: str) -> Tuple[int, int]:
+	"""ジオハッシュ → (経度のセル番号, 緯度のセル番号)"""
+	_bit_counts(len(geohash))
+	lon_q = lat_q = 0
+	bit = 0
+	for char in geohash:
+		value = _DECODE[char]
+		for shift in range(4, -1, -1):
+			if bit % 2 == 0:
+				lon_q = (lon_q << 1) | ((value >> shift) & 1)
+			else:
+				lat_q = (lat_q << 1) | ((value >> shift) & 1)
+			bit += 1
+	return lon_q, lat_q
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+	"""
+	ジオハッシュのセルの中心座標
+
+	Returns:
+		(緯度, 経度)
+	"""
+	lon_bits, lat_bits = _bit_counts(len(geohash))
+	lon_q, lat_q = _cell_numbers(geohash)
+	latitude = (lat_q + 0.5) / (1 << lat_bits) * 180.0 - 90.0
+	longitude = (lon_q + 0.5) / (1 << lon_bits) * 360.0 - 180.0
+	return latitude, longitude
+
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+	"""
+	ジオハッシュのセルの範囲
+
+	Returns:
+		(南端の緯度, 西端の経度, 北端の緯度, 東端の経度)
+	"""
+	lon_bits, lat_bits = _bit_counts(len(geohash))
+	lon_q, lat_q = _cell_numbers(geohash)
+	lat_step = 180.0 / (1 << lat_bits)
+	lon_step = 360.0 / (1 << lon_bits)
+	south = lat_q * lat_step - 90.0
+	west = lon_q * lon_step - 180.0
+	return south, west, south + lat_step, west + lon_step
+
+
+def neighbors(geohash: str) -> List[str]:
+	"""
+	同じ文字数で隣接する8セル（経度 ±180° をまたぐ場合は反対側、極を越えるセルは含めない）
+
+	前方一致だけでは、近くの地点でもセルの境界をまたぐと共通の親セルが粗くなる。
+	隣接セルも調べることで境界付近の地点を拾う。
+
+	Args:
+		geohash: ジオハッシュ文字列
+
+	Returns:
+		隣接セルのジオハッシュ文字列のリスト
+	"""
+	precision = len(geohash)
+	lon_bits, lat_bits = _bit_counts(precision)
+	lon_q, lat_q = _cell_numbers(geohash)
+
+	lon_cells, lat_cells = [], []
+	for d_lat in (-1, 0, 1):
+		for d_lon in (-1, 0, 1):
+			lat_n = lat_q + d_lat
+			if (d_lat == 0 and d_lon == 0) or not 0 <= lat_n < (1 << lat_bits):
+				continue
+			lon_cells.append((lon_q + d_lon) % (1 << lon_bits))
+			lat_cells.append(lat_n)
+	return list(dict.fromkeys(
+		_interleave(np.array(lon_cells, dtype=np.int64), np.array(lat_cells, dtype=np.int64), precision)
+	))
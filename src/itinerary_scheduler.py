@@ -0,0 +1,335 @@
+"""
+旅程スケジューラーモジュール
+滞在時間・営業時間・1日の活動時間を考慮して、日ごとの訪問順と時刻を決める
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/itinerary_scheduler.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.logger import get_logger
+from src.route_optimizer import RouteOptimizer
+
+
+def parse_hhmm(value) -> Optional[int]:
+	"""'HH:MM' 形式の時刻を0時からの分に変換（None はそのまま）"""
+	if value is None or value == '':
+		return None
+	if isinstance(value, (int, float)):
+		return int(value)
+	hours, minutes = str(value).split(':')[:2]
+	return int(hours) * 60 + int(minutes)
+
+
+def format_hhmm(minutes: float) -> str:
+	"""0時からの分を 'HH:MM' 形式に変換"""
+	minutes = int(round(minutes))
+	return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class ItineraryScheduler:
+	"""時間枠付きの挿入法による旅程スケジューラー"""
+
+	def __init__(
+		self,
+		optimizer: RouteOptimizer = None,
+		speed_kmh: float = 40.0,
+		day_start: str = "09:00",
+		day_end: str = "18:00",
+		default_dwell_minutes: int = 60
+	):
+		"""
+		スケジューラーを初期化
+
+		Args:
+			optimizer: 距離行列の構築に使う RouteOptimizer（省略時は新規作成）
+			speed_kmh: 平均移動速度（km/h）
+			day_start: 1日の行動開始時刻（'HH:MM'）
+			day_end: 1日の行動終了時刻（'HH:MM'）
+			default_dwell_minutes: 滞在時間の指定がない地点の滞在時間（分）
+		"""
+		self.optimizer = optimizer or RouteOptimizer()
+		self.speed_kmh = speed_kmh
+		self.day_start = parse_hhmm(day_start)
+		self.day_end = parse_hhmm(day_end)
+		self.default_dwell_minutes = default_dwell_minutes
+		self.logger = get_logger()
+
+	def _travel_minutes(self, locations: List[Dict[str, Any]]) -> np.ndarray:
+		"""地点間の移動時間行列（分）"""
+		backend = self.optimizer.distance_backend
+		if backend is not None and hasattr(backend, 'travel_time_matrix'):
+			# 道路ネットワークがあれば道路種別ごとの速度による移動時間を使う
+			return np.asarray(backend.travel_time_matrix(
+				[location['latitude'] for location in locations],
+				[location['longitude'] for location in locations]
+			), dtype=np.float64)
+		distance_matrix = self.optimizer.build_distance_matrix(locations)
+		return np.asarray(distance_matrix, dtype=np.float64) / self.speed_kmh * 60.0
+
+	def _stop_attributes(
+		self,
+		locations: List[Dict[str, Any]],
+		dwell_minutes: Optional[Dict[int, int]],
+		time_windows: Optional[Dict[int, Tuple[str, str]]]
+	) -> Tuple[List[float], List[float], List[float]]:
+		"""
+		各地点の滞在時間・到着可能な最早時刻・滞在開始の最遅時刻
+
+		指定は attraction_id をキーとした辞書、または地点データの
+		'dwell_minutes' / 'open_time' / 'close_time' から取得する。
+		閉館時刻までに滞在を終える必要があるため、最遅開始時刻は「閉館 − 滞在時間」。
+		"""
+		dwell_minutes = dwell_minutes or {}
+		time_windows = time_windows or {}
+
+		dwell, earliest, latest = [], [], []
+		for location in locations:
+			key = location.get('attraction_id', location.get('id'))
+			stay = dwell_minutes.get(key, location.get('dwell_minutes') or self.default_dwell_minutes)
+			open_time, close_time = time_windows.get(
+				key, (location.get('open_time'), location.get('close_time'))
+			)
+			open_minutes = parse_hhmm(open_time)
+			close_minutes = parse_hhmm(close_time)
+
+			dwell.append(float(stay))
+			earliest.append(float(open_minutes if open_minutes is not None else self.day_start))
+			latest.append(float(close_minutes - stay if close_minutes is not None else self.day_end))
+
+		return dwell, earliest, latest
+
+	def schedule(
+		self,
+		locations: List[Dict[str, Any]],
+		days: int,
+		start_index: int = 0,
+		dwell_minutes: Optional[Dict[int, int]] = None,
+		time_windows: Optional[Dict[int, Tuple[str, str]]] = None
+	) -> Dict[str, Any]:
+		"""
+		日ごとの訪問順と時刻を決める
+
+		1日目は開始地点から、2日目以降は優先度の高い地点のうち前日の最後の地点に
+		最も近い地点から始め、
+		残りの地点を「移動時間の増加が最小になる位置」に1件ずつ挿入していく。
+		優先度（priority）の高い地点から挿入し、同じ優先度では増加が小さいものを選ぶ。
+
+		挿入できるかどうかは各地点の「後ろ倒しできる余裕（forward slack）」を
+		保持しておき O(1) で判定する。挿入で変わるのはその日の値だけなので、
+		挿入後はその日だけを再計算し、各候補の最良挿入位置もその日の分だけ更新する。
+
+		Args:
+			locations: 地点のリスト
+			days: 日数
+			start_index: 1日目の最初の地点のインデックス
+			dwell_minutes: attraction_id → 滞在時間（分）
+			time_windows: attraction_id → (開館時刻, 閉館時刻)（'HH:MM'）
+
+		Returns:
+			{'days': [[{'location', 'arrival', 'start', 'departure', 'travel_minutes',
+			            'wait_minutes'}, ...], ...],
+			 'unscheduled': 時間内に入らなかった地点のリスト,
+			 'total_distance': 日ごとの移動距離の合計（km）}
+		"""
+		n = len(locations)
+		if n == 0 or days <= 0:
+			return {'days': [], 'unscheduled': list(locations), 'total_distance': 0.0}
+
+		travel = self._travel_minutes(locations).tolist()
+		# 移動距離は移動時間（道路の速度を含む）ではなく距離行列から求める
+		distance = np.asarray(self.optimizer.build_distance_matrix(locations), dtype=np.float64)
+		dwell, earliest, latest = self._stop_attributes(locations, dwell_minutes, time_windows)
+		priority = [location.get('priority') or 0 for location in locations]
+
+		routes: List[List[int]] = []
+		# 日ごとの滞在開始時刻・出発時刻・forward slack
+		starts: List[List[float]] = []
+		departs: List[List[float]] = []
+		slacks: List[List[float]] = []
+
+		def evaluate(route: List[int]) -> Optional[Tuple[List[float], List[float], List[float]]]:
+			"""1日分の時刻と forward slack を計算（時間枠を満たさない場合は None）"""
+			start_list, depart_list = [], []
+			clock = self.day_start
+			previous = None
+			for node in route:
+				arrival = clock if previous is None else clock + travel[previous][node]
+				begin = max(arrival, earliest[node])
+				if begin > latest[node] + 1e-9:
+					return None
+				start_list.append(begin)
+				clock = begin + dwell[node]
+				depart_list.append(clock)
+				previous = node
+			if route and clock > self.day_end + 1e-9:
+				return None
+
+			# 後ろから「この地点の開始をどれだけ遅らせても全体が成立するか」を計算
+			slack_list = [0.0] * len(route)
+			following = self.day_end - clock if route else 0.0
+			for k in range(len(route) - 1, -1, -1):
+				node = route[k]
+				slack = min(latest[node] - start_list[k], following)
+				slack_list[k] = slack
+				if k > 0:
+					arrival = depart_list[k - 1] + travel[route[k - 1]][node]
+					wait = start_list[k] - arrival
+					# 待ち時間がある地点は、その分だけ前の地点の遅れを吸収できる
+					following = wait + slack
+			return start_list, depart_list, slack_list
+
+		def best_position(day: int, node: int) -> Optional[Tuple[float, int]]:
+			"""その日の中で node を挿入できる最良の位置（増加する移動時間, 位置）"""
+			route = routes[day]
+			best = None
+			# 1日目の開始地点は先頭に固定
+			first_position = 1 if day == 0 else 0
+			for position in range(first_position, len(route) + 1):
+				prev_node = route[position - 1] if position > 0 else None
+				next_node = route[position] if position < len(route) else None
+
+				arrival = self.day_start if prev_node is None else departs[day][position - 1] + travel[prev_node][node]
+				begin = max(arrival, earliest[node])
+				if begin > latest[node] + 1e-9:
+					continue
+				leave = begin + dwell[node]
+
+				if next_node is None:
+					if leave > self.day_end + 1e-9:
+						continue
+					added = 0.0 if prev_node is None else travel[prev_node][node]
+				else:
+					next_begin = max(leave + travel[node][next_node], earliest[next_node])
+					push = next_begin - starts[day][position]
+					if push > slacks[day][position] + 1e-9:
+						continue
+					added = travel[node][next_node]
+					if prev_node is not None:
+						added += travel[prev_node][node] - travel[prev_node][next_node]
+
+				if best is None or added < best[0]:
+					best = (added, position)
+			return best
+
+		def insert(day: int, node: int, position: int):
+			routes[day].insert(position, node)
+			evaluated = evaluate(routes[day])
+			starts[day], departs[day], slacks[day] = evaluated
+
+		def open_day(seed: int) -> bool:
+			if evaluate([seed]) is None:
+				return False
+			routes.append([])
+			starts.append([])
+			departs.append([])
+			slacks.append([])
+			insert(len(routes) - 1, seed, 0)
+			return True
+
+		unrouted = set(range(n))
+		# candidates[node][day] = (増加する移動時間, 位置) または None
+		candidates: Dict[int, List[Optional[Tuple[float, int]]]] = {}
+
+		while unrouted and len(routes) < days:
+			# 新しい日を開く（1日目は開始地点、以降は前日の最後の地点に近い地点）
+			if not routes:
+				seeds = [start_index] + sorted(unrouted - {start_index}, key=lambda k: -priority[k])
+			else:
+				last = routes[-1][-1]
+				seeds = sorted(unrouted, key=lambda k: (-priority[k], travel[last][k]))
+			opened = False
+			for seed in seeds:
+				if open_day(seed):
+					unrouted.discard(seed)
+					opened = True
+					break
+			if not opened:
+				break
+
+			day = len(routes) - 1
+			for node in unrouted:
+				candidates.setdefault(node, []).append(best_position(day, node))
+
+			# 開いている日に挿入できる限り挿入
+			while unrouted:
+				choice = None
+				for node in unrouted:
+					for candidate_day, candidate in enumerate(candidates[node]):
+						if candidate is None:
+							continue
+						key = (-priority[node], candidate[0])
+						if choice is None or key < choice[0]:
+							choice = (key, node, candidate_day, candidate[1])
+				if choice is None:
+					break
+
+				_, node, candidate_day, position = choice
+				insert(candidate_day, node, position)
+				unrouted.discard(node)
+				# 変わったのは挿入した日だけ
+				for other in unrouted:
+					candidates[other][candidate_day] = best_position(candidate_day, other)
+
+		unscheduled = [locations[node] for node in sorted(unrouted)]
+
+		result_days = []
+		total_distance = 0.0
+		for day, route in enumerate(routes):
+			day_items = []
+			previous = None
+			for k, node in enumerate(route):
+				travel_minutes = 0.0 if previous is None else travel[previous][node]
+				arrival = self.day_start if previous is None else departs[day][k - 1] + travel_minutes
+				day_items.append({
+					'location': locations[node],
+					'arrival': format_hhmm(arrival),
+					'start': format_hhmm(starts[day][k]),
+					'departure': format_hhmm(departs[day][k]),
+					'travel_minutes': round(travel_minutes),
+					'wait_minutes': round(starts[day][k] - arrival)
+				})
+				previous = node
+			if len(route) > 1:
+				total_distance += float(distance[route[:-1], route[1:]].sum())
+			result_days.append(day_items)
+
+		self.logger.info(
+			f"旅程スケジュール作成: {len(result_days)}日, {n - len(unscheduled)}/{n}地点"
+			+ (f"（時間内に入らない地点 {len(unscheduled)}件）" if unscheduled else "")
+		)
+		return {
+			'days': result_days,
+			'unscheduled': unscheduled,
+			'total_distance': total_distance
+		}
+
+
+# テスト用コード
+if __name__ == "__main__":
+	scheduler = ItineraryScheduler(day_start="09:00", day_end="18:00")
+
+	test_locations = [
+		{'attraction_id': 1, 'name': '東京タワー', 'latitude': 35.6586, 'longitude': 139.7454, 'dwell_minutes': 60},
+		{'attraction_id': 2, 'name': '浅草寺', 'latitude': 35.7148, 'longitude': 139.7967, 'dwell_minutes': 90, 'open_time': '06:00', 'close_time': '17:00'},
+		{'attraction_id': 3, 'name': 'スカイツリー', 'latitude': 35.7101, 'longitude': 139.8107, 'dwell_minutes': 120, 'open_time': '10:00', 'close_time': '21:00'},
+		{'attraction_id': 4, 'name': '渋谷', 'latitude': 35.6595, 'longitude': 139.7004, 'dwell_minutes': 90},
+		{'attraction_id': 5, 'name': '新宿御苑', 'latitude': 35.6852, 'longitude': 139.7101, 'dwell_minutes': 90, 'open_time': '09:00', 'close_time': '16:30'}
+	]
+
+	result = scheduler.schedule(test_locations, days=2)
+
+	for day_number, items in enumerate(result['days'], 1):
+		print(f"\n📅 {day_number}日目")
+		for item in items:
+			print(f"  {item['start']}-{item['departure']} {item['location']['name']}（移動 {item['travel_minutes']}分, 待ち {item['wait_minutes']}分）")
+
+	if result['unscheduled']:
+		print(f"\n⚠️ 入らなかった地点: {[l['name'] for l in result['unscheduled']]}")
@@ -0,0 +1,204 @@
+"""
+マップHTML ディスクキャッシュモジュール
+レンダリング済みマップHTMLをディスクに保存し、プロセス再起動後も再利用する
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.logger import get_logger
+
+
+class MapHtmlCache:
+	"""マップHTMLのディスクキャッシュ（容量上限付きLRU）"""
+
+	DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200MB
+
+	def __init__(
+		self,
+		cache_dir: str = "data/map_cache",
+		max_bytes: int = DEFAULT_MAX_BYTES,
+		compress: bool = True
+	):
+		"""
+		キャッシュを初期化
+
+		Args:
+			cache_dir: キャッシュ保存先（プロジェクトルートからの相対パス）
+			max_bytes: キャッシュ全体の最大バイト数（超過時は古いものから削除）
+			compress: gzip圧縮して保存するか
+		"""
+		cache_path = Path(cache_dir)
+		if not cache_path.is_absolute():
+			cache_path = Path(__file__).parent.parent / cache_path
+		self.cache_dir = cache_path
+		self.cache_dir.mkdir(parents=True, exist_ok=True)
+		self.max_bytes = max_bytes
+		self.compress = compress
+		self.logger = get_logger()
+
+	@staticmethod
+	def make_key(data_version: str, options: Optional[Dict[str, Any]] = None) -> str:
+		"""
+		キャッシュキーを生成
+
+		Args:
+			data_version: データのバージョン（写真データのハッシュ等）
+			options: レンダリングオプション
+
+		Returns:
+			キャッシュキー（16進文字列）
+		"""
+		key_input = json.dumps(
+			{'data': data_version, 'options': options or {}},
+			sort_keys=True,
+			ensure_ascii=False,
+			default=str
+		)
+		return hashlib.sha256(key_input.encode('utf-8')).hexdigest()
+
+	def _entry_paths(self, key: str) -> List[Path]:
+		"""キーに対応するエントリのパス候補（圧縮・非圧縮）"""
+		return [self.cache_dir / f"{key}.html.gz", self.cache_dir / f"{key}.html"]
+
+	def _find_entry(self, key: str) -> Optional[Path]:
+		for path in self._entry_paths(key):
+			if path.exists():
+				return path
+		return None
+
+	@staticmethod
+	def _read_entry(path: Path) -> str:
+		if path.suffix == '.gz':
+			with gzip.open(path, 'rt', encoding='utf-8') as f:
+				return f.read()
+		return path.read_text(encoding='utf-8')
+
+	def get(self, key: str) -> Optional[str]:
+		"""
+		キャッシュからHTMLを取得
+
+		Args:
+			key: キャッシュキー
+
+		Returns:
+			HTML文字列（キャッシュにない場合はNone）
+		"""
+		path = self._find_entry(key)
+		if path is None:
+			return None
+
+		try:
+			html = self._read_entry(path)
+		except Exception:
+			self.logger.warning(f"マップキャッシュ読み込み失敗のため削除: {path.name}")
+			path.unlink(missing_ok=True)
+			return None
+
+		# 最終利用時刻を更新（LRU判定に使用）
+		try:
+			os.utime(path, None)
+		except OSError:
+			pass
+
+		self.logger.debug(f"マップキャッシュヒット: {key[:12]}")
+		return html
+
+	def put(self, key: str, html: str) -> Path:
+		"""
+		HTMLをキャッシュに保存
+
+		Args:
+			key: キャッシュキー
+			html: マップのHTML
+
+		Returns:
+			保存したファイルのパス
+		"""
+		gz_path, plain_path = self._entry_paths(key)
+		target = gz_path if self.compress else plain_path
+
+		# 書き込み途中のファイルを読まれないよう一時ファイル経由で置き換える
+		fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				data = html.encode('utf-8')
+				if self.compress:
+					data = gzip.compress(data, compresslevel=6)
+				f.write(data)
+			os.replace(tmp_name, target)
+		except Exception:
+			Path(tmp_name).unlink(missing_ok=True)
+			raise
+
+		# 形式を切り替えた場合に古いエントリが残らないようにする
+		other = plain_path if self.compress else gz_path
+		other.unlink(missing_ok=True)
+
+		self.logger.debug(f"マップキャッシュ保存: {target.name} ({target.stat().st_size / 1024:.1f} KB)")
+		self._evict()
+		return target
+
+	def export(self, key: str, output_path) -> Optional[Path]:
+		"""
+		キャッシュ済みHTMLをファイルとして書き出す（output/*.html 用）
+
+		Args:
+			key: キャッシュキー
+			output_path: 出力ファイルパス
+
+		Returns:
+			出力したファイルのパス（キャッシュにない場合はNone）
+		"""
+		path = self._find_entry(key)
+		if path is None:
+			return None
+
+		output_path = Path(output_path)
+		output_path.parent.mkdir(parents=True, exist_ok=True)
+
+		if path.suffix == '.gz':
+			with gzip.open(path, 'rb') as src, open(output_path, 'wb') as dst:
+				shutil.copyfileobj(src, dst)
+		else:
+			shutil.copyfile(path, output_path)
+
+		os.utime(path, None)
+		return output_path
+
+	def _evict(self):
+		"""容量上限を超えた分を最終利用時刻の古い順に削除"""
+		entries = []
+		total = 0
+		for path in self.cache_dir.iterdir():
+			if not path.is_file() or path.suffix == '.tmp':
+				continue
+			stat = path.stat()
+			entries.append((stat.st_mtime, stat.st_size, path))
+			total += stat.st_size
+
+		if total <= self.max_bytes:
+			return
+
+		entries.sort(key=lambda e: e[0])
+		removed = 0
+		for _, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			path.unlink(missing_ok=True)
+			total -= size
+			removed += 1
+
+		self.logger.info(f"マップキャッシュを整理: {removed}件削除（残り {total / 1024 / 1024:.1f} MB）")
+
+	def clear(self):
+		"""キャッシュを全削除"""
+		for path in self.cache_dir.iterdir():
+			if path.is_file():
+				path.unlink(missing_ok=True)
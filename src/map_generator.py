@@ -15,20 +15,344 @@ if str(_project_root) not in sys.path:
 import streamlit as st
 import hashlib
 import json
+import math
+import numpy as np
 from typing import List, Dict, Any
+from branca.element import MacroElement
+from jinja2 import Template
 
 
+class CompactMarkerLayer(MacroElement):
+    """
+    コンパクト描画モード用のマーカーレイヤー
+    
+    ポップアップのテンプレートとCSSクラスを1度だけ定義し、
+    マーカーごとのデータは配列として埋め込む（ポップアップHTMLは開いた時に生成）。
+    """
+    
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>
+        .jm-pop{width:200px}
+        .jm-pop h4{margin:0 0 5px 0}
+        .jm-pop p{margin:3px 0}
+        .jm-pop .jm-note{margin-top:5px;font-size:.9em}
+        .jm-photo{width:220px;font-family:Arial,sans-serif}
+        .jm-photo h4{margin:0 0 8px 0;color:#2c5aa0}
+        .jm-photo p{margin:4px 0;font-size:12px}
+        .jm-photo hr{margin:8px 0}
+        .jm-photo .jm-foot{margin:0;font-size:11px;color:#666}
+        .jm-num{border:3px solid #fff;border-radius:50%;width:30px;height:30px;display:flex;align-items:center;justify-content:center;color:#fff;font-weight:bold;font-size:14px}
+        </style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        (function(){
+        var map = {{ this._parent.get_name() }};
+        var D = {{ this.data_json() }};
+        function e(s){return String(s==null?'':s).replace(/[&<>"']/g,function(c){return '&#'+c.charCodeAt(0)+';';});}
+        function p(label,value){return '<p><b>'+label+':</b> '+value+'</p>';}
+        function loc(r,i){return e(r[i])+', '+e(r[i+1]);}
+        var icons={};
+        function icon(color,name){var k=color+'/'+name;if(!icons[k]){icons[k]=L.AwesomeMarkers.icon({icon:name,iconColor:'white',markerColor:color,prefix:'fa',extraClasses:'fa-rotate-0'});}return icons[k];}
+        function add(lat,lon,ic,tip,html,w){L.marker([lat,lon],{icon:ic}).bindPopup(html,{maxWidth:w}).bindTooltip(tip,{sticky:true}).addTo(map);}
+        var TYPES=['image','video'];
+        var PI=[['red','camera'],['blue','video-camera'],['gray','question']];
+        D.p.forEach(function(r){
+            var t=typeof r[4]==='number'?TYPES[r[4]]:r[4];
+            var ic=PI[typeof r[4]==='number'?r[4]:2];
+            add(r[0],r[1],icon(ic[0],ic[1]),e(r[2]),function(){
+                return '<div class="jm-photo"><h4>📸 '+e(r[2])+'</h4>'
+                    +'<p><strong>📅 撮影日時:</strong><br>'+e(r[3])+'</p>'
+                    +'<p><strong>📍 位置:</strong><br>緯度: '+r[0].toFixed(6)+'<br>経度: '+r[1].toFixed(6)+'</p>'
+                    +'<p><strong>📁 種類:</strong> '+e(t||'unknown')+'</p><hr>'
+                    +'<p class="jm-foot">写真一覧パネルで詳細を確認できます</p></div>';
+            },260);
+        });
+        D.a.forEach(function(r){
+            var v=r[7];
+            add(r[0],r[1],icon(v?'blue':'green',v?'check':'star'),e(r[2]),function(){
+                var h='<div class="jm-pop"><h4>'+e(r[2])+'</h4>'+p('カテゴリ',e(r[3]))+p('場所',loc(r,4))
+                    +p('評価',r[6]?'⭐'.repeat(r[6]):'なし')+p('状態',v?'✅ 訪問済み':'⭐ 未訪問');
+                if(r[8]){h+=p('訪問日',e(r[8]));}
+                if(r[9]){h+='<p class="jm-note">'+e(r[9])+'</p>';}
+                return h+'</div>';
+            },250);
+        });
+        D.w.forEach(function(r){
+            var pr=r[6];
+            add(r[0],r[1],icon(pr>=5?'purple':(pr>=4?'darkpurple':'lightgray'),'heart'),'📝 '+e(r[2]),function(){
+                var h='<div class="jm-pop"><h4>'+'⭐'.repeat(Math.max(pr,0))+' '+e(r[2])+'</h4>'+p('カテゴリ',e(r[3]))+p('場所',loc(r,4))
+                    +p('優先度',pr+'/5')+p('状態','📝 ウィッシュリスト');
+                if(r[7]){h+='<p class="jm-note"><b>メモ:</b> '+e(r[7])+'</p>';}
+                if(r[8]){h+=p('予定日',e(r[8]));}
+                return h+'</div>';
+            },250);
+        });
+        D.r.forEach(function(r){
+            var i=r[7],n=r[8],color=D.c[r[9]],ic,tip;
+            if(!r[10]){ic=icon('orange','map-marker');tip=e(r[2]);}
+            else if(i===1){ic=icon('green','play');tip='🚩 開始: '+e(r[2]);}
+            else if(i===n){ic=icon('red','stop');tip='🏁 終了: '+e(r[2]);}
+            else{ic=L.divIcon({className:'empty',html:'<div class="jm-num" style="background-color:'+color+'">'+i+'</div>'});tip=i+'. '+e(r[2]);}
+            add(r[0],r[1],ic,tip,function(){
+                var h='<div class="jm-pop"><h4>'+i+'. '+e(r[2])+'</h4>'+p('カテゴリ',e(r[3]))+p('場所',loc(r,4));
+                if(r[6]){h+='<p class="jm-note"><b>メモ:</b> '+e(r[6])+'</p>';}
+                return h+'</div>';
+            },250);
+        });
+        })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self):
+        super().__init__()
+        self._name = 'CompactMarkerLayer'
+        self.photos = []
+        self.attractions = []
+        self.wishlist = []
+        self.route_stops = []
+        self.colors = []
+    
+    def color_index(self, color: str) -> int:
+        """ルート色をパレットに登録してインデックスを返す"""
+        if color not in self.colors:
+            self.colors.append(color)
+        return self.colors.index(color)
+    
+    def data_json(self) -> str:
+        """マーカーデータをJSON配列として出力（<script>内に埋め込める形式）"""
+        data = {
+            'p': self.photos,
+            'a': self.attractions,
+            'w': self.wishlist,
+            'r': self.route_stops,
+            'c': self.colors
+        }
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+
+class LazyMarkerLayer(MacroElement):
+    """
+    ビューポート遅延読み込み用の写真マーカーレイヤー
+    
+    地図の移動・ズーム（moveend）ごとにローカルのデータエンドポイントへ
+    表示範囲を問い合わせ、範囲内の写真（または集約セル）だけを描画する。
+    """
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(){
+        var map = {{ this._parent.get_name() }};
+        var endpoint = {{ this.endpoint|tojson }};
+        var range = {{ this.date_range|tojson }};
+        var layer = L.layerGroup().addTo(map);
+        var ctrl = null;
+        var COLORS = {image: '#d63e2a', video: '#38aadd'};
+        function e(s){return String(s==null?'':s).replace(/[&<>"']/g,function(c){return '&#'+c.charCodeAt(0)+';';});}
+        function popup(r){
+            return '<div style="width:220px;font-family:Arial,sans-serif"><h4 style="margin:0 0 8px 0;color:#2c5aa0">📸 '+e(r[3])+'</h4>'
+                +'<p style="margin:4px 0;font-size:12px"><strong>📅 撮影日時:</strong><br>'+e(r[4])+'</p>'
+                +'<p style="margin:4px 0;font-size:12px"><strong>📍 位置:</strong><br>緯度: '+r[1].toFixed(6)+'<br>経度: '+r[2].toFixed(6)+'</p>'
+                +'<p style="margin:4px 0;font-size:12px"><strong>📁 種類:</strong> '+e(r[5])+'</p></div>';
+        }
+        function render(data){
+            layer.clearLayers();
+            if(data.type === 'points'){
+                data.points.forEach(function(r){
+                    L.circleMarker([r[1], r[2]], {radius: 6, weight: 1, color: '#fff', fillColor: COLORS[r[5]] || '#777', fillOpacity: 0.9})
+                        .bindPopup(function(){return popup(r);}, {maxWidth: 260})
+                        .bindTooltip(e(r[3]))
+                        .addTo(layer);
+                });
+            } else {
+                data.clusters.forEach(function(c){
+                    var size = 24 + Math.min(24, Math.round(Math.log(c[2]) * 4));
+                    L.marker([c[0], c[1]], {icon: L.divIcon({className: 'empty', iconSize: [size, size], html:
+                        '<div style="width:'+size+'px;height:'+size+'px;line-height:'+size+'px;border-radius:50%;text-align:center;'
+                        +'background:rgba(255,107,53,0.8);color:#fff;font-weight:bold;font-size:12px">'+c[2]+'</div>'})})
+                        .on('click', function(){map.setView([c[0], c[1]], map.getZoom() + 2);})
+                        .addTo(layer);
+                });
+            }
+        }
+        function load(){
+            if(ctrl){ctrl.abort();}
+            ctrl = new AbortController();
+            var b = map.getBounds();
+            var q = 'south=' + b.getSouth() + '&west=' + b.getWest() + '&north=' + b.getNorth()
+                + '&east=' + b.getEast() + '&zoom=' + map.getZoom();
+            if(range[0]){q += '&start=' + encodeURIComponent(range[0]);}
+            if(range[1]){q += '&end=' + encodeURIComponent(range[1]);}
+            fetch(endpoint + '/points?' + q, {signal: ctrl.signal})
+                .then(function(r){return r.json();})
+                .then(render)
+                .catch(function(err){if(err.name !== 'AbortError'){console.warn('JourneyMap:', err);}});
+        }
+        map.on('moveend', load);
+        load();
+        })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, endpoint: str, start: str = None, end: str = None):
+        super().__init__()
+        self._name = 'LazyMarkerLayer'
+        self.endpoint = endpoint.rstrip('/')
+        self.date_range = [start, end]
+
+
+class LazyRouteLayer(MacroElement):
+    """
+    ビューポート遅延読み込み用の移動ルートレイヤー
+    
+    地図の移動・ズーム（moveend）ごとに表示範囲にかかるルートだけを
+    エンドポイントから取得する（ズームに応じてサーバ側で間引き済み）。
+    ルートは区間ごとの線で届き、移動手段（modes）ごとに描き分ける。
+    """
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(){
+        var map = {{ this._parent.get_name() }};
+        var endpoint = {{ this.endpoint|tojson }};
+        var range = {{ this.date_range|tojson }};
+        var style = {{ this.style|tojson }};
+        var modeStyles = {{ this.mode_styles|tojson }};
+        var layer = L.layerGroup().addTo(map);
+        var ctrl = null;
+        function load(){
+            if(ctrl){ctrl.abort();}
+            ctrl = new AbortController();
+            var b = map.getBounds();
+            var q = 'south=' + b.getSouth() + '&west=' + b.getWest() + '&north=' + b.getNorth()
+                + '&east=' + b.getEast() + '&zoom=' + map.getZoom();
+            if(range[0]){q += '&start=' + encodeURIComponent(range[0]);}
+            if(range[1]){q += '&end=' + encodeURIComponent(range[1]);}
+            fetch(endpoint + '/route?' + q, {signal: ctrl.signal})
+                .then(function(r){return r.json();})
+                .then(function(data){
+                    layer.clearLayers();
+                    data.lines.forEach(function(line, i){
+                        var mode = modeStyles[(data.modes || [])[i]] || {};
+                        var options = Object.assign({}, style, mode.style || {});
+                        L.polyline(line, options).bindTooltip(mode.label || '移動ルート').addTo(layer);
+                    });
+                })
+                .catch(function(err){if(err.name !== 'AbortError'){console.warn('JourneyMap:', err);}});
+        }
+        map.on('moveend', load);
+        load();
+        })();
+        {% endmacro %}
+    """)
+    
+    def __init__(
+        self,
+        endpoint: str,
+        start: str = None,
+        end: str = None,
+        color='#3388ff',
+        weight=3,
+        opacity=0.7,
+        mode_styles=None
+    ):
+        super().__init__()
+        self._name = 'LazyRouteLayer'
+        self.endpoint = endpoint.rstrip('/')
+        self.date_range = [start, end]
+        self.style = {'color': color, 'weight': weight, 'opacity': opacity}
+        # 移動手段ごとの Leaflet のスタイル（MapGenerator.ROUTE_MODE_STYLES から作る）
+        self.mode_styles = {}
+        for mode, mode_style in (mode_styles or {}).items():
+            options = {'opacity': opacity * mode_style['opacity_scale']}
+            if mode_style['color']:
+                options['color'] = mode_style['color']
+            if mode_style['dash_array']:
+                options['dashArray'] = mode_style['dash_array']
+            self.mode_styles[mode] = {'label': f"移動ルート（{mode_style['label']}）", 'style': options}
+
+
+class ZoomBandSwitcher(MacroElement):
+    """ズームレベルに最も近い解像度の集約レイヤーだけを表示する"""
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(){
+        var map = {{ this._parent.get_name() }};
+        var bands = [{% for zoom, layer in this.bands %}[{{ zoom }}, {{ layer.get_name() }}]{{ "," if not loop.last }}{% endfor %}];
+        function update(){
+            var z = map.getZoom(), best = null;
+            bands.forEach(function(b){ if(best === null || Math.abs(b[0] - z) < Math.abs(best[0] - z)){ best = b; } });
+            bands.forEach(function(b){
+                if(b === best){ if(!map.hasLayer(b[1])){ map.addLayer(b[1]); } }
+                else if(map.hasLayer(b[1])){ map.removeLayer(b[1]); }
+            });
+        }
+        map.on('zoomend', update);
+        update();
+        })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, bands):
+        super().__init__()
+        self._name = 'ZoomBandSwitcher'
+        self.bands = bands
+
 class MapGenerator:
     """Foliumマップ生成クラス"""
     
-    def __init__(self):
-        """初期化"""
+    # 写真レイヤーの表示方法
+    PHOTO_LAYERS = ('markers', 'heatmap', 'hexbin', 'grid', 'tiles')
+    
+    # 密度セルの配色（件数の少ない順）
+    DENSITY_COLORS = ['#ffffb2', '#fed976', '#feb24c', '#fd8d3c', '#f03b20', '#bd0026']
+    
+    def __init__(
+        self,
+        compact: bool = False,
+        lazy_endpoint: str = None,
+        lazy_date_range=None,
+        photo_layer: str = 'markers',
+        overlay_tiles: str = None
+    ):
+        """
+        初期化
+        
+        Args:
+            compact (bool): コンパクト描画モード（ポップアップテンプレート共有・HTML縮小）
+            lazy_endpoint (str): 写真マーカーを表示範囲ごとに取得するデータエンドポイント
+                （指定時は add_markers が全件を埋め込まない）
+            lazy_date_range (tuple): 遅延読み込み時の期間フィルタ (start, end)（ISO 8601）
+            photo_layer (str): add_markers での写真の表示方法
+                'markers'（個別マーカー）, 'heatmap', 'hexbin', 'grid'（密度表示）,
+                'tiles'（overlay_tiles の事前レンダリング済みタイルでドットとルートを表示）
+            overlay_tiles (str): 事前レンダリング済み写真オーバーレイのタイルURL（create_base_map の既定値）
+        """
+        if photo_layer not in self.PHOTO_LAYERS:
+            raise ValueError(f"photo_layer は {self.PHOTO_LAYERS} のいずれかを指定してください: {photo_layer}")
+        if photo_layer == 'tiles' and not overlay_tiles:
+            raise ValueError("photo_layer='tiles' には overlay_tiles の指定が必要です")
+        self.photo_layer = photo_layer
+        self.compact = compact
+        self.lazy_endpoint = lazy_endpoint
+        self.lazy_date_range = lazy_date_range or (None, None)
+        self.overlay_tiles = overlay_tiles
+        self._compact_layer = None
         self.map = None
         self.center_lat = 35.6762  # デフォルト: 東京
         self.center_lon = 139.6503
         self.zoom_start = 10
     
-    def create_base_map(self, center_lat=None, center_lon=None, zoom_start=10):
+    def create_base_map(
+        self,
+        center_lat=None,
+        center_lon=None,
+        zoom_start=10,
+        overlay_tiles=None,
+        overlay_max_zoom=14
+    ):
         """
         基本マップを作成
         
@@ -36,6 +360,9 @@ class MapGenerator:
             center_lat (float): 中心緯度（デフォルト: 東京）
             center_lon (float): 中心経度（デフォルト: 東京）
             zoom_start (int): 初期ズームレベル（デフォルト: 10）
+            overlay_tiles (str): 事前レンダリング済み写真オーバーレイのタイルURL
+                （MapDataServer.tiles_url、省略時はコンストラクタの指定）
+            overlay_max_zoom (int): オーバーレイタイルの最大ズーム（これより先は拡大表示）
             
         Returns:
             folium.Map: 作成されたマップオブジェクト
@@ -46,6 +373,7 @@ class MapGenerator:
             self.center_lon = center_lon
         
         self.zoom_start = zoom_start
+        overlay_tiles = overlay_tiles or self.overlay_tiles
         
         # Foliumマップを作成
         self.map = folium.Map(
@@ -55,6 +383,24 @@ class MapGenerator:
             control_scale=True      # スケールバー表示
         )
         
+        # 事前レンダリング済みの写真ドット・ルート（tile_renderer.py で生成）
+        if overlay_tiles:
+            folium.TileLayer(
+                tiles=overlay_tiles,
+                attr='JourneyMap',
+                name='写真オーバーレイ',
+                overlay=True,
+                control=False,
+                max_native_zoom=overlay_max_zoom,
+                max_zoom=19
+            ).add_to(self.map)
+        
+        # コンパクトモードではマーカーを共有テンプレートのレイヤーにまとめる
+        self._compact_layer = None
+        if self.compact:
+            self._compact_layer = CompactMarkerLayer()
+            self._compact_layer.add_to(self.map)
+        
         print(f"✅ 基本マップを作成しました")
         print(f"   中心座標: ({self.center_lat}, {self.center_lon})")
         print(f"   ズームレベル: {self.zoom_start}")
@@ -133,15 +479,28 @@ class MapGenerator:
         else:
             return 13
     
-    def add_route(self, photos, color='#3388ff', weight=3, opacity=0.7):
+    # 移動手段ごとのルートの描き方（color=None は add_route の color を使う）
+    ROUTE_MODE_STYLES = {
+        'walk': {'label': '徒歩', 'color': None, 'dash_array': '2 8', 'opacity_scale': 1.0},
+        'drive': {'label': '車・鉄道', 'color': None, 'dash_array': None, 'opacity_scale': 1.0},
+        'flight': {'label': '飛行機', 'color': '#7F8C8D', 'dash_array': '10 10', 'opacity_scale': 0.6},
+    }
+    
+    def add_route(self, photos, color='#3388ff', weight=3, opacity=0.7, segmented=False):
         """
         写真データから移動ルートを地図に追加
         
+        遅延読み込み（lazy_endpoint 指定時）は add_lazy_route() でエンドポイントから取得する。
+        segmented=True の場合は撮影時刻と区間速度から軌跡を復元し、
+        撮影間隔の長い箇所で線を分け、誤測位の地点を除いて移動手段ごとに描き分ける。
+        このとき撮影時刻のない写真はルートに含まれない（既定の False では全地点を結ぶ）。
+        
         Args:
             photos (list): 写真データのリスト（時系列順にソート推奨）
             color (str): ルートの色（16進数カラーコード）
             weight (int): ルートの太さ（ピクセル）
             opacity (float): ルートの不透明度（0.0〜1.0）
+            segmented (bool): 軌跡を区間に分けて描画するか（False で全地点を1本の線で結ぶ）
         
         Returns:
             int: 追加されたルートのポイント数
@@ -154,6 +513,19 @@ class MapGenerator:
             print("⚠️ ルートを描画するには2つ以上のGPS座標が必要です")
             return 0
         
+        if self.photo_layer == 'tiles':
+            # ルートはオーバーレイタイルに描画済み（区間分けも tile_renderer で同じ処理）
+            return len(valid_photos)
+        
+        if self.lazy_endpoint:
+            # 遅延読み込みではルートも表示範囲ごとに取得（全地点をページに埋め込まない）
+            start, end = self.lazy_date_range
+            self.add_lazy_route(self.lazy_endpoint, start=start, end=end, color=color, weight=weight, opacity=opacity)
+            return len(valid_photos)
+        
+        if segmented:
+            return self._add_segmented_route(valid_photos, color, weight, opacity)
+        
         sorted_photos = sorted(valid_photos, key=lambda p: p.get('timestamp') or '9999-99-99')
         coordinates = [[p['latitude'], p['longitude']] for p in sorted_photos]
         
@@ -170,6 +542,44 @@ class MapGenerator:
         print(f"   色: {color}, 太さ: {weight}px, 不透明度: {opacity}")
         return len(coordinates)
     
+    def _add_segmented_route(self, photos, color, weight, opacity):
+        """
+        区間に分けた移動軌跡を描画（移動手段ごとに1つのマルチポリラインにまとめる）
+        
+        Returns:
+            int: 描画したポイント数
+        """
+        from src.trajectory import build_segments, summarize_segments
+        
+        trajectory = build_segments(photos)
+        segments = trajectory['segments']
+        if not segments:
+            print("⚠️ 撮影時刻つきのGPS座標が足りないため、ルートを描画できません")
+            return 0
+        
+        summary = summarize_segments(segments)
+        for mode, style in self.ROUTE_MODE_STYLES.items():
+            lines = [segment['coordinates'] for segment in segments if segment['mode'] == mode]
+            if not lines:
+                continue
+            count, distance = summary[mode]
+            folium.PolyLine(
+                locations=lines,
+                color=style['color'] or color,
+                weight=weight,
+                opacity=opacity * style['opacity_scale'],
+                dash_array=style['dash_array'],
+                popup=f"移動ルート（{style['label']}）",
+                tooltip=f"{style['label']}: {count}区間, {distance:.1f} km"
+            ).add_to(self.map)
+        
+        print(f"✅ ルートを描画しました（{trajectory['points']} ポイント, {len(segments)} 区間）")
+        if trajectory['outliers']:
+            print(f"   誤測位として除外: {trajectory['outliers']} ポイント")
+        if trajectory['untimed']:
+            print(f"   撮影時刻なしで除外: {trajectory['untimed']} ポイント")
+        return trajectory['points']
+    
     def add_route_with_arrows(self, photos, color='#3388ff', weight=3):
         """
         矢印付きルートを描画（方向を示す）
@@ -216,34 +626,45 @@ class MapGenerator:
         Returns:
             ハッシュ値
         """
-        # 写真のID、緯度、経度、時間からハッシュを生成
+        # ポップアップに表示する項目（ファイルパス・種類）も含めてハッシュを生成
         hash_input = json.dumps([
             {
                 'id': p.get('id'),
                 'lat': p.get('latitude'),
                 'lon': p.get('longitude'),
-                'time': p.get('timestamp')
+                'time': p.get('timestamp'),
+                'path': str(p.get('file_path')),
+                'type': p.get('file_type')
             }
             for p in photos
         ], sort_keys=True)
         
         return hashlib.md5(hash_input.encode()).hexdigest()
     
+    # ディスクキャッシュのキーに含めるレンダリングオプション
+    RENDER_OPTIONS = {
+        'version': 4,
+        'compact': True,
+        'route_color': '#FF6B35',
+        'route_weight': 4,
+        'route_opacity': 0.8,
+        'route_segmented': True
+    }
+    
     @staticmethod
-    @st.cache_data(ttl=600)  # 10分間キャッシュ
-    def generate_map_cached(photos: List[Dict[str, Any]], _photos_hash: str = None) -> str:
+    def _render_map_html(photos: List[Dict[str, Any]], options: Dict[str, Any]) -> str:
         """
-        マップを生成（キャッシュ版）
+        写真マップのHTMLをレンダリング（キャッシュなし）
         
         Args:
             photos: 写真データのリスト
-            _photos_hash: 写真データのハッシュ（内部使用）
+            options: レンダリングオプション
             
         Returns:
             マップのHTML文字列
         """
         # MapGeneratorインスタンスを作成
-        generator = MapGenerator()
+        generator = MapGenerator(compact=options.get('compact', False))
         
         # 中心座標とズームレベルを計算
         center = generator.calculate_center_from_photos(photos) or (generator.center_lat, generator.center_lon)
@@ -260,10 +681,123 @@ class MapGenerator:
         generator.add_markers(photos)
         
         # ルートを追加
-        generator.add_route(photos, color='#FF6B35', weight=4, opacity=0.8)
+        generator.add_route(
+            photos,
+            color=options['route_color'],
+            weight=options['route_weight'],
+            opacity=options['route_opacity'],
+            segmented=options.get('route_segmented', False)
+        )
         
         # HTMLを取得
-        return generator.map._repr_html_()
+        return generator.get_map_html()
+    
+    @staticmethod
+    def generate_map_html(
+        photos: List[Dict[str, Any]],
+        photos_hash: str = None,
+        use_disk_cache: bool = True,
+        segmented: bool = True,
+        cache=None
+    ) -> str:
+        """
+        マップを生成（ディスクキャッシュ経由）
+        
+        データのバージョンとレンダリングオプションが同じであれば、
+        プロセス再起動後もディスク上のHTMLをそのまま返す。
+        
+        Args:
+            photos: 写真データのリスト
+            photos_hash: 写真データのハッシュ（省略時は計算）
+            use_disk_cache: ディスクキャッシュを使用するか
+            segmented: ルートを移動手段ごとの区間に分けて描画するか
+            cache: 使用する MapHtmlCache（省略時は既定の保存先）
+            
+        Returns:
+            マップのHTML文字列
+        """
+        options = dict(MapGenerator.RENDER_OPTIONS, route_segmented=segmented)
+        if not use_disk_cache:
+            return MapGenerator._render_map_html(photos, options)
+        
+        from src.map_cache import MapHtmlCache
+        
+        if photos_hash is None:
+            photos_hash = MapGenerator._calculate_photos_hash(photos)
+        
+        cache = cache or MapHtmlCache()
+        key = MapHtmlCache.make_key(photos_hash, options)
+        html = cache.get(key)
+        if html is not None:
+            return html
+        
+        html = MapGenerator._render_map_html(photos, options)
+        try:
+            cache.put(key, html)
+        except Exception:
+            from src.logger import get_logger
+            get_logger().error("マップキャッシュ保存エラー", exc_info=False)
+        return html
+    
+    @staticmethod
+    def export_map_html(
+        photos: List[Dict[str, Any]],
+        output_path='output/map.html',
+        segmented: bool = True,
+        cache=None
+    ) -> Path:
+        """
+        マップをHTMLファイルとして書き出す（ディスクキャッシュがあれば再利用）
+        
+        画面表示と同じキャッシュキーを使うため、表示済みのマップは
+        レンダリングせずにキャッシュからそのまま書き出す。
+        
+        Args:
+            photos: 写真データのリスト
+            output_path: 出力ファイルパス
+            segmented: ルートを移動手段ごとの区間に分けて描画するか
+            cache: 使用する MapHtmlCache（省略時は既定の保存先）
+            
+        Returns:
+            Path: 保存されたファイルのパス
+        """
+        from src.map_cache import MapHtmlCache
+        
+        options = dict(MapGenerator.RENDER_OPTIONS, route_segmented=segmented)
+        photos_hash = MapGenerator._calculate_photos_hash(photos)
+        key = MapHtmlCache.make_key(photos_hash, options)
+        cache = cache or MapHtmlCache()
+        
+        exported = cache.export(key, output_path)
+        if exported is None:
+            html = MapGenerator.generate_map_html(photos, photos_hash=photos_hash, segmented=segmented, cache=cache)
+            exported = cache.export(key, output_path)
+            if exported is None:
+                # キャッシュに保存できなかった場合は直接書き出す
+                exported = Path(output_path)
+                exported.parent.mkdir(parents=True, exist_ok=True)
+                exported.write_text(html, encoding='utf-8')
+        
+        print(f"✅ マップを保存しました: {exported}")
+        return exported
+    
+    @staticmethod
+    @st.cache_data(ttl=600)  # 10分間キャッシュ
+    def generate_map_cached(photos: List[Dict[str, Any]], _photos_hash: str = None, segmented: bool = True) -> str:
+        """
+        マップを生成（キャッシュ版）
+        
+        メモリキャッシュにない場合はディスクキャッシュを参照する。
+        
+        Args:
+            photos: 写真データのリスト
+            _photos_hash: 写真データのハッシュ（内部使用）
+            segmented: ルートを移動手段ごとの区間に分けて描画するか
+            
+        Returns:
+            マップのHTML文字列
+        """
+        return MapGenerator.generate_map_html(photos, photos_hash=_photos_hash, segmented=segmented)
 	
     def add_markers(self, photos):
         """
@@ -286,6 +820,20 @@ class MapGenerator:
         if self.map is None:
             raise ValueError("マップが作成されていません。create_base_map() を先に実行してください。")
         
+        if self.photo_layer == 'tiles':
+            # 撮影地点はオーバーレイタイルに描画済み
+            return sum(1 for p in photos if p.get('latitude') is not None and p.get('longitude') is not None)
+        if self.photo_layer == 'heatmap':
+            return self.add_heatmap(photos)
+        if self.photo_layer in ('hexbin', 'grid'):
+            return self.add_density_grid(photos, shape='hex' if self.photo_layer == 'hexbin' else 'square')
+        
+        if self.lazy_endpoint:
+            start, end = self.lazy_date_range
+            count = sum(1 for p in photos if p.get('latitude') is not None and p.get('longitude') is not None)
+            self.add_lazy_markers(self.lazy_endpoint, start=start, end=end)
+            return count
+        
         marker_count = 0
         
         for idx, photo in enumerate(photos):
@@ -299,6 +847,14 @@ class MapGenerator:
             timestamp = photo.get('timestamp') or '不明'
             file_type = photo.get('file_type', 'unknown')
             
+            if self._compact_layer is not None:
+                type_code = {'image': 0, 'video': 1}.get(file_type, file_type)
+                self._compact_layer.photos.append(
+                    [round(lat, 6), round(lon, 6), file_name, timestamp, type_code]
+                )
+                marker_count += 1
+                continue
+            
             # ファイルタイプで色・アイコンを分ける（画像=赤/カメラ、動画=青/ビデオ）
             if file_type == 'image':
                 icon = folium.Icon(color='red', icon='camera', prefix='fa')
@@ -336,6 +892,185 @@ class MapGenerator:
         print(f"✅ マーカーを {marker_count} 個追加しました")
         return marker_count
     
+    def add_lazy_markers(self, endpoint: str, start: str = None, end: str = None):
+        """
+        表示範囲内の写真だけをエンドポイントから取得するマーカーレイヤーを追加
+        
+        ページに埋め込まれるのはレイヤーの設定のみで、写真の件数に依存しない。
+        
+        Args:
+            endpoint (str): データエンドポイントのベースURL（MapDataServer.url）
+            start (str): 期間フィルタの開始（ISO 8601、省略可）
+            end (str): 期間フィルタの終了（ISO 8601、省略可）
+        """
+        if self.map is None:
+            raise ValueError("マップが作成されていません。create_base_map() を先に実行してください。")
+        
+        LazyMarkerLayer(endpoint, start=start, end=end).add_to(self.map)
+        
+        print(f"✅ 遅延読み込みマーカーレイヤーを追加しました（{endpoint}）")
+    
+    def add_lazy_route(self, endpoint: str, start: str = None, end: str = None, color='#3388ff', weight=3, opacity=0.7):
+        """
+        表示範囲にかかる移動ルートだけをエンドポイントから取得するレイヤーを追加
+        
+        ルートはサーバ側でズームに応じて間引かれるため、ページには座標を埋め込まない。
+        サーバは誤測位を除いた区間ごとに線を返し、移動手段ごとに ROUTE_MODE_STYLES で描き分ける。
+        
+        Args:
+            endpoint (str): データエンドポイントのベースURL（MapDataServer.url）
+            start (str): 期間フィルタの開始（ISO 8601、省略可）
+            end (str): 期間フィルタの終了（ISO 8601、省略可）
+            color (str): ルートの色（16進数カラーコード）
+            weight (int): ルートの太さ（ピクセル）
+            opacity (float): ルートの不透明度（0.0〜1.0）
+        """
+        if self.map is None:
+            raise ValueError("マップが作成されていません。create_base_map() を先に実行してください。")
+        
+        LazyRouteLayer(
+            endpoint, start=start, end=end, color=color, weight=weight, opacity=opacity,
+            mode_styles=self.ROUTE_MODE_STYLES
+        ).add_to(self.map)
+        
+        print(f"✅ 遅延読み込みルートレイヤーを追加しました（{endpoint}）")
+    
+    def _density_zoom_levels(self, zoom_levels=None):
+        """集約レイヤーを用意するズームレベル（省略時は初期ズーム周辺）"""
+        if zoom_levels:
+            return sorted(set(int(z) for z in zoom_levels))
+        low = max(self.zoom_start - 2, 2)
+        high = min(self.zoom_start + 4, 18)
+        return list(range(low, high + 1, 2))
+    
+    def add_heatmap(self, photos, zoom_levels=None, radius=18, blur=15, max_cells=20000):
+        """
+        写真の撮影密度をヒートマップで表示
+        
+        座標はズームレベルごとに細かいグリッドで事前集約し、
+        ブラウザには重み付きのセル中心だけを渡す。
+        
+        Args:
+            photos (list): 写真データのリスト
+            zoom_levels (list): 集約レイヤーを用意するズームレベル（省略時は初期ズーム周辺）
+            radius (int): ヒートマップの点の半径（ピクセル）
+            blur (int): ぼかし量（ピクセル）
+            max_cells (int): 1つのズーム段階で渡す最大セル数（超える段階は省略）
+        
+        Returns:
+            int: 集約対象の写真の数
+        """
+        if self.map is None:
+            raise ValueError("マップが作成されていません。create_base_map() を先に実行してください。")
+        
+        from folium.plugins import HeatMap
+        from src import density
+        
+        lats, lons = density.extract_coordinates(photos)
+        if lats.size == 0:
+            print("⚠️ ヒートマップを描画するにはGPS座標が必要です")
+            return 0
+        
+        bands = []
+        total_cells = 0
+        for zoom in self._density_zoom_levels(zoom_levels):
+            # 点の半径の半分程度のセルに集約すれば見た目はほぼ変わらない
+            cells = density.square_bins(lats, lons, density.cell_size_for_zoom(zoom, max(radius // 2, 2)))
+            if cells['count'].size > max_cells:
+                print(f"⚠️ ズーム {zoom} のセル数が多すぎるため省略しました（{cells['count'].size} セル）")
+                continue
+            counts = cells['count'].astype(float)
+            weights = np.minimum(counts / max(np.percentile(counts, 99), 1.0), 1.0)
+            data = np.column_stack([cells['lat'], cells['lon'], weights]).round(6).tolist()
+            
+            layer = HeatMap(data, radius=radius, blur=blur, min_opacity=0.3, max_zoom=zoom, control=False, show=False)
+            layer.add_to(self.map)
+            bands.append((zoom, layer))
+            total_cells += len(data)
+        
+        ZoomBandSwitcher(bands).add_to(self.map)
+        
+        print(f"✅ ヒートマップを追加しました（{lats.size} 件 → {total_cells} セル / {len(bands)} ズーム段階）")
+        return int(lats.size)
+    
+    def add_density_grid(self, photos, shape='hex', zoom_levels=None, cell_pixels=40, max_cells=20000):
+        """
+        写真の撮影密度を六角形または正方形のセルで表示（セルごとの件数付き）
+        
+        Args:
+            photos (list): 写真データのリスト
+            shape (str): 'hex'（六角形）または 'square'（正方形）
+            zoom_levels (list): 集約レイヤーを用意するズームレベル（省略時は初期ズーム周辺）
+            cell_pixels (int): 画面上のセルの大きさ（ピクセル）
+            max_cells (int): 1つのズーム段階で描画する最大セル数（超える段階は省略）
+        
+        Returns:
+            int: 集約対象の写真の数
+        """
+        if self.map is None:
+            raise ValueError("マップが作成されていません。create_base_map() を先に実行してください。")
+        if shape not in ('hex', 'square'):
+            raise ValueError(f"shape は 'hex' または 'square' を指定してください: {shape}")
+        
+        from src import density
+        
+        lats, lons = density.extract_coordinates(photos)
+        if lats.size == 0:
+            print("⚠️ 密度を表示するにはGPS座標が必要です")
+            return 0
+        
+        colors = self.DENSITY_COLORS
+        bands = []
+        total_cells = 0
+        for zoom in self._density_zoom_levels(zoom_levels):
+            cell_deg = density.cell_size_for_zoom(zoom, cell_pixels)
+            if shape == 'hex':
+                # 六角形の外接円半径（隣接セル中心間の距離が cell_pixels になるように）
+                cells = density.hex_bins(lats, lons, cell_deg / math.sqrt(3))
+            else:
+                cells = density.square_bins(lats, lons, cell_deg)
+            classes = density.count_classes(cells['count'], len(colors))
+            
+            if cells['count'].size > max_cells:
+                print(f"⚠️ ズーム {zoom} のセル数が多すぎるため省略しました（{cells['count'].size} セル）")
+                continue
+            
+            if shape == 'hex':
+                rings = density.hex_polygons(cells['lat'], cells['lon'], cells['size'], cells['lat_scale'])
+            else:
+                rings = density.square_polygons(cells['lat'], cells['lon'], cells['half_lat'], cells['half_lon'])
+            
+            features = [
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                    'properties': {'count': int(count), 'color': colors[int(cls)]}
+                }
+                for ring, count, cls in zip(rings.round(6).tolist(), cells['count'], classes)
+            ]
+            
+            layer = folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': features},
+                style_function=lambda f: {
+                    'fillColor': f['properties']['color'],
+                    'color': '#ffffff',
+                    'weight': 1,
+                    'fillOpacity': 0.7
+                },
+                tooltip=folium.GeoJsonTooltip(fields=['count'], aliases=['📸 写真数']),
+                control=False,
+                show=False
+            )
+            layer.add_to(self.map)
+            bands.append((zoom, layer))
+            total_cells += len(features)
+        
+        ZoomBandSwitcher(bands).add_to(self.map)
+        
+        label = '六角形' if shape == 'hex' else '正方形'
+        print(f"✅ 密度レイヤー（{label}）を追加しました（{lats.size} 件 → {total_cells} セル / {len(bands)} ズーム段階）")
+        return int(lats.size)
+    
     def add_custom_marker(self, lat, lon, label, popup_text=None, color='blue', icon='info-sign'):
         """
         カスタムマーカーを1つ追加
@@ -384,6 +1119,21 @@ class MapGenerator:
             if not visited and not show_unvisited:
                 continue
             
+            if self._compact_layer is not None:
+                self._compact_layer.attractions.append([
+                    round(attraction['latitude'], 6),
+                    round(attraction['longitude'], 6),
+                    attraction['name'],
+                    attraction.get('category', '不明'),
+                    attraction.get('city', ''),
+                    attraction.get('prefecture', ''),
+                    int(attraction.get('rating') or 0),
+                    1 if visited else 0,
+                    (attraction.get('visit_date') or '')[:10],
+                    attraction.get('description') or ''
+                ])
+                continue
+            
             # マーカーの色とアイコンを決定
             if visited:
                 color = 'blue'
@@ -444,6 +1194,20 @@ class MapGenerator:
             # 優先度に応じたアイコンの色
             priority = item.get('priority', 3)
             
+            if self._compact_layer is not None:
+                self._compact_layer.wishlist.append([
+                    round(item['latitude'], 6),
+                    round(item['longitude'], 6),
+                    item['name'],
+                    item.get('category', '不明'),
+                    item.get('city', ''),
+                    item.get('prefecture', ''),
+                    priority,
+                    item.get('notes') or '',
+                    (item.get('planned_date') or '')[:10]
+                ])
+                continue
+            
             # 優先度が高いほど目立つ色
             if priority >= 5:
                 color = 'purple'  # 最優先
@@ -518,6 +1282,27 @@ class MapGenerator:
             ).add_to(self.map)
         
         # マーカーを追加
+        if self._compact_layer is not None:
+            color_index = self._compact_layer.color_index(color)
+            for i, location in enumerate(route, 1):
+                self._compact_layer.route_stops.append([
+                    round(location['latitude'], 6),
+                    round(location['longitude'], 6),
+                    location['name'],
+                    location.get('category', '不明'),
+                    location.get('city', ''),
+                    location.get('prefecture', ''),
+                    location.get('notes') or '',
+                    i,
+                    len(route),
+                    color_index,
+                    1 if show_numbers else 0
+                ])
+            
+            from src.logger import get_logger
+            get_logger().info(f"ルートプレビューマーカー追加: {len(route)}地点")
+            return
+        
         for i, location in enumerate(route, 1):
             # 順序番号のアイコン
             if show_numbers:
@@ -598,7 +1383,10 @@ class MapGenerator:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         # HTML保存
-        self.map.save(str(output_path))
+        if self.compact:
+            output_path.write_text(self.get_map_html(), encoding='utf-8')
+        else:
+            self.map.save(str(output_path))
         
         print(f"✅ マップを保存しました: {output_path}")
         
@@ -614,7 +1402,27 @@ class MapGenerator:
         if self.map is None:
             raise ValueError("マップが作成されていません。")
         
+        if self.compact:
+            # iframe の srcdoc エスケープを避け、ページ全体を縮小して返す
+            return self._minify_html(self.map.get_root().render())
+        
         return self.map._repr_html_()
+    
+    @staticmethod
+    def _minify_html(html: str) -> str:
+        """
+        HTMLを縮小（行頭・行末の空白と空行を除去）
+        
+        改行は残すため、インラインスクリプトの自動セミコロン挿入には影響しない。
+        
+        Args:
+            html (str): HTML文字列
+            
+        Returns:
+            str: 縮小したHTML
+        """
+        lines = (line.strip() for line in html.splitlines())
+        return '\n'.join(line for line in lines if line)
 
 
 def main():
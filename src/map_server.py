@@ -0,0 +1,420 @@
+"""
+マップデータ配信モジュール
+表示範囲内の写真データを返すローカルHTTPエンドポイント（ビューポート遅延読み込み用）
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/map_server.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from src.database import Database
+from src.logger import get_logger
+from src.trajectory import build_segments
+
+
+class MapDataRequestHandler(BaseHTTPRequestHandler):
+	"""/points・/route・/tiles エンドポイントのリクエストハンドラ"""
+
+	server_version = "JourneyMapData/1.0"
+
+	def log_message(self, format, *args):
+		# アクセスログはデバッグレベルでファイルにのみ出力
+		get_logger().debug(f"マップデータ配信: {format % args}")
+
+	def _send_json(self, status: int, payload: Dict[str, Any]):
+		body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json; charset=utf-8")
+		self.send_header("Content-Length", str(len(body)))
+		# マップは srcdoc の iframe（オリジン null）から読み込まれるため CORS を許可
+		self.send_header("Access-Control-Allow-Origin", "*")
+		self.send_header("Cache-Control", "no-store")
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		if url.path == "/points":
+			self._handle_points(parse_qs(url.query))
+		elif url.path == "/route":
+			self._handle_route(parse_qs(url.query))
+		elif url.path.startswith("/tiles/"):
+			self._handle_tile(url.path)
+		elif url.path == "/health":
+			self._send_json(200, {'status': 'ok'})
+		else:
+			self._send_json(404, {'error': 'not found'})
+
+	def _handle_tile(self, path: str):
+		# /tiles/{z}/{x}/{y}.png
+		try:
+			z, x, y = path[len("/tiles/"):].removesuffix(".png").split("/")
+			z, x, y = int(z), int(x), int(y)
+		except ValueError:
+			self._send_json(400, {'error': 'invalid tile path'})
+			return
+
+		data = self.server.get_tile(z, x, y)
+		if data is None:
+			self.send_response(404)
+			self.send_header("Content-Length", "0")
+			self.send_header("Access-Control-Allow-Origin", "*")
+			self.end_headers()
+			return
+
+		self.send_response(200)
+		self.send_header("Content-Type", "image/png")
+		self.send_header("Content-Length", str(len(data)))
+		self.send_header("Access-Control-Allow-Origin", "*")
+		self.send_header("Cache-Control", "max-age=300")
+		self.end_headers()
+		self.wfile.write(data)
+
+	@staticmethod
+	def _parse_view(query: Dict[str, list]):
+		"""表示範囲・ズーム・期間のクエリパラメータを解析（不正な場合は ValueError）"""
+		def param(name, default=None):
+			values = query.get(name)
+			return values[0] if values else default
+
+		try:
+			south = max(float(param('south')), -90.0)
+			north = min(float(param('north')), 90.0)
+			west = max(float(param('west')), -180.0)
+			east = min(float(param('east')), 180.0)
+			zoom = int(float(param('zoom', 10)))
+		except TypeError:
+			raise ValueError("south, west, north, east は必須です")
+
+		return south, west, north, east, zoom, param('start'), param('end')
+
+	def _handle_points(self, query: Dict[str, list]):
+		self._handle_view(query, self.server.query_points)
+
+	def _handle_route(self, query: Dict[str, list]):
+		self._handle_view(query, self.server.query_route)
+
+	def _handle_view(self, query: Dict[str, list], handler):
+		try:
+			view = self._parse_view(query)
+		except ValueError:
+			self._send_json(400, {'error': 'south, west, north, east は必須です'})
+			return
+
+		try:
+			payload = handler(*view)
+		except Exception:
+			get_logger().error("マップデータ配信エラー")
+			self._send_json(500, {'error': 'internal error'})
+			return
+
+		self._send_json(200, payload)
+
+
+class MapDataServer(ThreadingHTTPServer):
+	"""表示範囲内の写真を返すローカルHTTPサーバ"""
+
+	daemon_threads = True
+
+	# ルートの間引き許容量（画面上のピクセル）
+	ROUTE_TOLERANCE_PX = 2
+
+	def __init__(
+		self,
+		host: str = "127.0.0.1",
+		port: int = 0,
+		db_path: str = "data/journeymap.db",
+		max_points: int = 1500,
+		grid_cells: int = 40,
+		mbtiles_path: str = "data/tiles/photos.mbtiles"
+	):
+		"""
+		サーバを初期化
+
+		Args:
+			host: 待ち受けアドレス
+			port: 待ち受けポート（0 で空きポートを自動選択）
+			db_path: データベースファイルのパス
+			max_points: 個別マーカーとして返す最大件数（超過時はグリッド集約）
+			grid_cells: グリッド集約時の表示範囲の分割数（縦方向）
+			mbtiles_path: 事前レンダリング済みタイル（/tiles で配信、プロジェクトルートからの相対パス）
+		"""
+		super().__init__((host, port), MapDataRequestHandler)
+		self.db_path = db_path
+		self.max_points = max_points
+		self.grid_cells = grid_cells
+		mbtiles = Path(mbtiles_path)
+		if not mbtiles.is_absolute():
+			mbtiles = _project_root / mbtiles
+		self.mbtiles_path = mbtiles
+		self._thread: Optional[threading.Thread] = None
+		# 期間ごとの移動軌跡の区間（写真データのシグネチャが変わるまで使い回す）
+		self._route_cache: Dict[Tuple[Optional[str], Optional[str]], Tuple[tuple, Tuple[int, list]]] = {}
+		self._route_lock = threading.Lock()
+
+	@property
+	def url(self) -> str:
+		"""エンドポイントのベースURL"""
+		host, port = self.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def query_points(
+		self,
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		zoom: int,
+		start: str = None,
+		end: str = None
+	) -> Dict[str, Any]:
+		"""
+		表示範囲内の写真を取得（件数が多い場合はグリッド集約）
+
+		Returns:
+			{'type': 'points', 'points': [[id, lat, lon, name, timestamp, file_type], ...]}
+			または {'type': 'clusters', 'clusters': [[lat, lon, count], ...]}
+		"""
+		# リクエストごとに接続を分ける（ハンドラはスレッドで並行実行される）
+		db = Database(self.db_path)
+		count = db.count_photos_in_bounds(south, west, north, east, start, end)
+
+		if count <= self.max_points or zoom >= 17:
+			photos = db.get_photos_in_bounds(
+				south, west, north, east, start, end, limit=self.max_points
+			)
+			return {
+				'type': 'points',
+				'total': count,
+				'points': [
+					[
+						p['id'],
+						round(p['latitude'], 6),
+						round(p['longitude'], 6),
+						Path(p['file_path']).name,
+						p['timestamp'] or '不明',
+						p['file_type']
+					]
+					for p in photos
+				]
+			}
+
+		cell_size = max(north - south, 1e-6) / self.grid_cells
+		cells = db.get_photo_grid_in_bounds(south, west, north, east, cell_size, start, end)
+		return {
+			'type': 'clusters',
+			'total': count,
+			'clusters': [
+				[round(c['latitude'], 6), round(c['longitude'], 6), c['count']]
+				for c in cells
+			]
+		}
+
+	def _route_segments(self, start: str = None, end: str = None) -> Tuple[int, List[Tuple[str, np.ndarray]]]:
+		"""
+		期間内の移動軌跡の区間をキャッシュ付きで取得
+
+		trajectory.build_segments() で誤測位を除き、撮影間隔の長い箇所と
+		移動手段が変わる箇所で分ける（インライン描画・タイルと同じ区間）。
+
+		Returns:
+			(撮影日時のある地点数, [(移動手段, 座標配列 shape=(n, 2)), ...])
+		"""
+		db = Database(self.db_path)
+		signature = db.get_photos_signature(start, end)
+		key = (start, end)
+
+		with self._route_lock:
+			cached = self._route_cache.get(key)
+			if cached is not None and cached[0] == signature:
+				return cached[1]
+
+		rows = db.get_route_points(start, end)
+		trajectory = build_segments([
+			{'latitude': lat, 'longitude': lon, 'timestamp': timestamp}
+			for lat, lon, timestamp in rows
+		])
+		segments = (len(rows), [
+			(segment['mode'], np.array(segment['coordinates'], dtype=float).reshape(-1, 2))
+			for segment in trajectory['segments']
+		])
+		with self._route_lock:
+			self._route_cache[key] = (signature, segments)
+		return segments
+
+	def _visible_runs(
+		self,
+		coords: np.ndarray,
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		zoom: int
+	) -> List[list]:
+		"""1区間の座標を間引き、表示範囲にかかる部分を線のリストにして返す"""
+		# ズームに応じたグリッドで連続する同一セルの点を省く
+		cell = 360.0 / (256 * 2 ** max(zoom, 0)) * self.ROUTE_TOLERANCE_PX
+		cells = np.floor(coords / cell).astype(np.int64)
+		keep = np.ones(len(coords), dtype=bool)
+		keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+		keep[-1] = True
+		coords = coords[keep]
+		if len(coords) < 2:
+			return []
+
+		# 表示範囲と外接矩形が交差する区間（点 i → i+1）だけを残す
+		pad_lat = (north - south) * 0.1
+		pad_lon = (east - west) * 0.1
+		a, b = coords[:-1], coords[1:]
+		visible = (
+			(np.minimum(a[:, 0], b[:, 0]) <= north + pad_lat)
+			& (np.maximum(a[:, 0], b[:, 0]) >= south - pad_lat)
+			& (np.minimum(a[:, 1], b[:, 1]) <= east + pad_lon)
+			& (np.maximum(a[:, 1], b[:, 1]) >= west - pad_lon)
+		)
+
+		# 連続する可視区間を1本の線にまとめる
+		lines = []
+		indices = np.flatnonzero(visible)
+		if indices.size:
+			breaks = np.flatnonzero(np.diff(indices) > 1) + 1
+			for run in np.split(indices, breaks):
+				lines.append(coords[run[0]:run[-1] + 2].round(6).tolist())
+		return lines
+
+	def query_route(
+		self,
+		south: float,
+		west: float,
+		north: float,
+		east: float,
+		zoom: int,
+		start: str = None,
+		end: str = None
+	) -> Dict[str, Any]:
+		"""
+		表示範囲にかかる移動ルートを取得（区間ごとの線、ズームに応じて間引き）
+
+		誤測位を除いた軌跡を撮影間隔の長い箇所・移動手段の変わる箇所で分け、
+		区間ごとに画面上で ROUTE_TOLERANCE_PX 未満しか動かない連続点を省いて、
+		表示範囲（周囲に少し余白）と交差する部分だけを返す。
+
+		Returns:
+			{'type': 'route', 'total': 全地点数, 'lines': [[[lat, lon], ...], ...], 'modes': [移動手段, ...]}
+			（modes は lines と同じ順の 'walk' / 'drive' / 'flight'）
+		"""
+		total, segments = self._route_segments(start, end)
+		lines, modes = [], []
+		for mode, coords in segments:
+			for line in self._visible_runs(coords, south, west, north, east, zoom):
+				lines.append(line)
+				modes.append(mode)
+		return {'type': 'route', 'total': total, 'lines': lines, 'modes': modes}
+
+	@property
+	def tiles_url(self) -> str:
+		"""事前レンダリング済みタイルの URL テンプレート（Leaflet 形式）"""
+		return f"{self.url}/tiles/{{z}}/{{x}}/{{y}}.png"
+
+	def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+		"""MBTiles からタイルを取得（ファイルがない場合は None）"""
+		if not self.mbtiles_path.exists():
+			return None
+
+		from src.tile_renderer import MBTilesStore
+
+		store = MBTilesStore(self.mbtiles_path)
+		try:
+			return store.get_tile(z, x, y)
+		finally:
+			store.close()
+
+	def start(self) -> str:
+		"""
+		バックグラウンドスレッドで起動
+
+		Returns:
+			エンドポイントのベースURL
+		"""
+		if self._thread is None:
+			self._thread = threading.Thread(
+				target=self.serve_forever,
+				name="MapDataServer",
+				daemon=True
+			)
+			self._thread.start()
+			get_logger().info(f"マップデータ配信サーバを起動: {self.url}")
+		return self.url
+
+	def stop(self):
+		"""サーバを停止"""
+		if self._thread is not None:
+			self.shutdown()
+			self._thread.join(timeout=5)
+			self._thread = None
+		self.server_close()
+
+
+# 共有サーバインスタンス（Streamlit の再実行間で使い回す）
+_server_instance: Optional[MapDataServer] = None
+_server_lock = threading.Lock()
+
+
+def get_map_data_server(port: int = 0) -> MapDataServer:
+	"""
+	起動済みの共有マップデータサーバを取得（未起動なら起動）
+
+	Args:
+		port: 待ち受けポート（既定の 0 で空きポートを自動選択、URL は server.url で取得）
+	"""
+	global _server_instance
+	with _server_lock:
+		if _server_instance is None:
+			server = MapDataServer(port=port)
+			server.start()
+			_server_instance = server
+	return _server_instance
+
+
+def main():
+	"""スタンドアロン起動用メイン関数"""
+	import argparse
+
+	parser = argparse.ArgumentParser(description="JourneyMap マップデータ配信サーバ")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765, help="待ち受けポート（0 で空きポートを自動選択）")
+	parser.add_argument("--db", default="data/journeymap.db")
+	parser.add_argument("--mbtiles", default="data/tiles/photos.mbtiles")
+	args = parser.parse_args()
+
+	server = MapDataServer(
+		host=args.host,
+		port=args.port,
+		db_path=args.db,
+		mbtiles_path=args.mbtiles
+	)
+	print(f"🌐 マップデータ配信サーバ: {server.url}/points")
+	print(f"🧭 移動ルート: {server.url}/route")
+	print(f"🗺️ 写真オーバーレイタイル: {server.tiles_url}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,387 @@
+"""
+オフライン逆ジオコーディングモジュール
+ローカルの地名辞書（GeoNames 形式）を KD 木に読み込み、
+座標配列から都市名・都道府県名・国名をまとめて取得する（外部サービス不要）
+
+地名辞書は同梱していないため、GeoNames から取得して data/gazetteer/ に置く:
+	https://download.geonames.org/export/dump/cities1000.zip（cities1000.txt）
+	https://download.geonames.org/export/dump/admin1CodesASCII.txt
+	https://download.geonames.org/export/dump/countryInfo.txt
+	（任意）alternatenames/JP.zip など言語別の地名（alternateNamesV2 形式）
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/offline_geocoder.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.geo import chord_to_km, unit_vectors
+from src.logger import get_logger
+
+try:
+	from scipy.spatial import cKDTree
+except Exception:
+	# scipy がない環境では NumPy の総当たり（分割して比較）を使う
+	cKDTree = None
+
+
+# 既定の地名辞書の置き場所（先に見つかったものを使う）
+DEFAULT_GAZETTEER_FILES = (
+	"data/gazetteer/gazetteer.npz",
+	"data/gazetteer/cities500.txt",
+	"data/gazetteer/cities1000.txt",
+	"data/gazetteer/cities5000.txt",
+	"data/gazetteer/cities15000.txt"
+)
+
+# 地名辞書と同じディレクトリから自動で読み込む補助ファイル
+ADMIN1_FILE = "admin1CodesASCII.txt"
+COUNTRY_FILE = "countryInfo.txt"
+ALTERNATE_NAME_FILES = ("alternateNamesV2.txt", "alternateNames.txt", "JP.txt")
+
+# 最寄りの地名がこれより遠い場合は該当なし（海上など）とする
+DEFAULT_MAX_DISTANCE_KM = 50.0
+
+
+def _read_tsv(path: Path):
+	"""GeoNames のタブ区切りファイルを1行ずつ読む（# で始まるコメント行は除く）"""
+	with open(path, 'r', encoding='utf-8') as f:
+		for line in f:
+			if not line.strip() or line.startswith('#'):
+				continue
+			yield line.rstrip('\n').split('\t')
+
+
+class OfflineGeocoder:
+	"""地名辞書による逆ジオコーディング（ReverseGeocoder と同じ形式の結果を返す）"""
+
+	def __init__(
+		self,
+		lats: np.ndarray,
+		lons: np.ndarray,
+		cities: np.ndarray,
+		admin1: np.ndarray,
+		countries: np.ndarray,
+		max_distance_km: float = DEFAULT_MAX_DISTANCE_KM
+	):
+		"""
+		オフライン逆ジオコーダーを初期化
+
+		Args:
+			lats: 地名の緯度配列
+			lons: 地名の経度配列
+			cities: 地名（都市・町村名）の配列
+			admin1: 都道府県・州名の配列
+			countries: 国名の配列
+			max_distance_km: これより遠い地名しかない地点は該当なしとする
+		"""
+		self.logger = get_logger()
+		self.lats = np.asarray(lats, dtype=np.float64)
+		self.lons = np.asarray(lons, dtype=np.float64)
+		self.cities = np.asarray(cities)
+		self.admin1 = np.asarray(admin1)
+		self.countries = np.asarray(countries)
+		self.max_distance_km = max_distance_km
+
+		self._points = unit_vectors(self.lats, self.lons)
+		self._tree = cKDTree(self._points) if cKDTree is not None else None
+
+	@classmethod
+	def from_geonames(
+		cls,
+		cities_path,
+		admin1_path=None,
+		country_path=None,
+		alternate_names_path=None,
+		language: str = 'ja'
+	) -> "OfflineGeocoder":
+		"""
+		GeoNames のダンプファイルから読み込む
+
+		Args:
+			cities_path: cities500.txt などの地名ファイル
+			admin1_path: admin1CodesASCII.txt（都道府県・州名）
+			country_path: countryInfo.txt（国名）
+			alternate_names_path: alternateNamesV2 形式の別名ファイル（language の名前を優先する）
+			language: 別名ファイルから採用する言語コード
+
+		Returns:
+			OfflineGeocoder
+		"""
+		# 都市: geonameid, name, ..., latitude(4), longitude(5), ..., country code(8), admin1 code(10)
+		ids, lats, lons, names, country_codes, admin1_codes = [], [], [], [], [], []
+		for cols in _read_tsv(Path(cities_path)):
+			if len(cols) < 11:
+				continue
+			ids.append(int(cols[0]))
+			names.append(cols[1])
+			lats.append(float(cols[4]))
+			lons.append(float(cols[5]))
+			country_codes.append(cols[8])
+			admin1_codes.append(f"{cols[8]}.{cols[10]}")
+
+		# 都道府県・州: "JP.40", name, ascii name, geonameid
+		admin1_names: Dict[str, Tuple[str, int]] = {}
+		if admin1_path and Path(admin1_path).exists():
+			for cols in _read_tsv(Path(admin1_path)):
+				if len(cols) >= 4:
+					admin1_names[cols[0]] = (cols[1], int(cols[3]) if cols[3] else 0)
+
+		# 国: ISO(0), ..., Country(4), ..., geonameid(16)
+		country_names: Dict[str, Tuple[str, int]] = {}
+		if country_path and Path(country_path).exists():
+			for cols in _read_tsv(Path(country_path)):
+				if len(cols) >= 17:
+					country_names[cols[0]] = (cols[4], int(cols[16]) if cols[16] else 0)
+
+		# 別名: alternateNameId, geonameid, isolanguage, alternate name, isPreferredName, isShortName, ...
+		localized: Dict[int, str] = {}
+		if alternate_names_path and Path(alternate_names_path).exists():
+			wanted = set(ids)
+			wanted.update(geoname_id for _, geoname_id in admin1_names.values())
+			wanted.update(geoname_id for _, geoname_id in country_names.values())
+			preferred = set()
+			for cols in _read_tsv(Path(alternate_names_path)):
+				if len(cols) < 4 or cols[2] != language:
+					continue
+				geoname_id = int(cols[1])
+				if geoname_id not in wanted or geoname_id in preferred:
+					continue
+				localized[geoname_id] = cols[3]
+				if len(cols) > 4 and cols[4] == '1':
+					preferred.add(geoname_id)
+
+		def display(name: str, geoname_id: int) -> str:
+			return localized.get(geoname_id, name)
+
+		cities = [display(name, geoname_id) for name, geoname_id in zip(names, ids)]
+		admin1 = [
+			display(*admin1_names[code]) if code in admin1_names else ''
+			for code in admin1_codes
+		]
+		countries = [
+			display(*country_names[code]) if code in country_names else code
+			for code in country_codes
+		]
+
+		geocoder = cls(lats, lons, np.array(cities), np.array(admin1), np.array(countries))
+		geocoder.logger.info(f"地名辞書読み込み: {cities_path}（{len(cities)}件）")
+		return geocoder
+
+	@classmethod
+	def load(cls, path, language: str = 'ja') -> "OfflineGeocoder":
+		"""
+		.npz（変換済み）または GeoNames の .txt を読み込む
+
+		.txt の場合は同じディレクトリの admin1CodesASCII.txt・countryInfo.txt・
+		別名ファイルがあれば一緒に読み込む。
+		"""
+		path = Path(path)
+		if path.suffix == '.npz':
+			data = np.load(path)
+			geocoder = cls(data['lats'], data['lons'], data['cities'], data['admin1'], data['countries'])
+			geocoder.logger.info(f"地名辞書読み込み: {path}（{len(geocoder.lats)}件）")
+			return geocoder
+
+		directory = path.parent
+		alternate_names = next(
+			(directory / name for name in ALTERNATE_NAME_FILES if (directory / name).exists()),
+			None
+		)
+		return cls.from_geonames(
+			path,
+			admin1_path=directory / ADMIN1_FILE,
+			country_path=directory / COUNTRY_FILE,
+			alternate_names_path=alternate_names,
+			language=language
+		)
+
+	def save(self, path):
+		"""地名辞書を .npz で保存（次回以降はテキストの解析が不要）"""
+		Path(path).parent.mkdir(parents=True, exist_ok=True)
+		np.savez_compressed(
+			path,
+			lats=self.lats,
+			lons=self.lons,
+			cities=self.cities,
+			admin1=self.admin1,
+			countries=self.countries
+		)
+
+	def nearest(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		各地点に最も近い地名を検索（1回のベクトル化された問い合わせ）
+
+		Args:
+			lats: 緯度配列
+			lons: 経度配列
+
+		Returns:
+			(地名のインデックス配列, 距離（km）配列)
+		"""
+		queries = unit_vectors(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+
+		if self._tree is not None:
+			chords, index = self._tree.query(queries)
+		else:
+			index = np.zeros(len(queries), dtype=np.int64)
+			best = np.full(len(queries), -np.inf)
+			# 内積が最大 = 最も近い。メモリを抑えるため地名を分割して比較
+			chunk = max(1, 2_000_000 // max(len(queries), 1))
+			for start in range(0, len(self._points), chunk):
+				dots = queries @ self._points[start:start + chunk].T
+				idx = np.argmax(dots, axis=1)
+				value = dots[np.arange(len(queries)), idx]
+				better = value > best
+				best[better] = value[better]
+				index[better] = idx[better] + start
+			chords = np.sqrt(np.maximum(2.0 - 2.0 * best, 0.0))
+
+		# 弦の長さ → 大圏距離
+		distances = chord_to_km(chords)
+		return np.asarray(index, dtype=np.int64), distances
+
+	def reverse_geocode_many(self, lats, lons) -> List[Optional[Dict[str, str]]]:
+		"""
+		複数の座標をまとめて逆ジオコーディング
+
+		Args:
+			lats: 緯度配列
+			lons: 経度配列
+
+		Returns:
+			地点ごとの場所情報（reverse_geocode と同じ形式、該当なしは None）
+		"""
+		if len(lats) == 0 or len(self.lats) == 0:
+			return [None] * len(lats)
+
+		index, distances = self.nearest(lats, lons)
+		found = distances <= self.max_distance_km if self.max_distance_km else np.ones(len(index), dtype=bool)
+
+		results: List[Optional[Dict[str, str]]] = []
+		# 同じ地名を何度も組み立てないよう、出現した地名ごとに1度だけ辞書を作る
+		built: Dict[int, Dict[str, str]] = {}
+		for i, ok in zip(index.tolist(), found.tolist()):
+			if not ok:
+				results.append(None)
+				continue
+			if i not in built:
+				city = str(self.cities[i])
+				prefecture = str(self.admin1[i])
+				country = str(self.countries[i])
+				address = ", ".join(part for part in (city, prefecture, country) if part)
+				built[i] = {
+					'display_name': address,
+					'city': city,
+					'prefecture': prefecture,
+					'country': country,
+					'address': address
+				}
+			results.append(built[i])
+		return results
+
+	def reverse_geocode(
+		self,
+		latitude: float,
+		longitude: float,
+		language: str = 'ja',
+		timeout: int = 5
+	) -> Optional[Dict[str, str]]:
+		"""
+		GPS座標から場所名を取得（ReverseGeocoder.reverse_geocode と同じ呼び出し方）
+
+		language・timeout は互換性のための引数で、使用しない。
+		"""
+		return self.reverse_geocode_many([latitude], [longitude])[0]
+
+	def batch_reverse_geocode(
+		self,
+		coordinates: list,
+		language: str = 'ja',
+		max_requests: int = None
+	) -> Dict[str, Dict[str, str]]:
+		"""
+		複数の座標をバッチで逆ジオコーディング（ReverseGeocoder.batch_reverse_geocode と同じ形式）
+
+		Args:
+			coordinates: 座標のリスト [(lat, lon), ...]
+			language: 互換性のための引数（使用しない）
+			max_requests: 互換性のための引数（オフラインのため制限なし）
+
+		Returns:
+			座標をキーとした場所情報の辞書
+		"""
+		if not coordinates:
+			return {}
+		lats, lons = np.asarray(coordinates, dtype=np.float64).T
+		return {
+			f"{lat:.2f},{lon:.2f}": info
+			for (lat, lon), info in zip(coordinates, self.reverse_geocode_many(lats, lons))
+			if info is not None
+		}
+
+
+# 共有インスタンス（Streamlit の再実行間で使い回す）
+_geocoder_instances: Dict[str, OfflineGeocoder] = {}
+_geocoder_lock = threading.Lock()
+
+
+def find_gazetteer_file() -> Optional[Path]:
+	"""既定の置き場所にある地名辞書ファイル"""
+	for name in DEFAULT_GAZETTEER_FILES:
+		path = _project_root / name
+		if path.exists():
+			return path
+	return None
+
+
+def get_offline_geocoder(path=None) -> Optional[OfflineGeocoder]:
+	"""
+	オフライン逆ジオコーダーを取得（初回のみ読み込み）
+
+	Args:
+		path: 地名辞書のパス（省略時は DEFAULT_GAZETTEER_FILES から探す）
+
+	Returns:
+		OfflineGeocoder（地名辞書がない場合は None）
+	"""
+	path = Path(path) if path else find_gazetteer_file()
+	if path is None or not path.exists():
+		return None
+
+	with _geocoder_lock:
+		geocoder = _geocoder_instances.get(str(path))
+		if geocoder is None:
+			geocoder = OfflineGeocoder.load(path)
+			_geocoder_instances[str(path)] = geocoder
+	return geocoder
+
+
+def main():
+	"""GeoNames のダンプを .npz に変換"""
+	import argparse
+
+	parser = argparse.ArgumentParser(description="GeoNames の地名ファイルを JourneyMap 用に変換")
+	parser.add_argument("input", help="cities1000.txt などの地名ファイル")
+	parser.add_argument("--output", default="data/gazetteer/gazetteer.npz")
+	parser.add_argument("--language", default="ja", help="別名ファイルから採用する言語")
+	args = parser.parse_args()
+
+	geocoder = OfflineGeocoder.load(args.input, language=args.language)
+	output = Path(args.output)
+	if not output.is_absolute():
+		output = _project_root / output
+	geocoder.save(output)
+	print(f"✅ 地名辞書を保存: {output}（{len(geocoder.lats)}件）")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,686 @@
+"""
+道路ネットワークモジュール
+ローカルの OSM 抽出データ（GeoJSON / PBF）から道路グラフを作り、
+ネットワーク上の距離・移動時間を計算する（外部サービス不要）
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/road_network.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import hashlib
+import heapq
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.geo import haversine_km, unit_vectors
+from src.logger import get_logger
+
+try:
+	from scipy.sparse import csr_matrix
+	from scipy.sparse.csgraph import dijkstra as _scipy_dijkstra
+	from scipy.spatial import cKDTree
+except Exception:
+	# scipy がない環境では純 Python / NumPy の実装を使う
+	csr_matrix = None
+	_scipy_dijkstra = None
+	cKDTree = None
+
+try:
+	import osmium
+except Exception:
+	# PBF を読む場合のみ必要（pip install osmium）
+	osmium = None
+
+
+# 道路種別ごとの既定速度（km/h）。ここにない種別（歩道・自転車道など）は読み込まない
+HIGHWAY_SPEEDS = {
+	'motorway': 80, 'motorway_link': 50,
+	'trunk': 60, 'trunk_link': 40,
+	'primary': 50, 'primary_link': 35,
+	'secondary': 40, 'secondary_link': 30,
+	'tertiary': 35, 'tertiary_link': 25,
+	'unclassified': 30, 'residential': 25,
+	'living_street': 10, 'service': 15,
+	'road': 30, 'track': 15
+}
+
+# 道路から離れた地点との間の移動（道路までの直線）に使う速度（km/h）
+ACCESS_SPEED_KMH = 20.0
+
+# 道路でつながっていない地点間は直線距離にこの係数を掛けて補う
+DETOUR_FACTOR = 1.3
+
+# A* の下界・多対多探索の上界に使うランドマークの数
+LANDMARK_COUNT = 8
+
+# 既定の道路データの置き場所（プロジェクトルートからの相対パス、先にあるものを優先）
+DEFAULT_ROAD_FILES = ("data/roads/roads.npz", "data/roads/roads.geojson", "data/roads/roads.osm.pbf")
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+	"""ハバーサイン距離（m）。NumPy 配列でもスカラーでも可"""
+	return haversine_km(lat1, lon1, lat2, lon2) * 1000.0
+
+
+def _parse_maxspeed(value) -> Optional[float]:
+	"""OSM の maxspeed タグ（'50', '30 mph' など）を km/h に変換"""
+	if value is None:
+		return None
+	text = str(value).strip().lower()
+	try:
+		if text.endswith('mph'):
+			return float(text[:-3]) * 1.609
+		return float(text.split()[0])
+	except (ValueError, IndexError):
+		return None
+
+
+def _oneway(value) -> int:
+	"""oneway タグ → 1（順方向のみ）/ -1（逆方向のみ）/ 0（両方向）"""
+	text = str(value).strip().lower() if value is not None else ''
+	if text in ('yes', 'true', '1'):
+		return 1
+	if text == '-1':
+		return -1
+	return 0
+
+
+class _RoadWayHandler(osmium.SimpleHandler if osmium is not None else object):
+	"""PBF から道路の way を集めるハンドラ"""
+
+	def __init__(self):
+		super().__init__()
+		self.ways: List[Tuple[List[Tuple[float, float]], str, Any, Any]] = []
+
+	def way(self, w):
+		highway = w.tags.get('highway')
+		if highway not in HIGHWAY_SPEEDS:
+			return
+		coords = [(n.lon, n.lat) for n in w.nodes if n.location.valid()]
+		if len(coords) >= 2:
+			self.ways.append((coords, highway, w.tags.get('maxspeed'), w.tags.get('oneway')))
+
+
+def _dijkstra_csr(
+	indptr: np.ndarray,
+	indices: np.ndarray,
+	weights: np.ndarray,
+	source: int,
+	targets: Optional[Iterable[int]] = None,
+	limit: float = math.inf
+) -> Dict[int, float]:
+	"""
+	CSR グラフ上の Dijkstra 法（純 Python 版）
+
+	targets を指定した場合は、すべての目的地が確定した時点で打ち切る。
+	limit を超える距離のノードは探索しない。
+
+	Returns:
+		ノード → 最短距離 の辞書（確定したノードのみ）
+	"""
+	remaining = set(targets) if targets is not None else None
+	settled: Dict[int, float] = {}
+	best = {source: 0.0}
+	heap = [(0.0, source)]
+	while heap:
+		d, u = heapq.heappop(heap)
+		if u in settled:
+			continue
+		settled[u] = d
+		if remaining is not None:
+			remaining.discard(u)
+			if not remaining:
+				break
+		for k in range(indptr[u], indptr[u + 1]):
+			v = indices[k]
+			nd = d + weights[k]
+			if nd <= limit and nd < best.get(v, math.inf):
+				best[v] = nd
+				heapq.heappush(heap, (nd, v))
+	return settled
+
+
+class RoadNetwork:
+	"""CSR 形式の道路グラフ"""
+
+	def __init__(
+		self,
+		node_lats: np.ndarray,
+		node_lons: np.ndarray,
+		edge_src: np.ndarray,
+		edge_dst: np.ndarray,
+		edge_length_m: np.ndarray,
+		edge_time_s: np.ndarray,
+		metric: str = 'distance'
+	):
+		"""
+		グラフを構築
+
+		Args:
+			node_lats, node_lons: ノードの座標
+			edge_src, edge_dst: 有向辺の始点・終点ノード番号
+			edge_length_m: 辺の長さ（m）
+			edge_time_s: 辺の所要時間（秒）
+			metric: distance_matrix() が返す値（'distance' = km, 'time' = 分）
+		"""
+		self.logger = get_logger()
+		self.node_lats = np.asarray(node_lats, dtype=np.float64)
+		self.node_lons = np.asarray(node_lons, dtype=np.float64)
+		self.metric = metric
+
+		n = len(self.node_lats)
+		order = np.argsort(edge_src, kind='stable')
+		self.indices = np.asarray(edge_dst, dtype=np.int32)[order]
+		self.length_m = np.asarray(edge_length_m, dtype=np.float32)[order]
+		self.time_s = np.asarray(edge_time_s, dtype=np.float32)[order]
+		self.indptr = np.zeros(n + 1, dtype=np.int64)
+		np.cumsum(np.bincount(edge_src, minlength=n), out=self.indptr[1:])
+
+		self._edge_src = np.asarray(edge_src, dtype=np.int32)[order]
+		self._tree = None
+		self._landmarks: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+		self._lock = threading.Lock()
+
+		# グラフは構築後に変わらないので識別子は一度だけ計算する
+		# （距離・時間・座標のどれが変わっても行列が変わるため全体を含める）
+		digest = hashlib.sha1()
+		for array in (self.indptr, self.indices, self.length_m, self.time_s, self.node_lats, self.node_lons):
+			digest.update(np.ascontiguousarray(array).tobytes())
+		self._graph_digest = digest.hexdigest()[:16]
+
+	# ------------------------------------------------------------------
+	# 読み込み
+	# ------------------------------------------------------------------
+
+	@classmethod
+	def _from_ways(
+		cls,
+		ways: Iterable[Tuple[List[Tuple[float, float]], str, Any, Any]],
+		metric: str = 'distance'
+	) -> "RoadNetwork":
+		"""(座標列, highway, maxspeed, oneway) の列からグラフを作る"""
+		node_ids: Dict[Tuple[int, int], int] = {}
+		lats: List[float] = []
+		lons: List[float] = []
+		src: List[int] = []
+		dst: List[int] = []
+		speeds: List[float] = []
+
+		def node_id(lon: float, lat: float) -> int:
+			# 約1cm単位で同じ座標を同じノードとみなす（交差点の接続）
+			key = (round(lon * 1e7), round(lat * 1e7))
+			nid = node_ids.get(key)
+			if nid is None:
+				nid = len(lats)
+				node_ids[key] = nid
+				lats.append(lat)
+				lons.append(lon)
+			return nid
+
+		for coords, highway, maxspeed, oneway in ways:
+			speed = _parse_maxspeed(maxspeed) or HIGHWAY_SPEEDS.get(highway, 30)
+			direction = _oneway(oneway)
+			ids = [node_id(lon, lat) for lon, lat in coords]
+			for a, b in zip(ids, ids[1:]):
+				if a == b:
+					continue
+				if direction >= 0:
+					src.append(a)
+					dst.append(b)
+					speeds.append(speed)
+				if direction <= 0:
+					src.append(b)
+					dst.append(a)
+					speeds.append(speed)
+
+		node_lats = np.array(lats, dtype=np.float64)
+		node_lons = np.array(lons, dtype=np.float64)
+		edge_src = np.array(src, dtype=np.int64)
+		edge_dst = np.array(dst, dtype=np.int64)
+		length_m = _haversine_m(node_lats[edge_src], node_lons[edge_src], node_lats[edge_dst], node_lons[edge_dst])
+		time_s = length_m / (np.array(speeds, dtype=np.float64) / 3.6)
+
+		return cls(node_lats, node_lons, edge_src, edge_dst, length_m, time_s, metric=metric)
+
+	@classmethod
+	def from_geojson(cls, path, metric: str = 'distance') -> "RoadNetwork":
+		"""
+		GeoJSON（LineString / MultiLineString、properties に highway 等）から読み込む
+
+		Args:
+			path: GeoJSON ファイルのパス
+			metric: 'distance' または 'time'
+		"""
+		with open(path, 'r', encoding='utf-8') as f:
+			data = json.load(f)
+
+		def ways():
+			for feature in data.get('features', []):
+				geometry = feature.get('geometry') or {}
+				props = feature.get('properties') or {}
+				highway = props.get('highway')
+				if highway not in HIGHWAY_SPEEDS:
+					continue
+				if geometry.get('type') == 'LineString':
+					lines = [geometry['coordinates']]
+				elif geometry.get('type') == 'MultiLineString':
+					lines = geometry['coordinates']
+				else:
+					continue
+				for line in lines:
+					if len(line) >= 2:
+						yield [(c[0], c[1]) for c in line], highway, props.get('maxspeed'), props.get('oneway')
+
+		network = cls._from_ways(ways(), metric=metric)
+		network.logger.info(f"道路ネットワーク読み込み: {path}（{network.node_count}ノード, {network.edge_count}辺）")
+		return network
+
+	@classmethod
+	def from_pbf(cls, path, metric: str = 'distance') -> "RoadNetwork":
+		"""
+		OSM PBF から読み込む（osmium が必要）
+
+		Args:
+			path: .osm.pbf ファイルのパス
+			metric: 'distance' または 'time'
+		"""
+		if osmium is None:
+			raise RuntimeError("PBF の読み込みには osmium が必要です（pip install osmium）")
+
+		handler = _RoadWayHandler()
+		handler.apply_file(str(path), locations=True)
+		network = cls._from_ways(handler.ways, metric=metric)
+		network.logger.info(f"道路ネットワーク読み込み: {path}（{network.node_count}ノード, {network.edge_count}辺）")
+		return network
+
+	@classmethod
+	def load(cls, path, metric: str = 'distance') -> "RoadNetwork":
+		"""拡張子に応じて .npz / .geojson / .pbf を読み込む"""
+		name = str(path).lower()
+		if name.endswith('.npz'):
+			data = np.load(path)
+			network = cls(
+				data['node_lats'], data['node_lons'],
+				data['edge_src'], data['edge_dst'],
+				data['length_m'], data['time_s'],
+				metric=metric
+			)
+			network.logger.info(f"道路ネットワーク読み込み: {path}（{network.node_count}ノード, {network.edge_count}辺）")
+			return network
+		if name.endswith('.pbf'):
+			return cls.from_pbf(path, metric=metric)
+		return cls.from_geojson(path, metric=metric)
+
+	def save(self, path):
+		"""CSR グラフを .npz で保存（次回以降は GeoJSON / PBF の解析が不要）"""
+		Path(path).parent.mkdir(parents=True, exist_ok=True)
+		np.savez_compressed(
+			path,
+			node_lats=self.node_lats,
+			node_lons=self.node_lons,
+			edge_src=self._edge_src,
+			edge_dst=self.indices,
+			length_m=self.length_m,
+			time_s=self.time_s
+		)
+
+	@property
+	def node_count(self) -> int:
+		return len(self.node_lats)
+
+	@property
+	def edge_count(self) -> int:
+		return len(self.indices)
+
+	@property
+	def cache_token(self) -> str:
+		"""距離行列キャッシュ用の識別子（グラフと指標が同じなら同じ値）"""
+		return f"road:{self.metric}:{self._graph_digest}"
+
+	# ------------------------------------------------------------------
+	# 最寄りノード
+	# ------------------------------------------------------------------
+
+	def nearest_nodes(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		各地点の最寄りノード
+
+		Returns:
+			(ノード番号配列, 地点からノードまでの距離（m）配列)
+		"""
+		lats = np.asarray(lats, dtype=np.float64)
+		lons = np.asarray(lons, dtype=np.float64)
+		queries = unit_vectors(lats, lons)
+
+		if cKDTree is not None:
+			with self._lock:
+				if self._tree is None:
+					self._tree = cKDTree(unit_vectors(self.node_lats, self.node_lons))
+			_, nodes = self._tree.query(queries)
+		else:
+			points = unit_vectors(self.node_lats, self.node_lons)
+			nodes = np.empty(len(queries), dtype=np.int64)
+			# 内積が最大 = 最も近い。メモリを抑えるためノードを分割して比較
+			chunk = max(1, 2_000_000 // max(len(queries), 1))
+			best = np.full(len(queries), -np.inf)
+			for start in range(0, len(points), chunk):
+				dots = queries @ points[start:start + chunk].T
+				idx = np.argmax(dots, axis=1)
+				value = dots[np.arange(len(queries)), idx]
+				better = value > best
+				best[better] = value[better]
+				nodes[better] = idx[better] + start
+
+		nodes = np.asarray(nodes, dtype=np.int64)
+		offsets = _haversine_m(lats, lons, self.node_lats[nodes], self.node_lons[nodes])
+		return nodes, offsets
+
+	# ------------------------------------------------------------------
+	# 多対多の距離・時間
+	# ------------------------------------------------------------------
+
+	def _weights(self, metric: str) -> np.ndarray:
+		return self.length_m if metric == 'distance' else self.time_s
+
+	def _search_limits(self, sources: np.ndarray, targets: np.ndarray, metric: str) -> np.ndarray:
+		"""
+		出発ノードごとの探索半径（すべての目的地までの最短距離の上界）
+
+		ランドマーク L を経由する距離 d(s,L) + d(L,t) は d(s,t) の上界になるので、
+		その最大値より遠いノードは探索しなくてよい。経由できない目的地がある
+		出発ノードは inf（打ち切らない）。
+		"""
+		forward, backward = self._prepare_landmarks(metric)
+		# (ランドマーク, 出発, 目的地) の上界を作らないよう、ランドマークごとに最小値を更新
+		bounds = np.full((len(sources), len(targets)), np.inf)
+		for to_landmark, from_landmark in zip(backward[:, sources], forward[:, targets]):
+			np.minimum(bounds, to_landmark[:, None] + from_landmark[None, :], out=bounds)
+		if not len(targets):
+			return np.zeros(len(sources))
+		# 経路の足し合わせ順による丸め誤差で目的地を取りこぼさないよう少し広げる
+		return bounds.max(axis=1) * (1 + 1e-9) + 1e-6
+
+	def _many_to_many(self, sources: np.ndarray, targets: np.ndarray, metric: str) -> np.ndarray:
+		"""
+		ノード間の最短距離（m）/ 時間（秒）行列。到達できない組は inf
+
+		出発ノードごとの探索は、ランドマーク経由の上界（_search_limits）より
+		遠いノードを打ち切る（地点が狭い範囲に集まっていれば広域の道路網を探索しない）。
+		ランドマークの前計算は出発ノードが多い場合か、計算済みの場合のみ使う。
+		"""
+		weights = self._weights(metric)
+		result = np.full((len(sources), len(targets)), np.inf)
+		unique_sources, inverse = np.unique(sources, return_inverse=True)
+
+		if len(unique_sources) > 2 * LANDMARK_COUNT or metric in (self._landmarks or {}):
+			limits = self._search_limits(unique_sources, targets, metric)
+		else:
+			limits = np.full(len(unique_sources), np.inf)
+
+		if _scipy_dijkstra is not None:
+			graph = csr_matrix((weights.astype(np.float64), self.indices, self.indptr), shape=(self.node_count, self.node_count))
+			# 探索半径の近い出発ノードをまとめ、1回に計算する行数はメモリ（行数 × ノード数）で制限
+			order = np.argsort(limits, kind='stable')
+			batch = max(1, 20_000_000 // max(self.node_count, 1))
+			for start in range(0, len(order), batch):
+				chunk = order[start:start + batch]
+				rows = np.atleast_2d(_scipy_dijkstra(
+					graph, directed=True, indices=unique_sources[chunk], limit=float(limits[chunk].max())
+				))
+				for row, index in zip(rows, chunk.tolist()):
+					result[inverse == index] = row[targets]
+			return result
+
+		# 純 Python: 出発ノードごとに、目的地がすべて確定するか探索半径を超えるまで探索
+		weight_list = weights.tolist()
+		indices_list = self.indices.tolist()
+		indptr_list = self.indptr.tolist()
+		target_set = set(targets.tolist())
+		for index, source in enumerate(unique_sources.tolist()):
+			settled = _dijkstra_csr(indptr_list, indices_list, weight_list, source, target_set, float(limits[index]))
+			result[inverse == index] = [settled.get(t, np.inf) for t in targets.tolist()]
+		return result
+
+	def distance_matrix(self, lats, lons, metric: str = None) -> np.ndarray:
+		"""
+		地点間の道路距離（km）または移動時間（分）の行列
+
+		地点から最寄りの道路ノードまでは直線で移動するものとして加算する。
+		道路でつながっていない組は直線距離 × DETOUR_FACTOR で補う。
+
+		Args:
+			lats, lons: 地点の座標
+			metric: 'distance'（km）または 'time'（分）。省略時はインスタンスの設定
+
+		Returns:
+			行列（float32）
+		"""
+		metric = metric or self.metric
+		lats = np.asarray(lats, dtype=np.float64)
+		lons = np.asarray(lons, dtype=np.float64)
+		nodes, offsets_m = self.nearest_nodes(lats, lons)
+
+		road = self._many_to_many(nodes, nodes, metric)
+		straight_m = _haversine_m(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+		if metric == 'distance':
+			access = offsets_m
+			fallback = straight_m * DETOUR_FACTOR
+			scale = 1 / 1000.0
+		else:
+			access = offsets_m / (ACCESS_SPEED_KMH / 3.6)
+			fallback = straight_m * DETOUR_FACTOR / (ACCESS_SPEED_KMH / 3.6)
+			scale = 1 / 60.0
+
+		matrix = road + access[:, None] + access[None, :]
+		unreachable = ~np.isfinite(road)
+		if unreachable.any():
+			self.logger.warning(f"道路でつながっていない地点の組: {int(unreachable.sum())}件（直線距離で補完）")
+			matrix[unreachable] = fallback[unreachable]
+
+		np.fill_diagonal(matrix, 0.0)
+		return (matrix * scale).astype(np.float32)
+
+	def travel_time_matrix(self, lats, lons) -> np.ndarray:
+		"""地点間の移動時間行列（分）"""
+		return self.distance_matrix(lats, lons, metric='time')
+
+	# ------------------------------------------------------------------
+	# 2地点間（ALT: A* + ランドマーク）
+	# ------------------------------------------------------------------
+
+	def _single_source(self, indptr, indices, weights, sources: List[int]) -> np.ndarray:
+		"""複数の出発ノードから全ノードへの最短距離（行 = 出発ノード）"""
+		if _scipy_dijkstra is not None:
+			graph = csr_matrix((np.asarray(weights, dtype=np.float64), indices, indptr), shape=(self.node_count, self.node_count))
+			return np.atleast_2d(_scipy_dijkstra(graph, directed=True, indices=sources))
+
+		result = np.full((len(sources), self.node_count), np.inf)
+		indptr_list, indices_list, weight_list = indptr.tolist(), indices.tolist(), np.asarray(weights).tolist()
+		for row, source in enumerate(sources):
+			settled = _dijkstra_csr(indptr_list, indices_list, weight_list, source)
+			result[row, list(settled.keys())] = list(settled.values())
+		return result
+
+	def _prepare_landmarks(self, metric: str, count: int = LANDMARK_COUNT) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		ランドマークからの / への最短距離を前計算（A* の下界に使う）
+
+		ランドマークは互いに地理的に遠いノードを順に選ぶ。
+
+		Returns:
+			(ランドマーク → 各ノード, 各ノード → ランドマーク) の距離行列
+		"""
+		with self._lock:
+			if self._landmarks is None:
+				self._landmarks = {}
+			if metric in self._landmarks:
+				return self._landmarks[metric]
+
+			chosen = [int(np.argmax(self.node_lats + self.node_lons))]
+			nearest = _haversine_m(self.node_lats, self.node_lons, self.node_lats[chosen[0]], self.node_lons[chosen[0]])
+			while len(chosen) < min(count, self.node_count):
+				nxt = int(np.argmax(nearest))
+				chosen.append(nxt)
+				nearest = np.minimum(nearest, _haversine_m(self.node_lats, self.node_lons, self.node_lats[nxt], self.node_lons[nxt]))
+
+			weights = self._weights(metric)
+			forward = self._single_source(self.indptr, self.indices, weights, chosen)
+
+			# 逆向きグラフで「ランドマークへの」距離を求める
+			order = np.argsort(self.indices, kind='stable')
+			rev_indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+			np.cumsum(np.bincount(self.indices, minlength=self.node_count), out=rev_indptr[1:])
+			backward = self._single_source(rev_indptr, self._edge_src[order], weights[order], chosen)
+
+			self._landmarks[metric] = (forward, backward)
+			return forward, backward
+
+	def shortest_path(
+		self,
+		lat1: float,
+		lon1: float,
+		lat2: float,
+		lon2: float,
+		metric: str = None
+	) -> Dict[str, Any]:
+		"""
+		2地点間の最短経路（ALT: ランドマーク下界付き A*）
+
+		Returns:
+			{'distance_km', 'time_min', 'path': [(lat, lon), ...]}（到達できない場合 path は空）
+		"""
+		metric = metric or self.metric
+		forward, backward = self._prepare_landmarks(metric)
+
+		nodes, _ = self.nearest_nodes([lat1, lat2], [lon1, lon2])
+		source, target = int(nodes[0]), int(nodes[1])
+		weights = self._weights(metric)
+
+		# 目的地に到達できない（距離が inf の）ランドマークは下界に使えない
+		to_target = forward[:, target]
+		from_target = backward[:, target]
+		forward_ok = np.isfinite(to_target)
+		backward_ok = np.isfinite(from_target)
+
+		def heuristic(v: int) -> float:
+			# 三角不等式による下界: d(L,t) - d(L,v) と d(v,L) - d(t,L)
+			# inf - inf を計算しないよう、両方が有限のランドマークだけを使う
+			fv = forward[:, v]
+			bv = backward[:, v]
+			use_f = forward_ok & np.isfinite(fv)
+			use_b = backward_ok & np.isfinite(bv)
+			values = np.concatenate([to_target[use_f] - fv[use_f], bv[use_b] - from_target[use_b]])
+			return float(max(values.max(), 0.0)) if values.size else 0.0
+
+		best = {source: 0.0}
+		parent = {source: -1}
+		heap = [(heuristic(source), source)]
+		closed = set()
+		while heap:
+			_, u = heapq.heappop(heap)
+			if u in closed:
+				continue
+			if u == target:
+				break
+			closed.add(u)
+			for k in range(self.indptr[u], self.indptr[u + 1]):
+				v = int(self.indices[k])
+				nd = best[u] + float(weights[k])
+				if nd < best.get(v, math.inf):
+					best[v] = nd
+					parent[v] = u
+					heapq.heappush(heap, (nd + heuristic(v), v))
+
+		if target not in best:
+			return {'distance_km': None, 'time_min': None, 'path': []}
+
+		path_nodes = []
+		node = target
+		while node != -1:
+			path_nodes.append(node)
+			node = parent[node]
+		path_nodes.reverse()
+
+		# 経路上の辺の長さ・時間を合計
+		length_m = time_s = 0.0
+		for a, b in zip(path_nodes, path_nodes[1:]):
+			lo, hi = self.indptr[a], self.indptr[a + 1]
+			edges = lo + np.nonzero(self.indices[lo:hi] == b)[0]
+			k = edges[np.argmin(weights[edges])]
+			length_m += float(self.length_m[k])
+			time_s += float(self.time_s[k])
+
+		return {
+			'distance_km': length_m / 1000.0,
+			'time_min': time_s / 60.0,
+			'path': [(float(self.node_lats[n]), float(self.node_lons[n])) for n in path_nodes]
+		}
+
+
+# 共有インスタンス（読み込みに時間がかかるため使い回す）
+_network_instances: Dict[Tuple[str, str], RoadNetwork] = {}
+_network_lock = threading.Lock()
+
+
+def find_road_file() -> Optional[Path]:
+	"""既定の置き場所にある道路データファイル"""
+	for name in DEFAULT_ROAD_FILES:
+		path = _project_root / name
+		if path.exists():
+			return path
+	return None
+
+
+def get_road_network(path=None, metric: str = 'distance') -> Optional[RoadNetwork]:
+	"""
+	道路ネットワークを取得（初回のみ読み込み）
+
+	Args:
+		path: 道路データのパス（省略時は DEFAULT_ROAD_FILES から探す）
+		metric: 'distance' または 'time'
+
+	Returns:
+		RoadNetwork（データがない場合は None）
+	"""
+	path = Path(path) if path else find_road_file()
+	if path is None or not path.exists():
+		return None
+
+	key = (str(path), metric)
+	with _network_lock:
+		network = _network_instances.get(key)
+		if network is None:
+			network = RoadNetwork.load(path, metric=metric)
+			_network_instances[key] = network
+	return network
+
+
+def main():
+	"""GeoJSON / PBF を CSR グラフ（.npz）に変換"""
+	import argparse
+
+	parser = argparse.ArgumentParser(description="道路データを JourneyMap 用のグラフに変換")
+	parser.add_argument("input", help="GeoJSON または .osm.pbf")
+	parser.add_argument("--output", default="data/roads/roads.npz")
+	args = parser.parse_args()
+
+	network = RoadNetwork.load(args.input)
+	output = Path(args.output)
+	if not output.is_absolute():
+		output = _project_root / output
+	network.save(output)
+	print(f"✅ 道路グラフを保存: {output}（{network.node_count}ノード, {network.edge_count}辺）")
+
+
+if __name__ == "__main__":
+	main()
@@ -2,17 +2,56 @@
 ルート最適化モジュール
 """
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from itertools import permutations
+from multiprocessing import shared_memory
 import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.geo import dots_to_km, haversine_km, unit_vectors
 from src.logger import get_logger
 
 
 class RouteOptimizer:
 	"""ルート最適化クラス"""
 	
-	def __init__(self):
+	# 厳密解（Held-Karp 動的計画法）を使う最大地点数
+	# 状態数は 2^(n-1) × (n-1)。18地点で約 220 万状態（約 20MB）
+	HELD_KARP_MAX_STOPS = 18
+	
+	# 2-opt で調べる近傍地点数
+	NEIGHBOR_COUNT = 10
+	
+	# Or-opt で移動する区間の最大長
+	OR_OPT_MAX_SEGMENT = 3
+	
+	# 距離行列キャッシュの最大件数（インスタンス間で共有）
+	MATRIX_CACHE_SIZE = 8
+	
+	# 日ごとの最適化をプロセス並列で行う最小地点数（これ未満は起動コストの方が大きい）
+	PARALLEL_MIN_STOPS = 200
+	
+	# 多始点探索でランダム構築時に候補とする近い未訪問地点の数
+	MULTISTART_CANDIDATES = 2
+	
+	# キー: (距離計算方法の識別子, 地点キーの列)
+	_matrix_cache: "OrderedDict[Tuple, Tuple[Dict[Tuple, int], np.ndarray]]" = OrderedDict()
+	_matrix_cache_lock = threading.Lock()
+	
+	def __init__(self, distance_backend=None):
+		"""
+		Args:
+			distance_backend: 距離行列の計算方法（RoadNetwork など、distance_matrix(lats, lons)
+				と cache_token を持つもの）。省略時は直線距離（ハバーサイン）
+		"""
 		self.logger = get_logger()
+		self.distance_backend = distance_backend
 	
 	@staticmethod
 	def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -26,62 +65,176 @@ class RouteOptimizer:
 		Returns:
 			距離（km）
 		"""
-		# 地球の半径（km）
-		R = 6371.0
-		
-		# ラジアンに変換
-		lat1_rad = math.radians(lat1)
-		lon1_rad = math.radians(lon1)
-		lat2_rad = math.radians(lat2)
-		lon2_rad = math.radians(lon2)
-		
-		# 差分
-		dlat = lat2_rad - lat1_rad
-		dlon = lon2_rad - lon1_rad
+		return float(haversine_km(lat1, lon1, lat2, lon2))
+	
+	@staticmethod
+	def haversine_matrix(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+		"""
+		全地点間の距離行列をまとめて計算
 		
-		# ハバーサイン公式
-		a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-		c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+		地点を単位球面上の3次元ベクトルに変換し、内積（行列積）から弦の長さを求めて
+		大円距離に変換する（ハバーサイン公式と同じ結果で、n×n の三角関数計算が不要）。
 		
-		distance = R * c
+		Args:
+			lats: 緯度配列
+			lons: 経度配列
+			
+		Returns:
+			距離行列（km, float32）
+		"""
+		points = unit_vectors(lats, lons)
+		distance = dots_to_km(points @ points.T).astype(np.float32)
+		np.fill_diagonal(distance, 0.0)
 		return distance
 	
-	def build_distance_matrix(self, locations: List[Dict[str, Any]]) -> List[List[float]]:
+	@staticmethod
+	def _location_key(location: Dict[str, Any]) -> Tuple:
+		"""距離行列キャッシュ用の地点キー（観光地ID + 座標）"""
+		for field in ('attraction_id', 'id'):
+			if location.get(field) is not None:
+				return (field, location[field], location['latitude'], location['longitude'])
+		return (None, None, location['latitude'], location['longitude'])
+	
+	def build_distance_matrix(self, locations: List[Dict[str, Any]]) -> np.ndarray:
 		"""
-		距離行列を構築
+		距離行列を構築（キャッシュ付き）
+		
+		distance_backend（道路ネットワーク等）が設定されていればその値を、
+		なければ直線距離を使う。同じ順序の地点リストの行列はキャッシュから返す。キャッシュ済み行列に
+		すべての地点が含まれていれば、その部分行列を切り出して使う
+		（日ごとの分割や手法の比較で全体行列を再計算しない）。
+		返す行列は共有されるため読み取り専用。
 		
 		Args:
 			locations: 地点のリスト
 			
 		Returns:
-			距離行列
+			距離行列（km, float32）
+		"""
+		token = self.distance_backend.cache_token if self.distance_backend is not None else None
+		keys = tuple(self._location_key(location) for location in locations)
+		cache_key = (token, keys)
+		
+		with self._matrix_cache_lock:
+			cached = self._matrix_cache.get(cache_key)
+			if cached is not None:
+				self._matrix_cache.move_to_end(cache_key)
+				return cached[1]
+			
+			# 大きい行列から順に、部分行列として取り出せるものを探す
+			for index_of, matrix in sorted(
+				(entry for key, entry in self._matrix_cache.items() if key[0] == token),
+				key=lambda entry: -len(entry[1])
+			):
+				if len(matrix) < len(keys):
+					break
+				if all(key in index_of for key in keys):
+					idx = np.fromiter((index_of[key] for key in keys), dtype=np.int64, count=len(keys))
+					sub_matrix = matrix[np.ix_(idx, idx)]
+					sub_matrix.flags.writeable = False
+					return sub_matrix
+		
+		lats = [location['latitude'] for location in locations]
+		lons = [location['longitude'] for location in locations]
+		if self.distance_backend is not None:
+			distance_matrix = np.asarray(self.distance_backend.distance_matrix(lats, lons), dtype=np.float32)
+		else:
+			distance_matrix = self.haversine_matrix(lats, lons)
+		
+		self._store_matrix(cache_key, keys, distance_matrix)
+		self.logger.debug(f"距離行列を構築: {len(locations)}地点")
+		return distance_matrix
+	
+	def _store_matrix(self, cache_key: Tuple, keys: Tuple, distance_matrix: np.ndarray):
+		"""距離行列を読み取り専用にしてキャッシュに登録"""
+		distance_matrix.flags.writeable = False
+		with self._matrix_cache_lock:
+			self._matrix_cache[cache_key] = ({key: i for i, key in enumerate(keys)}, distance_matrix)
+			self._matrix_cache.move_to_end(cache_key)
+			while len(self._matrix_cache) > self.MATRIX_CACHE_SIZE:
+				self._matrix_cache.popitem(last=False)
+	
+	def extend_distance_matrix(
+		self,
+		locations: List[Dict[str, Any]],
+		new_location: Dict[str, Any]
+	) -> np.ndarray:
+		"""
+		locations + [new_location] の距離行列を作る（既存部分はキャッシュを再利用）
+		
+		直線距離の場合は新しい地点の行と列だけを計算して既存の行列に付け足し、
+		結果もキャッシュに登録する。道路ネットワーク使用時は通常どおり構築する。
+		
+		Args:
+			locations: 既存の地点のリスト
+			new_location: 追加する地点
+			
+		Returns:
+			距離行列（km, float32、最後の行・列が新しい地点）
 		"""
+		extended = list(locations) + [new_location]
+		if self.distance_backend is not None or not locations:
+			return self.build_distance_matrix(extended)
+		
+		keys = tuple(self._location_key(location) for location in extended)
+		cache_key = (None, keys)
+		with self._matrix_cache_lock:
+			cached = self._matrix_cache.get(cache_key)
+			if cached is not None:
+				self._matrix_cache.move_to_end(cache_key)
+				return cached[1]
+		
+		base = self.build_distance_matrix(locations)
+		points = unit_vectors(
+			[location['latitude'] for location in locations],
+			[location['longitude'] for location in locations]
+		)
+		new_point = unit_vectors([new_location['latitude']], [new_location['longitude']])
+		row = dots_to_km(points @ new_point[0]).astype(np.float32)
+		
 		n = len(locations)
-		distance_matrix = [[0.0] * n for _ in range(n)]
-		
-		for i in range(n):
-			for j in range(n):
-				if i != j:
-					distance_matrix[i][j] = self.calculate_distance(
-						locations[i]['latitude'],
-						locations[i]['longitude'],
-						locations[j]['latitude'],
-						locations[j]['longitude']
-					)
+		distance_matrix = np.empty((n + 1, n + 1), dtype=np.float32)
+		distance_matrix[:n, :n] = base
+		distance_matrix[n, :n] = row
+		distance_matrix[:n, n] = row
+		distance_matrix[n, n] = 0.0
 		
+		self._store_matrix(cache_key, keys, distance_matrix)
 		return distance_matrix
 	
+	@classmethod
+	def clear_matrix_cache(cls):
+		"""距離行列キャッシュを削除"""
+		with cls._matrix_cache_lock:
+			cls._matrix_cache.clear()
+	
+	def _resolve_matrix(
+		self,
+		locations: List[Dict[str, Any]],
+		distance_matrix: Optional[np.ndarray]
+	) -> np.ndarray:
+		"""渡された距離行列、なければキャッシュ付きで構築した行列を返す"""
+		if distance_matrix is None:
+			return self.build_distance_matrix(locations)
+		return np.asarray(distance_matrix)
+	
 	def optimize_route_exhaustive(
 		self,
 		locations: List[Dict[str, Any]],
-		start_index: int = 0
+		start_index: int = 0,
+		return_to_start: bool = False,
+		distance_matrix: Optional[np.ndarray] = None
 	) -> Tuple[List[int], float]:
 		"""
 		全探索で最適ルートを計算（10地点以下推奨）
 		
+		Held-Karp 法の検証用リファレンスとして残している。
+		
 		Args:
 			locations: 地点のリスト
 			start_index: 開始地点のインデックス
+			return_to_start: 最後に開始地点へ戻る周回ルートにするか
+			distance_matrix: 構築済みの距離行列（省略時は構築）
 			
 		Returns:
 			(最適ルート, 総距離)
@@ -95,7 +248,7 @@ class RouteOptimizer:
 			self.logger.warning(f"地点数が多い（{n}件）ため、全探索は推奨されません")
 		
 		# 距離行列を構築
-		distance_matrix = self.build_distance_matrix(locations)
+		distance_matrix = self._resolve_matrix(locations, distance_matrix)
 		
 		# 開始地点以外のインデックス
 		other_indices = [i for i in range(n) if i != start_index]
@@ -111,6 +264,8 @@ class RouteOptimizer:
 			total_distance = 0.0
 			for i in range(len(route) - 1):
 				total_distance += distance_matrix[route[i]][route[i + 1]]
+			if return_to_start:
+				total_distance += distance_matrix[route[-1]][start_index]
 			
 			# より短いルートなら更新
 			if total_distance < best_distance:
@@ -120,10 +275,96 @@ class RouteOptimizer:
 		self.logger.info(f"最適ルート計算完了: {n}地点, 総距離={best_distance:.2f}km")
 		return best_route, best_distance
 	
+	def optimize_route_held_karp(
+		self,
+		locations: List[Dict[str, Any]],
+		start_index: int = 0,
+		return_to_start: bool = False,
+		distance_matrix: Optional[np.ndarray] = None
+	) -> Tuple[List[int], float]:
+		"""
+		Held-Karp 法（ビットマスク動的計画法）で厳密な最適ルートを計算（18地点以下推奨）
+		
+		dp[S][j] = 開始地点から集合 S の地点をすべて訪れて j で終わる最短距離
+		を、|S| の小さい順に NumPy でまとめて計算する。
+		
+		Args:
+			locations: 地点のリスト
+			start_index: 開始地点のインデックス
+			return_to_start: 最後に開始地点へ戻る周回ルートにするか
+			distance_matrix: 構築済みの距離行列（省略時は構築）
+			
+		Returns:
+			(最適ルート, 総距離)
+		"""
+		n = len(locations)
+		
+		if n <= 1:
+			return [0], 0.0
+		
+		if n > self.HELD_KARP_MAX_STOPS:
+			self.logger.warning(
+				f"地点数が多い（{n}件）ため、Held-Karp法ではなく貪欲法で計算します"
+			)
+			return self.optimize_route_greedy(locations, start_index, return_to_start, distance_matrix)
+		
+		distance_matrix = np.asarray(self._resolve_matrix(locations, distance_matrix), dtype=np.float64)
+		
+		# 開始地点以外の地点（ビット j が others[j] に対応）
+		others = np.array([i for i in range(n) if i != start_index], dtype=np.int64)
+		m = len(others)
+		full = (1 << m) - 1
+		
+		sub_matrix = distance_matrix[np.ix_(others, others)]
+		from_start = distance_matrix[start_index, others]
+		to_start = distance_matrix[others, start_index]
+		
+		dp = np.full((1 << m, m), np.inf)
+		parent = np.full((1 << m, m), -1, dtype=np.int8)
+		
+		bits = np.arange(m)
+		dp[1 << bits, bits] = from_start
+		
+		# 各マスクの要素数（popcount）ごとにまとめて処理
+		masks = np.arange(1 << m, dtype=np.int64)
+		popcount = ((masks[:, None] >> bits[None, :]) & 1).sum(axis=1)
+		
+		for size in range(2, m + 1):
+			level = masks[popcount == size]
+			for j in range(m):
+				with_j = level[(level >> j) & 1 == 1]
+				prev = with_j ^ (1 << j)
+				# prev に含まれない i は dp が inf のため自動的に除外される
+				candidates = dp[prev] + sub_matrix[:, j][None, :]
+				best = np.argmin(candidates, axis=1)
+				dp[with_j, j] = candidates[np.arange(len(with_j)), best]
+				parent[with_j, j] = best
+		
+		final = dp[full] + to_start if return_to_start else dp[full]
+		last = int(np.argmin(final))
+		best_distance = float(final[last])
+		
+		# 親をたどってルートを復元
+		order = []
+		mask = full
+		j = last
+		while j != -1:
+			order.append(j)
+			prev_j = int(parent[mask, j])
+			mask ^= 1 << j
+			j = prev_j
+		
+		best_route = [start_index] + [int(others[j]) for j in reversed(order)]
+		
+		self.logger.info(f"最適ルート計算完了（Held-Karp）: {n}地点, 総距離={best_distance:.2f}km")
+		return best_route, best_distance
+	
 	def optimize_route_greedy(
 		self,
 		locations: List[Dict[str, Any]],
-		start_index: int = 0
+		start_index: int = 0,
+		return_to_start: bool = False,
+		distance_matrix: Optional[np.ndarray] = None
 	) -> Tuple[List[int], float]:
 		"""
 		貪欲法で近似ルートを計算（大規模データ向け）
@@ -131,6 +372,8 @@ class RouteOptimizer:
 		Args:
 			locations: 地点のリスト
 			start_index: 開始地点のインデックス
+			return_to_start: 最後に開始地点へ戻る周回ルートにするか
+			distance_matrix: 構築済みの距離行列（省略時は構築）
 			
 		Returns:
 			(近似ルート, 総距離)
@@ -140,41 +383,597 @@ class RouteOptimizer:
 		if n <= 1:
 			return [0], 0.0
 		
-		# 距離行列を構築
-		distance_matrix = self.build_distance_matrix(locations)
+		distance_matrix = self._resolve_matrix(locations, distance_matrix)
+		route = self._nearest_neighbor_route(distance_matrix, start_index)
+		total_distance = self._route_length(route, distance_matrix, return_to_start)
 		
-		# 訪問済みフラグ
-		visited = [False] * n
-		route = [start_index]
+		self.logger.info(f"近似ルート計算完了: {n}地点, 総距離={total_distance:.2f}km")
+		return route, total_distance
+	
+	@staticmethod
+	def _nearest_neighbor_route(distance_matrix: np.ndarray, start_index: int) -> List[int]:
+		"""最も近い未訪問地点を順に訪問するルート（インデックスのリスト）"""
+		n = len(distance_matrix)
+		visited = np.zeros(n, dtype=bool)
 		visited[start_index] = True
-		
+		route = [start_index]
 		current = start_index
-		total_distance = 0.0
 		
-		# 最も近い未訪問地点を順に訪問
 		for _ in range(n - 1):
-			nearest = -1
-			nearest_distance = float('inf')
+			row = np.where(visited, np.inf, distance_matrix[current])
+			current = int(np.argmin(row))
+			visited[current] = True
+			route.append(current)
+		
+		return route
+	
+	@staticmethod
+	def _route_length(route: List[int], distance_matrix, return_to_start: bool = False) -> float:
+		"""ルートの総距離"""
+		if len(route) <= 1:
+			return 0.0
+		idx = np.asarray(route)
+		total = float(np.sum(distance_matrix[idx[:-1], idx[1:]], dtype=np.float64))
+		if return_to_start:
+			total += float(distance_matrix[idx[-1], idx[0]])
+		return total
+	
+	def _search_tables(self, distance_matrix) -> Tuple[List[memoryview], List[List[int]]]:
+		"""
+		局所探索用の距離表と近傍リストを作成
+		
+		距離表は行列の各行の memoryview で、行列をコピーしない（多始点探索のワーカーでは
+		共有メモリ上の行列をそのまま参照する）。dist[a][b] は Python の float を返すため、
+		ループ内で NumPy のスカラーを参照するより速い。
+		
+		Returns:
+			(各行の memoryview のリスト, 各地点の近い順 NEIGHBOR_COUNT 件のリスト)
+		"""
+		matrix = np.asarray(distance_matrix)
+		if matrix.dtype not in (np.float32, np.float64) or not matrix.flags.c_contiguous:
+			matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+		n = len(matrix)
+		k = min(self.NEIGHBOR_COUNT, n - 1)
+		
+		# 自分自身を含む上位 k+1 件だけを部分ソートしてから距離順に並べる
+		# （一時配列が n×n にならないよう行をまとめて処理）
+		neighbors = []
+		for lo in range(0, n, 256):
+			block = matrix[lo:lo + 256]
+			nearest = np.argpartition(block, k, axis=1)[:, :k + 1]
+			nearest = np.take_along_axis(
+				nearest,
+				np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1, kind='stable'),
+				axis=1
+			)
+			neighbors.extend(
+				[c for c in row if c != a][:k]
+				for a, row in enumerate(nearest.tolist(), start=lo)
+			)
+		
+		return [memoryview(row) for row in matrix], neighbors
+	
+	@staticmethod
+	def _search_matrix(distance_matrix: np.ndarray) -> np.ndarray:
+		"""
+		局所探索で改善量の計算に使う対称な距離行列
+		
+		一方通行を含む道路距離のように d(i, j) != d(j, i) の場合は (D + D^T) / 2 を返す。
+		区間を反転すると辺の向きが変わるため、非対称な行列のままでは改善量を正しく
+		計算できない。探索後のルートは元の行列で距離を計算し直して評価する。
+		"""
+		matrix = np.asarray(distance_matrix)
+		if np.array_equal(matrix, matrix.T):
+			return matrix
+		return ((matrix + matrix.T) / 2).astype(matrix.dtype, copy=False)
+	
+	def improve_route(
+		self,
+		route: List[int],
+		distance_matrix,
+		return_to_start: bool = False,
+		time_limit: float = 2.0,
+		tables: Optional[Tuple[List[memoryview], List[List[int]]]] = None
+	) -> Tuple[List[int], float]:
+		"""
+		2-opt と Or-opt による局所探索でルートを改善（先頭の開始地点は固定）
+		
+		2-opt は近傍リストと don't-look bit で改善の見込みがある地点だけを調べ、
+		改善が止まったら Or-opt（1〜3地点の区間の移動）を行う。
+		どちらでも改善しなくなるか、制限時間に達したら終了する。
+		改善量は区間を反転しても距離が変わらない前提で計算するため、
+		距離行列が非対称（一方通行など）の場合は対称化した行列（_search_matrix）で
+		探索し、結果は元の行列で距離を計算し直して比べる。
+		結果が初期ルートより短くならなかった場合は初期ルートをそのまま返す。
+		
+		Args:
+			route: 初期ルート（地点インデックスのリスト）
+			distance_matrix: 距離行列
+			return_to_start: 最後に開始地点へ戻る周回ルートとして評価するか
+			time_limit: 制限時間（秒）
+			tables: _search_tables(_search_matrix(distance_matrix)) の結果
+			（同じ行列で何度も改善する場合に使い回す）
 			
-			for j in range(n):
-				if not visited[j] and distance_matrix[current][j] < nearest_distance:
-					nearest = j
-					nearest_distance = distance_matrix[current][j]
+		Returns:
+			(改善後のルート, 総距離)
+		"""
+		n = len(route)
+		matrix = np.asarray(distance_matrix)
+		
+		if n <= 3:
+			return list(route), self._route_length(route, matrix, return_to_start)
+		
+		deadline = time.perf_counter() + time_limit
+		if tables is None:
+			tables = self._search_tables(self._search_matrix(matrix))
+		dist, neighbors = tables
+		
+		initial_route = list(route)
+		initial_distance = self._route_length(initial_route, matrix, return_to_start)
+		route = list(route)
+		pos = [0] * n
+		for i, node in enumerate(route):
+			pos[node] = i
+		
+		def succ_of(i):
+			# 位置 i の次の地点（片道ルートの末尾は None）
+			if i < n - 1:
+				return route[i + 1]
+			return route[0] if return_to_start else None
+		
+		def d(a, b):
+			return 0.0 if a is None or b is None else dist[a][b]
+		
+		def reverse(lo, hi):
+			# 位置 lo..hi を反転
+			route[lo:hi + 1] = route[lo:hi + 1][::-1]
+			for i in range(lo, hi + 1):
+				pos[route[i]] = i
+		
+		def two_opt() -> bool:
+			improved = False
+			active = [True] * n
+			queue = deque(route)
+			checks = 0
 			
-			if nearest != -1:
-				route.append(nearest)
-				visited[nearest] = True
-				total_distance += nearest_distance
-				current = nearest
+			while queue:
+				checks += 1
+				if checks % 256 == 0 and time.perf_counter() > deadline:
+					break
+				
+				a = queue.popleft()
+				active[a] = False
+				found = False
+				
+				# a の後ろの辺 (a, b) と c の後ろの辺 (c, e) を (a, c), (b, e) に張り替える
+				i = pos[a]
+				b = succ_of(i)
+				if b is not None:
+					d_ab = dist[a][b]
+					for c in neighbors[a]:
+						g1 = d_ab - dist[a][c]
+						if g1 <= 1e-12:
+							break
+						j = pos[c]
+						e = succ_of(j)
+						if c == b or e == a:
+							continue
+						gain = g1 + d(c, e) - d(b, e)
+						if gain > 1e-9:
+							lo, hi = (i, j) if i < j else (j, i)
+							reverse(lo + 1, hi)
+							for node in (a, b, c, e):
+								if node is not None and not active[node]:
+									active[node] = True
+									queue.append(node)
+							improved = found = True
+							break
+				
+				if found:
+					continue
+				
+				# a の前の辺 (p, a) と c の前の辺 (q, c) を (a, c), (p, q) に張り替える
+				i = pos[a]
+				if i == 0:
+					continue
+				p_node = route[i - 1]
+				d_pa = dist[p_node][a]
+				for c in neighbors[a]:
+					g1 = d_pa - dist[a][c]
+					if g1 <= 1e-12:
+						break
+					j = pos[c]
+					if j == 0 or c == p_node:
+						continue
+					q = route[j - 1]
+					if q == a:
+						continue
+					gain = g1 + dist[q][c] - dist[p_node][q]
+					if gain > 1e-9:
+						lo, hi = (i - 1, j - 1) if i < j else (j - 1, i - 1)
+						reverse(lo + 1, hi)
+						for node in (a, p_node, c, q):
+							if not active[node]:
+								active[node] = True
+								queue.append(node)
+						improved = True
+						break
+			
+			return improved
 		
-		self.logger.info(f"近似ルート計算完了: {n}地点, 総距離={total_distance:.2f}km")
+		def or_opt() -> bool:
+			improved = False
+			for length in range(1, self.OR_OPT_MAX_SEGMENT + 1):
+				i = 1
+				while i + length <= n:
+					if time.perf_counter() > deadline:
+						return improved
+					
+					s1 = route[i]
+					s2 = route[i + length - 1]
+					p_node = route[i - 1]
+					nx = succ_of(i + length - 1)
+					remove_gain = dist[p_node][s1] + d(s2, nx) - d(p_node, nx)
+					segment = set(route[i:i + length])
+					
+					best = None
+					best_gain = 1e-9
+					for c in set(neighbors[s1]) | set(neighbors[s2]):
+						if c in segment or c == p_node:
+							continue
+						e = succ_of(pos[c])
+						if e == s1:
+							continue
+						base = d(c, e)
+						forward = dist[c][s1] + d(s2, e) - base
+						backward = dist[c][s2] + d(s1, e) - base
+						add_cost, reverse_segment = (forward, False) if forward <= backward else (backward, True)
+						gain = remove_gain - add_cost
+						if gain > best_gain:
+							best_gain = gain
+							best = (c, reverse_segment)
+					
+					if best is None:
+						i += 1
+						continue
+					
+					c, reverse_segment = best
+					moved = route[i:i + length]
+					if reverse_segment:
+						moved.reverse()
+					del route[i:i + length]
+					insert_at = route.index(c) + 1
+					route[insert_at:insert_at] = moved
+					for idx, node in enumerate(route):
+						pos[node] = idx
+					improved = True
+			
+			return improved
+		
+		while time.perf_counter() < deadline:
+			two_opt()
+			if not or_opt():
+				break
+		
+		total_distance = self._route_length(route, matrix, return_to_start)
+		if total_distance >= initial_distance:
+			return initial_route, initial_distance
+		return route, total_distance
+	
+	def optimize_route_2opt(
+		self,
+		locations: List[Dict[str, Any]],
+		start_index: int = 0,
+		return_to_start: bool = False,
+		time_limit: float = 2.0,
+		distance_matrix: Optional[np.ndarray] = None
+	) -> Tuple[List[int], float]:
+		"""
+		貪欲法のルートを 2-opt / Or-opt で改善（大規模データ向け）
+		
+		非対称な距離行列は対称化して探索する（improve_route を参照）。
+		改善できなかった場合は貪欲法のルートを返す。
+		
+		Args:
+			locations: 地点のリスト
+			start_index: 開始地点のインデックス
+			return_to_start: 最後に開始地点へ戻る周回ルートにするか
+			time_limit: 局所探索の制限時間（秒）
+			distance_matrix: 構築済みの距離行列（省略時は構築）
+			
+		Returns:
+			(近似ルート, 総距離)
+		"""
+		n = len(locations)
+		
+		if n <= 1:
+			return [0], 0.0
+		
+		distance_matrix = self._resolve_matrix(locations, distance_matrix)
+		initial_route = self._nearest_neighbor_route(distance_matrix, start_index)
+		initial_distance = self._route_length(initial_route, distance_matrix, return_to_start)
+		
+		route, total_distance = self.improve_route(
+			initial_route,
+			distance_matrix,
+			return_to_start=return_to_start,
+			time_limit=time_limit
+		)
+		if total_distance >= initial_distance:
+			route, total_distance = initial_route, initial_distance
+		
+		self.logger.info(
+			f"近似ルート計算完了（2-opt）: {n}地点, 総距離={total_distance:.2f}km"
+			f"（貪欲法 {initial_distance:.2f}km）"
+		)
 		return route, total_distance
 	
+	@staticmethod
+	def _randomized_route(
+		distance_matrix: np.ndarray,
+		start_index: int,
+		rng: np.random.Generator,
+		candidates: int = 3
+	) -> List[int]:
+		"""近い未訪問地点の上位数件からランダムに選んで進むルート（多始点探索の初期解）"""
+		n = len(distance_matrix)
+		visited = np.zeros(n, dtype=bool)
+		visited[start_index] = True
+		route = [start_index]
+		current = start_index
+		
+		for remaining in range(n - 1, 0, -1):
+			row = np.where(visited, np.inf, distance_matrix[current])
+			k = min(candidates, remaining)
+			nearest = np.argpartition(row, k - 1)[:k]
+			current = int(nearest[rng.integers(k)])
+			visited[current] = True
+			route.append(current)
+		
+		return route
+	
+	def optimize_route_multistart(
+		self,
+		locations: List[Dict[str, Any]],
+		start_index: int = 0,
+		return_to_start: bool = False,
+		starts: Optional[int] = None,
+		time_limit: float = 10.0,
+		seed: Optional[int] = None,
+		max_workers: Optional[int] = None,
+		distance_matrix: Optional[np.ndarray] = None
+	) -> Tuple[List[int], float]:
+		"""
+		多始点探索（200〜2,000地点向け）
+		
+		ランダム化した貪欲法で複数の初期解を作り、それぞれを 2-opt / Or-opt で改善して
+		最も短いものを返す。各試行はプロセスプールで並列に実行し、距離行列は
+		共有メモリ経由で各プロセスから参照する（試行ごとにコピーしない）。
+		1本目の試行は通常の貪欲法から始めるため、'2opt' より悪くはならない。
+		
+		Args:
+			locations: 地点のリスト
+			start_index: 開始地点のインデックス
+			return_to_start: 最後に開始地点へ戻る周回ルートにするか
+			starts: 試行回数（省略時は CPU 数の2倍）
+			time_limit: 全体の制限時間（秒）。時間内に終わった試行の中から最良を選ぶ
+			seed: 乱数シード（同じシードで時間内に全試行が終われば同じ結果になる）
+			max_workers: 並列プロセス数（1 の場合はこのプロセスで順に実行）
+			distance_matrix: 構築済みの距離行列（省略時は構築）
+			
+		Returns:
+			(近似ルート, 総距離)
+		"""
+		n = len(locations)
+		
+		if n <= 3:
+			return self.optimize_route_greedy(locations, start_index, return_to_start, distance_matrix)
+		
+		deadline = time.time() + time_limit
+		distance_matrix = np.ascontiguousarray(self._resolve_matrix(locations, distance_matrix))
+		workers = max_workers or os.cpu_count() or 1
+		starts = starts or workers * 2
+		
+		# 試行ごとのシード（0番目は通常の貪欲法）
+		child_seeds = [None] + [
+			int(child.generate_state(1)[0])
+			for child in np.random.SeedSequence(seed).spawn(starts - 1)
+		]
+		tasks = [(seed_i, start_index, return_to_start, deadline) for seed_i in child_seeds]
+		
+		results: List[Optional[Tuple[List[int], float]]] = [None] * starts
+		if workers <= 1:
+			_multistart_state.update(
+				matrix=distance_matrix,
+				optimizer=self,
+				tables=self._search_tables(self._search_matrix(distance_matrix))
+			)
+			try:
+				for i, task in enumerate(tasks):
+					results[i] = _multistart_worker(task)
+			finally:
+				_multistart_state.clear()
+		else:
+			shm = shared_memory.SharedMemory(create=True, size=distance_matrix.nbytes)
+			try:
+				shared = np.ndarray(distance_matrix.shape, dtype=distance_matrix.dtype, buffer=shm.buf)
+				shared[:] = distance_matrix
+				
+				executor = ProcessPoolExecutor(
+					max_workers=min(workers, starts),
+					initializer=_init_multistart_worker,
+					initargs=(shm.name, distance_matrix.shape, distance_matrix.dtype.str)
+				)
+				try:
+					futures = {executor.submit(_multistart_worker, task): i for i, task in enumerate(tasks)}
+					pending = set(futures)
+					while pending:
+						# 制限時間を過ぎても、実行中の試行が自分の制限時間で止まるまでは待つ
+						timeout = max(deadline - time.time(), 0.0) + 5.0
+						done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+						if not done:
+							break
+						for future in done:
+							results[futures[future]] = future.result()
+				finally:
+					executor.shutdown(wait=True, cancel_futures=True)
+				del shared
+			finally:
+				shm.close()
+				shm.unlink()
+		
+		finished = [(result[1], i, result[0]) for i, result in enumerate(results) if result is not None]
+		if not finished:
+			self.logger.warning("多始点探索が制限時間内に終わらなかったため、貪欲法の結果を返します")
+			return self.optimize_route_greedy(locations, start_index, return_to_start, distance_matrix)
+		
+		best_distance, _, best_route = min(finished)
+		self.logger.info(
+			f"近似ルート計算完了（多始点探索）: {n}地点, 試行 {len(finished)}/{starts}回, "
+			f"総距離={best_distance:.2f}km"
+		)
+		return best_route, best_distance
+	
+	def _local_two_opt(
+		self,
+		route: List[int],
+		distance_matrix: np.ndarray,
+		center: int,
+		window: int,
+		return_to_start: bool = False
+	) -> List[int]:
+		"""
+		位置 center の前後 window 件の範囲だけで 2-opt を行う（先頭は固定）
+		
+		挿入・削除で変わるのはその周辺だけなので、ルート全体は調べない。
+		改善量は往復の平均距離で計算し（非対称な行列でも反転を評価できるように）、
+		元の行列で短くならなかった場合は入力のルートを返す。
+		"""
+		n = len(route)
+		dist = distance_matrix
+		original = list(route)
+		route = list(route)
+		lo = max(0, center - window)
+		hi = min(n - 1, center + window)
+		
+		def succ_of(i):
+			if i < n - 1:
+				return route[i + 1]
+			return route[0] if return_to_start else None
+		
+		def d(a, b):
+			return 0.0 if b is None else (dist[a, b] + dist[b, a]) / 2
+		
+		improved = True
+		while improved:
+			improved = False
+			for i in range(lo, min(hi, n - 1)):
+				a, b = route[i], route[i + 1]
+				for j in range(i + 2, hi + 1):
+					c, e = route[j], succ_of(j)
+					if e == a:
+						continue
+					if d(a, b) + d(c, e) - d(a, c) - d(b, e) > 1e-9:
+						route[i + 1:j + 1] = route[i + 1:j + 1][::-1]
+						a, b = route[i], route[i + 1]
+						improved = True
+		
+		if self._route_length(route, dist, return_to_start) < self._route_length(original, dist, return_to_start):
+			return route
+		return original
+	
+	def insert_stop(
+		self,
+		route: List[Dict[str, Any]],
+		new_location: Dict[str, Any],
+		return_to_start: bool = False,
+		window: int = 10
+	) -> Tuple[List[Dict[str, Any]], float]:
+		"""
+		最適化済みのルートに地点を1件追加（全体を再計算しない）
+		
+		距離行列は新しい地点の行・列だけを追加で計算し、最も距離の増加が小さい
+		位置に挿入したあと、その周辺だけ 2-opt で整える。
+		
+		Args:
+			route: 現在のルート（訪問順の地点リスト、先頭が開始地点）
+			new_location: 追加する地点
+			return_to_start: 最後に開始地点へ戻る周回ルートか
+			window: 2-opt で調べる挿入位置の前後の件数
+			
+		Returns:
+			(新しいルート, 総距離)
+		"""
+		if not route:
+			return [new_location], 0.0
+		
+		n = len(route)
+		extended = list(route) + [new_location]
+		distance_matrix = self.extend_distance_matrix(route, new_location).astype(np.float64)
+		new = n
+		
+		# 位置 k と k+1 の間に入れた場合の増加距離（k = n-1 は末尾）
+		current = np.arange(n)
+		following = np.append(current[1:], 0)
+		added = distance_matrix[current, new] + distance_matrix[new, following] - distance_matrix[current, following]
+		if not return_to_start:
+			added[-1] = distance_matrix[n - 1, new]
+		position = int(np.argmin(added)) + 1
+		
+		order = list(range(n))
+		order.insert(position, new)
+		order = self._local_two_opt(order, distance_matrix, position, window, return_to_start)
+		
+		total_distance = self._route_length(order, distance_matrix, return_to_start)
+		self.logger.info(f"ルートに地点を追加: {position + 1}番目, 総距離={total_distance:.2f}km")
+		return [extended[i] for i in order], total_distance
+	
+	def remove_stop(
+		self,
+		route: List[Dict[str, Any]],
+		index: int,
+		return_to_start: bool = False,
+		window: int = 10
+	) -> Tuple[List[Dict[str, Any]], float]:
+		"""
+		最適化済みのルートから地点を1件削除（全体を再計算しない）
+		
+		前後の地点をつなぎ、その周辺だけ 2-opt で整える。距離行列はキャッシュ済みの
+		行列から部分行列として取り出す。
+		
+		Args:
+			route: 現在のルート（訪問順の地点リスト）
+			index: 削除する地点の位置
+			return_to_start: 最後に開始地点へ戻る周回ルートか
+			window: 2-opt で調べる削除位置の前後の件数
+			
+		Returns:
+			(新しいルート, 総距離)
+		"""
+		remaining = list(route[:index]) + list(route[index + 1:])
+		if len(remaining) <= 1:
+			return remaining, 0.0
+		
+		distance_matrix = np.asarray(self.build_distance_matrix(remaining), dtype=np.float64)
+		order = self._local_two_opt(
+			list(range(len(remaining))),
+			distance_matrix,
+			min(index, len(remaining) - 1),
+			window,
+			return_to_start
+		)
+		
+		total_distance = self._route_length(order, distance_matrix, return_to_start)
+		self.logger.info(f"ルートから地点を削除: {index + 1}番目, 総距離={total_distance:.2f}km")
+		return [remaining[i] for i in order], total_distance
+	
 	def optimize_route(
 		self,
 		locations: List[Dict[str, Any]],
 		start_index: int = 0,
-		method: str = 'auto'
+		method: str = 'auto',
+		return_to_start: bool = False,
+		distance_matrix: Optional[np.ndarray] = None
 	) -> Tuple[List[Dict[str, Any]], float]:
 		"""
 		ルートを最適化
@@ -182,7 +981,10 @@ class RouteOptimizer:
 		Args:
 			locations: 地点のリスト
 			start_index: 開始地点のインデックス
-			method: 'auto', 'exhaustive', 'greedy'
+			method: 'auto', 'held_karp', '2opt', 'multistart', 'exhaustive', 'greedy'
+			return_to_start: 最後に開始地点へ戻る周回ルートにするか
+			（総距離に帰路を含める。地点リストには開始地点を重複させない）
+			distance_matrix: 構築済みの距離行列（省略時はキャッシュ付きで構築）
 			
 		Returns:
 			(最適順序の地点リスト, 総距離)
@@ -190,71 +992,207 @@ class RouteOptimizer:
 		if not locations:
 			return [], 0.0
 		
+		route_indices, total_distance = self._solve(
+			locations, start_index, method, return_to_start, distance_matrix
+		)
+		
+		# インデックスから実際の地点リストに変換
+		optimized_route = [locations[i] for i in route_indices]
+		
+		return optimized_route, total_distance
+	
+	def _solve(
+		self,
+		locations: List[Dict[str, Any]],
+		start_index: int,
+		method: str,
+		return_to_start: bool,
+		distance_matrix: Optional[np.ndarray]
+	) -> Tuple[List[int], float]:
+		"""手法を選んでルートを計算（地点インデックスのリストを返す）"""
 		n = len(locations)
 		
 		# 方法を決定
 		if method == 'auto':
-			method = 'exhaustive' if n <= 10 else 'greedy'
+			method = 'held_karp' if n <= self.HELD_KARP_MAX_STOPS else '2opt'
 		
 		# ルートを計算
+		if method == 'held_karp':
+			return self.optimize_route_held_karp(
+				locations, start_index, return_to_start, distance_matrix=distance_matrix
+			)
+		if method == '2opt':
+			return self.optimize_route_2opt(
+				locations, start_index, return_to_start, distance_matrix=distance_matrix
+			)
+		if method == 'multistart':
+			return self.optimize_route_multistart(
+				locations, start_index, return_to_start, distance_matrix=distance_matrix
+			)
 		if method == 'exhaustive':
-			route_indices, total_distance = self.optimize_route_exhaustive(locations, start_index)
-		else:
-			route_indices, total_distance = self.optimize_route_greedy(locations, start_index)
-		
-		# インデックスから実際の地点リストに変換
-		optimized_route = [locations[i] for i in route_indices]
-		
-		return optimized_route, total_distance
+			return self.optimize_route_exhaustive(
+				locations, start_index, return_to_start, distance_matrix=distance_matrix
+			)
+		return self.optimize_route_greedy(
+			locations, start_index, return_to_start, distance_matrix=distance_matrix
+		)
 	
 	def split_route_by_days(
 		self,
 		locations: List[Dict[str, Any]],
 		days: int,
-		start_index: int = 0
+		start_index: int = 0,
+		strategy: str = 'sweep',
+		max_stops_per_day: Optional[int] = None,
+		max_km_per_day: Optional[float] = None,
+		parallel: bool = True,
+		allow_extra_days: bool = False
 	) -> List[Tuple[List[Dict[str, Any]], float]]:
 		"""
 		複数日の旅程に分割
 		
+		'sweep' は全地点を1本のルートに最適化してから、ルート上で連続する区間を
+		各日に割り当てる。区切る位置は動的計画法で選び、日をまたぐ移動（切る辺）が
+		なるべく長くなるようにする（＝日ごとの移動距離の合計が短くなる）。
+		'slice' はリスト順に ceil(n/days) 件ずつ区切る従来の方式。
+		
 		Args:
 			locations: 地点のリスト
 			days: 日数
-			start_index: 開始地点のインデックス
+			start_index: 開始地点のインデックス（1日目の最初の地点）
+			strategy: 'sweep' または 'slice'
+			max_stops_per_day: 1日の最大地点数（省略時は ceil(n/days)）
+			max_km_per_day: 1日の最大移動距離（km、'sweep' のみ）
+			parallel: 地点数が多い場合に日ごとの最適化をプロセス並列で行うか
+			allow_extra_days: 上限を満たせない場合に日数を増やすか
+				（False の場合は ValueError。True の場合は戻り値が days より長くなる）
 			
 		Returns:
 			日ごとの(地点リスト, 総距離)のリスト
+			
+		Raises:
+			ValueError: allow_extra_days=False で、上限を満たすには days 日を超える場合
 		"""
 		n = len(locations)
 		
 		if days <= 0 or n == 0:
 			return []
 		
-		# 1日あたりの地点数を計算
-		points_per_day = math.ceil(n / days)
+		# 全体の距離行列を一度だけ構築し、各日はその部分行列を使う
+		distance_matrix = self.build_distance_matrix(locations)
 		
-		daily_routes = []
+		if strategy == 'slice':
+			# 1日あたりの地点数を計算
+			points_per_day = math.ceil(n / days)
+			day_indices = [
+				list(range(start, min(start + points_per_day, n)))
+				for start in range(0, n, points_per_day)
+			]
+		else:
+			day_indices = self._sweep_days(
+				locations,
+				distance_matrix,
+				days,
+				start_index,
+				max_stops_per_day or math.ceil(n / days),
+				max_km_per_day
+			)
+			if len(day_indices) > days:
+				if not allow_extra_days:
+					raise ValueError(
+						f"1日あたりの上限を満たすには {len(day_indices)}日必要です（指定: {days}日）"
+					)
+				self.logger.warning(
+					f"1日あたりの上限を満たすため、日数を {days}日 → {len(day_indices)}日 に増やしました"
+				)
 		
-		for day in range(days):
-			# この日の地点を抽出
-			start = day * points_per_day
-			end = min((day + 1) * points_per_day, n)
-			
-			if start >= n:
-				break
+		tasks = [
+			([locations[i] for i in indices], distance_matrix[np.ix_(indices, indices)])
+			for indices in day_indices
+		]
+		
+		# この日のルートを最適化（各日は区間の最初の地点から出発）
+		if parallel and n >= self.PARALLEL_MIN_STOPS and len(tasks) > 1:
+			workers = min(len(tasks), os.cpu_count() or 1)
+			with ProcessPoolExecutor(max_workers=workers) as executor:
+				daily_routes = list(executor.map(_optimize_day_worker, tasks))
+		else:
+			daily_routes = [_optimize_day(self, task) for task in tasks]
+		
+		total = sum(distance for _, distance in daily_routes)
+		self.logger.info(
+			f"{days}日間の旅程を生成: {len(daily_routes)}日分, 合計 {total:.1f}km（{strategy}）"
+		)
+		return daily_routes
+	
+	def _sweep_days(
+		self,
+		locations: List[Dict[str, Any]],
+		distance_matrix: np.ndarray,
+		days: int,
+		start_index: int,
+		max_stops: int,
+		max_km: Optional[float]
+	) -> List[List[int]]:
+		"""
+		最適化した全体ルートを連続区間に分けて日ごとの地点インデックスを返す
+		
+		best[d][i] = 先頭 i 地点を d 日に分けたときの「切った辺の長さの合計」の最大値
+		を、制約（1日の地点数・移動距離）を満たす区切りだけで計算する。
+		制約を満たせない場合は日数を増やす（戻り値の日数が days より多くなる）。
+		"""
+		tour, _ = self._solve(locations, start_index, 'auto', False, distance_matrix)
+		order = np.array(tour, dtype=np.int64)
+		n = len(order)
+		
+		# edge[k] = k番目と k+1番目の地点間の距離、prefix[i] = edge[0..i-1] の合計
+		edge = distance_matrix[order[:-1], order[1:]].astype(np.float64)
+		prefix = np.concatenate([[0.0], np.cumsum(edge)])
+		
+		def segment_ok(j: np.ndarray, i: int) -> np.ndarray:
+			# 区間 [j, i) の地点数と区間内の移動距離
+			ok = (i - j) <= max_stops
+			if max_km is not None:
+				ok &= (prefix[i - 1] - prefix[j]) <= max_km
+			return ok
+		
+		target_days = min(days, n)
+		while True:
+			best = np.full((target_days + 1, n + 1), -np.inf)
+			choice = np.zeros((target_days + 1, n + 1), dtype=np.int64)
 			
-			day_locations = locations[start:end]
+			# 1日目は先頭からの区間
+			first = np.arange(1, n + 1)
+			ok = first <= max_stops
+			if max_km is not None:
+				ok &= prefix[first - 1] <= max_km
+			best[1, 1:] = np.where(ok, 0.0, -np.inf)
 			
-			# この日のルートを最適化
-			optimized_route, total_distance = self.optimize_route(
-				day_locations,
-				start_index=0 if day == 0 else 0,
-				method='auto'
-			)
+			for d in range(2, target_days + 1):
+				for i in range(d, n + 1):
+					j = np.arange(max(d - 1, i - max_stops), i)
+					if j.size == 0:
+						continue
+					values = best[d - 1, j] + edge[j - 1]
+					values = np.where(segment_ok(j, i), values, -np.inf)
+					k = int(np.argmax(values))
+					best[d, i] = values[k]
+					choice[d, i] = j[k]
 			
-			daily_routes.append((optimized_route, total_distance))
+			if np.isfinite(best[target_days, n]) or target_days >= n:
+				break
+			target_days += 1
 		
-		self.logger.info(f"{days}日間の旅程を生成: {len(daily_routes)}日分")
-		return daily_routes
+		# 区切り位置を復元
+		bounds = [n]
+		i = n
+		for d in range(target_days, 1, -1):
+			i = int(choice[d, i])
+			bounds.append(i)
+		bounds.append(0)
+		bounds.reverse()
+		
+		return [order[bounds[k]:bounds[k + 1]].tolist() for k in range(target_days)]
 	
 	@staticmethod
 	def estimate_travel_time(distance_km: float, speed_kmh: float = 40.0) -> float:
@@ -271,6 +1209,72 @@ class RouteOptimizer:
 		return distance_km / speed_kmh
 
 
+def _optimize_day(
+	optimizer: RouteOptimizer,
+	task: Tuple[List[Dict[str, Any]], np.ndarray]
+) -> Tuple[List[Dict[str, Any]], float]:
+	"""1日分の地点を最適化（区間の最初の地点から出発）"""
+	day_locations, day_matrix = task
+	return optimizer.optimize_route(
+		day_locations,
+		start_index=0,
+		method='auto',
+		distance_matrix=day_matrix
+	)
+
+
+def _optimize_day_worker(task: Tuple[List[Dict[str, Any]], np.ndarray]) -> Tuple[List[Dict[str, Any]], float]:
+	"""プロセスプール用のワーカー（モジュールレベル関数である必要がある）"""
+	return _optimize_day(RouteOptimizer(), task)
+
+
+# 多始点探索ワーカーの状態（プロセスごとに1回だけ初期化する）
+_multistart_state: Dict[str, Any] = {}
+
+
+def _init_multistart_worker(shm_name: str, shape: Tuple[int, int], dtype: str):
+	"""共有メモリ上の距離行列に接続し、局所探索用の表を作成"""
+	# 共有メモリの削除（unlink）は親プロセスが行う
+	shm = shared_memory.SharedMemory(name=shm_name)
+	matrix = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+	optimizer = RouteOptimizer()
+	_multistart_state.update(
+		shm=shm,
+		matrix=matrix,
+		optimizer=optimizer,
+		tables=optimizer._search_tables(optimizer._search_matrix(matrix))
+	)
+
+
+def _multistart_worker(task: Tuple[Optional[int], int, bool, float]) -> Optional[Tuple[List[int], float]]:
+	"""1回分の試行（初期解の構築 + 局所探索）"""
+	seed, start_index, return_to_start, deadline = task
+	remaining = deadline - time.time()
+	if remaining <= 0:
+		return None
+	
+	optimizer = _multistart_state['optimizer']
+	matrix = _multistart_state['matrix']
+	
+	if seed is None:
+		route = optimizer._nearest_neighbor_route(matrix, start_index)
+	else:
+		route = optimizer._randomized_route(
+			matrix,
+			start_index,
+			np.random.default_rng(seed),
+			optimizer.MULTISTART_CANDIDATES
+		)
+	
+	return optimizer.improve_route(
+		route,
+		matrix,
+		return_to_start=return_to_start,
+		time_limit=deadline - time.time(),
+		tables=_multistart_state['tables']
+	)
+
+
 # テスト用コード
 if __name__ == "__main__":
 	optimizer = RouteOptimizer()
@@ -0,0 +1,538 @@
+"""
+スタブサーバモジュール
+外部サービス（Nominatim・Google Drive など）を模したローカルHTTPサーバ（動作確認・テスト用）
+
+実行方法:
+	python src/stub_servers.py nominatim --port 8766 --fail-every 5
+	python src/stub_servers.py drive --port 8767 --media-dir test_media
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/stub_servers.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import hashlib
+import json
+import mimetypes
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from src.geo import haversine_km
+from src.logger import get_logger
+
+
+# スタブが返す地名（緯度, 経度, Nominatim 形式の address）
+DEFAULT_PLACES: List[Tuple[float, float, Dict[str, str]]] = [
+	(35.6586, 139.7454, {'road': '芝公園', 'city': '港区', 'state': '東京都', 'country': '日本', 'country_code': 'jp'}),
+	(35.7148, 139.7967, {'road': '浅草', 'city': '台東区', 'state': '東京都', 'country': '日本', 'country_code': 'jp'}),
+	(34.9671, 135.7727, {'city': '京都市', 'state': '京都府', 'country': '日本', 'country_code': 'jp'}),
+	(43.0642, 141.3469, {'city': '札幌市', 'state': '北海道', 'country': '日本', 'country_code': 'jp'}),
+	(26.2124, 127.6809, {'city': '那覇市', 'state': '沖縄県', 'country': '日本', 'country_code': 'jp'}),
+]
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+	"""スタブサーバ共通のハンドラ（ログ・JSON 応答）"""
+
+	server_version = "JourneyMapStub/1.0"
+
+	def log_message(self, format, *args):
+		get_logger().debug(f"スタブサーバ: {format % args}")
+
+	def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+		body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json; charset=utf-8")
+		self.send_header("Content-Length", str(len(body)))
+		for name, value in (headers or {}).items():
+			self.send_header(name, value)
+		self.end_headers()
+		self.wfile.write(body)
+
+
+class NominatimStubHandler(_StubRequestHandler):
+	"""/reverse エンドポイント（Nominatim の jsonv2 形式に近い応答）"""
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		if url.path != "/reverse":
+			self._send_json(404, {'error': 'not found'})
+			return
+
+		query = {name: values[0] for name, values in parse_qs(url.query).items()}
+		try:
+			lat = float(query['lat'])
+			lon = float(query['lon'])
+		except (KeyError, ValueError):
+			self._send_json(400, {'error': 'lat, lon は必須です'})
+			return
+
+		failure = self.server.record_request(lat, lon)
+		if failure == 'timeout':
+			# クライアントのタイムアウトより長く待ってから応答する
+			time.sleep(self.server.timeout_delay)
+		elif failure == 'rate_limit':
+			self._send_json(429, {'error': 'Too Many Requests'}, headers={'Retry-After': '1'})
+			return
+		elif failure == 'unavailable':
+			self._send_json(503, {'error': 'Service Unavailable'})
+			return
+
+		place = self.server.nearest_place(lat, lon)
+		if place is None:
+			self._send_json(200, {'error': 'Unable to geocode'})
+			return
+
+		place_lat, place_lon, address = place
+		display_name = ", ".join(
+			address[key] for key in ('road', 'city', 'state', 'country') if address.get(key)
+		)
+		self._send_json(200, {
+			'place_id': abs(hash((place_lat, place_lon))) % 10 ** 9,
+			'lat': str(place_lat),
+			'lon': str(place_lon),
+			'display_name': display_name,
+			'address': address
+		})
+
+
+class StubNominatimServer(ThreadingHTTPServer):
+	"""
+	Nominatim を模したローカルHTTPサーバ
+
+	失敗を混ぜて、ReverseGeocoder・AsyncGeocodingWorker の再試行やレート制限を確認できる。
+	"""
+
+	daemon_threads = True
+
+	def __init__(
+		self,
+		host: str = "127.0.0.1",
+		port: int = 0,
+		places: Optional[List[Tuple[float, float, Dict[str, str]]]] = None,
+		max_distance_km: float = 50.0,
+		fail_every: int = 0,
+		failure: str = 'unavailable',
+		timeout_delay: float = 2.0
+	):
+		"""
+		サーバを初期化
+
+		Args:
+			host: 待ち受けアドレス
+			port: 待ち受けポート（0 で空きポートを自動選択）
+			places: 返す地名（省略時は DEFAULT_PLACES）
+			max_distance_km: これより遠い地名しかない場合は「該当なし」を返す
+			fail_every: n 回に1回失敗させる（0 で失敗しない）
+			failure: 失敗の種類（'unavailable': 503, 'rate_limit': 429, 'timeout': 応答を遅らせる）
+			timeout_delay: failure='timeout' のときに応答を遅らせる秒数
+		"""
+		super().__init__((host, port), NominatimStubHandler)
+		self.places = list(places if places is not None else DEFAULT_PLACES)
+		self.max_distance_km = max_distance_km
+		self.fail_every = fail_every
+		self.failure = failure
+		self.timeout_delay = timeout_delay
+
+		# 受け付けたリクエストの記録（単調時刻, 緯度, 経度）
+		self.requests: List[Tuple[float, float, float]] = []
+		self._lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def domain(self) -> str:
+		"""ReverseGeocoder(domain=..., scheme='http') に渡すホスト:ポート"""
+		host, port = self.server_address[:2]
+		return f"{host}:{port}"
+
+	def record_request(self, lat: float, lon: float) -> Optional[str]:
+		"""リクエストを記録し、失敗させる場合はその種類を返す"""
+		with self._lock:
+			self.requests.append((time.monotonic(), lat, lon))
+			count = len(self.requests)
+		if self.fail_every and count % self.fail_every == 0:
+			return self.failure
+		return None
+
+	def max_rate(self, window: float = 1.0) -> int:
+		"""任意の window 秒間に受け付けた最大リクエスト数（レート制限の確認用）"""
+		with self._lock:
+			times = sorted(t for t, _, _ in self.requests)
+		best = 0
+		start = 0
+		for end, t in enumerate(times):
+			while t - times[start] >= window:
+				start += 1
+			best = max(best, end - start + 1)
+		return best
+
+	def nearest_place(self, lat: float, lon: float) -> Optional[Tuple[float, float, Dict[str, str]]]:
+		"""最も近い地名（max_distance_km 以内）"""
+		best = None
+		best_km = self.max_distance_km
+		for place in self.places:
+			km = float(haversine_km(lat, lon, place[0], place[1]))
+			if km <= best_km:
+				best, best_km = place, km
+		return best
+
+	def start(self) -> str:
+		"""バックグラウンドスレッドで起動し、ホスト:ポートを返す"""
+		if self._thread is None:
+			self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+			self._thread.start()
+		return self.domain
+
+	def stop(self):
+		"""サーバを停止"""
+		if self._thread is not None:
+			self.shutdown()
+			self._thread.join(timeout=5)
+			self._thread = None
+		self.server_close()
+
+
+class FakeDriveHandler(_StubRequestHandler):
+	"""Drive API v3 の一部（files.list / files.get / alt=media の Range 取得 / changes）"""
+
+	API_PREFIX = "/drive/v3"
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		query = {name: values[0] for name, values in parse_qs(url.query).items()}
+		if not url.path.startswith(self.API_PREFIX):
+			self._send_json(404, {'error': 'not found'})
+			return
+
+		path = url.path[len(self.API_PREFIX):]
+		if path == "/changes/startPageToken":
+			self._send_json(200, {'startPageToken': self.server.start_page_token()})
+		elif path == "/changes":
+			self._send_json(200, self.server.list_changes(query))
+		elif path == "/files":
+			self._send_json(200, self.server.list_files(query))
+		elif path.startswith("/files/"):
+			file_id = unquote(path[len("/files/"):])
+			entry = self.server.files.get(file_id)
+			if entry is None:
+				self._send_json(404, {'error': {'code': 404, 'message': f'File not found: {file_id}'}})
+			elif query.get('alt') == 'media':
+				self._send_media(file_id, entry)
+			else:
+				self._send_json(200, self.server.metadata(entry))
+		else:
+			self._send_json(404, {'error': 'not found'})
+
+	def _send_media(self, file_id: str, entry: Dict[str, Any]):
+		content = entry['content']
+		range_header = self.headers.get('Range')
+		if self.server.record_media_request(file_id, range_header):
+			self._send_json(503, {'error': {'code': 503, 'message': 'Backend Error'}})
+			return
+
+		start, end, status = 0, len(content) - 1, 200
+		match = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+		if match:
+			start = int(match.group(1))
+			end = min(int(match.group(2)) if match.group(2) else len(content) - 1, len(content) - 1)
+			status = 206
+			if start >= len(content):
+				self.send_response(416)
+				self.send_header("Content-Range", f"bytes */{len(content)}")
+				self.send_header("Content-Length", "0")
+				self.end_headers()
+				return
+
+		body = content[start:end + 1]
+		self.send_response(status)
+		self.send_header("Content-Type", entry['mimeType'])
+		self.send_header("Content-Length", str(len(body)))
+		if status == 206:
+			self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+		self.end_headers()
+		self.wfile.write(body)
+
+
+class FakeDriveServer(ThreadingHTTPServer):
+	"""
+	Google Drive API を模したローカルHTTPサーバ
+
+	service_factory() を DriveSync(service_factory=...) に渡すと、
+	認証なしでこのサーバに接続する Drive v3 サービスが作られる。
+	"""
+
+	daemon_threads = True
+	FOLDER_MIME = "application/vnd.google-apps.folder"
+
+	def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_media_every: int = 0):
+		"""
+		サーバを初期化
+
+		Args:
+			host: 待ち受けアドレス
+			port: 待ち受けポート（0 で空きポートを自動選択）
+			fail_media_every: ファイル本体の取得を n 回に1回 503 で失敗させる（0 で失敗しない）
+		"""
+		super().__init__((host, port), FakeDriveHandler)
+		self.fail_media_every = fail_media_every
+		self.files: Dict[str, Dict[str, Any]] = {}
+		# 変更履歴（ファイルIDの列、changes の pageToken はこの位置）
+		self.change_log: List[str] = []
+
+		# 受け付けた本体取得リクエストの記録（ファイルID, Range ヘッダ）
+		self.media_requests: List[Tuple[str, Optional[str]]] = []
+		self._lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def api_endpoint(self) -> str:
+		host, port = self.server_address[:2]
+		return f"http://{host}:{port}{FakeDriveHandler.API_PREFIX}/"
+
+	def service_factory(self):
+		"""このサーバに接続する Drive v3 サービスを作る関数"""
+		import httplib2
+		from googleapiclient.discovery import build
+
+		endpoint = self.api_endpoint
+
+		def factory():
+			return build(
+				"drive", "v3",
+				http=httplib2.Http(),
+				client_options={"api_endpoint": endpoint},
+				static_discovery=True
+			)
+		return factory
+
+	@staticmethod
+	def _now() -> str:
+		return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+	def add_folder(self, name: str, parent: Optional[str] = None, folder_id: Optional[str] = None) -> str:
+		"""フォルダを追加してIDを返す"""
+		folder_id = folder_id or uuid.uuid4().hex[:16]
+		with self._lock:
+			self.files[folder_id] = {
+				'id': folder_id,
+				'name': name,
+				'mimeType': self.FOLDER_MIME,
+				'parents': [parent] if parent else [],
+				'modifiedTime': self._now(),
+				'trashed': False,
+				'content': b''
+			}
+			self.change_log.append(folder_id)
+		return folder_id
+
+	def add_file(
+		self,
+		name: str,
+		content: bytes,
+		parent: Optional[str] = None,
+		mime_type: Optional[str] = None,
+		modified_time: Optional[str] = None,
+		file_id: Optional[str] = None
+	) -> str:
+		"""ファイルを追加（同じIDなら更新）してIDを返す"""
+		file_id = file_id or uuid.uuid4().hex[:16]
+		with self._lock:
+			self.files[file_id] = {
+				'id': file_id,
+				'name': name,
+				'mimeType': mime_type or mimetypes.guess_type(name)[0] or 'application/octet-stream',
+				'parents': [parent] if parent else [],
+				'modifiedTime': modified_time or self._now(),
+				'trashed': False,
+				'content': content
+			}
+			self.change_log.append(file_id)
+		return file_id
+
+	def update_file(self, file_id: str, **fields) -> None:
+		"""メタデータを更新（name・parents・trashed など。content を渡すと本体も更新）"""
+		with self._lock:
+			self.files[file_id].update(fields)
+			self.files[file_id]['modifiedTime'] = fields.get('modifiedTime') or self._now()
+			self.change_log.append(file_id)
+
+	def delete_file(self, file_id: str) -> None:
+		"""ファイルを完全に削除（changes では removed として返る）"""
+		with self._lock:
+			self.files.pop(file_id, None)
+			self.change_log.append(file_id)
+
+	def add_directory(self, directory: Path, parent: Optional[str] = None) -> str:
+		"""ローカルのディレクトリをフォルダとして再帰的に追加し、フォルダIDを返す"""
+		directory = Path(directory)
+		folder_id = self.add_folder(directory.name, parent)
+		for path in sorted(directory.iterdir()):
+			if path.is_dir():
+				self.add_directory(path, folder_id)
+			elif path.is_file():
+				self.add_file(path.name, path.read_bytes(), parent=folder_id)
+		return folder_id
+
+	def metadata(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+		"""files.get・files.list が返すメタデータ"""
+		meta = {key: value for key, value in entry.items() if key != 'content'}
+		if entry['mimeType'] != self.FOLDER_MIME:
+			meta['size'] = str(len(entry['content']))
+			meta['md5Checksum'] = hashlib.md5(entry['content']).hexdigest()
+		return meta
+
+	@staticmethod
+	def _select_fields(meta: Dict[str, Any], fields: Optional[str], name: str) -> Dict[str, Any]:
+		"""fields パラメータの name(...) で指定された項目だけを残す（指定がなければそのまま）"""
+		match = re.search(rf"\b{name}\(([^)]*)\)", fields or "")
+		if not match:
+			return meta
+		keys = {key.strip() for key in match.group(1).split(",")}
+		return {key: value for key, value in meta.items() if key in keys}
+
+	@classmethod
+	def _matches(cls, entry: Dict[str, Any], q: str) -> bool:
+		"""
+		files.list の q を簡易的に評価
+
+		mimeType の条件（= と contains）はまとめて OR、それ以外の種類の条件とは AND として扱う。
+		modifiedTime の条件はフォルダには適用しない（再帰的な一覧のクエリ向け）。
+		"""
+		parents = re.findall(r"'([^']+)' in parents", q)
+		if parents and not set(parents) & set(entry['parents']):
+			return False
+		prefixes = re.findall(r"mimeType contains '([^']+)'", q)
+		equals = re.findall(r"mimeType = '([^']+)'", q)
+		if (prefixes or equals) and not (
+			entry['mimeType'] in equals or any(prefix in entry['mimeType'] for prefix in prefixes)
+		):
+			return False
+		if entry['mimeType'] in re.findall(r"mimeType != '([^']+)'", q):
+			return False
+		after = re.search(r"modifiedTime > '([^']+)'", q)
+		if after and entry['mimeType'] != cls.FOLDER_MIME and not entry['modifiedTime'] > after.group(1):
+			return False
+		if "trashed = false" in q and entry['trashed']:
+			return False
+		return True
+
+	def list_files(self, query: Dict[str, str]) -> Dict[str, Any]:
+		"""files.list（pageToken は先頭からの件数）"""
+		q = query.get('q', '')
+		with self._lock:
+			entries = [entry for entry in self.files.values() if self._matches(entry, q)]
+		if query.get('orderBy', '').startswith('modifiedTime'):
+			entries.sort(key=lambda entry: entry['modifiedTime'], reverse=query['orderBy'].endswith('desc'))
+		else:
+			entries.sort(key=lambda entry: entry['name'])
+
+		offset = int(query.get('pageToken') or 0)
+		page_size = int(query.get('pageSize') or 100)
+		page = entries[offset:offset + page_size]
+		response: Dict[str, Any] = {
+			'files': [self._select_fields(self.metadata(entry), query.get('fields'), 'files') for entry in page]
+		}
+		if offset + page_size < len(entries):
+			response['nextPageToken'] = str(offset + page_size)
+		return response
+
+	def start_page_token(self) -> str:
+		"""changes.getStartPageToken（これ以降の変更だけを返すトークン）"""
+		with self._lock:
+			return str(len(self.change_log))
+
+	def list_changes(self, query: Dict[str, str]) -> Dict[str, Any]:
+		"""changes.list（変更ごとに現在のメタデータを返す）"""
+		offset = int(query.get('pageToken') or 0)
+		page_size = int(query.get('pageSize') or 100)
+		with self._lock:
+			page = self.change_log[offset:offset + page_size]
+			end = len(self.change_log)
+			changes = []
+			for file_id in page:
+				entry = self.files.get(file_id)
+				change: Dict[str, Any] = {'kind': 'drive#change', 'changeType': 'file', 'fileId': file_id}
+				if entry is None:
+					change['removed'] = True
+				else:
+					change['removed'] = False
+					change['file'] = self._select_fields(self.metadata(entry), query.get('fields'), 'file')
+				changes.append(change)
+
+		response: Dict[str, Any] = {'changes': changes}
+		if offset + page_size < end:
+			response['nextPageToken'] = str(offset + page_size)
+		else:
+			response['newStartPageToken'] = str(end)
+		return response
+
+	def record_media_request(self, file_id: str, range_header: Optional[str]) -> bool:
+		"""本体取得リクエストを記録し、失敗させる場合は True"""
+		with self._lock:
+			self.media_requests.append((file_id, range_header))
+			count = len(self.media_requests)
+		return bool(self.fail_media_every) and count % self.fail_media_every == 0
+
+	def start(self) -> str:
+		"""バックグラウンドスレッドで起動し、API のエンドポイントを返す"""
+		if self._thread is None:
+			self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+			self._thread.start()
+		return self.api_endpoint
+
+	def stop(self):
+		"""サーバを停止"""
+		if self._thread is not None:
+			self.shutdown()
+			self._thread.join(timeout=5)
+			self._thread = None
+		self.server_close()
+
+
+def main():
+	"""スタンドアロン起動用メイン関数"""
+	import argparse
+
+	parser = argparse.ArgumentParser(description="JourneyMap 動作確認用スタブサーバ")
+	parser.add_argument("service", choices=["nominatim", "drive"])
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8766)
+	parser.add_argument("--fail-every", type=int, default=0, help="n 回に1回失敗させる")
+	parser.add_argument("--failure", choices=["unavailable", "rate_limit", "timeout"], default="unavailable")
+	parser.add_argument("--media-dir", default="test_media", help="drive: フォルダとして公開するディレクトリ")
+	args = parser.parse_args()
+
+	if args.service == "drive":
+		server = FakeDriveServer(host=args.host, port=args.port, fail_media_every=args.fail_every)
+		folder_id = server.add_directory(_project_root / args.media_dir)
+		print(f"🧪 Drive スタブ: {server.api_endpoint}")
+		print(f"   フォルダID: {folder_id}（{len(server.files) - 1}件）")
+	else:
+		server = StubNominatimServer(
+			host=args.host,
+			port=args.port,
+			fail_every=args.fail_every,
+			failure=args.failure
+		)
+		print(f"🧪 Nominatim スタブ: http://{server.domain}/reverse")
+		print(f"   ReverseGeocoder(domain='{server.domain}', scheme='http') で接続できます")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,700 @@
+"""
+タイル事前レンダリングモジュール
+写真の撮影地点と移動軌跡（trajectory.py で区間に分けたもの）を XYZ 形式の PNG タイルに描画し、
+MBTiles（SQLite）に保存する
+"""
+
+import sys
+from pathlib import Path as _PathForSysPath
+# 実行方法が `python src/tile_renderer.py` の場合でも import できるようにパス調整
+_project_root = _PathForSysPath(__file__).parent.parent
+if str(_project_root) not in sys.path:
+	sys.path.append(str(_project_root))
+
+import hashlib
+import io
+import math
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from src.logger import get_logger
+from src.trajectory import MODES, build_segments
+
+
+TILE_SIZE = 256
+
+# Web メルカトルで表示できる緯度の上限
+MAX_LATITUDE = 85.05112878
+
+
+def lonlat_to_world_pixels(lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+	緯度経度をズーム0のワールドピクセル座標（0〜256）に変換
+
+	Args:
+		lats: 緯度配列
+		lons: 経度配列
+
+	Returns:
+		(x, y) の配列
+	"""
+	lats = np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE)
+	x = (lons + 180.0) / 360.0 * TILE_SIZE
+	sin_lat = np.sin(np.radians(lats))
+	y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * TILE_SIZE
+	return x, y
+
+
+def tile_bounds_world(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+	"""タイルの範囲（ズーム0のワールドピクセル座標）"""
+	scale = TILE_SIZE / (2 ** z)
+	return x * scale, y * scale, (x + 1) * scale, (y + 1) * scale
+
+
+# 移動手段ごとのルートの描き方（MapGenerator.ROUTE_MODE_STYLES に合わせる）
+# color が None の場合は route_color、dash は (線の長さ, 間隔) ピクセル
+ROUTE_MODE_STYLES = {
+	'walk': {'color': None, 'dash': (2, 8), 'opacity_scale': 1.0},
+	'drive': {'color': None, 'dash': None, 'opacity_scale': 1.0},
+	'flight': {'color': (127, 140, 141), 'dash': (10, 10), 'opacity_scale': 0.6},
+}
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+# ワーカープロセス用の描画データ（initializer で1度だけ受け取る）
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(state: Dict[str, Any]):
+	_worker_state.clear()
+	_worker_state.update(state)
+
+
+def _render_tiles_worker(jobs: List[tuple]) -> List[Tuple[int, int, int, Optional[bytes]]]:
+	return [(z, x, y, _render_tile(_worker_state, z, x, y, dots, segs)) for z, x, y, dots, segs in jobs]
+
+
+def _draw_dashed(draw, ax: float, ay: float, bx: float, by: float, dash: Tuple[int, int], fill, width: int):
+	"""
+	破線を描画（タイルの範囲にかかる部分の線だけ）
+
+	線の位相は線分の始点から数えるため、隣のタイルと継ぎ目がずれない。
+	"""
+	dx, dy = bx - ax, by - ay
+	length = math.hypot(dx, dy)
+	if length == 0:
+		return
+
+	# 線分のうちタイル（+線の太さ）に入る範囲 [t0, t1] を求める（Liang-Barsky）
+	lo, hi = -width, TILE_SIZE + width
+	t0, t1 = 0.0, 1.0
+	for p, q in ((-dx, ax - lo), (dx, hi - ax), (-dy, ay - lo), (dy, hi - ay)):
+		if p == 0:
+			if q < 0:
+				return
+			continue
+		t = q / p
+		if p < 0:
+			t0 = max(t0, t)
+		else:
+			t1 = min(t1, t)
+	if t0 > t1:
+		return
+
+	on, off = dash
+	period = on + off
+	for k in range(int(t0 * length // period), int(math.ceil(t1 * length / period))):
+		s = k * period / length
+		e = min(k * period + on, length) / length
+		draw.line([(ax + dx * s, ay + dy * s), (ax + dx * e, ay + dy * e)], fill=fill, width=width)
+
+
+def _render_tile(
+	state: Dict[str, Any],
+	z: int,
+	x: int,
+	y: int,
+	dots: np.ndarray = None,
+	segs: np.ndarray = None
+) -> Optional[bytes]:
+	"""
+	タイルを1枚描画
+
+	Args:
+		state: TileRenderer._build_state() の戻り値
+		z, x, y: タイル座標
+		dots: このタイルにかかる撮影地点のインデックス（TileRenderer._tile_jobs で振り分け済み）
+		segs: このタイルにかかるルート線分のインデックス
+
+	Returns:
+		PNG バイト列（描画対象がない場合は None）
+	"""
+	dots = _EMPTY if dots is None else dots
+	segs = _EMPTY if segs is None else segs
+	if dots.size == 0 and segs.size == 0:
+		return None
+
+	scale = 2 ** z
+	x0, y0, _, _ = tile_bounds_world(z, x, y)
+	radius = state['dot_radius']
+	width = state['route_width']
+
+	image = Image.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+	draw = ImageDraw.Draw(image, 'RGBA')
+
+	# ルート（移動手段ごとの区間の線分）
+	if segs.size:
+		lines = np.column_stack([
+			(state['seg_ax'][segs] - x0) * scale,
+			(state['seg_ay'][segs] - y0) * scale,
+			(state['seg_bx'][segs] - x0) * scale,
+			(state['seg_by'][segs] - y0) * scale
+		])
+		modes = state['seg_mode'][segs]
+		for mode, (fill, dash) in enumerate(state['route_styles']):
+			selected = lines[modes == mode]
+			if selected.size == 0:
+				continue
+			# 低ズームで同じピクセルに重なる線分は1回だけ描く
+			selected = _unique_rows(np.round(selected, 1))
+			for a_x, a_y, b_x, b_y in selected.tolist():
+				if dash is None:
+					draw.line([(a_x, a_y), (b_x, b_y)], fill=fill, width=width)
+				else:
+					_draw_dashed(draw, a_x, a_y, b_x, b_y, dash, fill, width)
+
+	# 撮影地点のドット（同じピクセルに重なるものは1回だけ描く）
+	if dots.size:
+		centers = _unique_rows(np.round(np.column_stack([
+			(state['px'][dots] - x0) * scale,
+			(state['py'][dots] - y0) * scale
+		])))
+		for c_x, c_y in centers.tolist():
+			draw.ellipse(
+				[c_x - radius, c_y - radius, c_x + radius, c_y + radius],
+				fill=state['dot_color'],
+				outline=(255, 255, 255, 255)
+			)
+
+	buf = io.BytesIO()
+	image.save(buf, format='PNG', compress_level=6)
+	return buf.getvalue()
+
+
+def _unique_rows(rows: np.ndarray) -> np.ndarray:
+	"""重複する行を除く（np.unique(axis=0) より高速な辞書順ソートによる実装）"""
+	if len(rows) < 2:
+		return rows
+	rows = rows[np.lexsort(rows.T[::-1])]
+	keep = np.ones(len(rows), dtype=bool)
+	keep[1:] = np.any(rows[1:] != rows[:-1], axis=1)
+	return rows[keep]
+
+
+def _bucket(keys: np.ndarray, indices: np.ndarray) -> Dict[int, np.ndarray]:
+	"""(タイルキー, 要素インデックス) の組をタイルキーごとのインデックス配列にまとめる"""
+	if keys.size == 0:
+		return {}
+	# 2つの整数を1つにまとめて1次元でソート・重複除去する
+	width = int(indices.max()) + 1
+	combined = np.unique(keys * width + indices)
+	keys, indices = np.divmod(combined, width)
+	splits = np.flatnonzero(np.diff(keys)) + 1
+	starts = np.concatenate(([0], splits))
+	return {
+		int(keys[start]): group
+		for start, group in zip(starts.tolist(), np.split(indices, splits))
+	}
+
+
+class MBTilesStore:
+	"""MBTiles（SQLite）形式のタイルストア"""
+
+	def __init__(self, path):
+		"""
+		タイルストアを開く（存在しない場合は作成）
+
+		Args:
+			path: MBTiles ファイルのパス
+		"""
+		self.path = Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self.conn = sqlite3.connect(self.path, check_same_thread=False)
+		self.conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+		self.conn.execute("""
+			CREATE TABLE IF NOT EXISTS tiles (
+				zoom_level INTEGER,
+				tile_column INTEGER,
+				tile_row INTEGER,
+				tile_data BLOB
+			)
+		""")
+		self.conn.execute("""
+			CREATE UNIQUE INDEX IF NOT EXISTS tile_index
+			ON tiles (zoom_level, tile_column, tile_row)
+		""")
+		self.conn.commit()
+
+	def close(self):
+		if self.conn:
+			self.conn.close()
+			self.conn = None
+
+	def get_metadata(self, name: str, default: str = None) -> Optional[str]:
+		row = self.conn.execute("SELECT value FROM metadata WHERE name = ?", (name,)).fetchone()
+		return row[0] if row else default
+
+	def set_metadata(self, values: Dict[str, Any]):
+		self.conn.executemany(
+			"INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+			[(k, str(v)) for k, v in values.items()]
+		)
+		self.conn.commit()
+
+	def write_tiles(self, tiles: Iterable[Tuple[int, int, int, Optional[bytes]]]) -> Tuple[int, int]:
+		"""
+		タイルを書き込む（XYZ 座標で受け取り、MBTiles の TMS 行番号に変換）
+
+		描画対象がない（データが None の）タイルは削除する。
+
+		Returns:
+			(書き込み件数, 削除件数)
+		"""
+		upserts = []
+		deletes = []
+		for z, x, y, data in tiles:
+			row = (2 ** z) - 1 - y
+			if data is None:
+				deletes.append((z, x, row))
+			else:
+				upserts.append((z, x, row, sqlite3.Binary(data)))
+
+		with self.conn:
+			if upserts:
+				self.conn.executemany(
+					"INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+					upserts
+				)
+			if deletes:
+				self.conn.executemany(
+					"DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+					deletes
+				)
+		return len(upserts), len(deletes)
+
+	def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+		"""XYZ 座標でタイルを取得"""
+		row = (2 ** z) - 1 - y
+		result = self.conn.execute(
+			"SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+			(z, x, row)
+		).fetchone()
+		return bytes(result[0]) if result else None
+
+
+class TileRenderer:
+	"""写真オーバーレイのタイル事前レンダリングクラス"""
+
+	def __init__(
+		self,
+		dot_color: Tuple[int, int, int, int] = (214, 62, 42, 230),
+		dot_radius: int = 4,
+		route_color: Tuple[int, int, int, int] = (255, 107, 53, 200),
+		route_width: int = 3,
+		draw_route: bool = True,
+		max_workers: int = None
+	):
+		"""
+		タイルレンダラーを初期化
+
+		Args:
+			dot_color: 撮影地点の色（RGBA）
+			dot_radius: 撮影地点の半径（ピクセル）
+			route_color: ルートの色（RGBA）
+			route_width: ルートの太さ（ピクセル）
+			draw_route: ルートを描画するか
+			max_workers: 並列プロセス数（省略時はCPUコア数）
+		"""
+		self.dot_color = dot_color
+		self.dot_radius = dot_radius
+		self.route_color = route_color
+		self.route_width = route_width
+		self.draw_route = draw_route
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.logger = get_logger()
+
+	@staticmethod
+	def _valid_sorted(photos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+		"""GPS情報を持つ写真を時系列順に並べる（add_route と同じ順序）"""
+		valid = [p for p in photos if p.get('latitude') is not None and p.get('longitude') is not None]
+		return sorted(valid, key=lambda p: p.get('timestamp') or '9999-99-99')
+
+	@staticmethod
+	def content_hash(photos: List[Dict[str, Any]]) -> str:
+		"""
+		描画内容に関わる写真データ（ID・座標・撮影日時）のハッシュ
+
+		MAX(id) では検出できない座標の更新や削除も差分描画の判定に反映するために使う。
+		"""
+		rows = sorted(
+			(p.get('id') or 0, p['latitude'], p['longitude'], p.get('timestamp') or '')
+			for p in photos
+			if p.get('latitude') is not None and p.get('longitude') is not None
+		)
+		digest = hashlib.sha1()
+		for row in rows:
+			digest.update(repr(row).encode('utf-8'))
+		return digest.hexdigest()
+
+	def _route_styles(self) -> List[Tuple[Tuple[int, int, int, int], Optional[Tuple[int, int]]]]:
+		"""移動手段（trajectory.MODES の順）ごとの (RGBA, 破線) のリスト"""
+		styles = []
+		for mode in MODES:
+			style = ROUTE_MODE_STYLES[mode]
+			rgb = style['color'] or self.route_color[:3]
+			alpha = int(round(self.route_color[3] * style['opacity_scale']))
+			styles.append(((*rgb, alpha), style['dash']))
+		return styles
+
+	def _build_state(self, photos: List[Dict[str, Any]]) -> Dict[str, Any]:
+		"""
+		描画用の共有データを作成
+
+		撮影地点のワールドピクセル座標と、trajectory.build_segments() で
+		区間に分けた移動軌跡の線分（移動手段つき）を持つ。
+		"""
+		lats = np.array([p['latitude'] for p in photos], dtype=np.float64)
+		lons = np.array([p['longitude'] for p in photos], dtype=np.float64)
+		px, py = lonlat_to_world_pixels(lats, lons)
+
+		# 区間ごとの座標列を隣り合う2点の線分に分解
+		starts, ends, modes = [], [], []
+		if self.draw_route:
+			for segment in build_segments(photos)['segments']:
+				coords = np.asarray(segment['coordinates'], dtype=np.float64)
+				starts.append(coords[:-1])
+				ends.append(coords[1:])
+				modes.append(np.full(len(coords) - 1, MODES.index(segment['mode']), dtype=np.int8))
+		a = np.concatenate(starts) if starts else np.zeros((0, 2))
+		b = np.concatenate(ends) if ends else np.zeros((0, 2))
+		ax, ay = lonlat_to_world_pixels(a[:, 0], a[:, 1])
+		bx, by = lonlat_to_world_pixels(b[:, 0], b[:, 1])
+
+		return {
+			'px': px,
+			'py': py,
+			'dot_radius': self.dot_radius,
+			'dot_color': self.dot_color,
+			'route_width': self.route_width,
+			'route_styles': self._route_styles(),
+			'seg_ax': ax,
+			'seg_ay': ay,
+			'seg_bx': bx,
+			'seg_by': by,
+			'seg_mode': np.concatenate(modes) if modes else np.zeros(0, dtype=np.int8)
+		}
+
+	def _point_tiles(self, xs: np.ndarray, ys: np.ndarray, z: int) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		ワールド座標の点が重なるタイル（キー = x * 2^z + y）と点のインデックスの組
+
+		ドット・線の太さ分だけタイル境界に近い点は隣のタイルにも含める。
+		"""
+		n = 2 ** z
+		margin = (self.dot_radius + self.route_width) / TILE_SIZE
+		tx = xs * (n / TILE_SIZE)
+		ty = ys * (n / TILE_SIZE)
+		indices = np.arange(xs.size, dtype=np.int64)
+		keys = []
+		for ox in (-margin, 0.0, margin):
+			for oy in (-margin, 0.0, margin):
+				cx = np.clip(np.floor(tx + ox), 0, n - 1).astype(np.int64)
+				cy = np.clip(np.floor(ty + oy), 0, n - 1).astype(np.int64)
+				keys.append(cx * n + cy)
+		return np.concatenate(keys), np.tile(indices, 9)
+
+	def _segment_tiles(
+		self,
+		ax: np.ndarray,
+		ay: np.ndarray,
+		bx: np.ndarray,
+		by: np.ndarray,
+		z: int
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		ワールド座標の線分が通過するタイルのキーと線分のインデックスの組
+
+		外接矩形ではなく線分上を半タイル間隔でサンプリングするため、
+		長い斜めの線分でも通過するタイルだけが対象になる。
+		"""
+		scale = (2 ** z) / TILE_SIZE
+		length = np.maximum(np.abs(bx - ax), np.abs(by - ay)) * scale
+		steps = np.ceil(length * 2).astype(np.int64) + 1
+		seg = np.repeat(np.arange(ax.size, dtype=np.int64), steps)
+		offsets = np.arange(seg.size) - np.repeat(np.cumsum(steps) - steps, steps)
+		t = offsets / np.repeat(np.maximum(steps - 1, 1), steps)
+		xs = ax[seg] + (bx[seg] - ax[seg]) * t
+		ys = ay[seg] + (by[seg] - ay[seg]) * t
+		keys, sample = self._point_tiles(xs, ys, z)
+		return keys, seg[sample]
+
+	def _dot_buckets(self, state: Dict[str, Any], z: int, indices: np.ndarray = None) -> Dict[int, np.ndarray]:
+		"""タイルキーごとの撮影地点インデックス（indices 指定時はその地点だけ）"""
+		px, py = state['px'], state['py']
+		if indices is None:
+			indices = np.arange(px.size, dtype=np.int64)
+		keys, local = self._point_tiles(px[indices], py[indices], z)
+		return _bucket(keys, indices[local])
+
+	def _segment_buckets(self, state: Dict[str, Any], z: int, indices: np.ndarray = None) -> Dict[int, np.ndarray]:
+		"""タイルキーごとのルート線分インデックス（indices 指定時はその線分だけ）"""
+		if indices is None:
+			indices = np.arange(state['seg_ax'].size, dtype=np.int64)
+		keys, local = self._segment_tiles(
+			state['seg_ax'][indices], state['seg_ay'][indices],
+			state['seg_bx'][indices], state['seg_by'][indices], z
+		)
+		return _bucket(keys, indices[local])
+
+	def _tile_jobs(
+		self,
+		state: Dict[str, Any],
+		zooms: Iterable[int],
+		targets: Optional[Set[Tuple[int, int, int]]] = None
+	) -> List[tuple]:
+		"""
+		タイルごとの描画ジョブ (z, x, y, 地点インデックス, 線分インデックス) を作成
+
+		地点と線分をズームごとに1度だけタイルへ振り分けるため、
+		各タイルの描画は自分にかかる要素だけを扱う（全要素の走査はしない）。
+
+		Args:
+			state: _build_state() の戻り値
+			zooms: ズームレベル
+			targets: 描画するタイル（省略時は何かが重なるタイルすべて）。
+				重なる要素がなくなったタイルは空のジョブになり、書き込み時に削除される
+		"""
+		jobs = []
+		for z in zooms:
+			n = 2 ** z
+			dots = self._dot_buckets(state, z)
+			segs = self._segment_buckets(state, z)
+			if targets is None:
+				keys = set(dots) | set(segs)
+			else:
+				keys = {x * n + y for tz, x, y in targets if tz == z}
+			for key in sorted(keys):
+				jobs.append((z, key // n, key % n, dots.get(key, _EMPTY), segs.get(key, _EMPTY)))
+		return jobs
+
+	def _changed_tiles(
+		self,
+		old_state: Dict[str, Any],
+		new_state: Dict[str, Any],
+		new_indices: np.ndarray,
+		zooms: Iterable[int]
+	) -> Set[Tuple[int, int, int]]:
+		"""
+		写真の追加で見た目が変わるタイル
+
+		追加した地点のドットに加え、軌跡の区間分け・移動手段の分類・誤測位の除去が
+		前後の地点に波及するため、追加前後で差のある線分（消えた線分と増えた線分）が
+		重なるタイルを対象にする。
+		"""
+		def segment_rows(state):
+			return np.column_stack([
+				state['seg_ax'], state['seg_ay'], state['seg_bx'], state['seg_by'], state['seg_mode']
+			])
+
+		old_rows = segment_rows(old_state)
+		new_rows = segment_rows(new_state)
+		old_set = set(map(tuple, old_rows.tolist()))
+		new_set = set(map(tuple, new_rows.tolist()))
+		removed = np.array([i for i, row in enumerate(old_rows.tolist()) if tuple(row) not in new_set], dtype=np.int64)
+		added = np.array([i for i, row in enumerate(new_rows.tolist()) if tuple(row) not in old_set], dtype=np.int64)
+
+		tiles: Set[Tuple[int, int, int]] = set()
+		for z in zooms:
+			n = 2 ** z
+			keys = set(self._dot_buckets(new_state, z, new_indices))
+			if removed.size:
+				keys |= set(self._segment_buckets(old_state, z, removed))
+			if added.size:
+				keys |= set(self._segment_buckets(new_state, z, added))
+			tiles.update((z, key // n, key % n) for key in keys)
+		return tiles
+
+	def _render_and_store(
+		self,
+		state: Dict[str, Any],
+		jobs: List[tuple],
+		store: MBTilesStore
+	) -> Tuple[int, int]:
+		"""タイルを並列に描画して MBTiles に書き込む"""
+		if not jobs:
+			return 0, 0
+
+		written = deleted = 0
+		if self.max_workers <= 1 or len(jobs) < 64:
+			results = [(z, x, y, _render_tile(state, z, x, y, dots, segs)) for z, x, y, dots, segs in jobs]
+			return store.write_tiles(results)
+
+		chunk = max(16, len(jobs) // (self.max_workers * 8))
+		chunks = [jobs[i:i + chunk] for i in range(0, len(jobs), chunk)]
+		with ProcessPoolExecutor(
+			max_workers=self.max_workers,
+			initializer=_init_worker,
+			initargs=(state,)
+		) as executor:
+			for results in executor.map(_render_tiles_worker, chunks):
+				w, d = store.write_tiles(results)
+				written += w
+				deleted += d
+		return written, deleted
+
+	def render(
+		self,
+		photos: List[Dict[str, Any]],
+		mbtiles_path,
+		min_zoom: int = 5,
+		max_zoom: int = 14,
+		previous_photos: Optional[List[Dict[str, Any]]] = None
+	) -> Dict[str, int]:
+		"""
+		写真オーバーレイのタイルを描画して MBTiles に保存
+
+		Args:
+			photos: 写真データのリスト（全件）
+			mbtiles_path: MBTiles ファイルのパス
+			min_zoom: 最小ズームレベル
+			max_zoom: 最大ズームレベル
+			previous_photos: 前回描画した写真（photos の一部、指定時は追加分で変わるタイルだけ再描画）
+
+		Returns:
+			{'tiles': 対象タイル数, 'written': 書き込み件数, 'deleted': 削除件数}
+		"""
+		photos = self._valid_sorted(photos)
+		zooms = range(min_zoom, max_zoom + 1)
+		state = self._build_state(photos)
+
+		if previous_photos is None:
+			# 全件描画: ドットとルート線分が重なるタイルすべて
+			jobs = self._tile_jobs(state, zooms)
+		else:
+			previous_ids = {p.get('id') for p in previous_photos}
+			new_indices = np.array(
+				[i for i, p in enumerate(photos) if p.get('id') not in previous_ids],
+				dtype=np.int64
+			)
+			old_state = self._build_state(self._valid_sorted(previous_photos))
+			targets = self._changed_tiles(old_state, state, new_indices, zooms)
+			jobs = self._tile_jobs(state, zooms, targets) if targets else []
+
+		store = MBTilesStore(mbtiles_path)
+		try:
+			if previous_photos is None:
+				with store.conn:
+					store.conn.execute(
+						"DELETE FROM tiles WHERE zoom_level BETWEEN ? AND ?",
+						(min_zoom, max_zoom)
+					)
+			written, deleted = self._render_and_store(state, jobs, store)
+			max_id = max((p.get('id') or 0 for p in photos), default=0)
+			store.set_metadata({
+				'name': 'JourneyMap photos',
+				'format': 'png',
+				'type': 'overlay',
+				'minzoom': min_zoom,
+				'maxzoom': max_zoom,
+				'journeymap_max_photo_id': max_id,
+				'journeymap_photo_count': len(photos),
+				'journeymap_content_hash': self.content_hash(photos),
+				'journeymap_route': int(self.draw_route)
+			})
+		finally:
+			store.close()
+
+		self.logger.info(
+			f"タイル描画完了: 対象 {len(jobs)} 枚, 書き込み {written} 枚, 削除 {deleted} 枚 (z{min_zoom}-{max_zoom})"
+		)
+		return {'tiles': len(jobs), 'written': written, 'deleted': deleted}
+
+	def render_incremental(
+		self,
+		photos: List[Dict[str, Any]],
+		mbtiles_path,
+		min_zoom: int = 5,
+		max_zoom: int = 14
+	) -> Dict[str, int]:
+		"""
+		前回の描画以降に追加された写真（IDが前回の最大IDより大きいもの）のタイルだけ再描画
+
+		前回の最大ID以下の写真の内容ハッシュが前回と一致する（追加のみの）場合だけ差分描画し、
+		座標の更新・削除があった場合や、MBTiles がない・描画設定が変わった場合は全件描画する。
+		"""
+		path = Path(mbtiles_path)
+		if not path.exists():
+			return self.render(photos, path, min_zoom, max_zoom)
+
+		store = MBTilesStore(path)
+		try:
+			last_max_id = store.get_metadata('journeymap_max_photo_id')
+			last_hash = store.get_metadata('journeymap_content_hash')
+			same_settings = (
+				store.get_metadata('minzoom') == str(min_zoom)
+				and store.get_metadata('maxzoom') == str(max_zoom)
+				and store.get_metadata('journeymap_route') == str(int(self.draw_route))
+			)
+		finally:
+			store.close()
+
+		if last_max_id is None or last_hash is None or not same_settings:
+			return self.render(photos, path, min_zoom, max_zoom)
+
+		previous = [p for p in photos if (p.get('id') or 0) <= int(last_max_id)]
+		if self.content_hash(previous) != last_hash:
+			self.logger.info("前回描画した写真に変更があるため全タイルを描画し直します")
+			return self.render(photos, path, min_zoom, max_zoom)
+
+		if len(previous) == len(photos):
+			return {'tiles': 0, 'written': 0, 'deleted': 0}
+		return self.render(photos, path, min_zoom, max_zoom, previous_photos=previous)
+
+
+def main():
+	"""コマンドライン実行用メイン関数"""
+	import argparse
+	from src.database import Database
+
+	parser = argparse.ArgumentParser(description="写真オーバーレイのタイルを事前レンダリング")
+	parser.add_argument("--output", default="data/tiles/photos.mbtiles", help="MBTiles ファイル")
+	parser.add_argument("--min-zoom", type=int, default=5)
+	parser.add_argument("--max-zoom", type=int, default=14)
+	parser.add_argument("--full", action="store_true", help="差分ではなく全タイルを描画し直す")
+	parser.add_argument("--no-route", action="store_true", help="ルートを描画しない")
+	parser.add_argument("--workers", type=int, default=None)
+	args = parser.parse_args()
+
+	db = Database()
+	db.initialize()
+	photos = db.get_all_photos()
+	db.close()
+
+	renderer = TileRenderer(draw_route=not args.no_route, max_workers=args.workers)
+	if args.full:
+		result = renderer.render(photos, args.output, args.min_zoom, args.max_zoom)
+	else:
+		result = renderer.render_incremental(photos, args.output, args.min_zoom, args.max_zoom)
+
+	print(f"✅ タイル描画完了: {result}")
+
+
+if __name__ == "__main__":
+	main()
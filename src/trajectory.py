@@ -0,0 +1,285 @@
+"""
+移動軌跡モジュール
+写真の撮影時刻と位置から実際の移動経路を復元する（NumPy によるベクトル化処理）
+
+区間ごとの速度を計算し、時間・速度の途切れで軌跡を分割して
+徒歩・車・飛行機に分類する。GPS の誤測位（前後の地点から飛び出した1点）は除去する。
+すべての処理は地点数に対して線形時間。
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.geo import haversine_km
+
+
+# 移動手段の分類（区間速度 km/h の上限）
+WALK_MAX_KMH = 7.0
+DRIVE_MAX_KMH = 200.0
+
+# これを超える速度は誤測位とみなす（旅客機の巡航速度より速い）
+MAX_SPEED_KMH = 1000.0
+
+# 撮影間隔がこれを超えたら軌跡を分ける（分）
+MAX_GAP_MINUTES = 180.0
+
+# 分類ラベル（classify_legs の戻り値はこのタプルのインデックス）
+MODES = ('walk', 'drive', 'flight')
+
+# 撮影時刻の差が0秒の連写でも速度が発散しないようにする最小間隔（秒）
+_MIN_DT_SECONDS = 1.0
+
+
+def parse_timestamps(values: List[Optional[str]]) -> np.ndarray:
+	"""
+	ISO 8601 形式の撮影時刻を UNIX 秒の配列に変換（不明な時刻は NaN）
+
+	タイムゾーン表記は無視し、撮影地のローカル時刻として扱う。
+
+	Args:
+		values: 撮影時刻の文字列リスト
+
+	Returns:
+		秒単位の float64 配列
+	"""
+	# 秒までの部分だけを datetime64 にまとめて変換
+	heads = [value[:19] if value else 'NaT' for value in values]
+	try:
+		parsed = np.array(heads, dtype='datetime64[s]')
+	except ValueError:
+		# 想定外の書式が混ざっている場合は1件ずつ解析
+		parsed = np.array([_parse_one(value) for value in values], dtype='datetime64[s]')
+
+	seconds = parsed.astype('int64').astype(np.float64)
+	seconds[np.isnat(parsed)] = np.nan
+	return seconds
+
+
+def _parse_one(value: Optional[str]) -> np.datetime64:
+	"""撮影時刻1件を解析（解析できない場合は NaT）"""
+	if not value:
+		return np.datetime64('NaT')
+	try:
+		return np.datetime64(datetime.fromisoformat(value).replace(tzinfo=None), 's')
+	except ValueError:
+		return np.datetime64('NaT')
+
+
+def leg_distances(lats: np.ndarray, lons: np.ndarray, step: int = 1) -> np.ndarray:
+	"""
+	時系列で step 個離れた地点間の距離を計算（Haversine公式）
+
+	Args:
+		lats: 緯度配列
+		lons: 経度配列
+		step: 何個先の地点との距離か（1 で連続する地点間）
+
+	Returns:
+		長さ n-step の距離配列（km）
+	"""
+	return haversine_km(lats[:-step], lons[:-step], lats[step:], lons[step:])
+
+
+def leg_speeds(distances: np.ndarray, times: np.ndarray) -> np.ndarray:
+	"""
+	区間ごとの速度を計算
+
+	Args:
+		distances: leg_distances の戻り値（km）
+		times: 撮影時刻（秒）
+
+	Returns:
+		長さ n-1 の速度配列（km/h）
+	"""
+	hours = np.maximum(np.diff(times), _MIN_DT_SECONDS) / 3600.0
+	return distances / hours
+
+
+def find_outliers(
+	lats: np.ndarray,
+	lons: np.ndarray,
+	times: np.ndarray,
+	max_speed_kmh: float = MAX_SPEED_KMH,
+	spike_speed_kmh: float = DRIVE_MAX_KMH
+) -> np.ndarray:
+	"""
+	誤測位の地点を検出
+
+	前後の区間がどちらも異常な速度で、前後の地点を直接結ぶと短く済む
+	（行って戻ってくる）1点を誤測位とみなす。飛行機の移動は到着地点から
+	先の区間が通常の速度になるため除外されない。
+
+	Args:
+		lats: 緯度配列
+		lons: 経度配列
+		times: 撮影時刻（秒）
+		max_speed_kmh: これを超える速度は前後を問わず誤測位とみなす
+		spike_speed_kmh: 往復する飛び出しとみなす速度
+
+	Returns:
+		誤測位の地点で True となる真偽値配列
+	"""
+	n = len(lats)
+	outliers = np.zeros(n, dtype=bool)
+	if n < 3:
+		return outliers
+
+	distances = leg_distances(lats, lons)
+	speeds = leg_speeds(distances, times)
+	speed_in = speeds[:-1]
+	speed_out = speeds[1:]
+
+	# 1つ飛ばしで結んだ距離（i-1 → i+1）
+	bypass = leg_distances(lats, lons, step=2)
+
+	impossible = (speed_in > max_speed_kmh) & (speed_out > max_speed_kmh)
+	spike = (
+		(speed_in > spike_speed_kmh)
+		& (speed_out > spike_speed_kmh)
+		& (bypass < 0.25 * (distances[:-1] + distances[1:]))
+	)
+	outliers[1:-1] = impossible | spike
+
+	# 両端は片側の区間しかないため、速度が上限を超える場合のみ除外
+	outliers[0] = speeds[0] > max_speed_kmh and speeds[1] <= max_speed_kmh
+	outliers[-1] = speeds[-1] > max_speed_kmh and speeds[-2] <= max_speed_kmh
+	return outliers
+
+
+def classify_legs(
+	speeds: np.ndarray,
+	walk_max_kmh: float = WALK_MAX_KMH,
+	drive_max_kmh: float = DRIVE_MAX_KMH
+) -> np.ndarray:
+	"""
+	区間速度から移動手段を分類
+
+	Args:
+		speeds: 区間速度（km/h）
+		walk_max_kmh: 徒歩とみなす上限速度
+		drive_max_kmh: 車・鉄道とみなす上限速度
+
+	Returns:
+		MODES のインデックス配列（0: 徒歩, 1: 車, 2: 飛行機）
+	"""
+	return np.digitize(speeds, [walk_max_kmh, drive_max_kmh], right=True).astype(np.int8)
+
+
+def build_segments(
+	photos: List[Dict[str, Any]],
+	max_gap_minutes: float = MAX_GAP_MINUTES,
+	max_speed_kmh: float = MAX_SPEED_KMH,
+	outlier_passes: int = 3
+) -> Dict[str, Any]:
+	"""
+	写真の時系列から移動軌跡の区間を作成
+
+	撮影時刻のない写真・GPS情報のない写真は使用しない。
+	撮影間隔が max_gap_minutes を超える箇所で軌跡を分け、
+	さらに移動手段が変わる箇所で区間を分ける。
+
+	Args:
+		photos: 写真データのリスト
+		max_gap_minutes: 軌跡を分ける撮影間隔（分）
+		max_speed_kmh: 誤測位とみなす速度
+		outlier_passes: 誤測位除去の繰り返し回数（連続した誤測位に対応）
+
+	Returns:
+		{
+			'segments': [{'mode', 'coordinates', 'start', 'end', 'distance_km', 'points'}, ...],
+			'points': 使用した地点数,
+			'outliers': 除去した地点数,
+			'untimed': 撮影時刻がなく使用しなかった地点数
+		}
+	"""
+	located = [
+		p for p in photos
+		if p.get('latitude') is not None and p.get('longitude') is not None
+	]
+	times = parse_timestamps([p.get('timestamp') for p in located])
+	timed = ~np.isnan(times)
+
+	lats = np.fromiter((p['latitude'] for p in located), dtype=np.float64, count=len(located))[timed]
+	lons = np.fromiter((p['longitude'] for p in located), dtype=np.float64, count=len(located))[timed]
+	labels = np.array([p.get('timestamp') for p in located], dtype=object)[timed]
+	times = times[timed]
+
+	# 時系列順に並べる（同時刻は元の順序を保つ）
+	order = np.argsort(times, kind='stable')
+	lats, lons, times, labels = lats[order], lons[order], times[order], labels[order]
+
+	# 誤測位を除去（1回ごとに線形時間、変化がなくなったら終了）
+	removed = 0
+	for _ in range(outlier_passes):
+		outliers = find_outliers(lats, lons, times, max_speed_kmh=max_speed_kmh)
+		count = int(outliers.sum())
+		if count == 0:
+			break
+		keep = ~outliers
+		lats, lons, times, labels = lats[keep], lons[keep], times[keep], labels[keep]
+		removed += count
+
+	result = {
+		'segments': [],
+		'points': len(lats),
+		'outliers': removed,
+		'untimed': int((~timed).sum())
+	}
+	if len(lats) < 2:
+		return result
+
+	distances = leg_distances(lats, lons)
+	speeds = leg_speeds(distances, times)
+	modes = classify_legs(speeds)
+
+	# 前後と異なる1区間だけの分類（信号待ち・GPS のぶれ）は前後に合わせる
+	# 飛行機の区間は1区間で完結するため対象外
+	if len(modes) >= 3:
+		inner = modes[1:-1]
+		isolated = (modes[:-2] == modes[2:]) & (inner != modes[:-2]) & (inner != MODES.index('flight'))
+		inner[isolated] = modes[:-2][isolated]
+
+	# 区間の切れ目: 撮影間隔が長い区間（描画しない）と、移動手段が変わる箇所
+	gap = (np.diff(times) > max_gap_minutes * 60.0) | (speeds > max_speed_kmh)
+	change = np.flatnonzero((modes[1:] != modes[:-1]) | gap[1:] | gap[:-1]) + 1
+	starts = np.concatenate(([0], change))
+	ends = np.concatenate((change, [len(modes)]))
+
+	# 累積距離で区間ごとの距離を O(1) で求める
+	cumulative = np.concatenate(([0.0], np.cumsum(distances)))
+
+	for leg_start, leg_end in zip(starts.tolist(), ends.tolist()):
+		if gap[leg_start]:
+			continue
+		# 区間 [leg_start, leg_end) の区間は地点 leg_start〜leg_end を結ぶ
+		result['segments'].append({
+			'mode': MODES[modes[leg_start]],
+			'coordinates': np.column_stack(
+				(lats[leg_start:leg_end + 1], lons[leg_start:leg_end + 1])
+			).tolist(),
+			'start': labels[leg_start],
+			'end': labels[leg_end],
+			'distance_km': float(cumulative[leg_end] - cumulative[leg_start]),
+			'points': leg_end - leg_start + 1
+		})
+
+	return result
+
+
+def summarize_segments(segments: List[Dict[str, Any]]) -> Dict[str, Tuple[int, float]]:
+	"""
+	移動手段ごとの区間数と距離を集計
+
+	Args:
+		segments: build_segments の 'segments'
+
+	Returns:
+		{移動手段: (区間数, 距離km)}
+	"""
+	summary = {mode: (0, 0.0) for mode in MODES}
+	for segment in segments:
+		count, distance = summary[segment['mode']]
+		summary[segment['mode']] = (count + 1, distance + segment['distance_km'])
+	return summary
@@ -93,9 +93,9 @@ def main():
 	print("\n【ステップ5】移動ルートを描画")
 	route_points = generator.add_route(photos, color='#FF6B35', weight=4, opacity=0.8)
 	
-	# ステップ6: HTMLファイルとして保存
+	# ステップ6: HTMLファイルとして保存（アプリで表示済みのマップはディスクキャッシュから書き出す）
 	print("\n【ステップ6】HTMLファイルとして保存")
-	output_path = generator.save_map('output/journey_map.html')
+	output_path = MapGenerator.export_map_html(photos, 'output/journey_map.html')
 	
 	# 結果サマリー
 	print("\n" + "=" * 70)
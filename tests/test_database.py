@@ -0,0 +1,97 @@
+"""
+データベース（database）のテスト
+"""
+
+from src.database import Database
+
+
+def _location_names(db):
+	db.connect()
+	try:
+		rows = db.conn.execute("SELECT file_path, location_name FROM photos ORDER BY file_path").fetchall()
+	finally:
+		db.close()
+	return {row[0]: row[1] for row in rows}
+
+
+def test_upsert_photos_closes_connection_and_resets_moved_location(tmp_path):
+	db = Database(str(tmp_path / "journeymap.db"))
+	db.initialize()
+
+	assert db.upsert_photos([
+		('a.jpg', 'image', 35.0, 139.0, '2024-05-01T10:00:00'),
+		('b.jpg', 'image', 34.0, 135.0, '2024-05-01T11:00:00'),
+	]) == 2
+	assert db.conn is None
+
+	db.connect()
+	db.conn.execute("UPDATE photos SET location_name = '登録済み'")
+	db.conn.commit()
+	db.close()
+
+	# a.jpg は撮影日時だけ、b.jpg は座標が変わった
+	db.upsert_photos([
+		('a.jpg', 'image', 35.0, 139.0, '2024-05-01T10:30:00'),
+		('b.jpg', 'image', 34.5, 135.0, '2024-05-01T11:00:00'),
+	])
+	assert db.conn is None
+	assert _location_names(db) == {'a.jpg': '登録済み', 'b.jpg': None}
+
+
+class _CountingGeocoder:
+	"""ReverseGeocoder と同じ呼び出し方で、問い合わせた座標を記録する"""
+
+	def __init__(self):
+		self.calls = []
+
+	def reverse_geocode(self, latitude, longitude):
+		self.calls.append((latitude, longitude))
+		return {'city': f"町{len(self.calls)}", 'country': '日本'}
+
+
+def test_update_location_names_resolves_each_cell_once(tmp_path, monkeypatch):
+	import sqlite3
+
+	db = Database(str(tmp_path / "journeymap.db"))
+	db.initialize()
+	# 同じセル（約150m 四方）に 50 枚、離れた2か所に 1 枚ずつ
+	rows = [(f"same{i:02d}.jpg", 'image', 35.00001 + i * 1e-6, 139.00001, None) for i in range(50)]
+	rows += [('osaka.jpg', 'image', 34.7, 135.5, None), ('sapporo.jpg', 'image', 43.06, 141.35, None)]
+	db.upsert_photos(rows)
+
+	# UPDATE が1件ずつではなく executemany でまとめて実行されることを確認する
+	executemany_sizes = []
+
+	class CountingCursor(sqlite3.Cursor):
+		def executemany(self, sql, parameters):
+			parameters = list(parameters)
+			if sql.strip().startswith("UPDATE"):
+				executemany_sizes.append(len(parameters))
+			return super().executemany(sql, parameters)
+
+	class CountingConnection(sqlite3.Connection):
+		def cursor(self, factory=CountingCursor):
+			return super().cursor(factory)
+
+	def connect(self):
+		self.conn = sqlite3.connect(self.db_path, factory=CountingConnection)
+		self.conn.row_factory = sqlite3.Row
+		return self.conn
+
+	monkeypatch.setattr(Database, "connect", connect)
+	geocoder = _CountingGeocoder()
+	progress = []
+	updated = db.update_location_names(geocoder, progress_callback=lambda *args: progress.append(args), batch_size=2)
+
+	assert updated == 52
+	assert len(geocoder.calls) == 3
+	# 2セルずつ解決して、バッチごとに1回の executemany で更新・進捗を通知
+	assert executemany_sizes == [51, 1]
+	assert progress == [(2, 3, 51), (3, 3, 52)]
+
+	names = _location_names(db)
+	assert len({names[f"same{i:02d}.jpg"] for i in range(50)}) == 1
+	assert names['osaka.jpg'] != names['sapporo.jpg'] != names['same00.jpg']
+	# 解決済みの写真は再度問い合わせない
+	assert db.update_location_names(geocoder) == 0
+	assert len(geocoder.calls) == 3
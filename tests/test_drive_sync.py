@@ -0,0 +1,331 @@
+"""
+Google Drive 同期（drive_sync）のテスト（FakeDriveServer に接続）
+"""
+
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.database import Database
+from src.drive_sync import PARTIAL_STATE_SUFFIX, PARTIAL_SUFFIX, DriveSync, DriveSyncState
+from src.stub_servers import FakeDriveServer
+
+
+@pytest.fixture
+def server():
+	srv = FakeDriveServer()
+	srv.start()
+	yield srv
+	srv.stop()
+
+
+def _sync(server, root, tmp_path, **kwargs):
+	return DriveSync(
+		root,
+		tmp_path / "dl",
+		service_factory=server.service_factory(),
+		state=DriveSyncState(str(tmp_path / "sync.db")),
+		**kwargs
+	)
+
+
+def _jpeg(lat=None, lon=None) -> bytes:
+	"""撮影日時と（指定した場合は）GPS 情報つきの JPEG"""
+	image = Image.fromarray(np.random.default_rng(0).integers(0, 255, (200, 200, 3), dtype=np.uint8))
+	exif = Image.Exif()
+	exif[0x8769] = {36867: '2024:05:01 10:00:00'}
+	if lat is not None:
+		exif[34853] = {
+			1: 'N', 2: (int(lat), int(lat * 60) % 60, 0.0),
+			3: 'E', 4: (int(lon), int(lon * 60) % 60, 0.0)
+		}
+	buffer = io.BytesIO()
+	image.save(buffer, 'JPEG', exif=exif, quality=95)
+	return buffer.getvalue()
+
+
+def test_concurrent_download(server, tmp_path):
+	root = server.add_folder('photos')
+	data = {}
+	for i in range(8):
+		data[f'p{i}.jpg'] = os.urandom(100_000 + i * 1000)
+		server.add_file(f'p{i}.jpg', data[f'p{i}.jpg'], parent=root, modified_time=f'2024-01-{i + 1:02d}T00:00:00.000Z')
+	sync = _sync(server, root, tmp_path, max_workers=4, chunk_size=32 * 1024)
+
+	# 同時に取得中のリクエスト数を数える
+	fetch = sync._fetch_range
+	lock = threading.Lock()
+	inflight = peak = 0
+
+	def counting_fetch(*args):
+		nonlocal inflight, peak
+		with lock:
+			inflight += 1
+			peak = max(peak, inflight)
+		try:
+			time.sleep(0.01)
+			return fetch(*args)
+		finally:
+			with lock:
+				inflight -= 1
+
+	sync._fetch_range = counting_fetch
+	result = sync.sync_new_photos()
+
+	assert result['downloaded'] == 8 and result['failed'] == 0
+	assert peak > 1
+	for name, content in data.items():
+		assert (tmp_path / "dl" / name).read_bytes() == content
+	assert not [name for name in os.listdir(tmp_path / "dl") if PARTIAL_SUFFIX in name]
+
+
+def test_resume_from_partial_file(server, tmp_path):
+	root = server.add_folder('photos')
+	content = os.urandom(200_000)
+	file_id = server.add_file('a.jpg', content, parent=root, modified_time='2024-01-01T00:00:00.000Z')
+	sync = _sync(server, root, tmp_path, chunk_size=64 * 1024)
+
+	# 前回 50,000 バイトまで取得したところで止まった状態
+	target = tmp_path / "dl" / "a.jpg"
+	partial = target.with_name(target.name + PARTIAL_SUFFIX)
+	state = target.with_name(target.name + PARTIAL_STATE_SUFFIX)
+	partial.write_bytes(content[:50_000])
+	state.write_text(json.dumps({'id': file_id, 'modifiedTime': '2024-01-01T00:00:00.000Z', 'size': len(content)}))
+
+	path = sync.download_file(file_id, 'a.jpg', size=len(content), modified_time='2024-01-01T00:00:00.000Z')
+	assert path == target and target.read_bytes() == content
+	assert server.media_requests[0] == (file_id, 'bytes=50000-115535')
+	assert not partial.exists() and not state.exists()
+
+	# 版が変わっていれば先頭から取得し直す
+	partial.write_bytes(b'x' * 50_000)
+	state.write_text(json.dumps({'id': file_id, 'modifiedTime': '2023-12-31T00:00:00.000Z', 'size': len(content)}))
+	sync.download_file(file_id, 'a.jpg', size=len(content), modified_time='2024-01-01T00:00:00.000Z')
+	assert server.media_requests[-4][1].startswith('bytes=0-')
+	assert target.read_bytes() == content
+
+
+def test_failed_download_keeps_target_untouched_until_complete(server, tmp_path):
+	root = server.add_folder('photos')
+	content = os.urandom(200_000)
+	file_id = server.add_file('a.jpg', content, parent=root, modified_time='2024-01-01T00:00:00.000Z')
+	target = tmp_path / "dl" / "a.jpg"
+	sync = _sync(server, root, tmp_path, chunk_size=32 * 1024)
+	target.write_bytes(b'old')
+
+	# 3回目のチャンク取得で失敗させる
+	server.fail_media_every = 3
+	with pytest.raises(Exception):
+		sync.download_file(file_id, 'a.jpg', size=len(content), modified_time='2024-01-01T00:00:00.000Z')
+	partial = target.with_name(target.name + PARTIAL_SUFFIX)
+	assert target.read_bytes() == b'old'
+	assert partial.read_bytes() == content[:64 * 1024]
+
+	# 再実行すると続きから取得して、完了時に置き換える
+	server.fail_media_every = 0
+	sync.download_file(file_id, 'a.jpg', size=len(content), modified_time='2024-01-01T00:00:00.000Z')
+	assert target.read_bytes() == content
+	assert not partial.exists()
+
+
+def test_import_changes_registers_gps_photos(server, tmp_path):
+	root = server.add_folder('photos')
+	for i in range(3):
+		server.add_file(f'g{i}.jpg', _jpeg(35 + i * 0.5, 135 + i), parent=root)
+	server.add_file('nogps.jpg', _jpeg(), parent=root)
+
+	db = Database(str(tmp_path / "journeymap.db"))
+	db.initialize()
+	result = _sync(server, root, tmp_path, chunk_size=256 * 1024).import_changes(db, batch_size=2)
+
+	assert result['registered'] == 3 and result['no_gps'] == 1 and result['remote_only'] == 1
+	db.connect()
+	try:
+		rows = db.conn.execute("SELECT file_path, latitude, longitude FROM photos ORDER BY latitude").fetchall()
+	finally:
+		db.close()
+	assert [(os.path.basename(r[0]), r[1], r[2]) for r in rows] == [
+		('g0.jpg', 35.0, 135.0), ('g1.jpg', 35.5, 136.0), ('g2.jpg', 36.0, 137.0)
+	]
+
+
+def test_ensure_local_fetches_remote_only_file_once(server, tmp_path):
+	root = server.add_folder('photos')
+	server.add_file('g.jpg', _jpeg(35.0, 135.0), parent=root)
+	content = _jpeg()
+	file_id = server.add_file('nogps.jpg', content, parent=root)
+
+	db = Database(str(tmp_path / "journeymap.db"))
+	db.initialize()
+	sync = _sync(server, root, tmp_path, chunk_size=256 * 1024)
+	sync.import_changes(db)
+	assert [row['id'] for row in sync.state.remote_only(root)] == [file_id]
+	assert not (tmp_path / "dl" / "nogps.jpg").exists()
+
+	path = sync.ensure_local(file_id)
+	assert path.read_bytes() == content
+	assert sync.state.remote_only(root) == []
+
+	requests = len(server.media_requests)
+	assert sync.ensure_local(file_id) == path
+	assert len(server.media_requests) == requests
+
+
+def _media_ids(server, since=0):
+	return {file_id for file_id, _ in server.media_requests[since:]}
+
+
+def test_sync_changes_fetches_only_changes(server, tmp_path):
+	root = server.add_folder('photos')
+	for i in range(20):
+		server.add_file(f'p{i:02d}.jpg', os.urandom(2_000), parent=root)
+	sync = _sync(server, root, tmp_path)
+
+	first = sync.sync_changes()
+	assert first['full_scan'] and first['downloaded'] == 20
+
+	# 2回目以降は一覧を取り直さず、変更されたファイルだけを取得する
+	def no_listing(*args, **kwargs):
+		raise AssertionError("listed the whole folder")
+	sync.iter_files = no_listing
+	since = len(server.media_requests)
+	added = server.add_file('new.jpg', os.urandom(2_000), parent=root)
+	server.add_file('ignored.txt', b'text', parent=root)
+	second = sync.sync_changes()
+	assert not second['full_scan']
+	assert second['downloaded'] == 1 and second['skipped'] == 0
+	assert _media_ids(server, since) == {added}
+
+	# 変更がなければ何も取得しない
+	since = len(server.media_requests)
+	assert sync.sync_changes()['downloaded'] == 0
+	assert len(server.media_requests) == since
+
+
+def test_sync_changes_skips_renamed_and_duplicate_content(server, tmp_path):
+	root = server.add_folder('photos')
+	content = os.urandom(5_000)
+	file_id = server.add_file('a.jpg', content, parent=root)
+	sync = _sync(server, root, tmp_path)
+	sync.sync_changes()
+
+	# 名前の変更（内容は同じ）と、同じ内容の別ファイルは md5Checksum で判定して取得しない
+	since = len(server.media_requests)
+	server.update_file(file_id, name='renamed.jpg')
+	copy_id = server.add_file('copy.jpg', content, parent=root)
+	result = sync.sync_changes()
+	assert result['downloaded'] == 0 and result['skipped'] == 2 and result['failed'] == 0
+	assert len(server.media_requests) == since
+
+	files = sync.state.get_files([file_id, copy_id])
+	assert files[file_id]['local_path'] == files[copy_id]['local_path'] == str(tmp_path / "dl" / "a.jpg")
+
+
+def test_sync_changes_removes_deleted_and_trashed_files(server, tmp_path):
+	root = server.add_folder('photos')
+	deleted = server.add_file('a.jpg', os.urandom(1_000), parent=root)
+	trashed = server.add_file('b.jpg', os.urandom(1_000), parent=root)
+	kept = server.add_file('c.jpg', os.urandom(1_000), parent=root)
+	sync = _sync(server, root, tmp_path)
+	sync.sync_changes()
+
+	server.delete_file(deleted)
+	server.update_file(trashed, trashed=True)
+	result = sync.sync_changes()
+	assert result['removed'] == 2 and result['downloaded'] == 0
+	assert list(sync.state.get_files([deleted, trashed, kept])) == [kept]
+
+
+def test_sync_changes_lists_folders_moved_into_scope(server, tmp_path):
+	root = server.add_folder('photos')
+	outside = server.add_folder('elsewhere')
+	nested = server.add_folder('nested', parent=outside)
+	moved_files = {
+		server.add_file('x.jpg', os.urandom(1_000), parent=outside),
+		server.add_file('y.mp4', os.urandom(1_000), parent=nested)
+	}
+	server.add_file('z.jpg', os.urandom(1_000))
+	sync = _sync(server, root, tmp_path)
+	assert sync.sync_changes()['downloaded'] == 0
+
+	# フォルダの移動は1件の変更として届くため、配下（入れ子を含む）は一覧で取得する
+	since = len(server.media_requests)
+	server.update_file(outside, parents=[root])
+	result = sync.sync_changes()
+	assert result['downloaded'] == 2
+	assert _media_ids(server, since) == moved_files
+	assert sync.state.get_folders(root) == {outside: root, nested: outside}
+
+	# 対象外へ戻すと、以後そのフォルダ内の変更は扱わない
+	server.update_file(outside, parents=[])
+	sync.sync_changes()
+	assert sync.state.get_folders(root) == {}
+	server.add_file('w.jpg', os.urandom(1_000), parent=nested)
+	assert sync.sync_changes()['downloaded'] == 0
+
+
+def test_sync_changes_keeps_page_token_after_failure(server, tmp_path):
+	root = server.add_folder('photos')
+	server.add_file('a.jpg', os.urandom(1_000), parent=root)
+	sync = _sync(server, root, tmp_path)
+	sync.sync_changes()
+	token = sync.state.get_page_token(root)
+
+	file_id = server.add_file('b.jpg', os.urandom(1_000), parent=root)
+	server.fail_media_every = 1
+	failed = sync.sync_changes()
+	assert failed['failed'] == 1 and failed['downloaded'] == 0
+	assert sync.state.get_page_token(root) == token
+
+	# 次回は同じ変更から再試行する
+	server.fail_media_every = 0
+	retried = sync.sync_changes()
+	assert retried['downloaded'] == 1 and retried['failed'] == 0
+	assert sync.state.get_page_token(root) != token
+	assert (tmp_path / "dl" / "b.jpg").exists() and file_id in sync.state.get_files([file_id])
+
+
+def test_iter_files_walks_nested_folders_in_parallel(server, tmp_path):
+	# 3階層・6フォルダのツリー（動画・対象外のファイルを含む）
+	tree = tmp_path / "tree"
+	expected = set()
+	for folder in ("2024", "2024/05", "2024/05/kyoto", "2024/06", "2023"):
+		(tree / folder).mkdir(parents=True)
+		for name in ("a.jpg", "b.mp4"):
+			(tree / folder / name).write_bytes(os.urandom(100))
+			expected.add((folder.rsplit("/", 1)[-1], name))
+		(tree / folder / "notes.txt").write_text("memo")
+	root = server.add_directory(tree)
+
+	# 同時に処理中の一覧リクエスト数を数える
+	list_files = server.list_files
+	lock = threading.Lock()
+	inflight = peak = 0
+
+	def counting_list(query):
+		nonlocal inflight, peak
+		with lock:
+			inflight += 1
+			peak = max(peak, inflight)
+		try:
+			time.sleep(0.05)
+			return list_files(query)
+		finally:
+			with lock:
+				inflight -= 1
+
+	server.list_files = counting_list
+	sync = _sync(server, root, tmp_path, list_workers=2)
+	files = list(sync.iter_files(page_size=2))
+
+	assert len(files) == 10
+	assert {(server.files[f['parents'][0]]['name'], f['name']) for f in files} == expected
+	assert {f['mimeType'] for f in files} == {'image/jpeg', 'video/mp4'}
+	# サブフォルダは並行して一覧するが、同時に取得するのは list_workers まで
+	assert peak == 2
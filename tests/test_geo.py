@@ -0,0 +1,39 @@
+"""
+球面距離（geo）と、それを使う各モジュールの距離計算のテスト
+"""
+
+import numpy as np
+
+from src.geo import chord_to_km, dots_to_km, haversine_km, unit_vectors
+from src.map_generator import MapGenerator
+from src.route_optimizer import RouteOptimizer
+from src.trajectory import leg_distances
+
+
+def test_distance_helpers_agree():
+	rng = np.random.default_rng(0)
+	lats = rng.uniform(24.0, 45.0, 20)
+	lons = rng.uniform(123.0, 146.0, 20)
+	expected = haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+	points = unit_vectors(lats, lons)
+	# 内積からの変換は同じ地点どうし（内積 ≒ 1）で丸め誤差が 0.1m 程度出る
+	assert np.allclose(dots_to_km(points @ points.T), expected, atol=1e-3)
+	chords = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=-1)
+	assert np.allclose(chord_to_km(chords), expected, atol=1e-6)
+
+	assert np.allclose(RouteOptimizer.haversine_matrix(lats, lons), expected, rtol=1e-5, atol=1e-3)
+	assert np.allclose(leg_distances(lats, lons), np.diag(expected, k=1))
+	# 東京タワー → 浅草寺（約 7.8km）
+	assert abs(RouteOptimizer.calculate_distance(35.6586, 139.7454, 35.7148, 139.7967) - 7.8) < 0.5
+
+
+def test_add_route_keeps_untimed_photos_by_default():
+	photos = [
+		{'latitude': 35.0, 'longitude': 139.0 + i * 0.01, 'timestamp': f"2024-05-01T10:{i:02d}:00"}
+		for i in range(5)
+	] + [{'latitude': 35.1, 'longitude': 139.1, 'timestamp': None}]
+	generator = MapGenerator()
+	generator.create_base_map(35.0, 139.0, 12)
+	assert generator.add_route(photos) == 6
+	assert generator.add_route(photos, segmented=True) == 5
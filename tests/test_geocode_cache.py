@@ -0,0 +1,61 @@
+"""
+逆ジオコーディングの空間キャッシュ（geocode_cache / geohash）のテスト
+"""
+
+import pytest
+
+from src import geohash
+from src.geocode_cache import GeocodeCache
+
+
+def test_lookup_finds_result_across_cell_boundary(tmp_path):
+	cache = GeocodeCache(db_path=str(tmp_path / "cache.db"), legacy_json=None)
+	tower = (35.6586, 139.7454)
+	nearby = (35.665, 139.75)
+	# 約 0.9km しか離れていないが、市区町村レベルのセルが異なる
+	assert geohash.encode(*tower, precision=5) != geohash.encode(*nearby, precision=5)
+
+	cache.store(*tower, {'city': '港区', 'prefecture': '東京都', 'country': '日本'}, level='street')
+	result = cache.lookup(*nearby, level='city')
+	assert result is not None and result['city'] == '港区'
+	# 離れた地点には使わない
+	assert cache.lookup(35.0, 135.0, level='city') is None
+	cache.close()
+
+
+def test_neighbor_reuse_is_bounded(tmp_path):
+	cache = GeocodeCache(db_path=str(tmp_path / "cache.db"), legacy_json=None)
+	tower = (35.6586, 139.7454)
+	cache.store(*tower, {'city': '港区', 'prefecture': '東京都', 'country': '日本', 'road': '東京タワー通り'}, level='street')
+
+	# 番地レベルでは隣接セルを使わない（約10m 先でもセルが違えば別の通りとして扱う）
+	across_street = (35.6586, 139.7462)
+	assert geohash.encode(*tower, precision=7) != geohash.encode(*across_street, precision=7)
+	assert cache.lookup(*across_street, level='street') is None
+	assert cache.lookup(*across_street, level='city')['city'] == '港区'
+
+	# 隣接セルでも境界からセルの半分（約2km）より奥の地点には使わない
+	south, west, north, east = geohash.bounds(geohash.encode(*tower, precision=5))
+	assert cache.lookup(35.66, east + 0.015, level='city')['city'] == '港区'
+	assert cache.lookup(35.66, east + 0.035, level='city') is None
+	cache.close()
+
+
+def test_neighbors_and_decode():
+	cell = geohash.encode(35.6586, 139.7454, precision=5)
+	around = geohash.neighbors(cell)
+	assert len(around) == 8 and cell not in around
+	lat, lon = geohash.decode(cell)
+	assert geohash.encode(lat, lon, precision=5) == cell
+	south, west, north, east = geohash.bounds(cell)
+	assert south < lat < north and west < lon < east
+	# 経度 180° をまたぐ隣接セル
+	assert geohash.encode(0.0, -179.9, precision=3) in geohash.neighbors(geohash.encode(0.0, 179.9, precision=3))
+
+
+def test_precision_is_bounded():
+	assert len(geohash.encode(35.0, 139.0, precision=12)) == 12
+	with pytest.raises(ValueError):
+		geohash.encode_many([35.0], [139.0], precision=13)
+	with pytest.raises(ValueError):
+		geohash.encode(35.0, 139.0, precision=0)
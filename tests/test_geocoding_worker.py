@@ -0,0 +1,102 @@
+"""
+非同期逆ジオコーディングワーカー（geocoding_worker）と Nominatim スタブのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from src.geocoding import ReverseGeocoder
+from src.geocoding_worker import AsyncGeocodingWorker, GeocodeQueue
+from src.stub_servers import StubNominatimServer
+
+
+@pytest.fixture
+def stub():
+	server = StubNominatimServer()
+	server.start()
+	yield server
+	server.stop()
+
+
+def _worker(stub, tmp_path, **kwargs):
+	geocoder = ReverseGeocoder(domain=stub.domain, scheme="http", cache_file=tmp_path / "cache.db")
+	queue = GeocodeQueue(str(tmp_path / "queue.db"))
+	options = {'rate': 50.0, 'burst': 1, 'concurrency': 2, 'base_delay': 0.01, 'max_delay': 0.05}
+	options.update(kwargs)
+	return AsyncGeocodingWorker(geocoder, queue=queue, **options)
+
+
+def _sea_points(count):
+	# 地名から 50km 以上離れた海上の地点（結果はキャッシュされないので毎回問い合わせる）
+	return [30.0 + i * 0.5 for i in range(count)], [150.0] * count
+
+
+@pytest.mark.parametrize("failure", ['unavailable', 'rate_limit'])
+def test_retries_on_unavailable_and_rate_limit(stub, tmp_path, failure):
+	stub.fail_every = 2
+	stub.failure = failure
+	worker = _worker(stub, tmp_path)
+
+	results = worker.reverse_geocode_many([35.6586, 34.9671], [139.7454, 135.7727])
+	assert [r['city'] for r in results] == ['港区', '京都市']
+	# 2回目のリクエストだけが失敗し、同じ地点をもう一度問い合わせる
+	assert [(lat, lon) for _, lat, lon in stub.requests] == [(35.6586, 139.7454), (34.9671, 135.7727), (34.9671, 135.7727)]
+	assert worker.queue.counts() == {'done': 2}
+	if failure == 'rate_limit':
+		# Retry-After: 1 を守ってから再試行する
+		assert stub.requests[2][0] - stub.requests[1][0] >= 0.9
+
+
+def test_request_rate_is_bounded(stub, tmp_path):
+	worker = _worker(stub, tmp_path, rate=5.0, concurrency=3)
+	lats, lons = _sea_points(12)
+	assert worker.reverse_geocode_many(lats, lons) == [None] * 12
+	assert len(stub.requests) == 12
+	assert stub.max_rate(1.0) <= 6
+
+
+def test_resumes_after_interruption(stub, tmp_path):
+	worker = _worker(stub, tmp_path, rate=10.0)
+	lats, lons = _sea_points(8)
+	worker.enqueue(lats, lons)
+
+	async def interrupted():
+		with pytest.raises(asyncio.TimeoutError):
+			await asyncio.wait_for(worker.run(), timeout=0.35)
+
+	asyncio.run(interrupted())
+	first = len(stub.requests)
+	assert 0 < first < 8
+	worker.queue.close()
+
+	# 次回の起動（同じキューのファイルを開き直す）では残りだけを問い合わせる
+	resumed = _worker(stub, tmp_path, rate=50.0)
+	stats = resumed.drain()
+	assert resumed.queue.counts() == {'done': 8}
+	assert stats['done'] + first >= 8
+	assert len(stub.requests) <= 8 + 2
+
+
+def test_only_new_cells_are_processed_and_language_is_passed(stub, tmp_path):
+	worker = _worker(stub, tmp_path)
+	lats, lons = _sea_points(3)
+	worker.enqueue(lats, lons)
+
+	languages = []
+	fetch = worker.geocoder.fetch
+
+	def spy(latitude, longitude, language='ja', timeout=5):
+		languages.append(language)
+		return fetch(latitude, longitude, language=language, timeout=timeout)
+
+	worker.geocoder.fetch = spy
+
+	async def inside_loop():
+		# イベントループの中からでも呼べる
+		return worker.reverse_geocode(35.6586, 139.7454, language='en')
+
+	result = asyncio.run(inside_loop())
+	assert result['city'] == '港区'
+	assert languages == ['en']
+	assert worker.queue.counts() == {'pending': 3, 'done': 1}
@@ -0,0 +1,84 @@
+"""
+旅程スケジューラー（itinerary_scheduler）と観光地の営業時間のテスト
+"""
+
+import sqlite3
+
+import numpy as np
+
+from src.database import Database
+from src.itinerary_scheduler import ItineraryScheduler
+from src.route_optimizer import RouteOptimizer
+
+
+class _SlowRoads:
+	"""距離は直線距離、移動時間は 10km/h 相当の道路ネットワーク（テスト用）"""
+
+	cache_token = "slow-roads"
+
+	def distance_matrix(self, lats, lons):
+		return RouteOptimizer.haversine_matrix(np.asarray(lats), np.asarray(lons))
+
+	def travel_time_matrix(self, lats, lons):
+		return self.distance_matrix(lats, lons) / 10.0 * 60.0
+
+
+def _locations():
+	return [
+		{'attraction_id': i, 'name': str(i), 'latitude': 35.0, 'longitude': 139.0 + i * 0.02, 'dwell_minutes': 30}
+		for i in range(4)
+	]
+
+
+def test_total_distance_sums_the_distance_matrix():
+	scheduler = ItineraryScheduler(optimizer=RouteOptimizer(distance_backend=_SlowRoads()), speed_kmh=40.0)
+	locations = _locations()
+	result = scheduler.schedule(locations, days=1)
+
+	route = [item['location']['attraction_id'] for item in result['days'][0]]
+	matrix = RouteOptimizer.haversine_matrix(
+		np.array([p['latitude'] for p in locations]), np.array([p['longitude'] for p in locations])
+	)
+	expected = float(sum(matrix[a, b] for a, b in zip(route, route[1:])))
+	assert abs(result['total_distance'] - expected) < 1e-6
+
+
+def test_attraction_hours_migration_and_wishlist(tmp_path):
+	db_path = tmp_path / "journeymap.db"
+	# 営業時間のカラムがない既存のデータベース
+	conn = sqlite3.connect(db_path)
+	conn.execute("""
+		CREATE TABLE attractions (
+			id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, name_en TEXT, category TEXT,
+			latitude REAL NOT NULL, longitude REAL NOT NULL, description TEXT, rating REAL,
+			prefecture TEXT, city TEXT, visited BOOLEAN DEFAULT 0, visit_date TEXT, source TEXT,
+			created_at TEXT DEFAULT CURRENT_TIMESTAMP
+		)
+	""")
+	conn.execute("INSERT INTO attractions (name, latitude, longitude) VALUES ('浅草寺', 35.7148, 139.7967)")
+	conn.commit()
+	conn.close()
+
+	db = Database(str(db_path))
+	db.initialize()
+	first = db.get_all_attractions()[0]
+	assert first['open_time'] is None and first['dwell_minutes'] is None
+
+	db.update_attraction_hours(first['id'], open_time="10:00", close_time="17:00", dwell_minutes=90)
+	second = db.insert_attraction({'name': '東京タワー', 'latitude': 35.6586, 'longitude': 139.7454})
+	db.add_to_wishlist(first['id'])
+	db.add_to_wishlist(second)
+
+	wishlist = db.get_wishlist()
+	by_name = {item['name']: item for item in wishlist}
+	assert by_name['浅草寺']['open_time'] == "10:00"
+	assert by_name['浅草寺']['dwell_minutes'] == 90
+
+	# 開館前には始められない・滞在時間が反映される
+	start_index = [item['name'] for item in wishlist].index('東京タワー')
+	result = ItineraryScheduler(day_start="09:00").schedule(wishlist, days=1, start_index=start_index)
+	visit = next(item for item in result['days'][0] if item['location']['name'] == '浅草寺')
+	assert visit['start'] >= "10:00"
+	start_h, start_m = map(int, visit['start'].split(':'))
+	end_h, end_m = map(int, visit['departure'].split(':'))
+	assert (end_h * 60 + end_m) - (start_h * 60 + start_m) == 90
@@ -0,0 +1,62 @@
+"""
+マップHTMLキャッシュ（map_cache / MapGenerator._calculate_photos_hash）のテスト
+"""
+
+import pytest
+
+from src.map_cache import MapHtmlCache
+from src.map_generator import MapGenerator
+
+
+def _photo(**overrides):
+	photo = {
+		'id': 1,
+		'file_path': 'data/photos/a.jpg',
+		'file_type': 'image',
+		'latitude': 35.0,
+		'longitude': 139.0,
+		'timestamp': '2024-05-01T10:00:00'
+	}
+	photo.update(overrides)
+	return photo
+
+
+def test_photos_hash_changes_with_popup_fields():
+	base = MapGenerator._calculate_photos_hash([_photo()])
+	assert MapGenerator._calculate_photos_hash([_photo()]) == base
+	assert MapGenerator._calculate_photos_hash([_photo(file_path='data/photos/b.jpg')]) != base
+	assert MapGenerator._calculate_photos_hash([_photo(file_type='video')]) != base
+
+
+def test_cache_roundtrip_and_eviction(tmp_path):
+	cache = MapHtmlCache(cache_dir=str(tmp_path), max_bytes=10 * 1024 * 1024)
+	key = MapHtmlCache.make_key("v1", {'compact': True})
+	assert cache.get(key) is None
+
+	cache.put(key, "<html>地図</html>")
+	assert cache.get(key) == "<html>地図</html>"
+	assert MapHtmlCache.make_key("v1", {'compact': False}) != key
+
+	small = MapHtmlCache(cache_dir=str(tmp_path), max_bytes=1, compress=False)
+	small.put(MapHtmlCache.make_key("v2"), "x" * 100)
+	assert small.get(key) is None
+
+
+def test_export_reuses_cached_html(tmp_path, monkeypatch):
+	cache = MapHtmlCache(cache_dir=str(tmp_path / "cache"))
+	photos = [_photo(), _photo(id=2, latitude=35.01, timestamp='2024-05-01T10:30:00')]
+
+	html = MapGenerator.generate_map_html(photos, cache=cache)
+	assert "<html" in html
+
+	# 表示済み（キャッシュ済み）のマップは再レンダリングせずに書き出す
+	def fail(*args, **kwargs):
+		raise AssertionError("rendered again")
+	monkeypatch.setattr(MapGenerator, "_render_map_html", staticmethod(fail))
+	output = MapGenerator.export_map_html(photos, tmp_path / "output" / "map.html", cache=cache)
+	assert output.read_text(encoding='utf-8') == html
+
+	# 区間分けの設定が違えば別のキャッシュエントリ（未レンダリング）
+	with pytest.raises(AssertionError, match="rendered again"):
+		MapGenerator.export_map_html(photos, tmp_path / "output" / "flat.html", segmented=False, cache=cache)
+	assert cache.export(MapHtmlCache.make_key("missing"), tmp_path / "none.html") is None
@@ -0,0 +1,139 @@
+"""
+マップデータ配信サーバ（map_server）のテスト
+"""
+
+import json
+from urllib.request import urlopen
+
+import pytest
+
+from src.database import Database
+from src.map_server import MapDataServer
+
+
+@pytest.fixture
+def server(tmp_path):
+	db_path = str(tmp_path / "journeymap.db")
+	db = Database(db_path)
+	db.initialize()
+	# 東西に 1000 地点並んだルート（最後の1枚は撮影日時なし）
+	for i in range(1000):
+		db.insert_photo(f"p{i:04d}.jpg", 'image', 35.0, 139.0 + i * 0.001, f"2024-05-01T{i // 60 % 24:02d}:{i % 60:02d}:00")
+	db.insert_photo("untimed.jpg", 'image', 36.0, 140.0, None)
+	db.close()
+
+	server = MapDataServer(db_path=db_path, mbtiles_path=str(tmp_path / "none.mbtiles"))
+	server.start()
+	yield server
+	server.stop()
+
+
+def _get(server, path):
+	with urlopen(server.url + path, timeout=5) as response:
+		return json.loads(response.read())
+
+
+def test_binds_free_port(server):
+	assert server.server_address[1] != 0
+	assert server.url.endswith(f":{server.server_address[1]}")
+	assert _get(server, "/health") == {'status': 'ok'}
+
+
+def test_route_is_clipped_and_simplified(server):
+	view = "south=34.9&north=35.1&west=139.0&east=139.1"
+
+	detail = _get(server, f"/route?{view}&zoom=18")
+	assert detail['type'] == 'route'
+	assert detail['total'] == 1000
+	assert len(detail['lines']) == 1
+	line = detail['lines'][0]
+	# 表示範囲（+余白）にかかる区間だけが返る
+	assert max(p[1] for p in line) < 139.2
+	assert 100 <= len(line) < 1000
+
+	overview = _get(server, f"/route?{view}&zoom=5")
+	assert len(overview['lines'][0]) < len(line)
+
+	outside = _get(server, "/route?south=10&north=11&west=10&east=11&zoom=10")
+	assert outside['lines'] == []
+
+
+def test_route_cache_follows_data_changes(server):
+	view = "/route?south=-90&north=90&west=-180&east=180&zoom=18"
+	assert _get(server, view)['total'] == 1000
+
+	db = Database(server.db_path)
+	db.insert_photo("late.jpg", 'image', 35.5, 139.5, "2024-05-02T00:00:00")
+	db.close()
+	assert _get(server, view)['total'] == 1001
+
+
+def test_route_requires_bounds(server):
+	from urllib.error import HTTPError
+
+	with pytest.raises(HTTPError) as exc:
+		_get(server, "/route?zoom=3")
+	exc.value.close()
+	assert exc.value.code == 400
+
+
+def test_lazy_generator_does_not_embed_route():
+	from src.map_generator import MapGenerator
+
+	photos = [
+		{'latitude': 35.0, 'longitude': 139.0 + i * 0.001, 'timestamp': f"2024-05-01T10:{i:02d}:00"}
+		for i in range(50)
+	]
+	generator = MapGenerator(compact=True, lazy_endpoint="http://127.0.0.1:9")
+	generator.create_base_map(35.0, 139.0, 12)
+	assert generator.add_route(photos) == 50
+
+	html = generator.get_map_html()
+	assert "/route?" in html
+	assert "139.049" not in html
+
+
+def test_route_is_split_by_mode_and_gap(tmp_path):
+	db_path = str(tmp_path / "journeymap.db")
+	db = Database(db_path)
+	db.initialize()
+	# 東京を歩く（途中に1点だけ誤測位）→ 札幌へ飛行機 → 札幌を歩く → 翌日また歩く
+	for i in range(30):
+		lat = 40.0 if i == 15 else 35.0
+		db.insert_photo(f"tokyo{i:02d}.jpg", 'image', lat, 139.0 + i * 0.001, f"2024-05-01T10:{i:02d}:00")
+	for i in range(30):
+		db.insert_photo(f"sapporo{i:02d}.jpg", 'image', 43.0, 141.3 + i * 0.001, f"2024-05-01T12:{i:02d}:00")
+	for i in range(30):
+		db.insert_photo(f"next{i:02d}.jpg", 'image', 43.1, 141.3 + i * 0.001, f"2024-05-02T09:{i:02d}:00")
+	db.close()
+
+	server = MapDataServer(db_path=db_path, mbtiles_path=str(tmp_path / "none.mbtiles"))
+	try:
+		route = server.query_route(-90, -180, 90, 180, 18)
+	finally:
+		server.stop()
+
+	assert route['modes'] == ['walk', 'flight', 'walk', 'walk']
+	assert len(route['lines']) == len(route['modes'])
+	# 誤測位は線に含まれず、日をまたぐ空白期間は結ばれない
+	assert all(p[0] != 40.0 for line in route['lines'] for p in line)
+	assert route['lines'][1][0] == [35.0, 139.029]
+	assert route['lines'][1][-1] == [43.0, 141.3]
+	assert route['lines'][2][-1][0] == 43.0
+	assert route['lines'][3][0][0] == 43.1
+
+
+def test_lazy_route_styles_each_mode():
+	from src.map_generator import MapGenerator
+
+	generator = MapGenerator(compact=True, lazy_endpoint="http://127.0.0.1:9")
+	generator.create_base_map(35.0, 139.0, 12)
+	generator.add_route([
+		{'latitude': 35.0, 'longitude': 139.0, 'timestamp': "2024-05-01T10:00:00"},
+		{'latitude': 35.0, 'longitude': 139.001, 'timestamp': "2024-05-01T10:01:00"}
+	])
+
+	html = generator.get_map_html()
+	for mode, style in MapGenerator.ROUTE_MODE_STYLES.items():
+		assert f'"{mode}"' in html
+		assert json.dumps(style['label'])[1:-1] in html
@@ -0,0 +1,56 @@
+"""
+オフライン逆ジオコーディング（offline_geocoder）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from src.geo import haversine_km
+from src.offline_geocoder import OfflineGeocoder
+
+
+def _gazetteer(n=500, seed=0, **kwargs):
+	rng = np.random.default_rng(seed)
+	lats = rng.uniform(24.0, 46.0, n)
+	lons = rng.uniform(123.0, 146.0, n)
+	return OfflineGeocoder(
+		lats, lons,
+		np.array([f"町{i}" for i in range(n)]),
+		np.array([f"県{i % 47}" for i in range(n)]),
+		np.array(["日本"] * n),
+		**kwargs
+	)
+
+
+@pytest.mark.parametrize("use_tree", [True, False])
+def test_reverse_geocode_many_matches_brute_force(use_tree):
+	geocoder = _gazetteer(max_distance_km=None)
+	if not use_tree:
+		# scipy がない環境と同じ総当たりの経路
+		geocoder._tree = None
+	rng = np.random.default_rng(1)
+	lats = rng.uniform(24.0, 46.0, 300)
+	lons = rng.uniform(123.0, 146.0, 300)
+
+	distances = haversine_km(lats[:, None], lons[:, None], geocoder.lats[None, :], geocoder.lons[None, :])
+	expected = distances.argmin(axis=1)
+
+	index, nearest = geocoder.nearest(lats, lons)
+	np.testing.assert_array_equal(index, expected)
+	np.testing.assert_allclose(nearest, distances.min(axis=1), atol=1e-3)
+
+	results = geocoder.reverse_geocode_many(lats, lons)
+	assert [r['city'] for r in results] == [f"町{i}" for i in expected]
+	assert results[0]['address'] == f"町{expected[0]}, 県{expected[0] % 47}, 日本"
+
+
+@pytest.mark.parametrize("use_tree", [True, False])
+def test_far_points_are_not_found(use_tree):
+	geocoder = _gazetteer(max_distance_km=50.0)
+	if not use_tree:
+		geocoder._tree = None
+	near_lat, near_lon = float(geocoder.lats[0]), float(geocoder.lons[0]) + 0.01
+	results = geocoder.reverse_geocode_many([near_lat, 0.0], [near_lon, -150.0])
+	assert results[0]['city'] == "町0"
+	assert results[1] is None
+	assert geocoder.reverse_geocode_many([], []) == []
@@ -0,0 +1,92 @@
+"""
+道路ネットワーク（road_network）のテスト
+"""
+
+import warnings
+
+import numpy as np
+
+from src.road_network import RoadNetwork
+
+
+def _network():
+	# 0 → 1 → 2 の一方通行と、どこともつながらない 3 ⇄ 4
+	lats = np.array([35.000, 35.001, 35.002, 35.100, 35.101])
+	lons = np.array([139.000, 139.001, 139.002, 139.100, 139.101])
+	src = np.array([0, 1, 3, 4])
+	dst = np.array([1, 2, 4, 3])
+	length = np.array([150.0, 150.0, 150.0, 150.0])
+	return RoadNetwork(lats, lons, src, dst, length, length / 10.0)
+
+
+def test_shortest_path_ignores_unreachable_landmarks_without_warnings():
+	network = _network()
+	with warnings.catch_warnings():
+		warnings.simplefilter("error")
+		result = network.shortest_path(35.000, 139.000, 35.002, 139.002)
+		unreachable = network.shortest_path(35.002, 139.002, 35.000, 139.000)
+	assert abs(result['distance_km'] - 0.3) < 1e-6
+	assert len(result['path']) == 3
+	assert unreachable['path'] == []
+
+
+def test_cache_token_follows_graph_contents():
+	network = _network()
+	token = network.cache_token
+	assert token.startswith("road:distance:")
+	assert _network().cache_token == token
+
+	# 距離・時間・座標のどれか1つでも違えば別の行列になる
+	lats, lons = network.node_lats.copy(), network.node_lons.copy()
+	src, dst = np.array([0, 1, 3, 4]), np.array([1, 2, 4, 3])
+	length = np.array([150.0, 150.0, 150.0, 150.0])
+	slower = RoadNetwork(lats, lons, src, dst, length, length / 5.0)
+	longer = RoadNetwork(lats, lons, src, dst, length * 2, length / 10.0)
+	moved = RoadNetwork(lats + 0.01, lons, src, dst, length, length / 10.0)
+	tokens = {token, slower.cache_token, longer.cache_token, moved.cache_token}
+	assert len(tokens) == 4
+
+
+def _grid_network(size=12, seed=0):
+	# 一方通行を含むランダムな格子状の道路網
+	rng = np.random.default_rng(seed)
+	rows, cols = np.divmod(np.arange(size * size), size)
+	lats = 35.0 + rows * 0.001
+	lons = 139.0 + cols * 0.001
+	src, dst = [], []
+	for node in range(size * size):
+		r, c = divmod(node, size)
+		for nr, nc in ((r + 1, c), (r, c + 1)):
+			if nr < size and nc < size:
+				other = nr * size + nc
+				direction = rng.integers(6)
+				if direction != 1:
+					src.append(node)
+					dst.append(other)
+				if direction != 2:
+					src.append(other)
+					dst.append(node)
+	src, dst = np.array(src), np.array(dst)
+	length = rng.uniform(80.0, 200.0, len(src))
+	return RoadNetwork(lats, lons, src, dst, length, length / rng.uniform(5.0, 15.0, len(src)))
+
+
+def test_bounded_many_to_many_matches_full_search(monkeypatch):
+	import src.road_network as road_network
+
+	network = _grid_network()
+	rng = np.random.default_rng(1)
+	sources = rng.choice(network.node_count, 40)
+	targets = rng.choice(network.node_count, 25)
+	for metric in ('distance', 'time'):
+		# ランドマークなし（探索半径なし）の結果と一致する
+		expected = _grid_network()._many_to_many(sources[:5], targets, metric)
+		bounded = network._many_to_many(sources, targets, metric)
+		assert metric in network._landmarks
+		assert np.isfinite(network._search_limits(np.unique(sources), targets, metric)).all()
+		np.testing.assert_allclose(bounded[:5], expected)
+
+		# scipy がない環境の純 Python 版も同じ結果
+		monkeypatch.setattr(road_network, "_scipy_dijkstra", None)
+		np.testing.assert_allclose(network._many_to_many(sources, targets, metric), bounded)
+		monkeypatch.undo()
@@ -0,0 +1,248 @@
+"""
+ルート最適化（route_optimizer）のテスト
+"""
+
+import numpy as np
+
+from src.route_optimizer import RouteOptimizer
+
+
+def _grid_locations(n, seed=0):
+	rng = np.random.default_rng(seed)
+	lats = 35.0 + rng.random(n) * 0.5
+	lons = 139.0 + rng.random(n) * 0.5
+	return [{'id': i, 'latitude': float(a), 'longitude': float(b)} for i, (a, b) in enumerate(zip(lats, lons))]
+
+
+def test_improve_route_returns_input_when_not_shorter():
+	optimizer = RouteOptimizer()
+	# 一直線に並んだ地点は順番どおりが最短
+	locations = [{'latitude': 35.0, 'longitude': 139.0 + i * 0.01} for i in range(8)]
+	matrix = optimizer.haversine_matrix(
+		[p['latitude'] for p in locations], [p['longitude'] for p in locations]
+	)
+	route = list(range(8))
+
+	improved, distance = optimizer.improve_route(route, matrix)
+	assert improved == route
+	assert improved is not route
+	assert distance == optimizer._route_length(route, matrix)
+
+
+def test_improve_route_is_strictly_shorter_when_it_changes():
+	optimizer = RouteOptimizer()
+	locations = _grid_locations(60)
+	matrix = optimizer.build_distance_matrix(locations)
+	route = list(range(60))
+	before = optimizer._route_length(route, matrix)
+
+	improved, distance = optimizer.improve_route(route, matrix, time_limit=5.0)
+	assert sorted(improved) == route
+	assert improved[0] == 0
+	assert distance < before
+	assert abs(distance - optimizer._route_length(improved, matrix)) < 1e-6
+
+
+def test_2opt_is_never_worse_than_greedy():
+	optimizer = RouteOptimizer()
+	for seed in range(3):
+		locations = _grid_locations(40, seed)
+		_, greedy = optimizer.optimize_route_greedy(locations)
+		_, improved = optimizer.optimize_route_2opt(locations)
+		assert improved <= greedy
+
+
+def test_split_by_days_reports_overflow():
+	import pytest
+
+	optimizer = RouteOptimizer()
+	# 東西に 10km 間隔で 10 地点（合計約 90km）
+	locations = [
+		{'id': i, 'name': str(i), 'latitude': 35.0, 'longitude': 139.0 + i * 0.11}
+		for i in range(10)
+	]
+
+	days = optimizer.split_route_by_days(locations, days=3, parallel=False)
+	assert len(days) == 3
+
+	with pytest.raises(ValueError):
+		optimizer.split_route_by_days(locations, days=2, max_km_per_day=25, parallel=False)
+
+	extended = optimizer.split_route_by_days(
+		locations, days=2, max_km_per_day=25, parallel=False, allow_extra_days=True
+	)
+	assert len(extended) > 2
+	assert all(distance <= 25 for _, distance in extended)
+	assert sum(len(route) for route, _ in extended) == len(locations)
+
+
+def test_search_tables_reference_the_matrix_without_copying():
+	optimizer = RouteOptimizer()
+	locations = _grid_locations(30)
+	matrix = optimizer.build_distance_matrix(locations)
+
+	dist, neighbors = optimizer._search_tables(matrix)
+	assert all(isinstance(row, memoryview) for row in dist)
+	assert dist[3].obj is not None and np.shares_memory(np.asarray(dist[3]), matrix)
+	assert dist[3][7] == float(matrix[3, 7])
+	assert len(neighbors[0]) == optimizer.NEIGHBOR_COUNT
+	assert 0 not in neighbors[0]
+
+
+def test_multistart_in_worker_processes():
+	optimizer = RouteOptimizer()
+	locations = _grid_locations(80, seed=5)
+	_, greedy = optimizer.optimize_route_greedy(locations)
+
+	route, distance = optimizer.optimize_route_multistart(
+		locations, starts=3, time_limit=20, seed=1, max_workers=2
+	)
+	assert sorted(route) == list(range(80))
+	assert route[0] == 0
+	assert distance <= greedy
+
+
+def test_asymmetric_matrix_is_searched_symmetrized_and_costed_directionally():
+	optimizer = RouteOptimizer()
+	rng = np.random.default_rng(3)
+	locations = _grid_locations(60, seed=3)
+	base = optimizer.haversine_matrix(
+		np.array([p['latitude'] for p in locations]), np.array([p['longitude'] for p in locations])
+	)
+	# 一方通行のような遠回りを片方向にだけ加える
+	matrix = base + np.triu(rng.random(base.shape) * 2.0, k=1)
+	assert not np.array_equal(matrix, matrix.T)
+
+	route = optimizer._nearest_neighbor_route(matrix, 0)
+	before = optimizer._route_length(route, matrix)
+	improved, distance = optimizer.improve_route(route, matrix)
+	assert sorted(improved) == list(range(60))
+	assert distance <= before
+	assert abs(distance - optimizer._route_length(improved, matrix)) < 1e-6
+
+	# 周辺の 2-opt も元の行列で長くなる並べ替えは採用しない
+	local = optimizer._local_two_opt(list(improved), matrix, 30, 10)
+	assert optimizer._route_length(local, matrix) <= optimizer._route_length(improved, matrix)
+
+
+def _asymmetric_matrix(n, rng):
+	matrix = rng.random((n, n)) * 10.0
+	np.fill_diagonal(matrix, 0.0)
+	return matrix
+
+
+def test_held_karp_matches_exhaustive_on_asymmetric_instances():
+	optimizer = RouteOptimizer()
+	rng = np.random.default_rng(7)
+	for trial in range(12):
+		n = 3 + trial % 6
+		matrix = _asymmetric_matrix(n, rng)
+		locations = [{'id': i} for i in range(n)]
+		start = int(rng.integers(n))
+		for closed in (False, True):
+			route, distance = optimizer.optimize_route_held_karp(locations, start, closed, distance_matrix=matrix)
+			_, expected = optimizer.optimize_route_exhaustive(locations, start, closed, distance_matrix=matrix)
+			assert route[0] == start and sorted(route) == list(range(n))
+			assert abs(distance - expected) < 1e-9
+			assert abs(distance - optimizer._route_length(route, matrix, closed)) < 1e-9
+
+
+def test_auto_method_uses_held_karp_up_to_cutoff(monkeypatch):
+	optimizer = RouteOptimizer()
+	used = []
+	monkeypatch.setattr(optimizer, 'optimize_route_held_karp', lambda locations, *args, **kwargs: used.append('held_karp') or ([0], 0.0))
+	monkeypatch.setattr(optimizer, 'optimize_route_2opt', lambda locations, *args, **kwargs: used.append('2opt') or ([0], 0.0))
+
+	cutoff = RouteOptimizer.HELD_KARP_MAX_STOPS
+	for n in (cutoff, cutoff + 1):
+		locations = [{'id': i} for i in range(n)]
+		optimizer.optimize_route(locations, distance_matrix=np.zeros((n, n)))
+	assert used == ['held_karp', '2opt']
+
+
+def _ids(route):
+	return [location['id'] for location in route]
+
+
+def test_insert_and_remove_stop_keep_a_valid_route():
+	optimizer = RouteOptimizer()
+	locations = _grid_locations(30, seed=2)
+	for closed in (False, True):
+		route, _ = optimizer.optimize_route(locations, method='2opt', return_to_start=closed)
+		new_location = {'id': 30, 'latitude': 35.25, 'longitude': 139.25}
+
+		inserted, distance = optimizer.insert_stop(route, new_location, return_to_start=closed)
+		assert sorted(_ids(inserted)) == list(range(31))
+		assert inserted[0] is route[0]
+		matrix = optimizer.build_distance_matrix(inserted)
+		assert abs(distance - optimizer._route_length(list(range(31)), matrix, closed)) < 1e-3
+
+		removed, distance = optimizer.remove_stop(inserted, 10, return_to_start=closed)
+		assert sorted(_ids(removed)) == sorted(_ids(inserted[:10] + inserted[11:]))
+		assert removed[0] is inserted[0]
+		matrix = optimizer.build_distance_matrix(removed)
+		assert abs(distance - optimizer._route_length(list(range(30)), matrix, closed)) < 1e-3
+
+
+def test_extend_distance_matrix_equals_full_rebuild():
+	RouteOptimizer.clear_matrix_cache()
+	optimizer = RouteOptimizer()
+	locations = _grid_locations(25, seed=4)
+	new_location = {'id': 25, 'latitude': 35.1, 'longitude': 139.4}
+	optimizer.build_distance_matrix(locations)
+
+	extended = optimizer.extend_distance_matrix(locations, new_location)
+	lats = np.array([p['latitude'] for p in locations + [new_location]])
+	lons = np.array([p['longitude'] for p in locations + [new_location]])
+	np.testing.assert_allclose(extended, optimizer.haversine_matrix(lats, lons), atol=1e-3)
+	np.testing.assert_array_equal(extended, extended.T)
+	# 追加した行列もキャッシュに入り、同じ地点の並びでは再計算しない
+	assert optimizer.build_distance_matrix(locations + [new_location]) is extended
+	RouteOptimizer.clear_matrix_cache()
+
+
+def test_matrix_cache_hits_misses_and_evicts_least_recently_used(monkeypatch):
+	RouteOptimizer.clear_matrix_cache()
+	monkeypatch.setattr(RouteOptimizer, 'MATRIX_CACHE_SIZE', 3)
+	computed = []
+	haversine_matrix = RouteOptimizer.haversine_matrix
+
+	def counting(lats, lons):
+		computed.append(len(lats))
+		return haversine_matrix(lats, lons)
+
+	monkeypatch.setattr(RouteOptimizer, 'haversine_matrix', staticmethod(counting))
+	optimizer = RouteOptimizer()
+
+	def spots(first, n):
+		return [
+			{'attraction_id': first + i, 'latitude': 35.0 + (first + i) * 0.01, 'longitude': 139.0}
+			for i in range(n)
+		]
+
+	a, b, c, d = spots(0, 4), spots(10, 4), spots(20, 4), spots(30, 4)
+	matrix = optimizer.build_distance_matrix(a)
+	assert optimizer.build_distance_matrix(a) is matrix
+	# 順番が違うだけなら部分行列として取り出す（観光地IDと座標で照合）
+	reordered = optimizer.build_distance_matrix(a[::-1])
+	np.testing.assert_array_equal(reordered, matrix[::-1, ::-1])
+	assert computed == [4]
+
+	# 観光地IDが違えば同じ座標でも別の地点
+	optimizer.build_distance_matrix([dict(p, attraction_id=p['attraction_id'] + 100) for p in a])
+	assert computed == [4, 4]
+
+	# 上限を超えると最後に使ったのが最も古いものから削除する
+	RouteOptimizer.clear_matrix_cache()
+	computed.clear()
+	for spot_list in (a, b, c):
+		optimizer.build_distance_matrix(spot_list)
+	optimizer.build_distance_matrix(a)
+	optimizer.build_distance_matrix(d)
+	assert computed == [4, 4, 4, 4]
+	optimizer.build_distance_matrix(a)
+	optimizer.build_distance_matrix(c)
+	assert computed == [4, 4, 4, 4]
+	optimizer.build_distance_matrix(b)
+	assert computed == [4, 4, 4, 4, 4]
+	RouteOptimizer.clear_matrix_cache()
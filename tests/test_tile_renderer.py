@@ -0,0 +1,122 @@
+"""
+タイル事前レンダリング（tile_renderer）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from src.tile_renderer import MBTilesStore, TileRenderer, lonlat_to_world_pixels, tile_bounds_world
+
+
+def _walk(start_id, lat, lon, day, count=30):
+	"""10分おきに東へ少しずつ移動する写真（徒歩程度の速度）"""
+	return [
+		{
+			'id': start_id + i,
+			'latitude': lat,
+			'longitude': lon + i * 0.001,
+			'timestamp': f"2024-05-{day:02d}T{9 + i // 6:02d}:{i % 6 * 10:02d}:00"
+		}
+		for i in range(count)
+	]
+
+
+def _tile_of(lat, lon, z):
+	x, y = lonlat_to_world_pixels(np.array([lat]), np.array([lon]))
+	n = 2 ** z
+	return int(x[0] * n / 256), int(y[0] * n / 256)
+
+
+def test_jobs_only_contain_elements_near_the_tile():
+	renderer = TileRenderer(max_workers=1)
+	photos = _walk(1, 35.68, 139.70, 1) + _walk(100, 34.70, 135.50, 3)
+	state = renderer._build_state(renderer._valid_sorted(photos))
+
+	jobs = renderer._tile_jobs(state, [10])
+	assert sum(dots.size for _, _, _, dots, _ in jobs) >= len(photos)
+	margin = (renderer.dot_radius + renderer.route_width) / 2 ** 10
+	for z, x, y, dots, segs in jobs:
+		x0, y0, x1, y1 = tile_bounds_world(z, x, y)
+		assert np.all((state['px'][dots] >= x0 - margin) & (state['px'][dots] <= x1 + margin))
+		assert np.all((state['py'][dots] >= y0 - margin) & (state['py'][dots] <= y1 + margin))
+
+
+def test_route_is_split_at_long_gaps(tmp_path):
+	# 東京と大阪で別の日に撮影: 間の区間は描画しない
+	photos = _walk(1, 35.68, 139.70, 1) + _walk(100, 34.70, 135.50, 8)
+	path = tmp_path / "photos.mbtiles"
+	TileRenderer(max_workers=1).render(photos, path, 8, 8)
+
+	store = MBTilesStore(path)
+	try:
+		# 名古屋付近（東京〜大阪の直線上）のタイルは空
+		assert store.get_tile(8, *_tile_of(35.2, 137.6, 8)) is None
+		assert store.get_tile(8, *_tile_of(35.68, 139.70, 8)) is not None
+		assert store.get_tile(8, *_tile_of(34.70, 135.50, 8)) is not None
+	finally:
+		store.close()
+
+
+def test_incremental_render_tracks_content(tmp_path):
+	renderer = TileRenderer(max_workers=1)
+	path = tmp_path / "photos.mbtiles"
+	photos = _walk(1, 35.68, 139.70, 1) + _walk(100, 34.70, 135.50, 3)
+	full = renderer.render(photos, path, 5, 12)
+
+	# 変更なし: 何も描画しない
+	assert renderer.render_incremental(photos, path, 5, 12)['tiles'] == 0
+
+	# 追加のみ: 追加地点の周りだけ描き直す
+	added = photos + _walk(200, 34.70, 135.53, 3, count=3)
+	result = renderer.render_incremental(added, path, 5, 12)
+	assert 0 < result['tiles'] < full['tiles']
+
+	# 既存の写真の座標が変わった（MAX(id) は同じ）: 全件描画
+	moved = [dict(p) for p in added]
+	moved[0]['latitude'] = 43.06
+	result = renderer.render_incremental(moved, path, 5, 12)
+	assert result['tiles'] > full['tiles']
+
+	store = MBTilesStore(path)
+	try:
+		assert store.get_tile(12, *_tile_of(43.06, 139.70, 12)) is not None
+	finally:
+		store.close()
+
+
+def test_tiles_layer_requires_overlay_url():
+	from src.map_generator import MapGenerator
+
+	with pytest.raises(ValueError):
+		MapGenerator(photo_layer='tiles')
+
+	generator = MapGenerator(photo_layer='tiles', overlay_tiles="http://127.0.0.1:9/tiles/{z}/{x}/{y}.png")
+	generator.create_base_map(35.0, 139.0, 10)
+	photos = _walk(1, 35.68, 139.70, 1)
+	assert generator.add_markers(photos) == len(photos)
+	assert generator.add_route(photos) == len(photos)
+	html = generator.get_map_html()
+	assert "/tiles/{z}/{x}/{y}.png" in html
+	assert "139.729" not in html
+
+
+def test_incremental_matches_full_render(tmp_path):
+	renderer = TileRenderer(max_workers=1)
+	photos = _walk(1, 35.68, 139.70, 1) + _walk(100, 34.70, 135.50, 3)
+	# 途中の日に別の場所の写真を追加すると、前後の区間分けと移動手段が変わる
+	added = photos + _walk(200, 35.0, 137.0, 2, count=5) + _walk(300, 34.70, 135.52, 3, count=2)
+
+	incremental = tmp_path / "incremental.mbtiles"
+	full = tmp_path / "full.mbtiles"
+	renderer.render(photos, incremental, 5, 13)
+	renderer.render_incremental(added, incremental, 5, 13)
+	renderer.render(added, full, 5, 13)
+
+	def dump(path):
+		store = MBTilesStore(path)
+		try:
+			return {row[:3]: bytes(row[3]) for row in store.conn.execute("SELECT * FROM tiles")}
+		finally:
+			store.close()
+
+	assert dump(incremental) == dump(full)